@@ -16,6 +16,7 @@ from erpnext.stock.utils import check_pending_reposting
 class AccountsSettings(Document):
 	def on_update(self):
 		frappe.clear_cache()
+		self.rebuild_gl_period_balances()
 
 	def validate(self):
 		frappe.db.set_default("add_taxes_from_item_tax_template",
@@ -61,6 +62,12 @@ class AccountsSettings(Document):
 		make_property_setter("Item", "default_discount_account", "hidden", not(enable_discount_accounting), "Check", validate_fields_for_doctype=False)
 
 
+	def rebuild_gl_period_balances(self):
+		# balances are not maintained while disabled
+		if self.has_value_changed("use_gl_period_balances") and cint(self.use_gl_period_balances):
+			frappe.enqueue("erpnext.accounts.doctype.gl_period_balance.gl_period_balance.rebuild_gl_period_balances",
+				queue="long", enqueue_after_commit=True, now=frappe.flags.in_test)
+
 	def validate_pending_reposts(self):
 		if self.acc_frozen_upto:
 			check_pending_reposting(self.acc_frozen_upto)
@@ -7,7 +7,7 @@ from frappe import _
 from frappe.model.document import Document
 from frappe.model.meta import get_field_precision
 from frappe.model.naming import set_name_from_naming_options
-from frappe.utils import flt, fmt_money
+from frappe.utils import flt, fmt_money, getdate, now
 
 import erpnext
 from erpnext.accounts.doctype.accounting_dimension.accounting_dimension import (
@@ -16,6 +16,8 @@ from erpnext.accounts.doctype.accounting_dimension.accounting_dimension import (
 from erpnext.accounts.doctype.accounting_dimension_filter.accounting_dimension_filter import (
 	get_dimension_filter_map,
 )
+from erpnext.accounts.doctype.gl_period_balance.gl_period_balance import update_gl_period_balances
+from erpnext.accounts.doctype.open_item.open_item import update_open_items
 from erpnext.accounts.party import validate_party_frozen_disabled, validate_party_gle_currency
 from erpnext.accounts.utils import get_account_currency, get_fiscal_year
 from erpnext.exceptions import (
@@ -61,6 +63,9 @@ class GLEntry(Document):
 					update_outstanding_amt(self.account, self.party_type, self.party, self.against_voucher_type,
 						self.against_voucher)
 
+		update_gl_period_balances([self])
+		update_open_items([self])
+
 	def check_mandatory(self):
 		mandatory = ['account','voucher_type','voucher_no','company']
 		for k in mandatory:
@@ -68,7 +73,7 @@ class GLEntry(Document):
 				frappe.throw(_("{0} is required").format(_(self.meta.get_label(k))))
 
 		if not (self.party_type and self.party):
-			account_type = frappe.get_cached_value("Account", self.account, "account_type")
+			account_type = self.get_account_details().account_type
 			if account_type == "Receivable":
 				frappe.throw(_("{0} {1}: Customer is required against Receivable account {2}")
 					.format(self.voucher_type, self.voucher_no, self.account))
@@ -87,7 +92,7 @@ class GLEntry(Document):
 		if self.cost_center or self.voucher_type == 'Period Closing Voucher':
 			return
 
-		if frappe.get_cached_value("Account", self.account, "report_type") == "Profit and Loss":
+		if self.get_account_details().report_type == "Profit and Loss":
 			msg = _("{0} {1}: Cost Center is required for 'Profit and Loss' account {2}.").format(
 				self.voucher_type, self.voucher_no, self.account)
 			msg += " "
@@ -96,10 +101,13 @@ class GLEntry(Document):
 
 			frappe.throw(msg, title=_("Missing Cost Center"))
 
-	def validate_dimensions_for_pl_and_bs(self):
-		account_type = frappe.db.get_value("Account", self.account, "report_type")
+	def validate_dimensions_for_pl_and_bs(self, dimensions=None):
+		account_type = self.get_account_details().report_type
+
+		if dimensions is None:
+			dimensions = get_checks_for_pl_and_bs_accounts()
 
-		for dimension in get_checks_for_pl_and_bs_accounts():
+		for dimension in dimensions:
 			if account_type == "Profit and Loss" \
 				and self.company == dimension.company and dimension.mandatory_for_pl and not dimension.disabled:
 				if not self.get(dimension.fieldname):
@@ -112,8 +120,10 @@ class GLEntry(Document):
 					frappe.throw(_("Accounting Dimension <b>{0}</b> is required for 'Balance Sheet' account {1}.")
 						.format(dimension.label, self.account))
 
-	def validate_allowed_dimensions(self):
-		dimension_filter_map = get_dimension_filter_map()
+	def validate_allowed_dimensions(self, dimension_filter_map=None):
+		if dimension_filter_map is None:
+			dimension_filter_map = get_dimension_filter_map()
+
 		for key, value in dimension_filter_map.items():
 			dimension = key[0]
 			account = key[1]
@@ -134,15 +144,17 @@ class GLEntry(Document):
 
 	def check_pl_account(self):
 		if self.is_opening=='Yes' and \
-				frappe.db.get_value("Account", self.account, "report_type")=="Profit and Loss":
+				self.get_account_details().report_type=="Profit and Loss":
 			frappe.throw(_("{0} {1}: 'Profit and Loss' type account {2} not allowed in Opening Entry")
 				.format(self.voucher_type, self.voucher_no, self.account))
 
 	def validate_account_details(self, adv_adj):
 		"""Account must be ledger, active and not freezed"""
 
-		ret = frappe.db.sql("""select is_group, docstatus, company
-			from tabAccount where name=%s""", self.account, as_dict=1)[0]
+		ret = self.get_account_details()
+		if not ret:
+			frappe.throw(_("{0} {1}: Account {2} does not exist")
+				.format(self.voucher_type, self.voucher_no, self.account))
 
 		if ret.is_group==1:
 			frappe.throw(_('''{0} {1}: Account {2} is a Group Account and group accounts cannot be used in transactions''')
@@ -173,7 +185,7 @@ class GLEntry(Document):
 	def validate_party(self):
 		validate_party_frozen_disabled(self.party_type, self.party)
 
-	def validate_currency(self):
+	def validate_currency(self, validate_party_currency=True):
 		company_currency = erpnext.get_company_currency(self.company)
 		account_currency = get_account_currency(self.account)
 
@@ -185,13 +197,114 @@ class GLEntry(Document):
 				.format(self.voucher_type, self.voucher_no, self.account,
 				(account_currency or company_currency)), InvalidAccountCurrency)
 
-		if self.party_type and self.party:
+		if self.party_type and self.party and validate_party_currency:
 			validate_party_gle_currency(self.party_type, self.party, self.company, self.account_currency)
 
 	def validate_and_set_fiscal_year(self):
 		if not self.fiscal_year:
 			self.fiscal_year = get_fiscal_year(self.posting_date, company=self.company)[0]
 
+	def get_account_details(self):
+		"""Account fields used in validations, fetched once per entry (or once per gl map in bulk mode)"""
+		if self.flags.account_details is None:
+			self.flags.account_details = get_accounts_details([self.account]).get(self.account)
+
+		return self.flags.account_details or frappe._dict()
+
+def get_accounts_details(accounts):
+	accounts = [account for account in set(accounts) if account]
+	if not accounts:
+		return {}
+
+	return {d.name: d for d in frappe.get_all("Account",
+		filters={"name": ("in", accounts)},
+		fields=["name", "is_group", "docstatus", "company", "report_type", "account_type"])}
+
+def validate_gl_entries(gl_entries, adv_adj=False, from_repost=False):
+	"""
+		Validate all GL Entries of a gl map in one pass, equivalent to `validate` and `on_update`
+		of each entry. Masters are fetched once for the whole gl map and party validations
+		run once per party.
+	"""
+	account_details = get_accounts_details([gle.account for gle in gl_entries])
+	fiscal_years = {}
+
+	if not from_repost:
+		dimensions = get_checks_for_pl_and_bs_accounts()
+		dimension_filter_map = get_dimension_filter_map()
+		validated_parties = set()
+
+	for gle in gl_entries:
+		gle.flags.account_details = account_details.get(gle.account)
+
+		if not gle.fiscal_year:
+			key = (getdate(gle.posting_date), gle.company)
+			if key not in fiscal_years:
+				fiscal_years[key] = get_fiscal_year(gle.posting_date, company=gle.company)[0]
+			gle.fiscal_year = fiscal_years[key]
+
+		gle.pl_must_have_cost_center()
+
+		if from_repost:
+			continue
+
+		gle.check_mandatory()
+		gle.validate_cost_center()
+		gle.check_pl_account()
+
+		party_key = (gle.party_type, gle.party, gle.company, gle.account_currency or get_account_currency(gle.account))
+		if party_key not in validated_parties:
+			gle.validate_party()
+
+		gle.validate_currency(validate_party_currency=party_key not in validated_parties)
+		validated_parties.add(party_key)
+
+		gle.validate_account_details(adv_adj)
+		gle.validate_dimensions_for_pl_and_bs(dimensions)
+		gle.validate_allowed_dimensions(dimension_filter_map)
+
+	if not from_repost:
+		for account in account_details:
+			validate_frozen_account(account, adv_adj)
+
+def bulk_insert_gl_entries(gl_entries):
+	"""Insert validated GL Entries as submitted with multi-row inserts, skipping document events"""
+	fields = frappe.get_meta("GL Entry").get_valid_columns()
+	timestamp, user = now(), frappe.session.user
+
+	values = []
+	for gle in gl_entries:
+		gle.name = frappe.generate_hash(txt="", length=10)
+		gle.update({
+			"docstatus": 1,
+			"creation": timestamp,
+			"modified": timestamp,
+			"owner": user,
+			"modified_by": user
+		})
+
+		row = gle.get_valid_dict(convert_dates_to_str=True)
+		values.append(tuple(row.get(fieldname) for fieldname in fields))
+
+	frappe.db.bulk_insert("GL Entry", fields, values)
+	update_gl_period_balances(gl_entries)
+	update_open_items(gl_entries)
+
+def update_outstanding_amounts(gl_entries):
+	"""Update outstanding amount once per against voucher instead of once per GL Entry"""
+	if frappe.flags.is_reverse_depr_entry:
+		return
+
+	against_vouchers = {}
+	for gle in gl_entries:
+		if (gle.against_voucher_type in ['Journal Entry', 'Sales Invoice', 'Purchase Invoice', 'Fees']
+			and gle.against_voucher and gle.flags.update_outstanding == 'Yes'):
+			against_vouchers.setdefault((gle.account, gle.party_type, gle.party,
+				gle.against_voucher_type, gle.against_voucher), True)
+
+	for args in against_vouchers:
+		update_outstanding_amt(*args)
+
 def validate_balance_type(account, adv_adj=False):
 	if not adv_adj and account:
 		balance_must_be = frappe.db.get_value("Account", account, "balance_must_be")
@@ -296,6 +409,14 @@ def on_doctype_update():
 	frappe.db.add_index("GL Entry", ["against_voucher_type", "against_voucher"])
 	frappe.db.add_index("GL Entry", ["voucher_type", "voucher_no"])
 
+# links to temporarily named docs, updated when the docs are renamed
+TEMPORARY_NAME_LINKS = {
+	"Stock Ledger Entry": [
+		("Stock Ledger Entry Serial No", "stock_ledger_entry"),
+		("Stock Ledger Checkpoint", "stock_ledger_entry")
+	]
+}
+
 def rename_gle_sle_docs():
 	for doctype in ["GL Entry", "Stock Ledger Entry"]:
 		rename_temporarily_named_docs(doctype)
@@ -307,6 +428,12 @@ def rename_temporarily_named_docs(doctype):
 		oldname = doc.name
 		set_name_from_naming_options(frappe.get_meta(doctype).autoname, doc)
 		newname = doc.name
+		for link_doctype, fieldname in TEMPORARY_NAME_LINKS.get(doctype, []):
+			frappe.db.sql(
+				"UPDATE `tab{0}` SET `{1}` = %s where `{1}` = %s".format(link_doctype, fieldname),
+				(newname, oldname)
+			)
+
 		frappe.db.sql(
 			"UPDATE `tab{}` SET name = %s, to_rename = 0 where name = %s".format(doctype),
 			(newname, oldname),
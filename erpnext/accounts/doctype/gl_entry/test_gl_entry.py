@@ -2,13 +2,21 @@
 # License: GNU General Public License v3. See license.txt
 
 
+import copy
 import unittest
 
 import frappe
 from frappe.model.naming import parse_naming_series
+from frappe.utils import cstr, flt
 
+from erpnext.accounts.doctype.accounting_dimension.accounting_dimension import (
+	get_accounting_dimensions,
+)
 from erpnext.accounts.doctype.gl_entry.gl_entry import rename_gle_sle_docs
 from erpnext.accounts.doctype.journal_entry.test_journal_entry import make_journal_entry
+from erpnext.accounts.doctype.sales_invoice.test_sales_invoice import create_sales_invoice
+from erpnext.accounts.general_ledger import get_merge_properties, merge_similar_entries
+from erpnext.tests.utils import benchmark, get_benchmark_sizes, timer
 
 
 class TestGLEntry(unittest.TestCase):
@@ -59,3 +67,104 @@ class TestGLEntry(unittest.TestCase):
 
 		new_naming_series_current_value = frappe.db.sql("SELECT current from tabSeries where name = %s", naming_series)[0][0]
 		self.assertEqual(old_naming_series_current_value + 2, new_naming_series_current_value)
+
+	@benchmark
+	def test_merge_similar_entries_benchmark(self):
+		"Merging GL rows by key and by a linear scan of the merged rows, as before, gives the same rows."
+		def merge_by_linear_scan(gl_map, merge_properties):
+			merged_gl_map = []
+			for entry in gl_map:
+				for e in merged_gl_map:
+					if e.account == entry.account and all(cstr(e.get(fieldname)) == cstr(entry.get(fieldname))
+						for fieldname in merge_properties):
+						for fieldname in ("debit", "credit", "debit_in_account_currency", "credit_in_account_currency"):
+							e[fieldname] = flt(e.get(fieldname)) + flt(entry.get(fieldname))
+						break
+				else:
+					merged_gl_map.append(entry)
+
+			return merged_gl_map
+
+		merge_properties = get_merge_properties(get_accounting_dimensions())
+
+		for size in get_benchmark_sizes(10000):
+			# two rows to merge for each item of a large voucher
+			gl_map = [make_gl_row(i // 2) for i in range(size)]
+
+			with timer(f"Merging {size} GL rows by linear scan"):
+				expected = merge_by_linear_scan(copy.deepcopy(gl_map), merge_properties)
+
+			with timer(f"Merging {size} GL rows by key"):
+				merged_gl_map = merge_similar_entries(copy.deepcopy(gl_map))
+
+			self.assertEqual(merged_gl_map, expected)
+
+	def test_merge_similar_entries(self):
+		gl_map = []
+		for i in range(10000):
+			gl_map.append(frappe._dict({
+				"company": "_Test Company",
+				"account": "_Test Account Cost for Goods Sold - _TC" if i % 2 else "_Test Bank - _TC",
+				"cost_center": "_Test Cost Center - _TC",
+				# None and empty values are merged together
+				"project": None if i % 4 < 2 else "",
+				"voucher_detail_no": "row-{0}".format(i % 10),
+				"debit": 1 if i % 2 else 0,
+				"credit": 0 if i % 2 else 1,
+				"debit_in_account_currency": 1 if i % 2 else 0,
+				"credit_in_account_currency": 0 if i % 2 else 1,
+			}))
+
+		merged_gl_map = merge_similar_entries(gl_map)
+
+		self.assertEqual(len(merged_gl_map), 10)
+		self.assertEqual([d.voucher_detail_no for d in merged_gl_map], ["row-{0}".format(i) for i in range(10)])
+		for entry in merged_gl_map:
+			self.assertEqual(entry.debit + entry.credit, 1000)
+			self.assertEqual(entry.debit_in_account_currency + entry.credit_in_account_currency, 1000)
+
+	def test_bulk_gl_entry_insertion(self):
+		frappe.db.set_value("Accounts Settings", None, "bulk_gl_entry_insertion", 1)
+		try:
+			si = create_sales_invoice(rate=500)
+
+			jv = make_journal_entry("_Test Bank - _TC", "Debtors - _TC", 200, save=False)
+			jv.accounts[1].update({
+				"party_type": "Customer",
+				"party": si.customer,
+				"reference_type": "Sales Invoice",
+				"reference_name": si.name
+			})
+			jv.submit()
+
+			gl_entries = frappe.get_all("GL Entry",
+				fields=["account", "debit", "credit", "fiscal_year", "account_currency", "docstatus", "to_rename"],
+				filters={"voucher_type": "Journal Entry", "voucher_no": jv.name},
+				order_by="account"
+			)
+
+			self.assertEqual([(d.account, d.debit, d.credit) for d in gl_entries],
+				[("_Test Bank - _TC", 200, 0), ("Debtors - _TC", 0, 200)])
+			for entry in gl_entries:
+				self.assertTrue(entry.fiscal_year)
+				self.assertEqual(entry.account_currency, "INR")
+				self.assertEqual(entry.docstatus, 1)
+				self.assertEqual(entry.to_rename, 1)
+
+			# outstanding updated once for the against voucher
+			self.assertEqual(frappe.db.get_value("Sales Invoice", si.name, "outstanding_amount"), 300)
+		finally:
+			frappe.db.set_value("Accounts Settings", None, "bulk_gl_entry_insertion", 0)
+
+def make_gl_row(i):
+	return frappe._dict({
+		"company": "_Test Company",
+		"account": "_Test Account Cost for Goods Sold - _TC" if i % 2 else "_Test Bank - _TC",
+		"cost_center": "_Test Cost Center - _TC",
+		"project": None,
+		"voucher_detail_no": "row-{0}".format(i),
+		"debit": 1 if i % 2 else 0,
+		"credit": 0 if i % 2 else 1,
+		"debit_in_account_currency": 1 if i % 2 else 0,
+		"credit_in_account_currency": 0 if i % 2 else 1,
+	})
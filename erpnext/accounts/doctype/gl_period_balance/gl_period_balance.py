@@ -0,0 +1,199 @@
+# Copyright (c) 2021, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import hashlib
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import cint, cstr, flt, get_first_day, get_last_day, getdate, now
+
+from erpnext.accounts.doctype.accounting_dimension.accounting_dimension import get_accounting_dimensions
+
+# GL Entry fields by which balances are summed up, `posting_date` is the first day of the month
+KEY_FIELDS = ["company", "account", "posting_date", "fiscal_year", "account_currency", "is_opening",
+	"voucher_type", "cost_center", "project", "finance_book"]
+
+VALUE_FIELDS = ["debit", "credit", "debit_in_account_currency", "credit_in_account_currency"]
+
+
+class GLPeriodBalance(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("GL Period Balance", ["company", "account", "posting_date"])
+
+
+def use_gl_period_balances():
+	return cint(frappe.db.get_single_value("Accounts Settings", "use_gl_period_balances", cache=True))
+
+
+def update_gl_period_balances(gl_entries, reverse=False):
+	"""
+		Add debit and credit of GL Entries to the balances of their months,
+		or subtract them (`reverse`) when the entries are cancelled or deleted.
+
+		Entries marked as cancelled (originals and their reversals) are not part of the balances.
+		Balances are only maintained while `use_gl_period_balances` is enabled in Accounts Settings,
+		they are rebuilt when it is enabled again.
+	"""
+	if not use_gl_period_balances():
+		return
+
+	dimensions = get_accounting_dimensions()
+	balances = get_period_balances(gl_entries, dimensions)
+
+	if reverse:
+		for row in balances.values():
+			for fieldname in VALUE_FIELDS:
+				row[fieldname] = -1 * row[fieldname]
+
+	upsert_gl_period_balances(balances, dimensions)
+
+
+def get_period_balances(gl_entries, dimensions):
+	balances = {}
+	for gle in gl_entries:
+		if cint(gle.get("is_cancelled")):
+			continue
+
+		row = get_period_balance_row(gle, dimensions)
+		name = get_period_balance_name(row, dimensions)
+		if name in balances:
+			for fieldname in VALUE_FIELDS:
+				balances[name][fieldname] += row[fieldname]
+		else:
+			balances[name] = row
+
+	return balances
+
+
+def reverse_gl_period_balances(voucher_type, voucher_no):
+	"""Subtract active GL Entries of a voucher, to be called before they are cancelled or deleted"""
+	if not use_gl_period_balances():
+		return
+
+	gl_entries = frappe.get_all("GL Entry", fields=["*"],
+		filters={"voucher_type": voucher_type, "voucher_no": voucher_no, "is_cancelled": 0})
+
+	update_gl_period_balances(gl_entries, reverse=True)
+
+
+def get_period_balance_row(gle, dimensions):
+	row = frappe._dict({
+		"company": gle.get("company"),
+		"account": gle.get("account"),
+		"posting_date": get_first_day(gle.get("posting_date")),
+		"fiscal_year": gle.get("fiscal_year"),
+		"account_currency": gle.get("account_currency"),
+		"is_opening": gle.get("is_opening") or "No",
+		"voucher_type": "Period Closing Voucher" if gle.get("voucher_type") == "Period Closing Voucher" else ""
+	})
+
+	for fieldname in ["cost_center", "project", "finance_book"] + dimensions:
+		row[fieldname] = gle.get(fieldname) or None
+
+	for fieldname in VALUE_FIELDS:
+		row[fieldname] = flt(gle.get(fieldname))
+
+	return row
+
+
+def get_period_balance_name(row, dimensions):
+	# only set dimensions are part of the key, so that adding a dimension does not change existing keys
+	key = [cstr(row.get(fieldname)) for fieldname in KEY_FIELDS]
+	key += ["{0}:{1}".format(fieldname, row.get(fieldname)) for fieldname in dimensions if row.get(fieldname)]
+
+	return hashlib.sha1("\n".join(key).encode()).hexdigest()
+
+
+def upsert_gl_period_balances(balances, dimensions, chunk_size=1000):
+	if not balances:
+		return
+
+	fields = ["name", "creation", "modified", "owner", "modified_by", "docstatus"] + KEY_FIELDS \
+		+ dimensions + VALUE_FIELDS
+	timestamp, user = now(), frappe.session.user
+
+	# rows are always written in the same order, so that concurrent postings do not deadlock
+	values = []
+	for name in sorted(balances):
+		row = balances[name]
+		values.append([name, timestamp, timestamp, user, user, 0]
+			+ [row.get(fieldname) for fieldname in KEY_FIELDS + dimensions + VALUE_FIELDS])
+
+	if frappe.db.db_type == "postgres":
+		updates = ["`{0}` = `tabGL Period Balance`.`{0}` + excluded.`{0}`".format(fieldname)
+			for fieldname in VALUE_FIELDS]
+		updates.append("`modified` = excluded.`modified`")
+		on_conflict = "on conflict (`name`) do update set {0}".format(", ".join(updates))
+	else:
+		updates = ["`{0}` = `{0}` + values(`{0}`)".format(fieldname) for fieldname in VALUE_FIELDS]
+		updates.append("`modified` = values(`modified`)")
+		on_conflict = "on duplicate key update {0}".format(", ".join(updates))
+
+	for i in range(0, len(values), chunk_size):
+		chunk = values[i:i + chunk_size]
+		frappe.db.sql("""
+			insert into `tabGL Period Balance` ({fields})
+			values {rows}
+			{on_conflict}
+		""".format(
+			fields=", ".join("`{0}`".format(f) for f in fields),
+			rows=", ".join(["({0})".format(", ".join(["%s"] * len(fields)))] * len(chunk)),
+			on_conflict=on_conflict
+		), tuple(value for row in chunk for value in row))
+
+
+def rebuild_gl_period_balances(company=None):
+	"""Recompute all balances (of `company`) from GL Entries"""
+	dimensions = get_accounting_dimensions()
+	companies = [company] if company else frappe.get_all("Company", pluck="name")
+
+	group_by_fields = ["account", "fiscal_year", "account_currency", "is_opening", "cost_center",
+		"project", "finance_book"] + dimensions
+
+	for company in companies:
+		frappe.db.sql("delete from `tabGL Period Balance` where company = %s", company)
+
+		# any date of the month will do, `get_period_balance_row` moves it to the first day
+		gl_entries = frappe.db.sql("""
+			select
+				company, {fields},
+				min(posting_date) as posting_date,
+				case when voucher_type = 'Period Closing Voucher' then voucher_type else '' end as voucher_type,
+				sum(debit) as debit, sum(credit) as credit,
+				sum(debit_in_account_currency) as debit_in_account_currency,
+				sum(credit_in_account_currency) as credit_in_account_currency
+			from `tabGL Entry`
+			where company = %s and is_cancelled = 0
+			group by company, {fields},
+				extract(year from posting_date), extract(month from posting_date),
+				case when voucher_type = 'Period Closing Voucher' then voucher_type else '' end
+		""".format(fields=", ".join("`{0}`".format(f) for f in group_by_fields)), company, as_dict=1)
+
+		upsert_gl_period_balances(get_period_balances(gl_entries, dimensions), dimensions)
+
+
+def get_period_balance_conditions(boundaries):
+	"""
+		Returns conditions to read balances of whole months from GL Period Balance
+		and GL Entries of the remaining (partial) months from GL Entry.
+
+		A month is partial if any of the `boundaries` (dates on which a period of the report starts)
+		falls after its first day. The condition for GL Entry is None if there are no partial months.
+	"""
+	partial_months = sorted({get_first_day(d) for d in boundaries
+		if d and getdate(d) != get_first_day(d)})
+
+	if not partial_months:
+		return "", None
+
+	period_balance_conditions = " and posting_date not in ({0})".format(
+		", ".join(frappe.db.escape(cstr(d)) for d in partial_months))
+
+	gl_entry_conditions = " and ({0})".format(" or ".join(
+		"posting_date between {0} and {1}".format(frappe.db.escape(cstr(d)), frappe.db.escape(cstr(get_last_day(d))))
+		for d in partial_months))
+
+	return period_balance_conditions, gl_entry_conditions
@@ -0,0 +1,101 @@
+# Copyright (c) 2021, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+import frappe
+from frappe.utils import flt
+
+from erpnext.accounts.doctype.gl_period_balance.gl_period_balance import (
+	get_period_balance_conditions,
+	rebuild_gl_period_balances,
+)
+from erpnext.accounts.doctype.journal_entry.test_journal_entry import make_journal_entry
+from erpnext.tests.utils import ERPNextTestCase
+
+
+class TestGLPeriodBalance(ERPNextTestCase):
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		frappe.db.set_value("Accounts Settings", None, "use_gl_period_balances", 1)
+		rebuild_gl_period_balances("_Test Company")
+
+	def test_balances_follow_gl_entries(self):
+		accounts = ["_Test Bank - _TC", "_Test Cash - _TC"]
+		before = get_period_balances(accounts)
+
+		journal_entries = [
+			make_journal_entry(accounts[0], accounts[1], 100, posting_date="2021-03-05", submit=True),
+			make_journal_entry(accounts[1], accounts[0], 40, posting_date="2021-03-25", submit=True),
+			make_journal_entry(accounts[0], accounts[1], 25, posting_date="2021-04-10", submit=True),
+		]
+
+		balances = get_period_balances(accounts)
+		self.assertEqual(balances, get_gl_entry_balances(accounts))
+		self.assertEqual(get_change(before, balances, accounts[0], "2021-03-01"), 60)
+		self.assertEqual(get_change(before, balances, accounts[0], "2021-04-01"), 25)
+
+		for je in journal_entries:
+			je.cancel()
+
+		self.assertEqual(get_period_balances(accounts), before)
+
+	def test_rebuild_gl_period_balances(self):
+		accounts = ["_Test Bank - _TC", "_Test Cash - _TC"]
+		make_journal_entry(accounts[0], accounts[1], 100, posting_date="2021-05-15", submit=True)
+
+		expected = get_period_balances(accounts)
+		rebuild_gl_period_balances("_Test Company")
+
+		self.assertEqual(get_period_balances(accounts), expected)
+
+	def test_balances_not_maintained_when_disabled(self):
+		accounts = ["_Test Bank - _TC", "_Test Cash - _TC"]
+		before = get_period_balances(accounts)
+
+		frappe.db.set_value("Accounts Settings", None, "use_gl_period_balances", 0)
+		try:
+			make_journal_entry(accounts[0], accounts[1], 100, posting_date="2021-06-15", submit=True)
+			self.assertEqual(get_period_balances(accounts), before)
+		finally:
+			frappe.db.set_value("Accounts Settings", None, "use_gl_period_balances", 1)
+			rebuild_gl_period_balances("_Test Company")
+
+		self.assertEqual(get_period_balances(accounts), get_gl_entry_balances(accounts))
+
+	def test_period_balance_conditions(self):
+		self.assertEqual(get_period_balance_conditions(["2021-04-01", "2021-05-01"]), ("", None))
+
+		period_balance_conditions, gl_entry_conditions = get_period_balance_conditions(
+			["2021-04-01", "2021-04-16", "2021-05-01"])
+		self.assertIn("'2021-04-01'", period_balance_conditions)
+		self.assertIn("between '2021-04-01' and '2021-04-30'", gl_entry_conditions)
+
+
+def get_period_balances(accounts):
+	return {
+		(d.account, str(d.period)): flt(d.balance, 2)
+		for d in frappe.db.sql("""
+			select account, posting_date as period, sum(debit - credit) as balance
+			from `tabGL Period Balance`
+			where company = '_Test Company' and account in %s
+			group by account, posting_date
+		""", [accounts], as_dict=1)
+		if flt(d.balance, 2)
+	}
+
+
+def get_gl_entry_balances(accounts):
+	return {
+		(d.account, str(d.period)): flt(d.balance, 2)
+		for d in frappe.db.sql("""
+			select account, date_format(posting_date, '%%Y-%%m-01') as period, sum(debit - credit) as balance
+			from `tabGL Entry`
+			where company = '_Test Company' and account in %s and is_cancelled = 0
+			group by account, date_format(posting_date, '%%Y-%%m-01')
+		""", [accounts], as_dict=1)
+		if flt(d.balance, 2)
+	}
+
+
+def get_change(before, after, account, period):
+	return after.get((account, period), 0) - before.get((account, period), 0)
@@ -0,0 +1,183 @@
+# Copyright (c) 2021, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import hashlib
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import cint, cstr, flt, now
+
+KEY_FIELDS = ["company", "account", "party_type", "party", "voucher_type", "voucher_no"]
+
+# set from the voucher's own entries, kept as is for entries posted against it
+DETAIL_FIELDS = ["posting_date", "due_date", "cost_center", "account_currency"]
+
+VALUE_FIELDS = ["invoice_amount", "outstanding", "outstanding_in_account_currency"]
+
+
+class OpenItem(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("Open Item", ["party_type", "party", "account"])
+	frappe.db.add_index("Open Item", ["voucher_type", "voucher_no"])
+
+
+def get_party_account_type_of_account(account):
+	root_type, account_type = frappe.get_cached_value("Account", account, ["root_type", "account_type"])
+	return account_type or ("Receivable" if root_type == "Asset" else "Payable")
+
+
+def update_open_items(gl_entries, reverse=False):
+	"""
+		Add party GL Entries to the outstanding of the vouchers they are posted against
+		(or of their own voucher), or subtract them (`reverse`) when the entries are cancelled or deleted.
+
+		Outstanding is positive when the party owes (receivable) or is owed (payable) the amount.
+		Entries marked as cancelled (originals and their reversals) are not part of the outstanding.
+	"""
+	open_items = {}
+	for gle in gl_entries:
+		if cint(gle.get("is_cancelled")) or not (gle.get("party_type") and gle.get("party")):
+			continue
+
+		row = get_open_item_row(gle)
+		name = get_open_item_name(row)
+		if name in open_items:
+			for fieldname in VALUE_FIELDS:
+				open_items[name][fieldname] += row[fieldname]
+			for fieldname in DETAIL_FIELDS:
+				open_items[name][fieldname] = open_items[name][fieldname] or row[fieldname]
+		else:
+			open_items[name] = row
+
+	if reverse:
+		for row in open_items.values():
+			for fieldname in VALUE_FIELDS:
+				row[fieldname] = -1 * row[fieldname]
+
+	upsert_open_items(open_items)
+
+	if reverse:
+		delete_settled_open_items(list(open_items))
+
+
+def reverse_open_items(voucher_type, voucher_no):
+	"""Subtract active GL Entries of a voucher, to be called before they are cancelled or deleted"""
+	gl_entries = frappe.get_all("GL Entry", fields=["*"],
+		filters={"voucher_type": voucher_type, "voucher_no": voucher_no, "is_cancelled": 0})
+
+	update_open_items(gl_entries, reverse=True)
+
+
+def get_open_item_row(gle):
+	if gle.get("against_voucher"):
+		voucher_type, voucher_no = gle.get("against_voucher_type"), gle.get("against_voucher")
+	else:
+		voucher_type, voucher_no = gle.get("voucher_type"), gle.get("voucher_no")
+
+	is_own_entry = (voucher_type, voucher_no) == (gle.get("voucher_type"), gle.get("voucher_no"))
+	sign = 1 if get_party_account_type_of_account(gle.get("account")) == "Receivable" else -1
+
+	outstanding_in_account_currency = sign * (flt(gle.get("debit_in_account_currency"))
+		- flt(gle.get("credit_in_account_currency")))
+
+	return frappe._dict({
+		"company": gle.get("company"),
+		"account": gle.get("account"),
+		"party_type": gle.get("party_type"),
+		"party": gle.get("party"),
+		"voucher_type": voucher_type,
+		"voucher_no": voucher_no,
+		"posting_date": gle.get("posting_date") if is_own_entry else None,
+		"due_date": gle.get("due_date") if is_own_entry else None,
+		"cost_center": gle.get("cost_center") if is_own_entry else None,
+		"account_currency": gle.get("account_currency"),
+		"invoice_amount": outstanding_in_account_currency
+			if is_own_entry and outstanding_in_account_currency > 0 else 0.0,
+		"outstanding": sign * (flt(gle.get("debit")) - flt(gle.get("credit"))),
+		"outstanding_in_account_currency": outstanding_in_account_currency
+	})
+
+
+def get_open_item_name(row):
+	return hashlib.sha1("\n".join(cstr(row.get(fieldname)) for fieldname in KEY_FIELDS).encode()).hexdigest()
+
+
+def upsert_open_items(open_items, chunk_size=1000):
+	if not open_items:
+		return
+
+	fields = ["name", "creation", "modified", "owner", "modified_by", "docstatus"] + KEY_FIELDS \
+		+ DETAIL_FIELDS + VALUE_FIELDS
+	timestamp, user = now(), frappe.session.user
+
+	# rows are always written in the same order, so that concurrent postings do not deadlock
+	values = []
+	for name in sorted(open_items):
+		row = open_items[name]
+		values.append([name, timestamp, timestamp, user, user, 0]
+			+ [row.get(fieldname) for fieldname in KEY_FIELDS + DETAIL_FIELDS + VALUE_FIELDS])
+
+	if frappe.db.db_type == "postgres":
+		updates = ["`{0}` = `tabOpen Item`.`{0}` + excluded.`{0}`".format(fieldname)
+			for fieldname in VALUE_FIELDS]
+		updates += ["`{0}` = coalesce(excluded.`{0}`, `tabOpen Item`.`{0}`)".format(fieldname)
+			for fieldname in DETAIL_FIELDS]
+		updates.append("`modified` = excluded.`modified`")
+		on_conflict = "on conflict (`name`) do update set {0}".format(", ".join(updates))
+	else:
+		updates = ["`{0}` = `{0}` + values(`{0}`)".format(fieldname) for fieldname in VALUE_FIELDS]
+		updates += ["`{0}` = coalesce(values(`{0}`), `{0}`)".format(fieldname) for fieldname in DETAIL_FIELDS]
+		updates.append("`modified` = values(`modified`)")
+		on_conflict = "on duplicate key update {0}".format(", ".join(updates))
+
+	for i in range(0, len(values), chunk_size):
+		chunk = values[i:i + chunk_size]
+		frappe.db.sql("""
+			insert into `tabOpen Item` ({fields})
+			values {rows}
+			{on_conflict}
+		""".format(
+			fields=", ".join("`{0}`".format(f) for f in fields),
+			rows=", ".join(["({0})".format(", ".join(["%s"] * len(fields)))] * len(chunk)),
+			on_conflict=on_conflict
+		), tuple(value for row in chunk for value in row))
+
+
+def delete_settled_open_items(names):
+	# only items of vouchers whose entries are all cancelled or deleted,
+	# paid invoices are kept so that cancelling the payment restores them
+	if names:
+		frappe.db.sql("""
+			delete from `tabOpen Item`
+			where name in %(names)s
+				and invoice_amount = 0 and outstanding = 0 and outstanding_in_account_currency = 0
+		""", {"names": tuple(names)})
+
+
+def rebuild_open_items(company=None, page_size=10000):
+	"""Recompute all open items (of `company`) from GL Entries"""
+	companies = [company] if company else frappe.get_all("Company", pluck="name")
+
+	for company in companies:
+		frappe.db.sql("delete from `tabOpen Item` where company = %s", company)
+
+		last_name = ""
+		while True:
+			gl_entries = frappe.db.sql("""
+				select *
+				from `tabGL Entry`
+				where company = %s and name > %s
+					and is_cancelled = 0
+					and ifnull(party_type, '') != '' and ifnull(party, '') != ''
+				order by name
+				limit %s
+			""", (company, last_name, page_size), as_dict=1)
+
+			if not gl_entries:
+				break
+
+			update_open_items(gl_entries)
+			last_name = gl_entries[-1].name
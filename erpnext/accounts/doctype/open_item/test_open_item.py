@@ -0,0 +1,58 @@
+# Copyright (c) 2021, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+import frappe
+
+from erpnext.accounts.doctype.open_item.open_item import rebuild_open_items
+from erpnext.accounts.doctype.payment_entry.payment_entry import get_payment_entry
+from erpnext.accounts.doctype.sales_invoice.test_sales_invoice import create_sales_invoice
+from erpnext.accounts.utils import get_outstanding_invoices
+from erpnext.tests.utils import ERPNextTestCase
+
+
+class TestOpenItem(ERPNextTestCase):
+	def test_open_item_follows_payments(self):
+		si = create_sales_invoice(rate=100)
+		self.assertEqual(get_open_item(si).outstanding, si.outstanding_amount)
+
+		pe = get_payment_entry("Sales Invoice", si.name, party_amount=40, bank_account="_Test Cash - _TC")
+		pe.reference_no = "1"
+		pe.reference_date = si.posting_date
+		pe.submit()
+
+		si.load_from_db()
+		open_item = get_open_item(si)
+		self.assertEqual(open_item.outstanding, si.outstanding_amount)
+		self.assertEqual(open_item.invoice_amount, si.grand_total)
+
+		outstanding_invoices = get_outstanding_invoices("Customer", si.customer, si.debit_to)
+		invoice = [d for d in outstanding_invoices if d.voucher_no == si.name][0]
+		self.assertEqual(invoice.outstanding_amount, si.outstanding_amount)
+		self.assertEqual(invoice.payment_amount, 40)
+
+		pe.cancel()
+		si.load_from_db()
+		self.assertEqual(get_open_item(si).outstanding, si.grand_total)
+
+		si.cancel()
+		self.assertFalse(get_open_item(si))
+
+	def test_rebuild_open_items(self):
+		si = create_sales_invoice(rate=100)
+		pe = get_payment_entry("Sales Invoice", si.name, party_amount=30, bank_account="_Test Cash - _TC")
+		pe.reference_no = "1"
+		pe.reference_date = si.posting_date
+		pe.submit()
+
+		expected = get_open_item(si)
+		rebuild_open_items("_Test Company")
+		open_item = get_open_item(si)
+
+		for fieldname in ("invoice_amount", "outstanding", "outstanding_in_account_currency", "due_date"):
+			self.assertEqual(open_item.get(fieldname), expected.get(fieldname))
+
+
+def get_open_item(si):
+	return frappe.db.get_value("Open Item", {"voucher_type": si.doctype, "voucher_no": si.name,
+		"account": si.debit_to}, ["invoice_amount", "outstanding", "outstanding_in_account_currency",
+		"due_date"], as_dict=1)
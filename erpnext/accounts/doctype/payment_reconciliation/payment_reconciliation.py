@@ -292,13 +292,12 @@ class PaymentReconciliation(Document):
 		if get_invoices:
 			condition += " and posting_date >= {0}".format(frappe.db.escape(self.from_invoice_date)) if self.from_invoice_date else ""
 			condition += " and posting_date <= {0}".format(frappe.db.escape(self.to_invoice_date)) if self.to_invoice_date else ""
-			dr_or_cr = ("debit_in_account_currency" if erpnext.get_party_account_type(self.party_type) == 'Receivable'
-				else "credit_in_account_currency")
 
+			# invoices are read from Open Item
 			if self.minimum_invoice_amount:
-				condition += " and `{0}` >= {1}".format(dr_or_cr, flt(self.minimum_invoice_amount))
+				condition += " and invoice_amount >= {0}".format(flt(self.minimum_invoice_amount))
 			if self.maximum_invoice_amount:
-				condition += " and `{0}` <= {1}".format(dr_or_cr, flt(self.maximum_invoice_amount))
+				condition += " and invoice_amount <= {0}".format(flt(self.maximum_invoice_amount))
 
 		elif get_return_invoices:
 			condition = " and doc.company = '{0}' ".format(self.company)
@@ -1,7 +1,9 @@
 # Copyright (c) 2018, Frappe Technologies Pvt. Ltd. and Contributors
 # See license.txt
 
+import threading
 import unittest
+from unittest.mock import patch
 
 import frappe
 
@@ -9,6 +11,7 @@ from erpnext.accounts.doctype.pos_closing_entry.pos_closing_entry import (
 	make_closing_entry_from_opening,
 )
 from erpnext.accounts.doctype.pos_invoice.test_pos_invoice import create_pos_invoice
+from erpnext.accounts.doctype.pos_invoice_merge_log import pos_invoice_merge_log
 from erpnext.accounts.doctype.pos_opening_entry.test_pos_opening_entry import create_opening_entry
 from erpnext.accounts.doctype.pos_profile.test_pos_profile import make_pos_profile
 from erpnext.stock.doctype.stock_entry.test_stock_entry import make_stock_entry
@@ -17,7 +20,7 @@ from erpnext.stock.doctype.stock_entry.test_stock_entry import make_stock_entry
 class TestPOSClosingEntry(unittest.TestCase):
 	def setUp(self):
 		# Make stock available for POS Sales
-		make_stock_entry(target="_Test Warehouse - _TC", qty=2, basic_rate=100)
+		self.stock_entry = make_stock_entry(target="_Test Warehouse - _TC", qty=2, basic_rate=100)
 
 	def tearDown(self):
 		frappe.set_user("Administrator")
@@ -99,6 +102,121 @@ class TestPOSClosingEntry(unittest.TestCase):
 		pos_inv1.load_from_db()
 		self.assertEqual(pos_inv1.status, 'Paid')
 
+	def test_retry_of_failed_pos_closing_entry(self):
+		test_user, pos_profile = init_user_and_profile()
+		opening_entry = create_opening_entry(pos_profile, test_user.name)
+
+		pos_inv1 = create_pos_invoice(rate=3500, do_not_submit=1)
+		pos_inv1.append('payments', {
+			'mode_of_payment': 'Cash', 'account': 'Cash - _TC', 'amount': 3500
+		})
+		pos_inv1.submit()
+
+		pos_inv2 = create_pos_invoice(customer="_Test Customer 2", rate=3200, do_not_submit=1)
+		pos_inv2.append('payments', {
+			'mode_of_payment': 'Cash', 'account': 'Cash - _TC', 'amount': 3200
+		})
+		pos_inv2.submit()
+
+		pcv_doc = make_closing_entry_from_opening(opening_entry)
+		for d in pcv_doc.payment_reconciliation:
+			if d.mode_of_payment == 'Cash':
+				d.closing_amount = 6700
+
+		pcv_doc.submit()
+
+		pos_inv1.load_from_db()
+		consolidated_invoice = pos_inv1.consolidated_invoice
+
+		# as if consolidation failed for the invoices of the second customer
+		merge_log = frappe.get_doc('POS Invoice Merge Log',
+			{'pos_closing_entry': pcv_doc.name, 'customer': '_Test Customer 2'})
+		merge_log.cancel()
+		pcv_doc.set_status(update=True, status='Failed')
+
+		pcv_doc.retry()
+
+		# only the invoices left unconsolidated are merged again
+		pos_inv1.load_from_db()
+		pos_inv2.load_from_db()
+		self.assertEqual(pos_inv1.consolidated_invoice, consolidated_invoice)
+		self.assertTrue(pos_inv2.consolidated_invoice)
+		self.assertEqual(frappe.db.get_value('POS Closing Entry', pcv_doc.name, 'status'), 'Submitted')
+
+	def test_pos_closing_entry_completed_by_concurrent_jobs(self):
+		test_user, pos_profile = init_user_and_profile()
+		opening_entry = create_opening_entry(pos_profile, test_user.name)
+
+		pos_invoices = []
+		for customer, rate in [("_Test Customer", 3500), ("_Test Customer 2", 3200)]:
+			pos_inv = create_pos_invoice(customer=customer, rate=rate, do_not_submit=1)
+			pos_inv.append('payments', {
+				'mode_of_payment': 'Cash', 'account': 'Cash - _TC', 'amount': rate
+			})
+			pos_inv.submit()
+			pos_invoices.append(pos_inv)
+
+		pcv_doc = make_closing_entry_from_opening(opening_entry)
+		for d in pcv_doc.payment_reconciliation:
+			if d.mode_of_payment == 'Cash':
+				d.closing_amount = 6700
+
+		pcv_doc.submit()
+
+		# as if the invoices of both customers were queued, each in a job of its own
+		for merge_log in frappe.get_all('POS Invoice Merge Log', {'pos_closing_entry': pcv_doc.name}, pluck='name'):
+			frappe.get_doc('POS Invoice Merge Log', merge_log).cancel()
+		pcv_doc.set_status(update=True, status='Queued')
+
+		self.addCleanup(cancel_committed_docs, ('POS Closing Entry', pcv_doc.name),
+			*[('POS Invoice', pos_inv.name) for pos_inv in pos_invoices],
+			('POS Opening Entry', opening_entry.name), ('Stock Entry', self.stock_entry.name))
+		# the jobs run in connections of their own, which only see committed data
+		frappe.db.commit()
+
+		site, errors = frappe.local.site, []
+		barrier = threading.Barrier(2, timeout=120)
+		complete_closing_entry = pos_invoice_merge_log.complete_closing_entry
+
+		def complete_after_other_job(closing_entry):
+			# both jobs have consolidated their invoices before either completes the closing entry
+			barrier.wait()
+			complete_closing_entry(closing_entry)
+
+		def run_job(customer):
+			frappe.init(site=site)
+			frappe.connect()
+			try:
+				closing_entry = frappe.get_doc('POS Closing Entry', pcv_doc.name)
+				invoices = [d for d in closing_entry.pos_transactions if d.customer == customer]
+				pos_invoice_merge_log.create_merge_logs({customer: invoices}, closing_entry)
+			except Exception as e:
+				errors.append(e)
+			finally:
+				frappe.destroy()
+
+		with patch.object(pos_invoice_merge_log, 'complete_closing_entry', complete_after_other_job):
+			jobs = [threading.Thread(target=run_job, args=(customer,))
+				for customer in ["_Test Customer", "_Test Customer 2"]]
+			for job in jobs:
+				job.start()
+			for job in jobs:
+				job.join()
+
+		self.assertFalse(errors)
+		for pos_inv in pos_invoices:
+			self.assertTrue(frappe.db.get_value('POS Invoice', pos_inv.name, 'consolidated_invoice'))
+		self.assertEqual(frappe.db.get_value('POS Closing Entry', pcv_doc.name, 'status'), 'Submitted')
+
+
+def cancel_committed_docs(*docs):
+	"""Cancels the documents committed by a test, in the given order, and commits the cancellations"""
+	for doctype, name in docs:
+		doc = frappe.get_doc(doctype, name)
+		if doc.docstatus == 1:
+			doc.cancel()
+
+	frappe.db.commit()
 
 def init_user_and_profile(**args):
 	user = 'test@example.com'
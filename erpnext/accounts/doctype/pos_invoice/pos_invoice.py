@@ -4,7 +4,7 @@
 
 import frappe
 from frappe import _
-from frappe.utils import cint, flt, get_link_to_form, getdate, nowdate
+from frappe.utils import cint, cstr, flt, get_link_to_form, getdate, nowdate
 
 from erpnext.accounts.doctype.loyalty_program.loyalty_program import validate_loyalty_points
 from erpnext.accounts.doctype.payment_request.payment_request import make_payment_request
@@ -64,6 +64,7 @@ class POSInvoice(SalesInvoice):
 			self.apply_loyalty_points()
 		self.check_phone_payments()
 		self.set_status(update=True)
+		self.clear_item_availability_cache()
 
 		if self.coupon_code:
 			from erpnext.accounts.doctype.pricing_rule.utils import update_coupon_code_count
@@ -99,6 +100,15 @@ class POSInvoice(SalesInvoice):
 			from erpnext.accounts.doctype.pricing_rule.utils import update_coupon_code_count
 			update_coupon_code_count(self.coupon_code,'cancelled')
 
+		self.clear_item_availability_cache()
+
+	def clear_item_availability_cache(self):
+		from erpnext.selling.page.point_of_sale.point_of_sale import clear_item_availability_cache
+
+		for d in self.get("items"):
+			if d.item_code and d.warehouse:
+				clear_item_availability_cache(d.item_code, d.warehouse)
+
 	def check_phone_payments(self):
 		for pay in self.payments:
 			if pay.type == "Phone" and pay.amount >= 0:
@@ -111,13 +121,15 @@ class POSInvoice(SalesInvoice):
 				if paid_amt and pay.amount != paid_amt:
 					return frappe.throw(_("Payment related to {0} is not completed").format(pay.mode_of_payment))
 
-	def validate_pos_reserved_serial_nos(self, item):
+	def validate_pos_reserved_serial_nos(self, item, reserved_serial_nos=None):
 		serial_nos = get_serial_nos(item.serial_no)
-		filters = {"item_code": item.item_code, "warehouse": item.warehouse}
-		if item.batch_no:
-			filters["batch_no"] = item.batch_no
+		if reserved_serial_nos is None:
+			filters = {"item_code": item.item_code, "warehouse": item.warehouse}
+			if item.batch_no:
+				filters["batch_no"] = item.batch_no
+
+			reserved_serial_nos = get_pos_reserved_serial_nos(filters)
 
-		reserved_serial_nos = get_pos_reserved_serial_nos(filters)
 		invalid_serial_nos = [s for s in serial_nos if s in reserved_serial_nos]
 
 		bold_invalid_serial_nos = frappe.bold(', '.join(invalid_serial_nos))
@@ -145,13 +157,14 @@ class POSInvoice(SalesInvoice):
 			frappe.throw(_("Row #{}: Batch No. {} of item {} has less than required stock available, {} more required")
 						.format(item.idx, bold_invalid_batch_no, bold_item_name, bold_extra_batch_qty_needed), title=_("Item Unavailable"))
 
-	def validate_delivered_serial_nos(self, item):
-		serial_nos = get_serial_nos(item.serial_no)
-		delivered_serial_nos = frappe.db.get_list('Serial No', {
-			'item_code': item.item_code,
-			'name': ['in', serial_nos],
-			'sales_invoice': ['is', 'set']
-		}, pluck='name')
+	def validate_delivered_serial_nos(self, item, delivered_serial_nos=None):
+		if delivered_serial_nos is None:
+			serial_nos = get_serial_nos(item.serial_no)
+			delivered_serial_nos = frappe.db.get_list('Serial No', {
+				'item_code': item.item_code,
+				'name': ['in', serial_nos],
+				'sales_invoice': ['is', 'set']
+			}, pluck='name')
 
 		if delivered_serial_nos:
 			bold_delivered_serial_nos = frappe.bold(', '.join(delivered_serial_nos))
@@ -162,26 +175,43 @@ class POSInvoice(SalesInvoice):
 		if self.is_return or self.docstatus != 1:
 			return
 
-		allow_negative_stock = frappe.db.get_single_value('Stock Settings', 'allow_negative_stock')
+		# invoices synced by `sync_offline_invoices` are validated against the stock fetched for the whole batch
+		stock = self.flags.offline_stock
+		if stock:
+			allow_negative_stock = stock.allow_negative_stock
+		else:
+			allow_negative_stock = frappe.db.get_single_value('Stock Settings', 'allow_negative_stock')
+
 		for d in self.get('items'):
 			if d.serial_no:
-				self.validate_pos_reserved_serial_nos(d)
-				self.validate_delivered_serial_nos(d)
+				if stock:
+					self.validate_pos_reserved_serial_nos(d, stock.reserved_serial_nos.get((d.item_code, d.warehouse), set()))
+					self.validate_delivered_serial_nos(d, [serial_no for serial_no in get_serial_nos(d.serial_no)
+						if (d.item_code, serial_no) in stock.delivered_serial_nos])
+				else:
+					self.validate_pos_reserved_serial_nos(d)
+					self.validate_delivered_serial_nos(d)
 			elif d.batch_no:
 				self.validate_pos_reserved_batch_qty(d)
 			else:
 				if allow_negative_stock:
 					return
 
-				available_stock = get_stock_availability(d.item_code, d.warehouse)
+				if stock:
+					available_stock = get_offline_stock_availability(d.item_code, d.warehouse, stock)
+				else:
+					available_stock = get_stock_availability(d.item_code, d.warehouse)
 
-				item_code, warehouse, qty = frappe.bold(d.item_code), frappe.bold(d.warehouse), frappe.bold(d.qty)
-				if flt(available_stock) <= 0:
-					frappe.throw(_('Row #{}: Item Code: {} is not available under warehouse {}.')
-								.format(d.idx, item_code, warehouse), title=_("Item Unavailable"))
-				elif flt(available_stock) < flt(d.qty):
-					frappe.throw(_('Row #{}: Stock quantity not enough for Item Code: {} under warehouse {}. Available quantity {}.')
-								.format(d.idx, item_code, warehouse, available_stock), title=_("Item Unavailable"))
+				self.validate_available_qty(d, available_stock)
+
+	def validate_available_qty(self, item, available_stock):
+		item_code, warehouse = frappe.bold(item.item_code), frappe.bold(item.warehouse)
+		if flt(available_stock) <= 0:
+			frappe.throw(_('Row #{}: Item Code: {} is not available under warehouse {}.')
+						.format(item.idx, item_code, warehouse), title=_("Item Unavailable"))
+		elif flt(available_stock) < flt(item.qty):
+			frappe.throw(_('Row #{}: Stock quantity not enough for Item Code: {} under warehouse {}. Available quantity {}.')
+						.format(item.idx, item_code, warehouse, available_stock), title=_("Item Unavailable"))
 
 	def validate_serialised_or_batched_item(self):
 		error_msg = []
@@ -215,6 +245,7 @@ class POSInvoice(SalesInvoice):
 	def validate_return_items_qty(self):
 		if not self.get("is_return"): return
 
+		return_against_serial_nos = None
 		for d in self.get("items"):
 			if d.get("qty") > 0:
 				frappe.throw(
@@ -222,21 +253,15 @@ class POSInvoice(SalesInvoice):
 					.format(d.idx, frappe.bold(d.item_code)), title=_("Invalid Item")
 				)
 			if d.get("serial_no"):
+				if return_against_serial_nos is None:
+					return_against_serial_nos = set()
+					for item in frappe.get_all("POS Invoice Item", filters={"parent": self.return_against},
+						fields=["serial_no"]):
+						return_against_serial_nos.update(get_serial_nos(item.serial_no))
+
 				serial_nos = get_serial_nos(d.serial_no)
 				for sr in serial_nos:
-					serial_no_exists = frappe.db.sql("""
-						SELECT name
-						FROM `tabPOS Invoice Item`
-						WHERE
-							parent = %s
-							and (serial_no = %s
-								or serial_no like %s
-								or serial_no like %s
-								or serial_no like %s
-							)
-					""", (self.return_against, sr, sr+'\n%', '%\n'+sr, '%\n'+sr+'\n%'))
-
-					if not serial_no_exists:
+					if sr not in return_against_serial_nos:
 						bold_return_against = frappe.bold(self.return_against)
 						bold_serial_no = frappe.bold(sr)
 						frappe.throw(
@@ -533,6 +558,242 @@ def get_pos_reserved_qty(item_code, warehouse):
 
 	return reserved_qty[0].qty or 0 if reserved_qty else 0
 
+def get_available_qty_of_items(item_codes, warehouse):
+	"""Returns bin qty less qty reserved by POS Invoices (as per `get_stock_availability`) of items, in one query"""
+	if not item_codes:
+		return {}
+
+	available_qty = frappe._dict({item_code: 0 for item_code in item_codes})
+	available_qty.update(frappe.db.sql("""
+		select item_code, sum(qty)
+		from (
+			select item_code, ifnull(actual_qty, 0) as qty
+			from `tabBin`
+			where warehouse = %(warehouse)s and item_code in %(item_codes)s
+			union all
+			select p_item.item_code, -p_item.qty as qty
+			from `tabPOS Invoice` p, `tabPOS Invoice Item` p_item
+			where p.name = p_item.parent
+				and ifnull(p.consolidated_invoice, '') = ''
+				and p_item.docstatus = 1
+				and p_item.item_code in %(item_codes)s
+				and p_item.warehouse = %(warehouse)s
+		) stock
+		group by item_code
+	""", {"item_codes": tuple(item_codes), "warehouse": warehouse}))
+
+	return available_qty
+
+def get_bundle_availability_of_items(bundle_item_codes, warehouse):
+	"""`get_bundle_availability` of many product bundles, with a query for bundle items and one for their stock"""
+	bundle_items = frappe.get_all("Product Bundle Item", fields=["parent", "item_code", "qty"],
+		filters={"parent": ("in", bundle_item_codes), "parenttype": "Product Bundle"}, order_by="idx")
+
+	available_qty = get_available_qty_of_items(
+		list(set(bundle_item_codes) | {d.item_code for d in bundle_items}), warehouse)
+
+	bundle_bin_qty = {bundle_item_code: 1000000 for bundle_item_code in bundle_item_codes}
+	for item in bundle_items:
+		max_available_bundles = available_qty[item.item_code] / item.qty
+		if bundle_bin_qty[item.parent] > max_available_bundles:
+			bundle_bin_qty[item.parent] = max_available_bundles
+
+	# product bundles have no bins, their available qty is the reserved qty
+	return {bundle_item_code: bundle_bin_qty[bundle_item_code] + available_qty[bundle_item_code]
+		for bundle_item_code in bundle_item_codes}
+
+@frappe.whitelist()
+def sync_offline_invoices(invoices):
+	"""
+		Submit POS Invoices captured by a terminal while offline, all in one transaction.
+
+		`invoices` are POS Invoice dicts, each with a unique `offline_pos_name` generated by the terminal.
+		Invoices which are already synced are not created again, so a batch can be resent as is.
+		Returns the status (Synced or Failed) with the POS Invoice name or the error of each invoice.
+	"""
+	import json
+
+	from erpnext.accounts.doctype.pos_invoice_merge_log.pos_invoice_merge_log import safe_load_json
+
+	if isinstance(invoices, str):
+		invoices = json.loads(invoices)
+
+	if not invoices:
+		return []
+
+	synced_invoices = dict(frappe.get_all("POS Invoice", fields=["offline_pos_name", "name"],
+		filters={"offline_pos_name": ("in", [cstr(d.get("offline_pos_name")) for d in invoices])}, as_list=1))
+
+	# `to_sync` has the result of the first copy of each invoice, which its copies repeated in the batch share
+	results, docs, to_sync, repeated = [], [], {}, []
+	for invoice in invoices:
+		offline_pos_name = invoice.get("offline_pos_name")
+		result = frappe._dict({"offline_pos_name": offline_pos_name})
+		results.append(result)
+
+		if not offline_pos_name:
+			result.update(status="Failed", error=_("Offline POS Name is required to sync an invoice."))
+		elif offline_pos_name in synced_invoices:
+			result.update(status="Synced", name=synced_invoices[offline_pos_name])
+		elif offline_pos_name in to_sync:
+			repeated.append(result)
+		else:
+			to_sync[offline_pos_name] = result
+			invoice = dict(invoice, doctype="POS Invoice")
+			invoice.pop("name", None)
+			docs.append((frappe.get_doc(invoice), result))
+
+	stock = get_stock_of_invoices([doc for doc, result in docs])
+	payment_modes = get_payment_modes_of_pos_profiles({doc.pos_profile for doc, result in docs})
+
+	for doc, result in docs:
+		try:
+			frappe.db.savepoint("offline_pos_invoice")
+			validate_offline_payment_modes(doc, payment_modes)
+			doc.flags.offline_stock = stock
+			doc.submit()
+		except Exception as e:
+			frappe.db.rollback(save_point="offline_pos_invoice")
+			message_log = frappe.message_log.pop() if frappe.message_log else str(e)
+			frappe.local.message_log = []
+			result.update(status="Failed", error=safe_load_json(message_log))
+		else:
+			reserve_stock_of_invoice(doc, stock)
+			result.update(status="Synced", name=doc.name)
+
+	for result in repeated:
+		result.update(to_sync[result.offline_pos_name])
+
+	return results
+
+def get_stock_of_invoices(docs):
+	"""
+		Returns the stock of items of all invoices, in a few queries per warehouse:
+
+		- `available_qty` by item and warehouse, bin qty less qty reserved by POS Invoices as per
+		`get_stock_availability`, for stock items, product bundles and their bundle items
+		- serial nos reserved by POS Invoices or delivered
+	"""
+	stock = frappe._dict({
+		"allow_negative_stock": frappe.db.get_single_value('Stock Settings', 'allow_negative_stock'),
+		"stock_items": set(),
+		"bundle_items": {},
+		"available_qty": {},
+		"reserved_serial_nos": {},
+		"delivered_serial_nos": set()
+	})
+
+	items_by_warehouse, serial_nos = {}, []
+	for doc in docs:
+		for d in doc.get("items"):
+			items_by_warehouse.setdefault(d.warehouse, set()).add(d.item_code)
+			if d.serial_no:
+				serial_nos += get_serial_nos(d.serial_no)
+
+	item_codes = list({item_code for items in items_by_warehouse.values() for item_code in items if item_code})
+	if item_codes:
+		stock.stock_items = set(frappe.get_all("Item", filters={"name": ("in", item_codes), "is_stock_item": 1},
+			pluck="name"))
+
+		bundles = [d for d in frappe.get_all("Product Bundle", filters={"name": ("in", item_codes)}, pluck="name")
+			if d not in stock.stock_items]
+		for bundle_item_code in bundles:
+			stock.bundle_items[bundle_item_code] = []
+		if bundles:
+			for d in frappe.get_all("Product Bundle Item", fields=["parent", "item_code", "qty"],
+				filters={"parent": ("in", bundles), "parenttype": "Product Bundle"}, order_by="idx"):
+				stock.bundle_items[d.parent].append(d)
+
+	for warehouse, items in items_by_warehouse.items():
+		if warehouse:
+			get_offline_available_qty(stock, get_items_with_bundle_items(items, stock), warehouse)
+
+	if serial_nos and item_codes:
+		for d in frappe.db.sql("""select item.item_code, item.warehouse, item.serial_no
+			from `tabPOS Invoice` p, `tabPOS Invoice Item` item
+			where p.name = item.parent
+			and p.consolidated_invoice is NULL
+			and p.docstatus = 1
+			and item.docstatus = 1
+			and item.item_code in %s
+			and item.serial_no is NOT NULL and item.serial_no != ''
+			""", (tuple(item_codes),), as_dict=1):
+			stock.reserved_serial_nos.setdefault((d.item_code, d.warehouse), set()).update(get_serial_nos(d.serial_no))
+
+		stock.delivered_serial_nos = set(frappe.get_all('Serial No', fields=['item_code', 'name'],
+			filters={'name': ['in', serial_nos], 'sales_invoice': ['is', 'set']}, as_list=1))
+
+	return stock
+
+def get_items_with_bundle_items(item_codes, stock):
+	items = set()
+	for item_code in item_codes:
+		if item_code:
+			items.add(item_code)
+			items.update(d.item_code for d in stock.bundle_items.get(item_code, []))
+
+	return list(items)
+
+def get_offline_available_qty(stock, item_codes, warehouse):
+	"""Returns available qty of items from the stock fetched for the batch, fetching the missing ones"""
+	missing_item_codes = [item_code for item_code in item_codes if (item_code, warehouse) not in stock.available_qty]
+	if missing_item_codes:
+		for item_code, qty in get_available_qty_of_items(missing_item_codes, warehouse).items():
+			stock.available_qty[(item_code, warehouse)] = qty
+
+	return [stock.available_qty[(item_code, warehouse)] for item_code in item_codes]
+
+def get_offline_stock_availability(item_code, warehouse, stock):
+	"""`get_stock_availability` from the stock fetched for the batch, updated by `reserve_stock_of_invoice`"""
+	if item_code in stock.stock_items:
+		return get_offline_available_qty(stock, [item_code], warehouse)[0]
+
+	elif item_code in stock.bundle_items:
+		bundle_items = stock.bundle_items[item_code]
+		available_qty = get_offline_available_qty(stock,
+			[d.item_code for d in bundle_items] + [item_code], warehouse)
+
+		bundle_bin_qty = 1000000
+		for item, item_available_qty in zip(bundle_items, available_qty):
+			max_available_bundles = item_available_qty / item.qty
+			if bundle_bin_qty > max_available_bundles:
+				bundle_bin_qty = max_available_bundles
+
+		# product bundles have no bins, their available qty is the qty reserved by POS Invoices before the batch
+		return bundle_bin_qty + available_qty[-1]
+
+def reserve_stock_of_invoice(doc, stock):
+	"""Update the stock fetched for the batch with the qty and serial nos of a submitted invoice"""
+	for d in doc.get("items"):
+		key = (d.item_code, d.warehouse)
+		if d.item_code in stock.bundle_items:
+			# bundle items are not reserved by POS Invoices of the bundle, but must not be sold twice in the batch
+			bundle_items = stock.bundle_items[d.item_code]
+			get_offline_available_qty(stock, [item.item_code for item in bundle_items], d.warehouse)
+			for item in bundle_items:
+				stock.available_qty[(item.item_code, d.warehouse)] -= flt(d.qty) * flt(item.qty)
+		elif key in stock.available_qty:
+			stock.available_qty[key] -= flt(d.qty)
+
+		if d.serial_no:
+			stock.reserved_serial_nos.setdefault(key, set()).update(get_serial_nos(d.serial_no))
+
+def get_payment_modes_of_pos_profiles(pos_profiles):
+	payment_modes = {}
+	if pos_profiles:
+		for d in frappe.get_all("POS Payment Method", fields=["parent", "mode_of_payment"],
+			filters={"parent": ("in", list(pos_profiles)), "parenttype": "POS Profile"}):
+			payment_modes.setdefault(d.parent, set()).add(d.mode_of_payment)
+
+	return payment_modes
+
+def validate_offline_payment_modes(doc, payment_modes):
+	for pay in doc.get("payments"):
+		if pay.mode_of_payment not in payment_modes.get(doc.pos_profile, ()):
+			frappe.throw(_("Row #{}: Mode of Payment {} is not enabled in POS Profile {}.")
+				.format(pay.idx, frappe.bold(pay.mode_of_payment), frappe.bold(doc.pos_profile)),
+				title=_("Invalid Payment"))
+
 @frappe.whitelist()
 def make_sales_return(source_name, target_doc=None):
 	from erpnext.controllers.sales_and_purchase_return import make_return_doc
@@ -586,6 +586,160 @@ class TestPOSInvoice(unittest.TestCase):
 		pos_inv.delete()
 		pr.delete()
 
+	def test_item_availability_and_price_in_point_of_sale(self):
+		from erpnext.accounts.doctype.pos_invoice.pos_invoice import get_stock_availability
+		from erpnext.selling.page.point_of_sale.point_of_sale import get_items
+
+		pos_inv = create_pos_invoice(qty=5, do_not_submit=1)
+		pos_inv.append('payments', {
+			'mode_of_payment': 'Cash', 'account': 'Cash - _TC', 'amount': 500
+		})
+
+		def get_item(**args):
+			items = get_items(0, 100, "_Test Price List", "", pos_inv.pos_profile, search_term="_Test Item",
+				**args)["items"]
+			return [d for d in items if d["item_code"] == "_Test Item"]
+
+		available_qty = get_stock_availability("_Test Item", "_Test Warehouse - _TC")
+		self.assertEqual(get_item()[0]["actual_qty"], available_qty)
+
+		# qty of submitted POS Invoices is reserved
+		pos_inv.submit()
+		self.assertEqual(get_item()[0]["actual_qty"], available_qty - 5)
+
+		item_price = frappe.get_doc({
+			'doctype': 'Item Price',
+			'item_code': '_Test Item',
+			'price_list': '_Test Price List',
+			'price_list_rate': 450
+		}).insert()
+		self.assertEqual(get_item()[0]["price_list_rate"], 450)
+
+		item_price.delete()
+		self.assertIsNone(get_item()[0]["price_list_rate"])
+
+		# next page
+		self.assertFalse(get_item(last_item="_Test Item"))
+
+	def test_sync_offline_invoices(self):
+		from erpnext.accounts.doctype.pos_invoice.pos_invoice import sync_offline_invoices
+
+		item = make_item("_Test Offline POS Item", {"is_stock_item": 1}).name
+		make_stock_entry(target="_Test Warehouse - _TC", item_code=item, qty=10, basic_rate=100)
+
+		invoices = []
+		for i in range(3):
+			pos_inv = create_pos_invoice(item=item, qty=4, do_not_save=1)
+			pos_inv.append('payments', {
+				'mode_of_payment': 'Cash', 'account': 'Cash - _TC', 'amount': 400
+			})
+			pos_inv.offline_pos_name = frappe.generate_hash(length=10)
+			invoices.append(pos_inv.as_dict(convert_dates_to_str=True))
+
+		results = sync_offline_invoices(copy.deepcopy(invoices))
+		self.assertEqual([d.status for d in results], ["Synced", "Synced", "Failed"])
+		self.assertIn("Stock quantity not enough", results[2].error)
+
+		for result in results[:2]:
+			self.assertEqual(frappe.db.get_value("POS Invoice", result.name, "docstatus"), 1)
+
+		# resending the batch does not create the synced invoices again
+		self.assertEqual(sync_offline_invoices(copy.deepcopy(invoices)), results)
+
+	def test_sync_repeated_offline_invoices(self):
+		from erpnext.accounts.doctype.pos_invoice.pos_invoice import sync_offline_invoices
+
+		item = make_item("_Test Offline POS Item 2", {"is_stock_item": 1}).name
+		make_stock_entry(target="_Test Warehouse - _TC", item_code=item, qty=5, basic_rate=100)
+
+		invoices = []
+		for qty in (8, 4):
+			pos_inv = create_pos_invoice(item=item, qty=qty, do_not_save=1)
+			pos_inv.append('payments', {
+				'mode_of_payment': 'Cash', 'account': 'Cash - _TC', 'amount': qty * 100
+			})
+			pos_inv.offline_pos_name = frappe.generate_hash(length=10)
+			invoices.append(pos_inv.as_dict(convert_dates_to_str=True))
+
+		# each invoice is sent twice in the batch, the first one failing for want of stock
+		results = sync_offline_invoices(copy.deepcopy(invoices + invoices))
+		self.assertEqual([d.status for d in results], ["Failed", "Synced", "Failed", "Synced"])
+		self.assertEqual(results[2], results[0])
+		self.assertEqual(results[3], results[1])
+		self.assertEqual(frappe.db.count("POS Invoice", {"offline_pos_name": invoices[1].offline_pos_name}), 1)
+
+	def test_offline_stock_validation_matches_online(self):
+		from erpnext.selling.doctype.product_bundle.test_product_bundle import make_product_bundle
+
+		stock_item = make_item("_Test Offline POS Item 3", {"is_stock_item": 1}).name
+		make_stock_entry(target="_Test Warehouse - _TC", item_code=stock_item, qty=5, basic_rate=100)
+		non_stock_item = make_item("_Test Offline POS Service Item", {"is_stock_item": 0}).name
+		bundle = make_item("_Test Offline POS Bundle", {"is_stock_item": 0}).name
+		make_product_bundle(bundle, [stock_item], qty=2)
+
+		cases = [
+			# (item, qty, warehouse, status)
+			(stock_item, 1, "", "Failed"),
+			(non_stock_item, 1, None, "Failed"),
+			(bundle, 3, None, "Failed"),
+			(bundle, 2, None, "Synced"),
+		]
+		for item, qty, warehouse, status in cases:
+			invoice = make_offline_pos_invoice(item, qty, warehouse)
+			self.assertEqual(get_online_status(invoice), status, (item, qty, warehouse))
+			self.assertEqual(sync_offline_pos_invoices([invoice]), [status], (item, qty, warehouse))
+
+	def test_offline_bundles_reserve_bundle_items(self):
+		from erpnext.selling.doctype.product_bundle.test_product_bundle import make_product_bundle
+
+		stock_item = make_item("_Test Offline POS Item 4", {"is_stock_item": 1}).name
+		make_stock_entry(target="_Test Warehouse - _TC", item_code=stock_item, qty=5, basic_rate=100)
+		bundle = make_item("_Test Offline POS Bundle 2", {"is_stock_item": 0}).name
+		make_product_bundle(bundle, [stock_item], qty=2)
+
+		# 2 bundles take 4 of 5 units of the bundle item
+		self.assertEqual(sync_offline_pos_invoices([
+			make_offline_pos_invoice(bundle, 2),
+			make_offline_pos_invoice(stock_item, 2),
+			make_offline_pos_invoice(bundle, 1),
+			make_offline_pos_invoice(stock_item, 1),
+		]), ["Synced", "Failed", "Failed", "Synced"])
+
+
+def make_offline_pos_invoice(item, qty, warehouse=None):
+	pos_inv = create_pos_invoice(item=item, qty=qty, do_not_save=1)
+	if warehouse is not None:
+		pos_inv.items[0].warehouse = warehouse
+
+	pos_inv.append('payments', {
+		'mode_of_payment': 'Cash', 'account': 'Cash - _TC', 'amount': qty * 100
+	})
+	pos_inv.offline_pos_name = frappe.generate_hash(length=10)
+	return pos_inv.as_dict(convert_dates_to_str=True)
+
+def sync_offline_pos_invoices(invoices):
+	from erpnext.accounts.doctype.pos_invoice.pos_invoice import sync_offline_invoices
+
+	return [d.status for d in sync_offline_invoices(copy.deepcopy(invoices))]
+
+def get_online_status(invoice):
+	"""Status of the invoice if it is submitted online, which is rolled back"""
+	invoice = dict(copy.deepcopy(invoice), doctype="POS Invoice", offline_pos_name=None)
+	invoice.pop("name", None)
+
+	frappe.db.savepoint("online_pos_invoice")
+	try:
+		frappe.get_doc(invoice).submit()
+	except frappe.ValidationError:
+		status = "Failed"
+	else:
+		status = "Synced"
+	finally:
+		frappe.db.rollback(save_point="online_pos_invoice")
+		frappe.local.message_log = []
+
+	return status
+
 
 def create_pos_invoice(**args):
 	args = frappe._dict(args)
@@ -111,6 +111,10 @@ class POSInvoiceMergeLog(Document):
 	def merge_pos_invoice_into(self, invoice, data):
 		items, payments, taxes = [], [], []
 
+		# rows to merge into, by the values rows are merged on
+		item_rows, tax_rows, payment_rows = {}, {}, {}
+		item_wise_tax_details = {}
+
 		loyalty_amount_sum, loyalty_points_sum = 0, 0
 
 		rounding_adjustment, base_rounding_adjustment = 0, 0
@@ -129,28 +133,30 @@ class POSInvoiceMergeLog(Document):
 				loyalty_amount_sum += doc.loyalty_amount
 
 			for item in doc.get('items'):
-				found = False
-				for i in items:
-					if (i.item_code == item.item_code and not i.serial_no and not i.batch_no and
-						i.uom == item.uom and i.net_rate == item.net_rate and i.warehouse == item.warehouse):
-						found = True
-						i.qty = i.qty + item.qty
-
-				if not found:
+				i = item_rows.get((item.item_code, item.uom, item.net_rate, item.warehouse))
+				if i:
+					i.qty = i.qty + item.qty
+				else:
 					item.rate = item.net_rate
 					item.price_list_rate = 0
 					si_item = map_child_doc(item, invoice, {"doctype": "Sales Invoice Item"})
 					items.append(si_item)
 
+					# rows with serial or batch numbers are kept as they are
+					if not si_item.serial_no and not si_item.batch_no:
+						item_rows[(si_item.item_code, si_item.uom, si_item.net_rate, si_item.warehouse)] = si_item
+
 			for tax in doc.get('taxes'):
-				found = False
-				for t in taxes:
-					if t.account_head == tax.account_head and t.cost_center == tax.cost_center:
-						t.tax_amount = flt(t.tax_amount) + flt(tax.tax_amount_after_discount_amount)
-						t.base_tax_amount = flt(t.base_tax_amount) + flt(tax.base_tax_amount_after_discount_amount)
-						update_item_wise_tax_detail(t, tax)
-						found = True
-				if not found:
+				key = (tax.account_head, tax.cost_center)
+				t = tax_rows.get(key)
+				if t:
+					t.tax_amount = flt(t.tax_amount) + flt(tax.tax_amount_after_discount_amount)
+					t.base_tax_amount = flt(t.base_tax_amount) + flt(tax.base_tax_amount_after_discount_amount)
+
+					if key not in item_wise_tax_details:
+						item_wise_tax_details[key] = json.loads(t.item_wise_tax_detail) or {}
+					update_item_wise_tax_detail(item_wise_tax_details[key], tax)
+				else:
 					tax.charge_type = 'Actual'
 					tax.idx = idx
 					idx += 1
@@ -159,22 +165,26 @@ class POSInvoiceMergeLog(Document):
 					tax.base_tax_amount = tax.base_tax_amount_after_discount_amount
 					tax.item_wise_tax_detail = tax.item_wise_tax_detail
 					taxes.append(tax)
+					tax_rows[key] = tax
 
 			for payment in doc.get('payments'):
-				found = False
-				for pay in payments:
-					if pay.account == payment.account and pay.mode_of_payment == payment.mode_of_payment:
-						pay.amount = flt(pay.amount) + flt(payment.amount)
-						pay.base_amount = flt(pay.base_amount) + flt(payment.base_amount)
-						found = True
-				if not found:
+				key = (payment.account, payment.mode_of_payment)
+				pay = payment_rows.get(key)
+				if pay:
+					pay.amount = flt(pay.amount) + flt(payment.amount)
+					pay.base_amount = flt(pay.base_amount) + flt(payment.base_amount)
+				else:
 					payments.append(payment)
+					payment_rows[key] = payment
 			rounding_adjustment += doc.rounding_adjustment
 			rounded_total += doc.rounded_total
 			base_rounding_adjustment += doc.base_rounding_adjustment
 			base_rounded_total += doc.base_rounded_total
 
 
+		for key, item_wise_tax_detail in item_wise_tax_details.items():
+			tax_rows[key].item_wise_tax_detail = json.dumps(item_wise_tax_detail, separators=(',', ':'))
+
 		if loyalty_points_sum:
 			invoice.redeem_loyalty_points = 1
 			invoice.loyalty_points = loyalty_points_sum
@@ -220,13 +230,10 @@ class POSInvoiceMergeLog(Document):
 			si.flags.ignore_validate = True
 			si.cancel()
 
-def update_item_wise_tax_detail(consolidate_tax_row, tax_row):
-	consolidated_tax_detail = json.loads(consolidate_tax_row.item_wise_tax_detail)
+def update_item_wise_tax_detail(consolidated_tax_detail, tax_row):
+	"""Add item wise tax amounts of `tax_row` to `consolidated_tax_detail`, a dict of [tax rate, tax amount] by item"""
 	tax_row_detail = json.loads(tax_row.item_wise_tax_detail)
 
-	if not consolidated_tax_detail:
-		consolidated_tax_detail = {}
-
 	for item_code, tax_data in tax_row_detail.items():
 		if consolidated_tax_detail.get(item_code):
 			consolidated_tax_data = consolidated_tax_detail.get(item_code)
@@ -238,8 +245,6 @@ def update_item_wise_tax_detail(consolidate_tax_row, tax_row):
 				item_code: [tax_data[0], tax_data[1]]
 			})
 
-	consolidate_tax_row.item_wise_tax_detail = json.dumps(consolidated_tax_detail, separators=(',', ':'))
-
 def get_all_unconsolidated_invoices():
 	filters = {
 		'consolidated_invoice': [ 'in', [ '', None ]],
@@ -266,14 +271,29 @@ def consolidate_pos_invoices(pos_invoices=None, closing_entry=None):
 	if frappe.flags.in_test and not invoices:
 		invoices = get_all_unconsolidated_invoices()
 
+	if closing_entry:
+		# on retry, invoices consolidated before the failure are skipped
+		invoices = get_unconsolidated_invoices(invoices)
+
 	invoice_by_customer = get_invoice_customer_map(invoices)
 
 	if len(invoices) >= 10 and closing_entry:
 		closing_entry.set_status(update=True, status='Queued')
-		enqueue_job(create_merge_logs, invoice_by_customer=invoice_by_customer, closing_entry=closing_entry)
+		enqueue_merge_logs(invoice_by_customer, closing_entry)
 	else:
 		create_merge_logs(invoice_by_customer, closing_entry)
 
+def get_unconsolidated_invoices(invoices):
+	if not invoices:
+		return []
+
+	consolidated_invoices = frappe.get_all('POS Invoice', filters={
+		'name': ('in', [d.get('pos_invoice') for d in invoices]),
+		'consolidated_invoice': ('is', 'set')
+	}, pluck='name')
+
+	return [d for d in invoices if d.get('pos_invoice') not in consolidated_invoices]
+
 def unconsolidate_pos_invoices(closing_entry):
 	merge_logs = frappe.get_all(
 		'POS Invoice Merge Log',
@@ -300,9 +320,10 @@ def create_merge_logs(invoice_by_customer, closing_entry=None):
 			merge_log.submit()
 
 		if closing_entry:
-			closing_entry.set_status(update=True, status='Submitted')
-			closing_entry.db_set('error_message', '')
-			closing_entry.update_opening_entry()
+			# committed before the check, which then reads in a new transaction
+			# the invoices consolidated by concurrent jobs of the closing entry
+			frappe.db.commit()
+			complete_closing_entry(closing_entry)
 
 	except Exception as e:
 		frappe.db.rollback()
@@ -318,6 +339,22 @@ def create_merge_logs(invoice_by_customer, closing_entry=None):
 		frappe.db.commit()
 		frappe.publish_realtime('closing_process_complete', {'user': frappe.session.user})
 
+def complete_closing_entry(closing_entry):
+	"""
+		Mark the closing entry as submitted once all of its invoices are consolidated,
+		to be called in a new transaction after the merge logs of the job are committed.
+	"""
+	# merge logs of a closing entry can be created by concurrent jobs, the lock makes sure that
+	# the last one to commit reads the invoices after the others' commits (snapshot is taken at the first read)
+	frappe.db.get_value('POS Closing Entry', closing_entry.name, 'name', for_update=True)
+
+	if get_unconsolidated_invoices(closing_entry.get('pos_transactions')):
+		return
+
+	closing_entry.set_status(update=True, status='Submitted')
+	closing_entry.db_set('error_message', '')
+	closing_entry.update_opening_entry()
+
 def cancel_merge_logs(merge_logs, closing_entry=None):
 	try:
 		for log in merge_logs:
@@ -361,12 +398,35 @@ def enqueue_job(job, **kwargs):
 			now=frappe.conf.developer_mode or frappe.flags.in_test
 		)
 
-		if job == create_merge_logs:
-			msg = _('POS Invoices will be consolidated in a background process')
-		else:
-			msg = _('POS Invoices will be unconsolidated in a background process')
+		frappe.msgprint(_('POS Invoices will be unconsolidated in a background process'), alert=1)
+
+def enqueue_merge_logs(invoice_by_customer, closing_entry):
+	"""
+		Enqueue a job per customer, so that merge logs are created concurrently.
+
+		Each job commits its merge log on its own, a failed job leaves the closing entry as Failed
+		and retrying the closing entry enqueues only the customers whose invoices are still unconsolidated.
+	"""
+	check_scheduler_status()
+
+	enqueued_jobs = [d.get("job_name") for d in get_info()]
+	for customer, invoices in invoice_by_customer.items():
+		job_name = "{0}::{1}".format(closing_entry.get("name"), customer)
+		if job_name in enqueued_jobs:
+			continue
+
+		enqueue(
+			create_merge_logs,
+			invoice_by_customer={customer: invoices},
+			closing_entry=closing_entry,
+			queue="long",
+			timeout=10000,
+			event="processing_merge_logs",
+			job_name=job_name,
+			now=frappe.conf.developer_mode or frappe.flags.in_test
+		)
 
-		frappe.msgprint(msg, alert=1)
+	frappe.msgprint(_('POS Invoices will be consolidated in a background process'), alert=1)
 
 def check_scheduler_status():
 	if is_scheduler_inactive() and not frappe.flags.in_test:
@@ -12,6 +12,7 @@ from erpnext.accounts.doctype.pos_invoice.test_pos_invoice import create_pos_inv
 from erpnext.accounts.doctype.pos_invoice_merge_log.pos_invoice_merge_log import (
 	consolidate_pos_invoices,
 )
+from erpnext.tests.utils import benchmark, get_benchmark_sizes, timer
 
 
 class TestPOSInvoiceMergeLog(unittest.TestCase):
@@ -54,6 +55,35 @@ class TestPOSInvoiceMergeLog(unittest.TestCase):
 			frappe.db.sql("delete from `tabPOS Profile`")
 			frappe.db.sql("delete from `tabPOS Invoice`")
 
+	def test_consolidated_invoice_merged_rows(self):
+		frappe.db.sql("delete from `tabPOS Invoice`")
+
+		try:
+			init_user_and_profile()
+
+			pos_invoices = []
+			for qty, rate in [(1, 100), (2, 100), (1, 150)]:
+				pos_inv = create_pos_invoice(qty=qty, rate=rate, do_not_submit=1)
+				pos_inv.append('payments', {
+					'mode_of_payment': 'Cash', 'account': 'Cash - _TC', 'amount': qty * rate
+				})
+				pos_inv.submit()
+				pos_invoices.append(pos_inv)
+
+			consolidate_pos_invoices()
+
+			pos_invoices[0].load_from_db()
+			consolidated_invoice = frappe.get_doc('Sales Invoice', pos_invoices[0].consolidated_invoice)
+
+			# items with the same rate are merged into one row
+			self.assertEqual([(d.item_code, d.qty, d.rate) for d in consolidated_invoice.items],
+				[("_Test Item", 3, 100), ("_Test Item", 1, 150)])
+			self.assertEqual([(d.mode_of_payment, d.amount) for d in consolidated_invoice.payments], [("Cash", 450)])
+		finally:
+			frappe.set_user("Administrator")
+			frappe.db.sql("delete from `tabPOS Profile`")
+			frappe.db.sql("delete from `tabPOS Invoice`")
+
 	def test_consolidated_credit_note_creation(self):
 		frappe.db.sql("delete from `tabPOS Invoice`")
 
@@ -150,3 +180,46 @@ class TestPOSInvoiceMergeLog(unittest.TestCase):
 			frappe.set_user("Administrator")
 			frappe.db.sql("delete from `tabPOS Profile`")
 			frappe.db.sql("delete from `tabPOS Invoice`")
+
+	@benchmark
+	def test_merge_pos_invoice_into_benchmark(self):
+		"Merging the lines of thousands of POS invoices, 10 lines each, into a consolidated invoice."
+		try:
+			inv = create_pos_invoice(qty=1, rate=100, do_not_save=True)
+			for i in range(9):
+				inv.append("items", dict(inv.items[0].as_dict(), name=None, idx=None, rate=100 * (i + 2)))
+
+			inv.append("taxes", {
+				"account_head": "_Test Account VAT - _TC",
+				"charge_type": "On Net Total",
+				"cost_center": "_Test Cost Center - _TC",
+				"description": "VAT",
+				"doctype": "Sales Taxes and Charges",
+				"rate": 9
+			})
+			inv.append("payments", {"mode_of_payment": "Cash", "account": "Cash - _TC"})
+			inv.calculate_taxes_and_totals()
+			inv.payments[0].amount = inv.payments[0].base_amount = inv.grand_total
+
+			for size in get_benchmark_sizes(50000):
+				data = []
+				for i in range(size // len(inv.items)):
+					doc = frappe.copy_doc(inv)
+					# a hundred different rates of each item
+					for item in doc.items:
+						item.net_rate += i % 100
+					data.append(doc)
+
+				merge_log = frappe.new_doc("POS Invoice Merge Log")
+				merge_log.customer = inv.customer
+
+				with timer(f"Merging {size} POS invoice lines"):
+					invoice = merge_log.merge_pos_invoice_into(frappe.new_doc("Sales Invoice"), data)
+
+				self.assertEqual(len(invoice.items), len(inv.items) * min(len(data), 100))
+				self.assertEqual(sum(d.qty for d in invoice.items), len(data) * len(inv.items))
+				self.assertEqual(len(invoice.taxes), 1)
+				self.assertEqual(len(invoice.payments), 1)
+		finally:
+			frappe.set_user("Administrator")
+			frappe.db.sql("delete from `tabPOS Profile`")
@@ -7,6 +7,7 @@ import unittest
 
 import frappe
 
+from erpnext.accounts.doctype.pricing_rule.utils import clear_pricing_rule_index
 from erpnext.accounts.doctype.sales_invoice.test_sales_invoice import create_sales_invoice
 from erpnext.selling.doctype.sales_order.test_sales_order import make_sales_order
 from erpnext.stock.doctype.item.test_item import make_item
@@ -97,6 +98,7 @@ class TestPricingRule(unittest.TestCase):
 		self.assertEqual(details.get("discount_percentage"), 5)
 
 		frappe.db.sql("update `tabPricing Rule` set priority=NULL where campaign='_Test Campaign'")
+		clear_pricing_rule_index()
 		from erpnext.accounts.doctype.pricing_rule.utils import MultiplePricingRuleConflict
 		self.assertRaises(MultiplePricingRuleConflict, get_item_details, args)
 
@@ -628,6 +630,66 @@ class TestPricingRule(unittest.TestCase):
 		for doc in [si, si1]:
 			doc.delete()
 
+	def test_pricing_rule_index_invalidation(self):
+		args = frappe._dict({
+			"item_code": "_Test Item",
+			"company": "_Test Company",
+			"price_list": "_Test Price List",
+			"currency": "_Test Currency",
+			"doctype": "Sales Order",
+			"conversion_rate": 1,
+			"price_list_currency": "_Test Currency",
+			"plc_conversion_rate": 1,
+			"order_type": "Sales",
+			"customer": "_Test Customer",
+			"name": None
+		})
+
+		pricing_rule = make_pricing_rule(selling=1, discount_percentage=10)
+		self.assertEqual(get_item_details(args).get("discount_percentage"), 10)
+
+		pricing_rule.discount_percentage = 20
+		pricing_rule.save()
+		self.assertEqual(get_item_details(args).get("discount_percentage"), 20)
+
+		pricing_rule.disable = 1
+		pricing_rule.save()
+		self.assertFalse(get_item_details(args).get("discount_percentage"))
+
+		pricing_rule.delete()
+		self.assertFalse(get_item_details(args).get("discount_percentage"))
+
+	def test_pricing_rule_index_invalidation_on_rename(self):
+		customer = frappe.get_doc({
+			"doctype": "Customer",
+			"customer_name": "_Test Pricing Rule Customer " + frappe.generate_hash(length=5),
+			"customer_group": "_Test Customer Group",
+			"territory": "_Test Territory"
+		}).insert()
+
+		args = frappe._dict({
+			"item_code": "_Test Item",
+			"company": "_Test Company",
+			"price_list": "_Test Price List",
+			"currency": "_Test Currency",
+			"doctype": "Sales Order",
+			"conversion_rate": 1,
+			"price_list_currency": "_Test Currency",
+			"plc_conversion_rate": 1,
+			"order_type": "Sales",
+			"customer": customer.name,
+			"name": None
+		})
+
+		make_pricing_rule(selling=1, discount_percentage=10, applicable_for="Customer", customer=customer.name)
+		self.assertEqual(get_item_details(args).get("discount_percentage"), 10)
+
+		# the customer of the pricing rule is renamed without saving the rule
+		args.customer = frappe.rename_doc("Customer", customer.name, customer.name + " Renamed")
+		self.assertEqual(get_item_details(args).get("discount_percentage"), 10)
+
+		frappe.delete_doc("Customer", args.customer)
+
 test_dependencies = ["Campaign"]
 
 def make_pricing_rule(**args):
@@ -676,6 +738,8 @@ def make_pricing_rule(**args):
 	if args.get(applicable_for):
 		doc.db_set(applicable_for, args.get(applicable_for))
 
+	clear_pricing_rule_index()
+
 	return doc
 
 def setup_pricing_rule_data():
@@ -692,6 +756,8 @@ def delete_existing_pricing_rules():
 
 		frappe.db.sql("delete from `tab{0}`".format(doctype))
 
+	clear_pricing_rule_index()
+
 
 def make_item_price(item, price_list_name, item_price):
 	frappe.get_doc({
@@ -9,7 +9,7 @@ import json
 
 import frappe
 from frappe import _, bold
-from frappe.utils import cint, flt, fmt_money, get_link_to_form, getdate, today
+from frappe.utils import cint, cstr, flt, fmt_money, get_link_to_form, getdate, today
 
 from erpnext.setup.doctype.item_group.item_group import get_child_item_groups
 from erpnext.stock.doctype.warehouse.warehouse import get_child_warehouses
@@ -26,13 +26,13 @@ apply_on_table = {
 
 def get_pricing_rules(args, doc=None):
 	pricing_rules = []
-	values =  {}
+	pricing_rule_index = get_pricing_rule_index()
 
-	if not frappe.db.exists('Pricing Rule', {'disable': 0, args.transaction_type: 1}):
+	if not pricing_rule_index.get(args.transaction_type):
 		return
 
 	for apply_on in ['Item Code', 'Item Group', 'Brand']:
-		pricing_rules.extend(_get_pricing_rules(apply_on, args, values))
+		pricing_rules.extend(_get_pricing_rules(apply_on, args, pricing_rule_index[args.transaction_type]))
 		if pricing_rules and not apply_multiple_pricing_rules(pricing_rules):
 			break
 
@@ -92,60 +92,147 @@ def filter_pricing_rule_based_on_condition(pricing_rules, doc=None):
 
 	return filtered_pricing_rules
 
-def _get_pricing_rules(apply_on, args, values):
+# values of the link fields of pricing rules (and their child tables) which are renamed in place,
+# their `after_rename` hook in hooks.py clears the index
+PRICING_RULE_LINKED_DOCTYPES = ("Item", "Item Group", "Brand", "UOM", "Company", "Customer", "Customer Group",
+	"Territory", "Supplier", "Supplier Group", "Sales Partner", "Campaign", "Warehouse", "Price List")
+
+# the index is rebuilt at least this often, should a change not clear it
+PRICING_RULE_INDEX_EXPIRY = 6 * 60 * 60
+
+def get_pricing_rule_index():
+	"""
+		Returns enabled pricing rules compiled into lookup tables, cached until a Pricing Rule or
+		Promotional Scheme is changed, a linked record is renamed, or for `PRICING_RULE_INDEX_EXPIRY`.
+
+		{
+			"selling": {
+				"rules": [rule rows joined with the apply on table, by priority desc, name desc],
+				"item_code": {
+					"values": {"Item A": [rule row positions], ...},
+					"other_values": {"Item B": [positions of rows of rules applied on other item B]}
+				}, ...
+			},
+			"buying": ...
+		}
+	"""
+	pricing_rule_index = frappe.cache().get_value("pricing_rule_index", expires=True)
+	if pricing_rule_index is None:
+		pricing_rule_index = build_pricing_rule_index()
+		frappe.cache().set_value("pricing_rule_index", pricing_rule_index,
+			expires_in_sec=PRICING_RULE_INDEX_EXPIRY)
+
+	return pricing_rule_index
+
+def clear_pricing_rule_index():
+	"""
+		Clears the index for the rest of the transaction, and again once it is committed,
+		as concurrent requests may have rebuilt it from the rules as they were before the commit.
+	"""
+	delete_pricing_rule_index()
+	frappe.enqueue("erpnext.accounts.doctype.pricing_rule.utils.delete_pricing_rule_index",
+		queue="short", enqueue_after_commit=True, now=frappe.flags.in_test)
+
+def delete_pricing_rule_index():
+	frappe.cache().delete_value("pricing_rule_index")
+
+def clear_pricing_rule_index_on_rename(doc, method=None, *args):
+	"""`after_rename` hook, rename and merge update the links of pricing rules without saving them."""
+	clear_pricing_rule_index()
+
+def build_pricing_rule_index():
+	pricing_rule_index = {}
+
+	for apply_on in ['Item Code', 'Item Group', 'Brand']:
+		apply_on_field = frappe.scrub(apply_on)
+		other_field = "other_{0}".format(apply_on_field)
+
+		rows = frappe.db.sql("""select `tabPricing Rule`.*,
+				child.{apply_on_field}, child.uom
+			from `tabPricing Rule`, `tabPricing Rule {apply_on}` child
+			where child.parent = `tabPricing Rule`.name
+				and `tabPricing Rule`.disable = 0
+			order by `tabPricing Rule`.priority desc,
+				`tabPricing Rule`.name desc
+		""".format(apply_on=apply_on, apply_on_field=apply_on_field), as_dict=1)
+
+		for transaction_type in ('selling', 'buying'):
+			rules = [row for row in rows if row.get(transaction_type)]
+			if not rules:
+				continue
+
+			index = pricing_rule_index.setdefault(transaction_type, {"rules": []})
+			offset = len(index["rules"])
+			index["rules"].extend(rules)
+
+			lookup = index[apply_on_field] = {"values": {}, "other_values": {}}
+			for position, rule in enumerate(rules, start=offset):
+				if rule.get(apply_on_field):
+					lookup["values"].setdefault(rule.get(apply_on_field), []).append(position)
+
+				if rule.apply_rule_on_other is not None and rule.get(other_field):
+					lookup["other_values"].setdefault(rule.get(other_field), []).append(position)
+
+	return pricing_rule_index
+
+def _get_pricing_rules(apply_on, args, pricing_rule_index):
 	apply_on_field = frappe.scrub(apply_on)
 
 	if not args.get(apply_on_field): return []
 
-	child_doc = '`tabPricing Rule {0}`'.format(apply_on)
-
-	conditions = item_variant_condition = item_conditions = ""
-	values[apply_on_field] = args.get(apply_on_field)
-	if apply_on_field in ['item_code', 'brand']:
-		item_conditions = "{child_doc}.{apply_on_field}= %({apply_on_field})s".format(child_doc=child_doc,
-			apply_on_field = apply_on_field)
+	lookup = pricing_rule_index.get(apply_on_field)
+	if not lookup:
+		return []
 
-		if apply_on_field == 'item_code':
-			if "variant_of" not in args:
-				args.variant_of = frappe.get_cached_value("Item", args.item_code, "variant_of")
+	values = [args.get(apply_on_field)]
+	if apply_on_field == 'item_code':
+		if "variant_of" not in args:
+			args.variant_of = frappe.get_cached_value("Item", args.item_code, "variant_of")
 
-			if args.variant_of:
-				item_variant_condition = ' or {child_doc}.item_code=%(variant_of)s '.format(child_doc=child_doc)
-				values['variant_of'] = args.variant_of
+		if args.variant_of:
+			values.append(args.variant_of)
 	elif apply_on_field == 'item_group':
-		item_conditions = _get_tree_conditions(args, "Item Group", child_doc, False)
+		values = get_tree_parents("Item Group", args.item_group)
 
-	conditions += get_other_conditions(conditions, values, args)
-	warehouse_conditions = _get_tree_conditions(args, "Warehouse", '`tabPricing Rule`')
-	if warehouse_conditions:
-		warehouse_conditions = " and {0}".format(warehouse_conditions)
+	positions = set()
+	for value in values:
+		positions.update(lookup["values"].get(value, []))
+	positions.update(lookup["other_values"].get(args.get(apply_on_field), []))
 
 	if not args.price_list: args.price_list = None
 
-	conditions += " and ifnull(`tabPricing Rule`.for_price_list, '') in (%(price_list)s, '')"
-	values["price_list"] = args.get("price_list")
-
-	pricing_rules = frappe.db.sql("""select `tabPricing Rule`.*,
-			{child_doc}.{apply_on_field}, {child_doc}.uom
-		from `tabPricing Rule`, {child_doc}
-		where ({item_conditions} or (`tabPricing Rule`.apply_rule_on_other is not null
-			and `tabPricing Rule`.{apply_on_other_field}=%({apply_on_field})s) {item_variant_condition})
-			and {child_doc}.parent = `tabPricing Rule`.name
-			and `tabPricing Rule`.disable = 0 and
-			`tabPricing Rule`.{transaction_type} = 1 {warehouse_cond} {conditions}
-		order by `tabPricing Rule`.priority desc,
-			`tabPricing Rule`.name desc""".format(
-			child_doc = child_doc,
-			apply_on_field = apply_on_field,
-			item_conditions = item_conditions,
-			item_variant_condition = item_variant_condition,
-			transaction_type = args.transaction_type,
-			warehouse_cond = warehouse_conditions,
-			apply_on_other_field = "other_{0}".format(apply_on_field),
-			conditions = conditions), values, as_dict=1) or []
+	pricing_rules = []
+	for position in sorted(positions):
+		rule = pricing_rule_index["rules"][position]
+		if is_pricing_rule_applicable(rule, args):
+			# rules are mutated while applying, the cached index should not be
+			pricing_rules.append(frappe._dict(rule))
 
 	return pricing_rules
 
+def is_pricing_rule_applicable(rule, args):
+	"""Checks the party, warehouse, price list and validity conditions of the rule for the transaction"""
+	for field in ["company", "customer", "supplier", "campaign", "sales_partner"]:
+		if cstr(rule.get(field)) not in (cstr(args.get(field)), ''):
+			return False
+
+	for parenttype in ["Customer Group", "Territory", "Supplier Group", "Warehouse"]:
+		field = frappe.scrub(parenttype)
+		if args.get(field) and rule.get(field):
+			if rule.get(field) not in get_tree_parents(parenttype, args.get(field)):
+				return False
+
+	if cstr(rule.for_price_list) not in (cstr(args.price_list), ''):
+		return False
+
+	if args.get("transaction_date"):
+		transaction_date = getdate(args.get("transaction_date"))
+		if not (getdate(rule.valid_from or '2000-01-01') <= transaction_date
+			<= getdate(rule.valid_upto or '2500-12-31')):
+			return False
+
+	return True
+
 def apply_multiple_pricing_rules(pricing_rules):
 	apply_multiple_rule = [d.apply_multiple_pricing_rules
 		for d in pricing_rules if d.apply_multiple_pricing_rules]
@@ -154,6 +241,34 @@ def apply_multiple_pricing_rules(pricing_rules):
 
 	return True
 
+def get_tree_parents(parenttype, name):
+	"""Returns `name` and its ancestors (and the root of the tree for groups), cached for the request"""
+	if not frappe.flags.tree_parents:
+		frappe.flags.tree_parents = {}
+
+	key = (parenttype, name)
+	if key in frappe.flags.tree_parents:
+		return frappe.flags.tree_parents[key]
+
+	try:
+		lft, rgt = frappe.db.get_value(parenttype, name, ["lft", "rgt"])
+	except TypeError:
+		frappe.throw(_("Invalid {0}").format(name))
+
+	parent_groups = frappe.db.sql_list("""select name from `tab%s`
+		where lft<=%s and rgt>=%s""" % (parenttype, '%s', '%s'), (lft, rgt))
+
+	if parenttype in ["Customer Group", "Item Group", "Territory"]:
+		parent_field = "parent_{0}".format(frappe.scrub(parenttype))
+		root_name = frappe.db.get_list(parenttype,
+			{"is_group": 1, parent_field: ("is", "not set")}, "name", as_list=1, ignore_permissions=True)
+
+		if root_name and root_name[0][0]:
+			parent_groups.append(root_name[0][0])
+
+	frappe.flags.tree_parents[key] = parent_groups
+	return parent_groups
+
 def _get_tree_conditions(args, parenttype, table, allow_blank=True):
 	field = frappe.scrub(parenttype)
 	condition = ""
@@ -164,21 +279,7 @@ def _get_tree_conditions(args, parenttype, table, allow_blank=True):
 		if key in frappe.flags.tree_conditions:
 			return frappe.flags.tree_conditions[key]
 
-		try:
-			lft, rgt = frappe.db.get_value(parenttype, args.get(field), ["lft", "rgt"])
-		except TypeError:
-			frappe.throw(_("Invalid {0}").format(args.get(field)))
-
-		parent_groups = frappe.db.sql_list("""select name from `tab%s`
-			where lft<=%s and rgt>=%s""" % (parenttype, '%s', '%s'), (lft, rgt))
-
-		if parenttype in ["Customer Group", "Item Group", "Territory"]:
-			parent_field = "parent_{0}".format(frappe.scrub(parenttype))
-			root_name = frappe.db.get_list(parenttype,
-				{"is_group": 1, parent_field: ("is", "not set")}, "name", as_list=1, ignore_permissions=True)
-
-			if root_name and root_name[0][0]:
-				parent_groups.append(root_name[0][0])
+		parent_groups = list(get_tree_parents(parenttype, args.get(field)))
 
 		if parent_groups:
 			if allow_blank: parent_groups.append('')
@@ -6,6 +6,8 @@ import frappe
 from frappe import _
 from frappe.model.document import Document
 
+from erpnext.accounts.doctype.pricing_rule.utils import clear_pricing_rule_index
+
 pricing_rule_fields = ['apply_on', 'mixed_conditions', 'is_cumulative', 'other_item_code', 'other_item_group',
 	'apply_rule_on_other', 'other_brand', 'selling', 'buying', 'applicable_for', 'valid_from',
 	'valid_upto', 'customer', 'customer_group', 'territory', 'sales_partner', 'campaign', 'supplier',
@@ -76,6 +78,7 @@ class PromotionalScheme(Document):
 			order_by = 'creation asc',
 		) or {}
 		self.update_pricing_rules(pricing_rules)
+		clear_pricing_rule_index()
 
 	def update_pricing_rules(self, pricing_rules):
 		rules = {}
@@ -104,6 +107,8 @@ class PromotionalScheme(Document):
 			{'promotional_scheme': self.name}):
 			frappe.delete_doc('Pricing Rule', rule.name)
 
+		clear_pricing_rule_index()
+
 def raise_for_transaction_exists(name):
 	msg = (f"""You can't change the {frappe.bold(_('Applicable For'))}
 		because transactions are present against the Promotional Scheme {frappe.bold(name)}. """)
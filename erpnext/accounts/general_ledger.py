@@ -12,6 +12,8 @@ from erpnext.accounts.doctype.accounting_dimension.accounting_dimension import (
 	get_accounting_dimensions,
 )
 from erpnext.accounts.doctype.budget.budget import validate_expense_against_budget
+from erpnext.accounts.doctype.gl_period_balance.gl_period_balance import reverse_gl_period_balances
+from erpnext.accounts.doctype.open_item.open_item import reverse_open_items
 
 
 class ClosedAccountingPeriod(frappe.ValidationError): pass
@@ -97,11 +99,14 @@ def update_net_values(entry):
 
 def merge_similar_entries(gl_map, precision=None):
 	merged_gl_map = []
-	accounting_dimensions = get_accounting_dimensions()
+	merged_entries = {}
+	merge_properties = get_merge_properties(get_accounting_dimensions())
+
 	for entry in gl_map:
 		# if there is already an entry in this account then just add it
 		# to that entry
-		same_head = check_if_in_list(entry, merged_gl_map, accounting_dimensions)
+		key = get_merge_key(entry, merge_properties)
+		same_head = merged_entries.get(key)
 		if same_head:
 			same_head.debit	= flt(same_head.debit) + flt(entry.debit)
 			same_head.debit_in_account_currency	= \
@@ -110,6 +115,7 @@ def merge_similar_entries(gl_map, precision=None):
 			same_head.credit_in_account_currency = \
 				flt(same_head.credit_in_account_currency) + flt(entry.credit_in_account_currency)
 		else:
+			merged_entries[key] = entry
 			merged_gl_map.append(entry)
 
 	company = gl_map[0].company if gl_map else erpnext.get_default_company()
@@ -124,25 +130,25 @@ def merge_similar_entries(gl_map, precision=None):
 
 	return merged_gl_map
 
-def check_if_in_list(gle, gl_map, dimensions=None):
-	account_head_fieldnames = ['voucher_detail_no', 'party', 'against_voucher',
+def get_merge_properties(dimensions=None):
+	merge_properties = ['voucher_detail_no', 'party', 'against_voucher',
 			'cost_center', 'against_voucher_type', 'party_type', 'project', 'finance_book']
 
 	if dimensions:
-		account_head_fieldnames = account_head_fieldnames + dimensions
+		merge_properties = merge_properties + dimensions
 
-	for e in gl_map:
-		same_head = True
-		if e.account != gle.account:
-			same_head = False
-			continue
+	return merge_properties
 
-		for fieldname in account_head_fieldnames:
-			if cstr(e.get(fieldname)) != cstr(gle.get(fieldname)):
-				same_head = False
-				break
+def get_merge_key(gle, merge_properties):
+	"""Entries with the same key are merged into a single GL Entry"""
+	return (gle.account,) + tuple(cstr(gle.get(fieldname)) for fieldname in merge_properties)
 
-		if same_head:
+def check_if_in_list(gle, gl_map, dimensions=None):
+	merge_properties = get_merge_properties(dimensions)
+	key = get_merge_key(gle, merge_properties)
+
+	for e in gl_map:
+		if get_merge_key(e, merge_properties) == key:
 			return e
 
 def save_entries(gl_map, adv_adj, update_outstanding, from_repost=False):
@@ -154,6 +160,10 @@ def save_entries(gl_map, adv_adj, update_outstanding, from_repost=False):
 	if gl_map:
 		check_freezing_date(gl_map[0]["posting_date"], adv_adj)
 
+	if cint(frappe.db.get_single_value("Accounts Settings", "bulk_gl_entry_insertion")):
+		make_entries_in_bulk(gl_map, adv_adj, update_outstanding, from_repost)
+		return
+
 	for entry in gl_map:
 		make_entry(entry, adv_adj, update_outstanding, from_repost)
 
@@ -169,6 +179,39 @@ def make_entry(args, adv_adj, update_outstanding, from_repost=False):
 	if not from_repost:
 		validate_expense_against_budget(args)
 
+def make_entries_in_bulk(gl_map, adv_adj, update_outstanding, from_repost=False):
+	"""
+		Validate the whole gl map in one pass and insert it with multi-row inserts.
+		Outstanding amounts are updated once per against voucher after all entries are inserted.
+	"""
+	from erpnext.accounts.doctype.gl_entry.gl_entry import (
+		bulk_insert_gl_entries,
+		update_outstanding_amounts,
+		validate_balance_type,
+		validate_gl_entries,
+	)
+
+	gl_entries = []
+	for args in gl_map:
+		gle = frappe.new_doc("GL Entry")
+		gle.update(args)
+		gle.flags.from_repost = from_repost
+		gle.flags.adv_adj = adv_adj
+		gle.flags.update_outstanding = update_outstanding or 'Yes'
+		gl_entries.append(gle)
+
+	validate_gl_entries(gl_entries, adv_adj, from_repost)
+	bulk_insert_gl_entries(gl_entries)
+
+	if not from_repost:
+		for account in {gle.account for gle in gl_entries}:
+			validate_balance_type(account, adv_adj)
+
+		update_outstanding_amounts(gl_entries)
+
+		for args in gl_map:
+			validate_expense_against_budget(args)
+
 def validate_cwip_accounts(gl_map):
 	"""Validate that CWIP account are not used in Journal Entry"""
 	if gl_map and gl_map[0].voucher_type != "Journal Entry":
@@ -319,6 +362,8 @@ def set_as_cancel(voucher_type, voucher_no):
 	"""
 		Set is_cancelled=1 in all original gl entries for the voucher
 	"""
+	reverse_gl_period_balances(voucher_type, voucher_no)
+	reverse_open_items(voucher_type, voucher_no)
 	frappe.db.sql("""UPDATE `tabGL Entry` SET is_cancelled = 1,
 		modified=%s, modified_by=%s
 		where voucher_type=%s and voucher_no=%s and is_cancelled = 0""",
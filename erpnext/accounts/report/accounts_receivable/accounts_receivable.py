@@ -70,16 +70,7 @@ class ReceivablePayableReport(object):
 			self.skip_total_row = 1
 
 	def get_data(self):
-		self.get_gl_entries()
 		self.get_sales_invoices_or_customers_based_on_sales_person()
-		self.voucher_balance = OrderedDict()
-		self.init_voucher_balance() # invoiced, paid, credit_note, outstanding
-
-		# Build delivery note map against all sales invoices
-		self.build_delivery_note_map()
-
-		# Get invoice details like bill_no, due_date etc for all invoices
-		self.get_invoice_details()
 
 		# fetch future payments against invoices
 		self.get_future_payments()
@@ -88,6 +79,30 @@ class ReceivablePayableReport(object):
 		self.get_return_entries()
 
 		self.data = []
+		if cint(frappe.db.get_single_value("Accounts Settings", "stream_receivable_payable_reports")):
+			# all GL Entries of a voucher balance belong to the same party,
+			# so the balances can be built one batch of parties at a time
+			for gl_entries in self.get_gl_entries_by_party_batch():
+				self.invoices = set()
+				self.party_details = {}
+				self.process_gl_entries(gl_entries, in_batches=True)
+		else:
+			self.get_gl_entries()
+			self.process_gl_entries(self.gl_entries)
+
+		self.append_total_rows()
+
+	def process_gl_entries(self, gl_entries, in_batches=False):
+		self.gl_entries = gl_entries
+		self.voucher_balance = OrderedDict()
+		self.init_voucher_balance() # invoiced, paid, credit_note, outstanding
+
+		# Build delivery note map against all sales invoices
+		self.build_delivery_note_map()
+
+		# Get invoice details like bill_no, due_date etc for all invoices (or only for the vouchers in the batch)
+		self.get_invoice_details(vouchers=tuple({key[1] for key in self.voucher_balance}) if in_batches else None)
+
 		for gle in self.gl_entries:
 			self.update_voucher_balance(gle)
 
@@ -254,6 +269,7 @@ class ReceivablePayableReport(object):
 				else:
 					self.append_row(row)
 
+	def append_total_rows(self):
 		if self.filters.get('group_by_party'):
 			self.append_subtotal_row(self.previous_party)
 			if self.data:
@@ -316,14 +332,18 @@ class ReceivablePayableReport(object):
 			for d in dn_against_si:
 				self.delivery_notes.setdefault(d.against_sales_invoice, set()).add(d.parent)
 
-	def get_invoice_details(self):
+	def get_invoice_details(self, vouchers=None):
+		# `vouchers` limits the details to the given voucher nos
 		self.invoice_details = frappe._dict()
+		values = {"report_date": self.filters.report_date, "vouchers": vouchers}
+		voucher_condition = "and name in %(vouchers)s" if vouchers else ""
+
 		if self.party_type == "Customer":
 			si_list = frappe.db.sql("""
 				select name, due_date, po_no
 				from `tabSales Invoice`
-				where posting_date <= %s
-			""",self.filters.report_date, as_dict=1)
+				where posting_date <= %(report_date)s {0}
+			""".format(voucher_condition), values, as_dict=1)
 			for d in si_list:
 				self.invoice_details.setdefault(d.name, d)
 
@@ -332,8 +352,8 @@ class ReceivablePayableReport(object):
 				sales_team = frappe.db.sql("""
 					select parent, sales_person
 					from `tabSales Team`
-					where parenttype = 'Sales Invoice'
-				""", as_dict=1)
+					where parenttype = 'Sales Invoice' {0}
+				""".format("and parent in %(vouchers)s" if vouchers else ""), values, as_dict=1)
 				for d in sales_team:
 					self.invoice_details.setdefault(d.parent, {})\
 						.setdefault('sales_team', []).append(d.sales_person)
@@ -342,16 +362,16 @@ class ReceivablePayableReport(object):
 			for pi in frappe.db.sql("""
 				select name, due_date, bill_no, bill_date
 				from `tabPurchase Invoice`
-				where posting_date <= %s
-			""", self.filters.report_date, as_dict=1):
+				where posting_date <= %(report_date)s {0}
+			""".format(voucher_condition), values, as_dict=1):
 				self.invoice_details.setdefault(pi.name, pi)
 
 		# Invoices booked via Journal Entries
 		journal_entries = frappe.db.sql("""
 			select name, due_date, bill_no, bill_date
 			from `tabJournal Entry`
-			where posting_date <= %s
-		""", self.filters.report_date, as_dict=1)
+			where posting_date <= %(report_date)s {0}
+		""".format(voucher_condition), values, as_dict=1)
 
 		for je in journal_entries:
 			if je.bill_no:
@@ -582,12 +602,21 @@ class ReceivablePayableReport(object):
 		if index is None: index = 4
 		row['range' + str(index+1)] = row.outstanding
 
-	def get_gl_entries(self):
+	def get_gl_entries(self, after=None, limit=None):
 		# get all the GL entries filtered by the given filters
+		# with `limit`, get a page of entries ordered by party, starting after the entry `after`
 
 		conditions, values = self.prepare_conditions()
 		order_by = self.get_order_by_condition()
 
+		if limit:
+			if after:
+				conditions += """ and (party > %s or (party = %s and (posting_date > %s
+					or (posting_date = %s and name > %s))))"""
+				values += [after.party, after.party, after.posting_date, after.posting_date, after.name]
+
+			order_by = "order by party, posting_date, name limit {0}".format(cint(limit))
+
 		if self.filters.show_future_payments:
 			values.insert(2, self.filters.report_date)
 
@@ -619,6 +648,35 @@ class ReceivablePayableReport(object):
 				{2} {3} {4}"""
 			.format(select_fields, doc_currency_fields, date_condition, conditions, order_by, remarks=remarks), values, as_dict=True)
 
+		return self.gl_entries
+
+	def get_gl_entries_by_party_batch(self, batch_size=10000):
+		"""
+			Yields GL Entries ordered by party, in batches of whole parties.
+
+			Entries are read in pages of `batch_size`, so that only a page and
+			the entries of the parties it completes are in memory at a time.
+		"""
+		pending = []
+		while True:
+			gl_entries = self.get_gl_entries(after=pending[-1] if pending else None, limit=batch_size)
+			if len(gl_entries) < batch_size:
+				break
+
+			pending += gl_entries
+
+			# entries of the last party may continue on the next page
+			i = len(pending)
+			while i and pending[i - 1].party == pending[-1].party:
+				i -= 1
+
+			if i:
+				yield pending[:i]
+				pending = pending[i:]
+
+		if pending or gl_entries:
+			yield pending + gl_entries
+
 	def get_sales_invoices_or_customers_based_on_sales_person(self):
 		if self.filters.get("sales_person"):
 			lft, rgt = frappe.db.get_value("Sales Person",
@@ -5,7 +5,10 @@ from frappe.utils import add_days, getdate, today
 
 from erpnext.accounts.doctype.payment_entry.payment_entry import get_payment_entry
 from erpnext.accounts.doctype.sales_invoice.test_sales_invoice import create_sales_invoice
-from erpnext.accounts.report.accounts_receivable.accounts_receivable import execute
+from erpnext.accounts.report.accounts_receivable.accounts_receivable import (
+	ReceivablePayableReport,
+	execute,
+)
 
 
 class TestAccountsReceivable(unittest.TestCase):
@@ -54,6 +57,40 @@ class TestAccountsReceivable(unittest.TestCase):
 		self.assertEqual(expected_data_after_credit_note,
 			[row.invoice_grand_total, row.invoiced, row.paid, row.credit_note, row.outstanding])
 
+	def test_accounts_receivable_party_wise(self):
+		for customer in ("_Test Customer", "_Test Customer 1", "_Test Customer 2"):
+			for rate in (100, 200):
+				create_sales_invoice(customer=customer, rate=rate)
+
+		filters = {
+			'company': '_Test Company',
+			'report_date': today()
+		}
+
+		def get_rows():
+			# rows are ordered by party when processed party-wise
+			return sorted(execute(filters)[1], key=lambda row: (row.party, row.voucher_no))
+
+		expected = get_rows()
+
+		frappe.db.set_value("Accounts Settings", None, "stream_receivable_payable_reports", 1)
+		try:
+			self.assertEqual(get_rows(), expected)
+		finally:
+			frappe.db.set_value("Accounts Settings", None, "stream_receivable_payable_reports", 0)
+
+		# parties are never split across batches, even when a page ends within a party
+		report = ReceivablePayableReport(filters)
+		report.filters.update({"party_type": "Customer"})
+		report.set_defaults()
+
+		batches = list(report.get_gl_entries_by_party_batch(batch_size=1))
+		gl_entries = report.get_gl_entries()
+
+		self.assertEqual(sum(len(batch) for batch in batches), len(gl_entries))
+		parties = [party for batch in batches for party in {gle.party for gle in batch}]
+		self.assertEqual(len(parties), len(set(parties)))
+
 def make_sales_invoice():
 	frappe.set_user("Administrator")
 
@@ -4,8 +4,12 @@
 
 import frappe
 from frappe import _
-from frappe.utils import cint, cstr
+from frappe.utils import add_days, cint, cstr, flt
 
+from erpnext.accounts.doctype.gl_period_balance.gl_period_balance import (
+	get_period_balance_conditions,
+	use_gl_period_balances,
+)
 from erpnext.accounts.report.financial_statements import (
 	get_columns,
 	get_data,
@@ -148,16 +152,28 @@ def get_account_type_based_gl_data(company, start_date, end_date, account_type,
 	else:
 		cond = " AND (finance_book in (%s, '') OR finance_book IS NULL)" %(frappe.db.escape(cstr(filters.finance_book)))
 
+	queries = [("GL Entry", cond)]
+	if use_gl_period_balances():
+		period_balance_conditions, gl_entry_conditions = get_period_balance_conditions(
+			[start_date, add_days(end_date, 1)])
+
+		queries = [("GL Period Balance", cond + period_balance_conditions)]
+		if gl_entry_conditions:
+			queries.append(("GL Entry", cond + gl_entry_conditions))
+
+	amount = 0
+	for doctype, conditions in queries:
+		gl_sum = frappe.db.sql_list("""
+			select sum(credit) - sum(debit)
+			from `tab{doctype}`
+			where company=%s and posting_date >= %s and posting_date <= %s
+				and voucher_type != 'Period Closing Voucher'
+				and account in ( SELECT name FROM tabAccount WHERE account_type = %s) {cond}
+		""".format(doctype=doctype, cond=conditions), (company, start_date, end_date, account_type))
 
-	gl_sum = frappe.db.sql_list("""
-		select sum(credit) - sum(debit)
-		from `tabGL Entry`
-		where company=%s and posting_date >= %s and posting_date <= %s
-			and voucher_type != 'Period Closing Voucher'
-			and account in ( SELECT name FROM tabAccount WHERE account_type = %s) {cond}
-	""".format(cond=cond), (company, start_date, end_date, account_type))
+		amount += flt(gl_sum[0]) if gl_sum else 0
 
-	return gl_sum[0] if gl_sum and gl_sum[0] else 0
+	return amount
 
 def get_start_date(period, accumulated_values, company):
 	if not accumulated_values and period.get('from_date'):
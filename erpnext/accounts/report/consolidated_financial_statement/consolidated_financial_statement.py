@@ -6,9 +6,13 @@ from collections import defaultdict
 
 import frappe
 from frappe import _
-from frappe.utils import cint, flt, getdate
+from frappe.utils import add_days, cint, flt, getdate
 
 import erpnext
+from erpnext.accounts.doctype.gl_period_balance.gl_period_balance import (
+	get_period_balance_conditions,
+	use_gl_period_balances,
+)
 from erpnext.accounts.report.balance_sheet.balance_sheet import (
 	get_chart_data,
 	get_provisional_profit_loss,
@@ -285,13 +289,18 @@ def get_data(companies, root_type, balance_must_be, fiscal_year, filters=None, i
 
 	filters.end_date = end_date
 
+	# `calculate_values` splits the opening balance at the start of the fiscal year or period
+	opening_date = (fiscal_year.year_start_date
+		if filters.filter_based_on == 'Fiscal Year' else filters.period_start_date)
+
 	gl_entries_by_account = {}
 	for root in frappe.db.sql("""select lft, rgt from tabAccount
 			where root_type=%s and ifnull(parent_account, '') = ''""", root_type, as_dict=1):
 
 		set_gl_entries_by_account(start_date,
 			end_date, root.lft, root.rgt, filters,
-			gl_entries_by_account, accounts_by_name, accounts, ignore_closing_entries=False)
+			gl_entries_by_account, accounts_by_name, accounts, ignore_closing_entries=False,
+			period_boundaries=[opening_date])
 
 	calculate_values(accounts_by_name, gl_entries_by_account, companies, filters, fiscal_year)
 	accumulate_values_into_parents(accounts, accounts_by_name, companies)
@@ -467,8 +476,12 @@ def prepare_data(accounts, start_date, end_date, balance_must_be, companies, com
 	return data
 
 def set_gl_entries_by_account(from_date, to_date, root_lft, root_rgt, filters, gl_entries_by_account,
-	accounts_by_name, accounts, ignore_closing_entries=False):
-	"""Returns a dict like { "account": [gl entries], ... }"""
+	accounts_by_name, accounts, ignore_closing_entries=False, period_boundaries=None):
+	"""Returns a dict like { "account": [gl entries], ... }
+
+		Balances of whole months are read from GL Period Balance if enabled, `period_boundaries` are
+		other dates (than `from_date` and `to_date`) by which the entries are split.
+	"""
 
 	company_lft, company_rgt = frappe.get_cached_value('Company',
 		filters.get('company'),  ["lft", "rgt"])
@@ -485,23 +498,29 @@ def set_gl_entries_by_account(from_date, to_date, root_lft, root_rgt, filters, g
 		'presentation_currency': filters.get('presentation_currency')
 	})
 
+	queries = [("GL Entry", additional_conditions)]
+	if period_boundaries is not None and use_gl_period_balances():
+		period_balance_conditions, gl_entry_conditions = get_period_balance_conditions(
+			list(period_boundaries) + [from_date, add_days(to_date, 1)])
+
+		queries = [("GL Period Balance", additional_conditions + period_balance_conditions)]
+		if gl_entry_conditions:
+			queries.append(("GL Entry", additional_conditions + gl_entry_conditions))
+
 	for d in companies:
-		gl_entries = frappe.db.sql("""select gl.posting_date, gl.account, gl.debit, gl.credit, gl.is_opening, gl.company,
-			gl.fiscal_year, gl.debit_in_account_currency, gl.credit_in_account_currency, gl.account_currency,
-			acc.account_name, acc.account_number
-			from `tabGL Entry` gl, `tabAccount` acc where acc.name = gl.account and gl.company = %(company)s and gl.is_cancelled = 0
-			{additional_conditions} and gl.posting_date <= %(to_date)s and acc.lft >= %(lft)s and acc.rgt <= %(rgt)s
-			order by gl.account, gl.posting_date""".format(additional_conditions=additional_conditions),
-			{
-				"from_date": from_date,
-				"to_date": to_date,
-				"lft": root_lft,
-				"rgt": root_rgt,
-				"company": d.name,
-				"finance_book": filters.get("finance_book"),
-				"company_fb": frappe.db.get_value("Company", d.name, 'default_finance_book')
-			},
-			as_dict=True)
+		gl_filters = {
+			"from_date": from_date,
+			"to_date": to_date,
+			"lft": root_lft,
+			"rgt": root_rgt,
+			"company": d.name,
+			"finance_book": filters.get("finance_book"),
+			"company_fb": frappe.db.get_value("Company", d.name, 'default_finance_book')
+		}
+
+		gl_entries = []
+		for doctype, conditions in queries:
+			gl_entries += get_gl_entries(doctype, conditions, gl_filters)
 
 		if filters and filters.get('presentation_currency') != d.default_currency:
 			currency_info['company'] = d.name
@@ -519,6 +538,18 @@ def set_gl_entries_by_account(from_date, to_date, root_lft, root_rgt, filters, g
 
 	return gl_entries_by_account
 
+def get_gl_entries(doctype, additional_conditions, gl_filters):
+	"""Returns entries upto `to_date` from GL Entry or GL Period Balance (which has no cancelled entries)"""
+	cancelled_condition = "and gl.is_cancelled = 0" if doctype == "GL Entry" else ""
+
+	return frappe.db.sql("""select gl.posting_date, gl.account, gl.debit, gl.credit, gl.is_opening, gl.company,
+		gl.fiscal_year, gl.debit_in_account_currency, gl.credit_in_account_currency, gl.account_currency,
+		acc.account_name, acc.account_number
+		from `tab{doctype}` gl, `tabAccount` acc where acc.name = gl.account and gl.company = %(company)s {cancelled_condition}
+		{additional_conditions} and gl.posting_date <= %(to_date)s and acc.lft >= %(lft)s and acc.rgt <= %(rgt)s
+		order by gl.account, gl.posting_date """.format(doctype=doctype, cancelled_condition=cancelled_condition,
+			additional_conditions=additional_conditions), gl_filters, as_dict=True) #nosec
+
 def get_account_details(account):
 	return frappe.get_cached_value('Account', account, ['name', 'report_type', 'root_type', 'company',
 		'is_group', 'account_name', 'account_number', 'parent_account', 'lft', 'rgt'], as_dict=1)
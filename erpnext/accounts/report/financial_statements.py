@@ -14,6 +14,10 @@ from erpnext.accounts.doctype.accounting_dimension.accounting_dimension import (
 	get_accounting_dimensions,
 	get_dimension_with_children,
 )
+from erpnext.accounts.doctype.gl_period_balance.gl_period_balance import (
+	get_period_balance_conditions,
+	use_gl_period_balances,
+)
 from erpnext.accounts.report.utils import convert_to_presentation_currency, get_currency
 from erpnext.accounts.utils import get_fiscal_year
 
@@ -162,7 +166,8 @@ def get_data(
 			period_list[0]["year_start_date"] if only_current_fiscal_year else None,
 			period_list[-1]["to_date"],
 			root.lft, root.rgt, filters,
-			gl_entries_by_account, ignore_closing_entries=ignore_closing_entries
+			gl_entries_by_account, ignore_closing_entries=ignore_closing_entries,
+			period_boundaries=get_period_boundaries(period_list)
 		)
 
 	calculate_values(
@@ -357,9 +362,24 @@ def sort_accounts(accounts, is_root=False, key="name"):
 
 	accounts.sort(key = functools.cmp_to_key(compare_accounts))
 
+def get_period_boundaries(period_list):
+	"""Returns dates on which periods of the report (and the fiscal year of the first period) start"""
+	boundaries = [period_list[0]["year_start_date"]]
+	for period in period_list:
+		boundaries += [period["from_date"], add_days(period["to_date"], 1)]
+
+	return boundaries
+
+
 def set_gl_entries_by_account(
-		company, from_date, to_date, root_lft, root_rgt, filters, gl_entries_by_account, ignore_closing_entries=False):
-	"""Returns a dict like { "account": [gl entries], ... }"""
+		company, from_date, to_date, root_lft, root_rgt, filters, gl_entries_by_account, ignore_closing_entries=False,
+		period_boundaries=None):
+	"""
+		Returns a dict like { "account": [gl entries], ... }
+
+		If `period_boundaries` are passed, balances of months within which no period starts are read
+		from GL Period Balance (one row per month, posted on the first day of the month).
+	"""
 
 	additional_conditions = get_additional_conditions(from_date, ignore_closing_entries, filters)
 
@@ -387,42 +407,17 @@ def set_gl_entries_by_account(
 					key: value
 				})
 
-		distributed_cost_center_query = ""
-		if filters and filters.get('cost_center'):
-			distributed_cost_center_query = """
-			UNION ALL
-			SELECT posting_date,
-				account,
-				debit*(DCC_allocation.percentage_allocation/100) as debit,
-				credit*(DCC_allocation.percentage_allocation/100) as credit,
-				is_opening,
-				fiscal_year,
-				debit_in_account_currency*(DCC_allocation.percentage_allocation/100) as debit_in_account_currency,
-				credit_in_account_currency*(DCC_allocation.percentage_allocation/100) as credit_in_account_currency,
-				account_currency
-			FROM `tabGL Entry`,
-			(
-				SELECT parent, sum(percentage_allocation) as percentage_allocation
-				FROM `tabDistributed Cost Center`
-				WHERE cost_center IN %(cost_center)s
-				AND parent NOT IN %(cost_center)s
-				GROUP BY parent
-			) as DCC_allocation
-			WHERE company=%(company)s
-			{additional_conditions}
-			AND posting_date <= %(to_date)s
-			AND is_cancelled = 0
-			AND cost_center = DCC_allocation.parent
-			""".format(additional_conditions=additional_conditions.replace("and cost_center in %(cost_center)s ", ''))
-
-		gl_entries = frappe.db.sql("""select posting_date, account, debit, credit, is_opening, fiscal_year, debit_in_account_currency, credit_in_account_currency, account_currency from `tabGL Entry`
-			where company=%(company)s
-			{additional_conditions}
-			and posting_date <= %(to_date)s
-			and is_cancelled = 0
-			{distributed_cost_center_query}""".format(
-				additional_conditions=additional_conditions,
-				distributed_cost_center_query=distributed_cost_center_query), gl_filters, as_dict=True) #nosec
+		if period_boundaries is not None and use_gl_period_balances():
+			period_balance_conditions, gl_entry_conditions = get_period_balance_conditions(
+				list(period_boundaries) + [from_date, add_days(to_date, 1)])
+
+			gl_entries = get_gl_entries("GL Period Balance", additional_conditions + period_balance_conditions,
+				gl_filters, filters)
+			if gl_entry_conditions:
+				gl_entries += get_gl_entries("GL Entry", additional_conditions + gl_entry_conditions,
+					gl_filters, filters)
+		else:
+			gl_entries = get_gl_entries("GL Entry", additional_conditions, gl_filters, filters)
 
 		if filters and filters.get('presentation_currency'):
 			convert_to_presentation_currency(gl_entries, get_currency(filters), filters.get('company'))
@@ -433,6 +428,51 @@ def set_gl_entries_by_account(
 		return gl_entries_by_account
 
 
+def get_gl_entries(doctype, additional_conditions, gl_filters, filters):
+	"""Returns entries upto `to_date` from GL Entry or GL Period Balance (which has no cancelled entries)"""
+	cancelled_condition = "AND is_cancelled = 0" if doctype == "GL Entry" else ""
+
+	distributed_cost_center_query = ""
+	if filters and filters.get('cost_center'):
+		distributed_cost_center_query = """
+		UNION ALL
+		SELECT posting_date,
+			account,
+			debit*(DCC_allocation.percentage_allocation/100) as debit,
+			credit*(DCC_allocation.percentage_allocation/100) as credit,
+			is_opening,
+			fiscal_year,
+			debit_in_account_currency*(DCC_allocation.percentage_allocation/100) as debit_in_account_currency,
+			credit_in_account_currency*(DCC_allocation.percentage_allocation/100) as credit_in_account_currency,
+			account_currency
+		FROM `tab{doctype}`,
+		(
+			SELECT parent, sum(percentage_allocation) as percentage_allocation
+			FROM `tabDistributed Cost Center`
+			WHERE cost_center IN %(cost_center)s
+			AND parent NOT IN %(cost_center)s
+			GROUP BY parent
+		) as DCC_allocation
+		WHERE company=%(company)s
+		{additional_conditions}
+		AND posting_date <= %(to_date)s
+		{cancelled_condition}
+		AND cost_center = DCC_allocation.parent
+		""".format(doctype=doctype, cancelled_condition=cancelled_condition,
+			additional_conditions=additional_conditions.replace("and cost_center in %(cost_center)s ", ''))
+
+	return frappe.db.sql("""select posting_date, account, debit, credit, is_opening, fiscal_year, debit_in_account_currency, credit_in_account_currency, account_currency from `tab{doctype}`
+		where company=%(company)s
+		{additional_conditions}
+		and posting_date <= %(to_date)s
+		{cancelled_condition}
+		{distributed_cost_center_query}""".format(
+			doctype=doctype,
+			cancelled_condition=cancelled_condition,
+			additional_conditions=additional_conditions,
+			distributed_cost_center_query=distributed_cost_center_query), gl_filters, as_dict=True) #nosec
+
+
 def get_additional_conditions(from_date, ignore_closing_entries, filters):
 	additional_conditions = []
 
@@ -189,7 +189,52 @@ frappe.query_reports["General Ledger"] = {
 			"label": __("Show Net Values in Party Account"),
 			"fieldtype": "Check"
 		}
-	]
+	],
+
+	onload: function(report) {
+		report.page.add_inner_button(__("Export Ungrouped Ledger"), function() {
+			export_ledger_in_pages(report);
+		});
+	}
 }
 
+// the ungrouped ledger is fetched page by page, so that a long period is not loaded in one request
+let export_ledger_in_pages = function(report) {
+	const values = report.get_values();
+	if (!values) return;
+
+	const columns = (report.columns || []).filter(col => col.fieldname);
+	if (!columns.length) {
+		frappe.msgprint(__("Please run the report before exporting it."));
+		return;
+	}
+
+	const filters = Object.assign({}, values, {group_by: ""});
+	let rows = [columns.map(col => col.label)];
+
+	const fetch_page = function(cursor) {
+		frappe.call({
+			method: "erpnext.accounts.report.general_ledger.general_ledger.get_gl_entries_page",
+			args: {
+				filters: filters,
+				cursor: cursor
+			},
+			freeze: true,
+			freeze_message: __("Fetched {0} rows", [rows.length - 1]),
+			callback: function(r) {
+				if (!r.message) return;
+
+				rows = rows.concat(r.message.data.map(d => columns.map(col => d[col.fieldname])));
+				if (r.message.cursor) {
+					fetch_page(r.message.cursor);
+				} else {
+					frappe.tools.downloadify(rows, null, __("General Ledger"));
+				}
+			}
+		});
+	};
+
+	fetch_page(null);
+};
+
 erpnext.utils.add_dimensions('General Ledger', 15)
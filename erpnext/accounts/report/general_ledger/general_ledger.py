@@ -6,7 +6,7 @@ from collections import OrderedDict
 
 import frappe
 from frappe import _, _dict
-from frappe.utils import cstr, getdate
+from frappe.utils import cint, cstr, flt, getdate
 
 from erpnext import get_company_currency, get_default_company
 from erpnext.accounts.doctype.accounting_dimension.accounting_dimension import (
@@ -24,6 +24,17 @@ def execute(filters=None):
 	if not filters:
 		return [], []
 
+	filters, account_details = validate_and_set_filters(filters)
+
+	columns = get_columns(filters)
+
+	update_translations()
+
+	res = get_result(filters, account_details)
+
+	return columns, res
+
+def validate_and_set_filters(filters):
 	account_details = {}
 
 	if filters and filters.get('print_in_account_currency') and \
@@ -42,13 +53,7 @@ def execute(filters=None):
 
 	filters = set_account_currency(filters)
 
-	columns = get_columns(filters)
-
-	update_translations()
-
-	res = get_result(filters, account_details)
-
-	return columns, res
+	return filters, account_details
 
 def update_translations():
 	TRANSLATIONS.update(
@@ -155,8 +160,6 @@ def get_result(filters, account_details):
 
 def get_gl_entries(filters, accounting_dimensions):
 	currency_map = get_currency(filters)
-	select_fields = """, debit, credit, debit_in_account_currency,
-		credit_in_account_currency """
 
 	order_by_statement = "order by posting_date, account, creation"
 
@@ -168,6 +171,25 @@ def get_gl_entries(filters, accounting_dimensions):
 	if filters.get("group_by") == "Group by Account":
 		order_by_statement = "order by account, posting_date, creation"
 
+	gl_entries = frappe.db.sql(
+		"""
+		{gl_entries_query}
+		{order_by_statement}
+		""".format(
+			gl_entries_query=get_gl_entries_query(filters, accounting_dimensions),
+			order_by_statement=order_by_statement
+		),
+		filters, as_dict=1)
+
+	if filters.get('presentation_currency'):
+		return convert_to_presentation_currency(gl_entries, currency_map, filters.get('company'))
+	else:
+		return gl_entries
+
+def get_gl_entries_query(filters, accounting_dimensions):
+	select_fields = """, debit, credit, debit_in_account_currency,
+		credit_in_account_currency """
+
 	if filters.get("include_default_book_entries"):
 		filters['company_fb'] = frappe.db.get_value("Company",
 			filters.get("company"), 'default_finance_book')
@@ -212,8 +234,7 @@ def get_gl_entries(filters, accounting_dimensions):
 		AND cost_center = DCC_allocation.parent
 		""".format(dimension_fields=dimension_fields,select_fields_with_percentage=select_fields_with_percentage, conditions=get_conditions(filters).replace("and cost_center in %(cost_center)s ", ''))
 
-	gl_entries = frappe.db.sql(
-		"""
+	return """
 		select
 			name as gl_entry, posting_date, account, party_type, party,
 			voucher_type, voucher_no, {dimension_fields}
@@ -223,17 +244,9 @@ def get_gl_entries(filters, accounting_dimensions):
 		from `tabGL Entry`
 		where company=%(company)s {conditions}
 		{distributed_cost_center_query}
-		{order_by_statement}
 		""".format(
-			dimension_fields=dimension_fields, select_fields=select_fields, conditions=get_conditions(filters), distributed_cost_center_query=distributed_cost_center_query,
-			order_by_statement=order_by_statement
-		),
-		filters, as_dict=1)
-
-	if filters.get('presentation_currency'):
-		return convert_to_presentation_currency(gl_entries, currency_map, filters.get('company'))
-	else:
-		return gl_entries
+			dimension_fields=dimension_fields, select_fields=select_fields, conditions=get_conditions(filters), distributed_cost_center_query=distributed_cost_center_query
+		)
 
 
 def get_conditions(filters):
@@ -488,14 +501,145 @@ def get_result_as_list(data, filters):
 
 	return data
 
-def get_supplier_invoice_details():
+def get_supplier_invoice_details(invoices=None):
+	# `invoices` limits the details to the given purchase invoices
 	inv_details = {}
 	for d in frappe.db.sql(""" select name, bill_no from `tabPurchase Invoice`
-		where docstatus = 1 and bill_no is not null and bill_no != '' """, as_dict=1):
+		where docstatus = 1 and bill_no is not null and bill_no != '' {0}""".format(
+			"and name in %(invoices)s" if invoices else ""), {"invoices": invoices}, as_dict=1):
 		inv_details[d.name] = d.bill_no
 
 	return inv_details
 
+@frappe.whitelist()
+def get_gl_entries_page(filters, cursor=None, page_length=500):
+	"""
+		Returns a page of the (ungrouped) ledger, ordered by posting date, creation and name,
+		as `{"data": rows, "cursor": cursor}`.
+
+		The first page starts with the opening row, which is computed by an aggregate query.
+		Pass the returned `cursor` to get the next page, it carries the key of the last row
+		and the running totals. The last page ends with the total and closing rows
+		and returns no cursor.
+	"""
+	filters = frappe._dict(frappe.parse_json(filters))
+	cursor = frappe._dict(frappe.parse_json(cursor)) if cursor else None
+	page_length = cint(page_length) or 500
+
+	if filters.get("group_by"):
+		frappe.throw(_("Pages can only be fetched without grouping"))
+
+	filters, account_details = validate_and_set_filters(filters)
+	update_translations()
+
+	accounting_dimensions = []
+	if filters.get("include_dimensions"):
+		accounting_dimensions = get_accounting_dimensions()
+
+	gl_entries_query = get_gl_entries_query(filters, accounting_dimensions)
+
+	# entries before the period, and opening entries unless they are shown, are part of the opening
+	opening_condition = "posting_date < %(from_date)s"
+	if not filters.get("show_opening_entries"):
+		opening_condition += " or ifnull(is_opening, 'No') = 'Yes'"
+
+	data = []
+	if not cursor:
+		cursor = get_opening_cursor(filters, gl_entries_query, opening_condition)
+		opening = _dict(cursor.opening, account="'{0}'".format(TRANSLATIONS.OPENING))
+		opening.balance = flt(opening.debit) - flt(opening.credit)
+		data.append(opening)
+
+	values = dict(filters, page_length=page_length + 1)
+	keyset_condition = ""
+	if cursor.get("name"):
+		keyset_condition = """and (posting_date > %(last_posting_date)s
+			or (posting_date = %(last_posting_date)s and (creation > %(last_creation)s
+				or (creation = %(last_creation)s and gl_entry > %(last_name)s))))"""
+		values.update(last_posting_date=cursor.posting_date, last_creation=cursor.creation,
+			last_name=cursor.name)
+
+	gl_entries = frappe.db.sql("""
+		select *
+		from ({gl_entries_query}) gle
+		where not ({opening_condition}) and posting_date <= %(to_date)s
+			{keyset_condition}
+		order by posting_date, creation, gl_entry
+		limit %(page_length)s
+	""".format(gl_entries_query=gl_entries_query, opening_condition=opening_condition,
+		keyset_condition=keyset_condition), values, as_dict=1)
+
+	has_more = len(gl_entries) > page_length
+	gl_entries = gl_entries[:page_length]
+
+	if filters.get('presentation_currency'):
+		gl_entries = convert_to_presentation_currency(gl_entries, get_currency(filters),
+			filters.get('company'), account_currencies=cursor.account_currencies)
+
+	inv_details = get_supplier_invoice_details(list({d.against_voucher for d in gl_entries if d.against_voucher}))
+
+	for d in gl_entries:
+		for fieldname in ("debit", "credit", "debit_in_account_currency", "credit_in_account_currency"):
+			cursor.total[fieldname] = flt(cursor.total[fieldname]) + flt(d.get(fieldname))
+
+		cursor.balance = flt(cursor.balance) + flt(d.debit) - flt(d.credit)
+		d['balance'] = cursor.balance
+		d['account_currency'] = filters.account_currency
+		d['bill_no'] = inv_details.get(d.get('against_voucher'), '')
+
+	data += gl_entries
+
+	if has_more:
+		last = gl_entries[-1]
+		cursor.update(posting_date=cstr(last.posting_date), creation=cstr(last.creation), name=last.gl_entry)
+		return {"data": data, "cursor": cursor}
+
+	total = _dict(cursor.total, account="'{0}'".format(TRANSLATIONS.TOTAL))
+	total.balance = flt(total.debit) - flt(total.credit)
+
+	closing = _dict(account="'{0}'".format(TRANSLATIONS.CLOSING_TOTAL))
+	for fieldname in ("debit", "credit", "debit_in_account_currency", "credit_in_account_currency"):
+		closing[fieldname] = flt(cursor.opening.get(fieldname)) + flt(total.get(fieldname))
+	closing.balance = flt(closing.debit) - flt(closing.credit)
+
+	for d in (total, closing):
+		d['account_currency'] = filters.account_currency
+
+	data += [total, closing]
+	return {"data": data, "cursor": None}
+
+def get_opening_cursor(filters, gl_entries_query, opening_condition):
+	"""Returns the cursor of the first page, with the opening of the period summed up in the database"""
+	opening_by_currency = frappe.db.sql("""
+		select
+			account_currency,
+			sum(case when {opening_condition} then debit else 0 end) as debit,
+			sum(case when {opening_condition} then credit else 0 end) as credit,
+			sum(case when {opening_condition} then debit_in_account_currency else 0 end) as debit_in_account_currency,
+			sum(case when {opening_condition} then credit_in_account_currency else 0 end) as credit_in_account_currency
+		from ({gl_entries_query}) gle
+		group by account_currency
+	""".format(gl_entries_query=gl_entries_query, opening_condition=opening_condition), filters, as_dict=1)
+
+	# presentation currency conversion depends on the currencies of all the entries, not only of a page
+	account_currencies = [d.account_currency for d in opening_by_currency]
+
+	if filters.get('presentation_currency'):
+		opening_by_currency = convert_to_presentation_currency(opening_by_currency, get_currency(filters),
+			filters.get('company'), account_currencies=account_currencies)
+
+	opening = _dict(debit=0.0, credit=0.0, debit_in_account_currency=0.0, credit_in_account_currency=0.0)
+	for d in opening_by_currency:
+		for fieldname in opening:
+			opening[fieldname] += flt(d.get(fieldname))
+
+	return _dict(
+		opening=opening,
+		total=_dict(debit=0.0, credit=0.0, debit_in_account_currency=0.0, credit_in_account_currency=0.0),
+		balance=opening.debit - opening.credit,
+		account_currencies=account_currencies
+	)
+
 def get_balance(row, balance, debit_field, credit_field):
 	balance += (row.get(debit_field, 0) -  row.get(credit_field, 0))
 
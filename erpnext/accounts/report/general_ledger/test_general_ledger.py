@@ -0,0 +1,42 @@
+# Copyright (c) 2021, Frappe Technologies Pvt. Ltd. and Contributors
+# License: GNU General Public License v3. See license.txt
+
+import frappe
+
+from erpnext.accounts.doctype.journal_entry.test_journal_entry import make_journal_entry
+from erpnext.accounts.report.general_ledger.general_ledger import execute, get_gl_entries_page
+from erpnext.tests.utils import ERPNextTestCase
+
+
+class TestGeneralLedger(ERPNextTestCase):
+	def test_gl_entries_in_pages(self):
+		for i, posting_date in enumerate(["2021-01-10", "2021-02-10", "2021-02-15", "2021-02-20"]):
+			make_journal_entry("_Test Bank - _TC", "_Test Cash - _TC", 100 * (i + 1),
+				posting_date=posting_date, submit=True)
+
+		filters = frappe._dict(
+			company="_Test Company",
+			from_date="2021-02-01",
+			to_date="2021-02-28",
+			account=["_Test Bank - _TC"],
+			group_by="Group by Voucher (Consolidated)"
+		)
+		expected = execute(frappe._dict(filters))[1]
+
+		filters.group_by = ""
+		rows, cursor = [], None
+		while True:
+			page = get_gl_entries_page(frappe._dict(filters), cursor, page_length=1)
+			rows += page["data"]
+			cursor = page["cursor"]
+			if not cursor:
+				break
+
+		opening, entries, closing = rows[0], rows[1:-2], rows[-1]
+
+		self.assertEqual(opening.balance, expected[0]["balance"])
+		self.assertEqual(closing.balance, expected[-1]["balance"])
+		self.assertEqual([d.gl_entry for d in entries], [d.gl_entry for d in expected[1:-2]])
+
+		# running balance carries across pages
+		self.assertEqual(entries[-1].balance, closing.balance)
@@ -11,6 +11,10 @@ from erpnext.accounts.doctype.accounting_dimension.accounting_dimension import (
 	get_accounting_dimensions,
 	get_dimension_with_children,
 )
+from erpnext.accounts.doctype.gl_period_balance.gl_period_balance import (
+	get_period_balance_conditions,
+	use_gl_period_balances,
+)
 from erpnext.accounts.report.financial_statements import (
 	filter_accounts,
 	filter_out_zero_value_rows,
@@ -83,7 +87,8 @@ def get_data(filters):
 		filters.project = [filters.project]
 
 	set_gl_entries_by_account(filters.company, filters.from_date,
-		filters.to_date, min_lft, max_rgt, filters, gl_entries_by_account, ignore_closing_entries=not flt(filters.with_period_closing_entry))
+		filters.to_date, min_lft, max_rgt, filters, gl_entries_by_account, ignore_closing_entries=not flt(filters.with_period_closing_entry),
+		period_boundaries=[])
 
 	total_row = calculate_values(accounts, gl_entries_by_account, opening_balances, filters, company_currency)
 	accumulate_values_into_parents(accounts, accounts_by_name)
@@ -151,23 +156,42 @@ def get_rootwise_opening_balances(filters, report_type):
 					dimension.fieldname: filters.get(dimension.fieldname)
 				})
 
-	gle = frappe.db.sql("""
+	if use_gl_period_balances():
+		period_balance_conditions, gl_entry_conditions = get_period_balance_conditions(
+			[filters.from_date, filters.year_start_date])
+
+		gle = get_opening_gl_entries("GL Period Balance", additional_conditions + period_balance_conditions,
+			query_filters)
+		if gl_entry_conditions:
+			gle += get_opening_gl_entries("GL Entry", additional_conditions + gl_entry_conditions, query_filters)
+	else:
+		gle = get_opening_gl_entries("GL Entry", additional_conditions, query_filters)
+
+	opening = frappe._dict()
+	for d in gle:
+		if d.account in opening:
+			opening[d.account].opening_debit += flt(d.opening_debit)
+			opening[d.account].opening_credit += flt(d.opening_credit)
+		else:
+			opening[d.account] = d
+
+	return opening
+
+def get_opening_gl_entries(doctype, additional_conditions, query_filters):
+	cancelled_condition = "and is_cancelled = 0" if doctype == "GL Entry" else ""
+
+	return frappe.db.sql("""
 		select
 			account, sum(debit) as opening_debit, sum(credit) as opening_credit
-		from `tabGL Entry`
+		from `tab{doctype}`
 		where
 			company=%(company)s
 			{additional_conditions}
 			and (posting_date < %(from_date)s or ifnull(is_opening, 'No') = 'Yes')
 			and account in (select name from `tabAccount` where report_type=%(report_type)s)
-			and is_cancelled = 0
-		group by account""".format(additional_conditions=additional_conditions), query_filters , as_dict=True)
-
-	opening = frappe._dict()
-	for d in gle:
-		opening.setdefault(d.account, d)
-
-	return opening
+			{cancelled_condition}
+		group by account""".format(doctype=doctype, additional_conditions=additional_conditions,
+			cancelled_condition=cancelled_condition), query_filters , as_dict=True)
 
 def calculate_values(accounts, gl_entries_by_account, opening_balances, filters, company_currency):
 	init = {
@@ -69,22 +69,23 @@ def get_rate_as_at(date, from_currency, to_currency):
 
 	return rate
 
-def convert_to_presentation_currency(gl_entries, currency_info, company):
+def convert_to_presentation_currency(gl_entries, currency_info, company, account_currencies=None):
 	"""
 	Take a list of GL Entries and change the 'debit' and 'credit' values to currencies
 	in `currency_info`.
 	:param gl_entries:
 	:param currency_info:
+	:param account_currencies: account currencies of all the entries, if `gl_entries` is a part of them
 	:return:
 	"""
 	converted_gl_list = []
 	presentation_currency = currency_info['presentation_currency']
 	company_currency = currency_info['company_currency']
 
-	account_currencies = list(set(entry['account_currency'] for entry in gl_entries))
+	if account_currencies is None:
+		account_currencies = list(set(entry['account_currency'] for entry in gl_entries))
 
 	for entry in gl_entries:
-		account = entry['account']
 		debit = flt(entry['debit'])
 		credit = flt(entry['credit'])
 		debit_in_account_currency = flt(entry['debit_in_account_currency'])
@@ -14,6 +14,8 @@ import erpnext
 
 # imported to enable erpnext.accounts.utils.get_account_currency
 from erpnext.accounts.doctype.account.account import get_account_currency  # noqa
+from erpnext.accounts.doctype.gl_period_balance.gl_period_balance import reverse_gl_period_balances
+from erpnext.accounts.doctype.open_item.open_item import reverse_open_items, update_open_items
 from erpnext.stock import get_warehouse_account_map
 from erpnext.stock.utils import get_stock_value_on
 
@@ -521,6 +523,13 @@ def unlink_ref_doc_from_payment_entries(ref_doc):
 	remove_ref_doc_link_from_jv(ref_doc.doctype, ref_doc.name)
 	remove_ref_doc_link_from_pe(ref_doc.doctype, ref_doc.name)
 
+	# unlinked entries are moved from the open item of the reference to those of their own vouchers
+	unlinked_gl_entries = frappe.db.sql("""select * from `tabGL Entry`
+		where against_voucher_type=%s and against_voucher=%s
+		and voucher_no != ifnull(against_voucher, '') and is_cancelled = 0""",
+		(ref_doc.doctype, ref_doc.name), as_dict=1)
+	update_open_items(unlinked_gl_entries, reverse=True)
+
 	frappe.db.sql("""update `tabGL Entry`
 		set against_voucher_type=null, against_voucher=null,
 		modified=%s, modified_by=%s
@@ -528,6 +537,10 @@ def unlink_ref_doc_from_payment_entries(ref_doc):
 		and voucher_no != ifnull(against_voucher, '')""",
 		(now(), frappe.session.user, ref_doc.doctype, ref_doc.name))
 
+	for gle in unlinked_gl_entries:
+		gle.against_voucher_type = gle.against_voucher = None
+	update_open_items(unlinked_gl_entries)
+
 	if ref_doc.doctype in ("Sales Invoice", "Purchase Invoice"):
 		ref_doc.set("advances", [])
 
@@ -656,43 +669,29 @@ def get_held_invoices(party_type, party):
 
 
 def get_outstanding_invoices(party_type, party, account, condition=None, filters=None):
+	"""
+		Returns vouchers of the party with positive outstanding in the party account,
+		read from Open Item. `condition` may filter on the columns of Open Item.
+	"""
 	outstanding_invoices = []
 	precision = frappe.get_precision("Sales Invoice", "outstanding_amount") or 2
 
-	if account:
-		root_type, account_type = frappe.get_cached_value("Account", account, ["root_type", "account_type"])
-		party_account_type = "Receivable" if root_type == "Asset" else "Payable"
-		party_account_type = account_type or party_account_type
-	else:
-		party_account_type = erpnext.get_party_account_type(party_type)
-
-	if party_account_type == 'Receivable':
-		dr_or_cr = "debit_in_account_currency - credit_in_account_currency"
-		payment_dr_or_cr = "credit_in_account_currency - debit_in_account_currency"
-	else:
-		dr_or_cr = "credit_in_account_currency - debit_in_account_currency"
-		payment_dr_or_cr = "debit_in_account_currency - credit_in_account_currency"
-
 	held_invoices = get_held_invoices(party_type, party)
 
 	invoice_list = frappe.db.sql("""
 		select
-			voucher_no, voucher_type, posting_date, due_date,
-			ifnull(sum({dr_or_cr}), 0) as invoice_amount,
+			voucher_no, voucher_type, posting_date, due_date, invoice_amount,
+			outstanding_in_account_currency as outstanding_amount,
 			account_currency as currency
 		from
-			`tabGL Entry`
+			`tabOpen Item`
 		where
 			party_type = %(party_type)s and party = %(party)s
-			and account = %(account)s and {dr_or_cr} > 0
-			and is_cancelled=0
+			and account = %(account)s
+			and voucher_type != 'Payment Entry'
+			and invoice_amount > 0 and outstanding_in_account_currency > 0
 			{condition}
-			and ((voucher_type = 'Journal Entry'
-					and (against_voucher = '' or against_voucher is null))
-				or (voucher_type not in ('Journal Entry', 'Payment Entry')))
-		group by voucher_type, voucher_no
 		order by posting_date, name""".format(
-			dr_or_cr=dr_or_cr,
 			condition=condition or ""
 		), {
 			"party_type": party_type,
@@ -700,29 +699,9 @@ def get_outstanding_invoices(party_type, party, account, condition=None, filters
 			"account": account,
 		}, as_dict=True)
 
-	payment_entries = frappe.db.sql("""
-		select against_voucher_type, against_voucher,
-			ifnull(sum({payment_dr_or_cr}), 0) as payment_amount
-		from `tabGL Entry`
-		where party_type = %(party_type)s and party = %(party)s
-			and account = %(account)s
-			and {payment_dr_or_cr} > 0
-			and against_voucher is not null and against_voucher != ''
-			and is_cancelled=0
-		group by against_voucher_type, against_voucher
-	""".format(payment_dr_or_cr=payment_dr_or_cr), {
-		"party_type": party_type,
-		"party": party,
-		"account": account
-	}, as_dict=True)
-
-	pe_map = frappe._dict()
-	for d in payment_entries:
-		pe_map.setdefault((d.against_voucher_type, d.against_voucher), d.payment_amount)
-
 	for d in invoice_list:
-		payment_amount = pe_map.get((d.voucher_type, d.voucher_no), 0)
-		outstanding_amount = flt(d.invoice_amount - payment_amount, precision)
+		payment_amount = flt(d.invoice_amount - d.outstanding_amount)
+		outstanding_amount = flt(d.outstanding_amount, precision)
 		if outstanding_amount > 0.5 / (10**precision):
 			if (filters and filters.get("outstanding_amt_greater_than") and
 				not (outstanding_amount >= filters.get("outstanding_amt_greater_than") and
@@ -924,6 +903,8 @@ def update_gl_entries_after(posting_date, posting_time, for_warehouses=None, for
 
 def repost_gle_for_stock_vouchers(stock_vouchers, posting_date, company=None, warehouse_account=None):
 	def _delete_gl_entries(voucher_type, voucher_no):
+		reverse_gl_period_balances(voucher_type, voucher_no)
+		reverse_open_items(voucher_type, voucher_no)
 		frappe.db.sql("""delete from `tabGL Entry`
 			where voucher_type=%s and voucher_no=%s""", (voucher_type, voucher_no))
 
@@ -26,6 +26,8 @@ import erpnext
 from erpnext.accounts.doctype.accounting_dimension.accounting_dimension import (
 	get_accounting_dimensions,
 )
+from erpnext.accounts.doctype.gl_period_balance.gl_period_balance import reverse_gl_period_balances
+from erpnext.accounts.doctype.open_item.open_item import reverse_open_items
 from erpnext.accounts.doctype.pricing_rule.utils import (
 	apply_pricing_rule_for_free_items,
 	apply_pricing_rule_on_transaction,
@@ -52,6 +54,7 @@ from erpnext.stock.get_item_details import (
 	get_item_details,
 	get_item_tax_map,
 	get_item_warehouse,
+	prefetched_item_details,
 )
 from erpnext.utilities.transaction_base import TransactionBase
 
@@ -173,7 +176,12 @@ class AccountsController(TransactionBase):
 	def on_trash(self):
 		# delete sl and gl entries on deletion of transaction
 		if frappe.db.get_single_value('Accounts Settings', 'delete_linked_ledger_entries'):
+			reverse_gl_period_balances(self.doctype, self.name)
+			reverse_open_items(self.doctype, self.name)
 			frappe.db.sql("delete from `tabGL Entry` where voucher_type=%s and voucher_no=%s", (self.doctype, self.name))
+			frappe.db.sql("""delete sr from `tabStock Ledger Entry Serial No` sr
+				inner join `tabStock Ledger Entry` sle on sle.name = sr.stock_ledger_entry
+				where sle.voucher_type=%s and sle.voucher_no=%s""", (self.doctype, self.name))
 			frappe.db.sql("delete from `tabStock Ledger Entry` where voucher_type=%s and voucher_no=%s", (self.doctype, self.name))
 
 	def validate_deferred_start_and_end_date(self):
@@ -368,51 +376,61 @@ class AccountsController(TransactionBase):
 				parent_dict.update({"customer": parent_dict.get("party_name")})
 
 			self.pricing_rules = []
+			# free items added by pricing rules are not prefetched, they fall back to queries
+			prefetch_args = []
 			for item in self.get("items"):
 				if item.get("item_code"):
 					args = parent_dict.copy()
 					args.update(item.as_dict())
-
 					args["doctype"] = self.doctype
-					args["name"] = self.name
-					args["child_docname"] = item.name
-					args["ignore_pricing_rule"] = self.ignore_pricing_rule if hasattr(self, 'ignore_pricing_rule') else 0
+					prefetch_args.append(args)
 
-					if not args.get("transaction_date"):
-						args["transaction_date"] = args.get("posting_date")
+			with prefetched_item_details(prefetch_args):
+				for item in self.get("items"):
+					if item.get("item_code"):
+						args = parent_dict.copy()
+						args.update(item.as_dict())
 
-					if self.get("is_subcontracted"):
-						args["is_subcontracted"] = self.is_subcontracted
+						args["doctype"] = self.doctype
+						args["name"] = self.name
+						args["child_docname"] = item.name
+						args["ignore_pricing_rule"] = self.ignore_pricing_rule if hasattr(self, 'ignore_pricing_rule') else 0
 
-					ret = get_item_details(args, self, for_validate=True, overwrite_warehouse=False)
+						if not args.get("transaction_date"):
+							args["transaction_date"] = args.get("posting_date")
 
-					for fieldname, value in ret.items():
-						if item.meta.get_field(fieldname) and value is not None:
-							if (item.get(fieldname) is None or fieldname in force_item_fields):
-								item.set(fieldname, value)
+						if self.get("is_subcontracted"):
+							args["is_subcontracted"] = self.is_subcontracted
 
-							elif fieldname in ['cost_center', 'conversion_factor'] and not item.get(fieldname):
-								item.set(fieldname, value)
+						ret = get_item_details(args, self, for_validate=True, overwrite_warehouse=False)
 
-							elif fieldname == "serial_no":
-								# Ensure that serial numbers are matched against Stock UOM
-								item_conversion_factor = item.get("conversion_factor") or 1.0
-								item_qty = abs(item.get("qty")) * item_conversion_factor
+						for fieldname, value in ret.items():
+							if item.meta.get_field(fieldname) and value is not None:
+								if (item.get(fieldname) is None or fieldname in force_item_fields):
+									item.set(fieldname, value)
 
-								if item_qty != len(get_serial_nos(item.get('serial_no'))):
+								elif fieldname in ['cost_center', 'conversion_factor'] and not item.get(fieldname):
 									item.set(fieldname, value)
 
-					if self.doctype in ["Purchase Invoice", "Sales Invoice"] and item.meta.get_field('is_fixed_asset'):
-						item.set('is_fixed_asset', ret.get('is_fixed_asset', 0))
+								elif fieldname == "serial_no":
+									# Ensure that serial numbers are matched against Stock UOM
+									item_conversion_factor = item.get("conversion_factor") or 1.0
+									item_qty = abs(item.get("qty")) * item_conversion_factor
+
+									if item_qty != len(get_serial_nos(item.get('serial_no'))):
+										item.set(fieldname, value)
+
+						if self.doctype in ["Purchase Invoice", "Sales Invoice"] and item.meta.get_field('is_fixed_asset'):
+							item.set('is_fixed_asset', ret.get('is_fixed_asset', 0))
 
-					# Double check for cost center
-					# Items add via promotional scheme may not have cost center set
-					if hasattr(item, 'cost_center') and not item.get('cost_center'):
-						item.set('cost_center', self.get('cost_center') or erpnext.get_default_cost_center(self.company))
+						# Double check for cost center
+						# Items add via promotional scheme may not have cost center set
+						if hasattr(item, 'cost_center') and not item.get('cost_center'):
+							item.set('cost_center', self.get('cost_center') or erpnext.get_default_cost_center(self.company))
 
-					if ret.get("pricing_rules"):
-						self.apply_pricing_rule_on_items(item, ret)
-						self.set_pricing_rule_details(item, ret)
+						if ret.get("pricing_rules"):
+							self.apply_pricing_rule_on_items(item, ret)
+							self.set_pricing_rule_details(item, ret)
 
 			if self.doctype == "Purchase Invoice":
 				self.set_expense_account(for_validate)
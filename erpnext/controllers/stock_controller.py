@@ -18,6 +18,7 @@ from erpnext.accounts.utils import get_fiscal_year
 from erpnext.controllers.accounts_controller import AccountsController
 from erpnext.stock import get_warehouse_account_map
 from erpnext.stock.stock_ledger import get_items_to_be_repost
+from erpnext.stock.utils import get_combine_datetime
 
 
 class QualityInspectionRequiredError(frappe.ValidationError): pass
@@ -564,15 +565,19 @@ def future_sle_exists(args, sl_entries=None):
 		if not sl_entries:
 			return
 
+	args.posting_datetime = get_combine_datetime(args.posting_date, args.posting_time)
+	sl_entries = get_entries_to_validate_future_sle(sl_entries, args.posting_datetime)
+	if not sl_entries:
+		return 0
+
 	or_conditions = get_conditions_to_validate_future_sle(sl_entries)
 
 	data = frappe.db.sql("""
 		select item_code, warehouse, count(name) as total_row
-		from `tabStock Ledger Entry` force index (item_warehouse)
+		from `tabStock Ledger Entry`
 		where
 			({})
-			and timestamp(posting_date, posting_time)
-				>= timestamp(%(posting_date)s, %(posting_time)s)
+			and posting_datetime >= %(posting_datetime)s
 			and voucher_no != %(voucher_no)s
 			and is_cancelled = 0
 		GROUP BY
@@ -615,6 +620,24 @@ def get_sle_entries_against_voucher(args):
 		fields=["item_code", "warehouse"],
 		order_by="creation asc")
 
+def get_entries_to_validate_future_sle(sl_entries, posting_datetime):
+	"""
+		Skip item-warehouses whose latest SLE as per Bin is before `posting_datetime`,
+		they can not have future SLEs. Bins without the latest posting datetime are validated.
+	"""
+	latest_posting_datetimes = {}
+	for d in frappe.get_all("Bin",
+		filters={
+			"item_code": ("in", list({entry.item_code for entry in sl_entries})),
+			"warehouse": ("in", list({entry.warehouse for entry in sl_entries}))
+		},
+		fields=["item_code", "warehouse", "latest_posting_datetime"]):
+		latest_posting_datetimes[(d.item_code, d.warehouse)] = d.latest_posting_datetime
+
+	return [entry for entry in sl_entries
+		if not latest_posting_datetimes.get((entry.item_code, entry.warehouse))
+			or latest_posting_datetimes[(entry.item_code, entry.warehouse)] >= posting_datetime]
+
 def get_conditions_to_validate_future_sle(sl_entries):
 	warehouse_items_map = {}
 	for entry in sl_entries:
@@ -3,6 +3,7 @@
 
 
 import json
+import operator
 
 import frappe
 from frappe import _, scrub
@@ -18,6 +19,11 @@ from erpnext.controllers.accounts_controller import (
 )
 from erpnext.stock.get_item_details import _get_item_tax_template
 
+try:
+	import numpy
+except ImportError:
+	numpy = None
+
 
 class calculate_taxes_and_totals(object):
 	def __init__(self, doc):
@@ -182,23 +188,31 @@ class calculate_taxes_and_totals(object):
 		if not any(cint(tax.included_in_print_rate) for tax in self.doc.get("taxes")):
 			return
 
-		for item in self.doc.get("items"):
-			item_tax_map = self._load_item_tax_rate(item.item_tax_rate)
-			cumulated_tax_fraction = 0
-			total_inclusive_tax_amount_per_qty = 0
-			for i, tax in enumerate(self.doc.get("taxes")):
-				tax.tax_fraction_for_current_item, inclusive_tax_amount_per_qty = self.get_current_tax_fraction(tax, item_tax_map)
-
-				if i==0:
-					tax.grand_total_fraction_for_current_item = 1 + tax.tax_fraction_for_current_item
-				else:
-					tax.grand_total_fraction_for_current_item = \
-						self.doc.get("taxes")[i-1].grand_total_fraction_for_current_item \
-						+ tax.tax_fraction_for_current_item
+		items = self.doc.get("items")
+		item_tax_rates = self.get_item_tax_rates()
+		qty = get_column([flt(item.qty) for item in items])
+
+		# fractions are computed for all items at once, one tax at a time
+		tax_fractions, grand_total_fractions = [], []
+		cumulated_tax_fractions = total_inclusive_tax_amounts_per_qty = get_column([0.0] * len(items))
 
-				cumulated_tax_fraction += tax.tax_fraction_for_current_item
-				total_inclusive_tax_amount_per_qty += inclusive_tax_amount_per_qty * flt(item.qty)
+		for i, tax in enumerate(self.doc.get("taxes")):
+			tax_fraction, inclusive_tax_amount_per_qty = self.get_current_tax_fractions(tax,
+				item_tax_rates[i], tax_fractions, grand_total_fractions)
 
+			tax_fractions.append(tax_fraction)
+			grand_total_fractions.append(apply_to_column(operator.add,
+				1 if i == 0 else grand_total_fractions[i-1], tax_fraction))
+
+			cumulated_tax_fractions = apply_to_column(operator.add, cumulated_tax_fractions, tax_fraction)
+			total_inclusive_tax_amounts_per_qty = apply_to_column(operator.add, total_inclusive_tax_amounts_per_qty,
+				apply_to_column(operator.mul, inclusive_tax_amount_per_qty, qty))
+
+			tax.tax_fraction_for_current_item = get_last(tax_fraction)
+			tax.grand_total_fraction_for_current_item = get_last(grand_total_fractions[i])
+
+		for item, cumulated_tax_fraction, total_inclusive_tax_amount_per_qty in zip(items,
+			column_to_list(cumulated_tax_fractions), column_to_list(total_inclusive_tax_amounts_per_qty)):
 			if not self.discount_amount_applied and item.qty and (cumulated_tax_fraction or total_inclusive_tax_amount_per_qty):
 				amount = flt(item.amount) - total_inclusive_tax_amount_per_qty
 
@@ -212,34 +226,51 @@ class calculate_taxes_and_totals(object):
 	def _load_item_tax_rate(self, item_tax_rate):
 		return json.loads(item_tax_rate) if item_tax_rate else {}
 
-	def get_current_tax_fraction(self, tax, item_tax_map):
+	def get_item_tax_rates(self):
+		"""
+			Returns the rates of each tax for all items,
+			item tax rate maps are loaded once for items which share them
+		"""
+		item_tax_maps = {}
+		for item in self.doc.get("items"):
+			if item.item_tax_rate not in item_tax_maps:
+				item_tax_maps[item.item_tax_rate] = self._load_item_tax_rate(item.item_tax_rate)
+
+		item_tax_rates = []
+		for tax in self.doc.get("taxes"):
+			tax_rates = {item_tax_rate: self._get_tax_rate(tax, item_tax_map)
+				for item_tax_rate, item_tax_map in item_tax_maps.items()}
+			item_tax_rates.append([tax_rates[item.item_tax_rate] for item in self.doc.get("items")])
+
+		return item_tax_rates
+
+	def get_current_tax_fractions(self, tax, tax_rates, tax_fractions, grand_total_fractions):
 		"""
-			Get tax fraction for calculating tax exclusive amount
-			from tax inclusive amount
+			Get tax fractions of all items for calculating tax exclusive amounts
+			from tax inclusive amounts
 		"""
-		current_tax_fraction = 0
-		inclusive_tax_amount_per_qty = 0
+		current_tax_fraction = inclusive_tax_amount_per_qty = get_column([0.0] * len(tax_rates))
 
 		if cint(tax.included_in_print_rate):
-			tax_rate = self._get_tax_rate(tax, item_tax_map)
+			tax_rate = get_column(tax_rates)
 
 			if tax.charge_type == "On Net Total":
-				current_tax_fraction = tax_rate / 100.0
+				current_tax_fraction = apply_to_column(operator.truediv, tax_rate, 100.0)
 
 			elif tax.charge_type == "On Previous Row Amount":
-				current_tax_fraction = (tax_rate / 100.0) * \
-					self.doc.get("taxes")[cint(tax.row_id) - 1].tax_fraction_for_current_item
+				current_tax_fraction = apply_to_column(operator.mul,
+					apply_to_column(operator.truediv, tax_rate, 100.0), tax_fractions[cint(tax.row_id) - 1])
 
 			elif tax.charge_type == "On Previous Row Total":
-				current_tax_fraction = (tax_rate / 100.0) * \
-					self.doc.get("taxes")[cint(tax.row_id) - 1].grand_total_fraction_for_current_item
+				current_tax_fraction = apply_to_column(operator.mul,
+					apply_to_column(operator.truediv, tax_rate, 100.0), grand_total_fractions[cint(tax.row_id) - 1])
 
 			elif tax.charge_type == "On Item Quantity":
-				inclusive_tax_amount_per_qty = flt(tax_rate)
+				inclusive_tax_amount_per_qty = tax_rate
 
 		if getattr(tax, "add_deduct_tax", None) and tax.add_deduct_tax == "Deduct":
-			current_tax_fraction *= -1.0
-			inclusive_tax_amount_per_qty *= -1.0
+			current_tax_fraction = apply_to_column(operator.mul, current_tax_fraction, -1.0)
+			inclusive_tax_amount_per_qty = apply_to_column(operator.mul, inclusive_tax_amount_per_qty, -1.0)
 
 		return current_tax_fraction, inclusive_tax_amount_per_qty
 
@@ -270,63 +301,72 @@ class calculate_taxes_and_totals(object):
 		if not self.doc.get('is_consolidated'):
 			self.doc.rounding_adjustment = 0
 
-		# maintain actual tax rate based on idx
-		actual_tax_dict = dict([[tax.idx, flt(tax.tax_amount, tax.precision("tax_amount"))]
-			for tax in self.doc.get("taxes") if tax.charge_type == "Actual"])
+		items = self.doc.get("items")
+		item_tax_rates = self.get_item_tax_rates()
+		net_amount = get_column([item.net_amount for item in items])
+		qty = get_column([item.qty for item in items])
 
-		for n, item in enumerate(self.doc.get("items")):
-			item_tax_map = self._load_item_tax_rate(item.item_tax_rate)
-			for i, tax in enumerate(self.doc.get("taxes")):
-				# tax_amount represents the amount of tax for the current step
-				current_tax_amount = self.get_current_tax_amount(item, tax, item_tax_map)
+		# tax amounts are computed for all items at once, one tax at a time,
+		# with the same operations per item as when computed item by item
+		tax_amounts, grand_totals = [], []
 
-				# Adjust divisional loss to the last item
-				if tax.charge_type == "Actual":
-					actual_tax_dict[tax.idx] -= current_tax_amount
-					if n == len(self.doc.get("items")) - 1:
-						current_tax_amount += actual_tax_dict[tax.idx]
+		for i, tax in enumerate(self.doc.get("taxes")):
+			# tax_amount represents the amount of tax for the current step
+			current_tax_amount = self.get_current_tax_amounts(tax, item_tax_rates[i], net_amount, qty,
+				tax_amounts, grand_totals)
 
-				# accumulate tax amount into tax.tax_amount
-				if tax.charge_type != "Actual" and \
-					not (self.discount_amount_applied and self.doc.apply_discount_on=="Grand Total"):
-						tax.tax_amount += current_tax_amount
+			if not (self.doc.get("is_consolidated") or tax.get("dont_recompute_tax")):
+				self.set_item_wise_tax(items, tax, item_tax_rates[i], current_tax_amount)
 
-				# store tax_amount for current item as it will be used for
-				# charge type = 'On Previous Row Amount'
-				tax.tax_amount_for_current_item = current_tax_amount
+			current_tax_amount = column_to_list(current_tax_amount)
 
-				# set tax after discount
-				tax.tax_amount_after_discount_amount += current_tax_amount
+			# Adjust divisional loss to the last item
+			if tax.charge_type == "Actual":
+				divisional_loss = add_sequentially(flt(tax.tax_amount, tax.precision("tax_amount")),
+					current_tax_amount, operator.sub)
+				current_tax_amount[-1] += divisional_loss
 
-				current_tax_amount = self.get_tax_amount_if_for_valuation_or_deduction(current_tax_amount, tax)
+			# accumulate tax amount into tax.tax_amount
+			if tax.charge_type != "Actual" and \
+				not (self.discount_amount_applied and self.doc.apply_discount_on=="Grand Total"):
+					tax.tax_amount = add_sequentially(tax.tax_amount, current_tax_amount)
 
-				# note: grand_total_for_current_item contains the contribution of
-				# item's amount, previously applied tax and the current tax on that item
-				if i==0:
-					tax.grand_total_for_current_item = flt(item.net_amount + current_tax_amount)
-				else:
-					tax.grand_total_for_current_item = \
-						flt(self.doc.get("taxes")[i-1].grand_total_for_current_item + current_tax_amount)
+			# store tax_amount for current item as it will be used for
+			# charge type = 'On Previous Row Amount'
+			tax_amounts.append(get_column(current_tax_amount))
+			tax.tax_amount_for_current_item = current_tax_amount[-1]
+
+			# set tax after discount
+			tax.tax_amount_after_discount_amount = add_sequentially(tax.tax_amount_after_discount_amount,
+				current_tax_amount)
+
+			current_tax_amount = self.get_tax_amounts_if_for_valuation_or_deduction(tax_amounts[i], tax)
+
+			# note: grand_total_for_current_item contains the contribution of
+			# item's amount, previously applied tax and the current tax on that item
+			grand_totals.append(apply_to_column(operator.add,
+				net_amount if i == 0 else grand_totals[i-1], current_tax_amount))
+			tax.grand_total_for_current_item = get_last(grand_totals[i])
 
-				# set precision in the last item iteration
-				if n == len(self.doc.get("items")) - 1:
-					self.round_off_totals(tax)
-					self._set_in_company_currency(tax,
-						["tax_amount", "tax_amount_after_discount_amount"])
+		# set precision once all items are added
+		for i, tax in enumerate(self.doc.get("taxes")):
+			self.round_off_totals(tax)
+			self._set_in_company_currency(tax,
+				["tax_amount", "tax_amount_after_discount_amount"])
 
-					self.round_off_base_values(tax)
-					self.set_cumulative_total(i, tax)
+			self.round_off_base_values(tax)
+			self.set_cumulative_total(i, tax)
 
-					self._set_in_company_currency(tax, ["total"])
+			self._set_in_company_currency(tax, ["total"])
 
-					# adjust Discount Amount loss in last tax iteration
-					if i == (len(self.doc.get("taxes")) - 1) and self.discount_amount_applied \
-						and self.doc.discount_amount \
-						and self.doc.apply_discount_on == "Grand Total" \
-						and not self.doc.get('is_consolidated'):
-							self.doc.rounding_adjustment = flt(self.doc.grand_total
-								- flt(self.doc.discount_amount) - tax.total,
-								self.doc.precision("rounding_adjustment"))
+			# adjust Discount Amount loss in last tax iteration
+			if i == (len(self.doc.get("taxes")) - 1) and self.discount_amount_applied \
+				and self.doc.discount_amount \
+				and self.doc.apply_discount_on == "Grand Total" \
+				and not self.doc.get('is_consolidated'):
+					self.doc.rounding_adjustment = flt(self.doc.grand_total
+						- flt(self.doc.discount_amount) - tax.total,
+						self.doc.precision("rounding_adjustment"))
 
 	def get_tax_amount_if_for_valuation_or_deduction(self, tax_amount, tax):
 		# if just for valuation, do not add the tax amount in total
@@ -337,6 +377,16 @@ class calculate_taxes_and_totals(object):
 				tax_amount *= -1.0 if (tax.add_deduct_tax == "Deduct") else 1.0
 		return tax_amount
 
+	def get_tax_amounts_if_for_valuation_or_deduction(self, tax_amounts, tax):
+		# same as get_tax_amount_if_for_valuation_or_deduction, for the tax amounts of all items
+		if getattr(tax, "category", None):
+			if tax.category == "Valuation":
+				tax_amounts = get_column([0.0] * len(tax_amounts))
+			if self.doc.doctype in ["Purchase Order", "Purchase Invoice", "Purchase Receipt", "Supplier Quotation"] \
+				and tax.add_deduct_tax == "Deduct":
+					tax_amounts = apply_to_column(operator.mul, tax_amounts, -1.0)
+		return tax_amounts
+
 	def set_cumulative_total(self, row_idx, tax):
 		tax_amount = tax.tax_amount_after_discount_amount
 		tax_amount = self.get_tax_amount_if_for_valuation_or_deduction(tax_amount, tax)
@@ -346,39 +396,42 @@ class calculate_taxes_and_totals(object):
 		else:
 			tax.total = flt(self.doc.get("taxes")[row_idx-1].total + tax_amount, tax.precision("total"))
 
-	def get_current_tax_amount(self, item, tax, item_tax_map):
-		tax_rate = self._get_tax_rate(tax, item_tax_map)
-		current_tax_amount = 0.0
+	def get_current_tax_amounts(self, tax, tax_rates, net_amount, qty, tax_amounts, grand_totals):
+		tax_rate = get_column(tax_rates)
+		current_tax_amount = get_column([0.0] * len(tax_rates))
 
 		if tax.charge_type == "Actual":
 			# distribute the tax amount proportionally to each item row
 			actual = flt(tax.tax_amount, tax.precision("tax_amount"))
-			current_tax_amount = item.net_amount*actual / self.doc.net_total if self.doc.net_total else 0.0
+			if self.doc.net_total:
+				current_tax_amount = apply_to_column(operator.truediv,
+					apply_to_column(operator.mul, net_amount, actual), self.doc.net_total)
 
 		elif tax.charge_type == "On Net Total":
-			current_tax_amount = (tax_rate / 100.0) * item.net_amount
+			current_tax_amount = apply_to_column(operator.mul,
+				apply_to_column(operator.truediv, tax_rate, 100.0), net_amount)
 		elif tax.charge_type == "On Previous Row Amount":
-			current_tax_amount = (tax_rate / 100.0) * \
-				self.doc.get("taxes")[cint(tax.row_id) - 1].tax_amount_for_current_item
+			current_tax_amount = apply_to_column(operator.mul,
+				apply_to_column(operator.truediv, tax_rate, 100.0), tax_amounts[cint(tax.row_id) - 1])
 		elif tax.charge_type == "On Previous Row Total":
-			current_tax_amount = (tax_rate / 100.0) * \
-				self.doc.get("taxes")[cint(tax.row_id) - 1].grand_total_for_current_item
+			current_tax_amount = apply_to_column(operator.mul,
+				apply_to_column(operator.truediv, tax_rate, 100.0), grand_totals[cint(tax.row_id) - 1])
 		elif tax.charge_type == "On Item Quantity":
-			current_tax_amount = tax_rate * item.qty
-
-		if not (self.doc.get("is_consolidated") or tax.get("dont_recompute_tax")):
-			self.set_item_wise_tax(item, tax, tax_rate, current_tax_amount)
+			current_tax_amount = apply_to_column(operator.mul, tax_rate, qty)
 
 		return current_tax_amount
 
-	def set_item_wise_tax(self, item, tax, tax_rate, current_tax_amount):
+	def set_item_wise_tax(self, items, tax, tax_rates, current_tax_amount):
 		# store tax breakup for each item
-		key = item.item_code or item.item_name
-		item_wise_tax_amount = current_tax_amount*self.doc.conversion_rate
-		if tax.item_wise_tax_detail.get(key):
-			item_wise_tax_amount += tax.item_wise_tax_detail[key][1]
+		item_wise_tax_amounts = column_to_list(apply_to_column(operator.mul,
+			current_tax_amount, self.doc.conversion_rate))
+
+		for item, tax_rate, item_wise_tax_amount in zip(items, tax_rates, item_wise_tax_amounts):
+			key = item.item_code or item.item_name
+			if tax.item_wise_tax_detail.get(key):
+				item_wise_tax_amount += tax.item_wise_tax_detail[key][1]
 
-		tax.item_wise_tax_detail[key] = [tax_rate,flt(item_wise_tax_amount)]
+			tax.item_wise_tax_detail[key] = [tax_rate,flt(item_wise_tax_amount)]
 
 	def round_off_totals(self, tax):
 		if tax.account_head in frappe.flags.round_off_applicable_accounts:
@@ -819,6 +872,37 @@ def get_rounded_tax_amount(itemised_tax, precision):
 		for tax_account in taxes:
 			taxes[tax_account]["tax_amount"] = flt(taxes[tax_account]["tax_amount"], precision)
 
+def get_column(values):
+	"""
+		Returns `values` as a column of floats, a NumPy array if NumPy is installed.
+		Element-wise operations on columns give the same floats as on each value.
+	"""
+	return numpy.array(values, dtype=float) if numpy else [float(value) for value in values]
+
+def apply_to_column(op, a, b):
+	""" Applies the binary operator `op` element-wise, either of `a` and `b` may be a scalar """
+	if numpy:
+		return op(a, b)
+
+	if not isinstance(a, list):
+		return [op(a, y) for y in b]
+	elif not isinstance(b, list):
+		return [op(x, b) for x in a]
+
+	return [op(x, y) for x, y in zip(a, b)]
+
+def column_to_list(column):
+	return column.tolist() if numpy else list(column)
+
+def get_last(column):
+	return float(column[-1])
+
+def add_sequentially(total, values, op=operator.add):
+	# values are added one at a time, as sum (or numpy.sum) may round differently
+	for value in values:
+		total = op(total, value)
+	return total
+
 class init_landed_taxes_and_totals(object):
 	def __init__(self, doc):
 		self.doc = doc
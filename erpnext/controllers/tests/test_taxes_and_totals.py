@@ -0,0 +1,153 @@
+import json
+import unittest
+from unittest import mock
+
+from erpnext.accounts.doctype.purchase_invoice.test_purchase_invoice import make_purchase_invoice
+from erpnext.accounts.doctype.sales_invoice.test_sales_invoice import create_sales_invoice
+from erpnext.controllers import taxes_and_totals
+from erpnext.controllers.taxes_and_totals import calculate_taxes_and_totals
+
+# outputs of the item by item calculation, taxes and totals must stay the same to the last digit
+EXCLUSIVE_TAXES = {
+	"net_total": 433.33,
+	"grand_total": 507.56,
+	"total_taxes_and_charges": 74.23,
+	"taxes": [
+		(43.33, 476.66, {"_Test Item": [10.0, 30.0], "_Test Item 2": [10.0, 10.0],
+			"_Test Item Home Desktop 100": [10.0, 3.333]}),
+		(10.0, 486.66, {"_Test Item": [0.0, 6.923130177924445], "_Test Item 2": [0.0, 2.3077100593081488],
+			"_Test Item Home Desktop 100": [0.0, 0.7691597627674058]}),
+		(2.17, 488.83, {"_Test Item": [5.0, 1.5], "_Test Item 2": [5.0, 0.5],
+			"_Test Item Home Desktop 100": [5.0, 0.16665000000000002]}),
+		(9.73, 498.56, {"_Test Item": [2.0, 6.73846260355849], "_Test Item 2": [2.0, 2.246154201186163],
+			"_Test Item Home Desktop 100": [2.0, 0.7486431952553482]}),
+		(9.0, 507.56, {"_Test Item": [1.5, 4.5], "_Test Item 2": [1.5, 3.0],
+			"_Test Item Home Desktop 100": [1.5, 1.5]})
+	]
+}
+
+
+class TestTaxesAndTotals(unittest.TestCase):
+	def test_exclusive_taxes(self):
+		doc = make_invoice("Sales Invoice",
+			items=[("_Test Item", 3, 100), ("_Test Item 2", 2, 50), ("_Test Item Home Desktop 100", 1, 33.33)],
+			taxes=[
+				{"charge_type": "On Net Total", "account_head": "_Test Account VAT - _TC", "rate": 10},
+				{"charge_type": "Actual", "account_head": "_Test Account Shipping Charges - _TC", "tax_amount": 10},
+				{"charge_type": "On Previous Row Amount", "account_head": "_Test Account Service Tax - _TC",
+					"rate": 5, "row_id": 1},
+				{"charge_type": "On Previous Row Total", "account_head": "_Test Account Excise Duty - _TC",
+					"rate": 2, "row_id": 2},
+				{"charge_type": "On Item Quantity", "account_head": "_Test Account Customs Duty - _TC", "rate": 1.5}
+			])
+
+		self.assertEqual(doc.net_total, EXCLUSIVE_TAXES["net_total"])
+		self.assertEqual(doc.grand_total, EXCLUSIVE_TAXES["grand_total"])
+		self.assertEqual(doc.total_taxes_and_charges, EXCLUSIVE_TAXES["total_taxes_and_charges"])
+
+		for tax, (tax_amount, total, item_wise_tax_detail) in zip(doc.taxes, EXCLUSIVE_TAXES["taxes"]):
+			self.assertEqual(tax.tax_amount, tax_amount)
+			self.assertEqual(tax.total, total)
+			self.assertEqual(tax.item_wise_tax_detail, json.dumps(item_wise_tax_detail, separators=(',', ':')))
+
+	def test_inclusive_taxes(self):
+		doc = make_invoice("Sales Invoice",
+			items=[("_Test Item", 1, 118), ("_Test Item 2", 2, 59)],
+			taxes=[{"charge_type": "On Net Total", "account_head": "_Test Account VAT - _TC", "rate": 18,
+				"included_in_print_rate": 1}])
+
+		self.assertEqual([item.net_rate for item in doc.items], [100.0, 50.0])
+		self.assertEqual(doc.net_total, 200.0)
+		self.assertEqual(doc.taxes[0].tax_amount, 36.0)
+		self.assertEqual(doc.grand_total, 236.0)
+		self.assertEqual(doc.rounding_adjustment, 0)
+
+	def test_item_tax_rates(self):
+		doc = make_invoice("Sales Invoice",
+			items=[("_Test Item", 1, 100, {"_Test Account VAT - _TC": 5}), ("_Test Item 2", 1, 200)],
+			taxes=[{"charge_type": "On Net Total", "account_head": "_Test Account VAT - _TC", "rate": 10}])
+
+		self.assertEqual(doc.taxes[0].tax_amount, 25.0)
+		self.assertEqual(doc.taxes[0].item_wise_tax_detail, '{"_Test Item":[5.0,5.0],"_Test Item 2":[10.0,20.0]}')
+
+	def test_valuation_and_deducted_taxes(self):
+		doc = make_invoice("Purchase Invoice",
+			items=[("_Test Item", 5, 50), ("_Test Item 2", 1, 150)],
+			taxes=[
+				{"charge_type": "On Net Total", "account_head": "_Test Account VAT - _TC", "rate": 10,
+					"category": "Valuation and Total", "add_deduct_tax": "Add"},
+				{"charge_type": "Actual", "account_head": "_Test Account Shipping Charges - _TC", "tax_amount": 30,
+					"category": "Valuation", "add_deduct_tax": "Add"},
+				{"charge_type": "On Net Total", "account_head": "_Test Account Service Tax - _TC", "rate": 2,
+					"category": "Total", "add_deduct_tax": "Deduct"}
+			])
+
+		self.assertEqual([(tax.tax_amount, tax.total) for tax in doc.taxes], [(40.0, 440.0), (30.0, 440.0), (8.0, 432.0)])
+		self.assertEqual(doc.taxes[1].item_wise_tax_detail, '{"_Test Item":[0.0,18.75],"_Test Item 2":[0.0,11.25]}')
+		self.assertEqual(doc.taxes_and_charges_added, 40.0)
+		self.assertEqual(doc.taxes_and_charges_deducted, 8.0)
+		self.assertEqual(doc.grand_total, 432.0)
+
+	@unittest.skipUnless(taxes_and_totals.numpy, "NumPy is not installed")
+	def test_same_results_without_numpy(self):
+		item_codes = ["_Test Item", "_Test Item 2", "_Test Item Home Desktop 100"]
+		items = [(item_codes[i % 3], 1 + i % 7, 10.01 * (i + 1), {"_Test Account VAT - _TC": 5} if i % 4 else None)
+			for i in range(300)]
+		taxes = [
+			{"charge_type": "On Net Total", "account_head": "_Test Account VAT - _TC", "rate": 12.5,
+				"included_in_print_rate": 1},
+			{"charge_type": "On Previous Row Amount", "account_head": "_Test Account Service Tax - _TC",
+				"rate": 3.333, "row_id": 1, "included_in_print_rate": 1},
+			{"charge_type": "On Previous Row Total", "account_head": "_Test Account Excise Duty - _TC",
+				"rate": 7, "row_id": 2},
+			{"charge_type": "Actual", "account_head": "_Test Account Shipping Charges - _TC", "tax_amount": 99.99}
+		]
+
+		doc = make_invoice("Sales Invoice", items, taxes, additional_discount_percentage=7.5)
+		with mock.patch.object(taxes_and_totals, "numpy", None):
+			expected = make_invoice("Sales Invoice", items, taxes, additional_discount_percentage=7.5)
+
+		for fieldname in ["net_total", "grand_total", "total_taxes_and_charges", "rounding_adjustment"]:
+			self.assertEqual(doc.get(fieldname), expected.get(fieldname))
+
+		self.assertEqual([(item.net_amount, item.net_rate) for item in doc.items],
+			[(item.net_amount, item.net_rate) for item in expected.items])
+
+		for fieldname in ["tax_amount", "tax_amount_after_discount_amount", "total", "item_wise_tax_detail"]:
+			self.assertEqual([tax.get(fieldname) for tax in doc.taxes], [tax.get(fieldname) for tax in expected.taxes])
+
+
+def make_invoice(doctype, items, taxes, **args):
+	if doctype == "Sales Invoice":
+		doc = create_sales_invoice(do_not_save=1)
+	else:
+		doc = make_purchase_invoice(do_not_save=1)
+
+	item = doc.items[0]
+	doc.set("items", [])
+	for item_code, qty, rate, *item_tax_rate in items:
+		doc.append("items", {
+			"item_code": item_code,
+			"item_name": item_code,
+			"qty": qty,
+			"rate": rate,
+			"price_list_rate": rate,
+			"item_tax_rate": json.dumps(item_tax_rate[0]) if item_tax_rate and item_tax_rate[0] else None,
+			"uom": item.get("uom"),
+			"stock_uom": item.get("stock_uom"),
+			"conversion_factor": 1,
+			"warehouse": item.get("warehouse"),
+			"income_account": item.get("income_account"),
+			"expense_account": item.get("expense_account"),
+			"cost_center": item.get("cost_center")
+		})
+
+	for tax in taxes:
+		doc.append("taxes", dict({"cost_center": "_Test Cost Center - _TC", "description": tax["account_head"]}, **tax))
+
+	doc.update(args)
+	if args.get("additional_discount_percentage"):
+		doc.apply_discount_on = "Grand Total"
+
+	calculate_taxes_and_totals(doc)
+	return doc
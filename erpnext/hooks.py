@@ -227,6 +227,11 @@ doc_events = {
 	"*": {
 		"validate": "erpnext.support.doctype.service_level_agreement.service_level_agreement.apply",
 	},
+	# PRICING_RULE_LINKED_DOCTYPES
+	("Item", "Item Group", "Brand", "UOM", "Company", "Customer", "Customer Group", "Territory", "Supplier",
+		"Supplier Group", "Sales Partner", "Campaign", "Warehouse", "Price List"): {
+		"after_rename": "erpnext.accounts.doctype.pricing_rule.utils.clear_pricing_rule_index_on_rename",
+	},
 	"Stock Entry": {
 		"on_submit": "erpnext.stock.doctype.material_request.material_request.update_completed_and_requested_qty",
 		"on_cancel": "erpnext.stock.doctype.material_request.material_request.update_completed_and_requested_qty"
@@ -321,9 +326,13 @@ doc_events = {
 		'validate': ["erpnext.erpnext_integrations.taxjar_integration.set_sales_tax"]
 	},
 	"Company": {
+		"on_update": "erpnext.manufacturing.doctype.bom.bom.clear_bom_explosion_cache_on_update",
 		"on_trash": ["erpnext.regional.india.utils.delete_gst_settings_for_company",
 			"erpnext.regional.saudi_arabia.utils.delete_vat_settings_for_company"]
 	},
+	"Item": {
+		"on_update": "erpnext.manufacturing.doctype.bom.bom.clear_bom_explosion_cache_on_update"
+	},
 	"Integration Request": {
 		"validate": "erpnext.accounts.doctype.payment_request.payment_request.validate_payment"
 	}
@@ -357,7 +366,8 @@ scheduler_events = {
 		"erpnext.erpnext_integrations.doctype.plaid_settings.plaid_settings.automatic_synchronization",
 		"erpnext.projects.doctype.project.project.hourly_reminder",
 		"erpnext.projects.doctype.project.project.collect_project_status",
-		"erpnext.hr.doctype.shift_type.shift_type.process_auto_attendance_for_all_shifts"
+		"erpnext.hr.doctype.shift_type.shift_type.process_auto_attendance_for_all_shifts",
+		"erpnext.stock.reorder_item.reorder_queued_items"
 	],
 	"hourly_long": [
 		"erpnext.stock.doctype.repost_item_valuation.repost_item_valuation.repost_entries"
@@ -409,6 +419,7 @@ scheduler_events = {
 	],
 	"monthly_long": [
 		"erpnext.accounts.deferred_revenue.process_deferred_accounting",
+		"erpnext.stock.doctype.stock_ledger_checkpoint.stock_ledger_checkpoint.create_stock_ledger_checkpoints",
 		"erpnext.loan_management.doctype.process_loan_interest_accrual.process_loan_interest_accrual.process_loan_interest_accrual_for_demand_loans"
 	]
 }
@@ -444,7 +455,7 @@ accounting_dimension_doctypes = ["GL Entry", "Sales Invoice", "Purchase Invoice"
 	"Purchase Receipt Item", "Stock Entry Detail", "Payment Entry Deduction", "Sales Taxes and Charges", "Purchase Taxes and Charges", "Shipping Rule",
 	"Landed Cost Item", "Asset Value Adjustment", "Loyalty Program", "Fee Schedule", "Fee Structure", "Stock Reconciliation",
 	"Travel Request", "Fees", "POS Profile", "Opening Invoice Creation Tool", "Opening Invoice Creation Tool Item", "Subscription",
-	"Subscription Plan", "POS Invoice", "POS Invoice Item"
+	"Subscription Plan", "POS Invoice", "POS Invoice Item", "GL Period Balance"
 ]
 
 regional_overrides = {
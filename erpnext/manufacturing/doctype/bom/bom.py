@@ -1,7 +1,9 @@
 # Copyright (c) 2015, Frappe Technologies Pvt. Ltd. and Contributors
 # License: GNU General Public License v3. See license.txt
 
+import copy
 import functools
+import time
 from collections import deque
 from operator import itemgetter
 from typing import List
@@ -18,6 +20,11 @@ from erpnext.setup.utils import get_exchange_rate
 from erpnext.stock.doctype.item.item import get_item_details
 from erpnext.stock.get_item_details import get_conversion_factor, get_price_list_rate
 
+# cached explosions are cleared when a BOM (or an item or company) changes and expire after
+# `BOM_EXPLOSION_CACHE_EXPIRY` seconds, so that a change committed while another request
+# refills the cache is not missed for long
+BOM_EXPLOSION_CACHE_EXPIRY = 300
+
 form_grid_templates = {
 	"items": "templates/form_grid/item_grid.html"
 }
@@ -162,6 +169,7 @@ class BOM(WebsiteGenerator):
 
 	def on_update(self):
 		frappe.cache().hdel('bom_children', self.name)
+		clear_bom_explosion_cache([self.name])
 		self.check_recursion()
 
 	def on_submit(self):
@@ -170,12 +178,14 @@ class BOM(WebsiteGenerator):
 	def on_cancel(self):
 		frappe.db.set(self, "is_active", 0)
 		frappe.db.set(self, "is_default", 0)
+		clear_bom_explosion_cache([self.name])
 
 		# check if used in any other bom
 		self.validate_bom_links()
 		self.manage_default_bom()
 
 	def on_update_after_submit(self):
+		clear_bom_explosion_cache([self.name])
 		self.validate_bom_links()
 		self.manage_default_bom()
 
@@ -659,6 +669,7 @@ class BOM(WebsiteGenerator):
 
 		if save:
 			frappe.db.sql("""delete from `tabBOM Explosion Item` where parent=%s""", self.name)
+			clear_bom_explosion_cache([self.name])
 
 		for d in sorted(self.cur_exploded_items, key=itemgetter(0)):
 			ch = self.append('exploded_items', {})
@@ -810,7 +821,88 @@ def get_list_context(context):
 	context.title = _("Bill of Materials")
 	# context.introduction = _('Boms')
 
+def clear_bom_explosion_cache(boms=None):
+	"""
+		Clears cached explosions of `boms` and of the BOMs they are used in (of all BOMs if `boms` is None).
+
+		They are cleared again after commit, as another request may cache the old explosion in between.
+	"""
+	if boms is not None:
+		boms = get_boms_with_parents(boms)
+		if not boms:
+			return
+
+	delete_bom_explosion_cache(boms)
+	frappe.enqueue("erpnext.manufacturing.doctype.bom.bom.delete_bom_explosion_cache", boms=boms,
+		queue="short", enqueue_after_commit=True, now=frappe.flags.in_test)
+
+def delete_bom_explosion_cache(boms=None):
+	if boms is None:
+		frappe.cache().delete_keys("bom_explosion:")
+	else:
+		frappe.cache().delete_value(["bom_explosion:" + bom for bom in boms])
+
+def clear_bom_explosion_cache_on_update(doc, method=None):
+	"""On update of Item and Company, explosions of BOMs (using the item) carry their details"""
+	if doc.doctype == "Item":
+		clear_bom_explosion_cache(frappe.db.sql_list("""
+			select name from `tabBOM` where item = %(item)s
+			union
+			select parent from `tabBOM Item` where item_code = %(item)s and parenttype = 'BOM'
+			union
+			select parent from `tabBOM Explosion Item` where item_code = %(item)s and parenttype = 'BOM'
+		""", {"item": doc.name}))
+	else:
+		clear_bom_explosion_cache()
+
+def get_boms_with_parents(boms):
+	"""Returns `boms` and all BOMs (of any status) in which they are sub-assemblies"""
+	bom_list = list(set(boms))
+	count = 0
+	while count < len(bom_list):
+		for parent in frappe.db.sql_list("""select distinct parent from `tabBOM Item`
+			where bom_no = %s and parenttype = 'BOM'""", bom_list[count]):
+			if parent not in bom_list:
+				bom_list.append(parent)
+		count += 1
+
+	return bom_list
+
+def get_cached_bom_explosion(bom, key, generator):
+	"""
+		Returns the explosion of `bom` (for one unit of the BOM) cached by `key`,
+		the arguments of the explosion. `generator` computes it on a miss.
+
+		Cached results are shared by Production Plan, Work Order and Stock Entry
+		and cleared when the BOM, its sub-assemblies, their items or the company are changed.
+	"""
+	cache = frappe.cache()
+	name, field = "bom_explosion:" + bom, frappe.as_json(key, indent=None)
+
+	cached = cache.hget(name, field)
+	if cached and time.time() - cached[1] < BOM_EXPLOSION_CACHE_EXPIRY:
+		value = cached[0]
+	else:
+		value = generator()
+		cache.hset(name, field, (value, time.time()))
+
+	# callers update the rows they get
+	return copy.deepcopy(value)
+
 def get_bom_items_as_dict(bom, company, qty=1, fetch_exploded=1, fetch_scrap_items=0, include_non_stock_items=False, fetch_qty_in_stock_uom=True):
+	item_dict = get_cached_bom_explosion(bom, ["items_as_dict", company, cint(fetch_exploded),
+		cint(fetch_scrap_items), cint(include_non_stock_items), cint(fetch_qty_in_stock_uom)],
+		lambda: _get_bom_items_as_dict(bom, company, fetch_exploded, fetch_scrap_items,
+			include_non_stock_items, fetch_qty_in_stock_uom))
+
+	for item_details in item_dict.values():
+		item_details.qty = flt(item_details.qty) * flt(qty)
+		item_details.amount = flt(item_details.amount) * flt(qty)
+
+	return item_dict
+
+def _get_bom_items_as_dict(bom, company, fetch_exploded, fetch_scrap_items, include_non_stock_items, fetch_qty_in_stock_uom):
+	"""Returns items of the BOM as dict with qty and amount for one unit of the BOM"""
 	item_dict = {}
 
 	# Did not use qty_consumed_per_unit in the query, as it leads to rounding loss
@@ -818,11 +910,11 @@ def get_bom_items_as_dict(bom, company, qty=1, fetch_exploded=1, fetch_scrap_ite
 				bom_item.item_code,
 				bom_item.idx,
 				item.item_name,
-				sum(bom_item.{qty_field}/ifnull(bom.quantity, 1)) * %(qty)s as qty,
+				sum(bom_item.{qty_field}/ifnull(bom.quantity, 1)) as qty,
 				item.image,
 				bom.project,
 				bom_item.rate,
-				sum(bom_item.{qty_field}/ifnull(bom.quantity, 1)) * bom_item.rate * %(qty)s as amount,
+				sum(bom_item.{qty_field}/ifnull(bom.quantity, 1)) * bom_item.rate as amount,
 				item.stock_uom,
 				item.item_group,
 				item.allow_alternative_item,
@@ -855,7 +947,7 @@ def get_bom_items_as_dict(bom, company, qty=1, fetch_exploded=1, fetch_scrap_ite
 				bom_item.include_item_in_manufacturing, bom_item.description, bom_item.rate, bom_item.sourced_by_supplier,
 				(Select idx from `tabBOM Item` where item_code = bom_item.item_code and parent = %(parent)s limit 1) as idx""")
 
-		items = frappe.db.sql(query, { "parent": bom, "qty": qty, "bom": bom, "company": company }, as_dict=True)
+		items = frappe.db.sql(query, { "parent": bom, "bom": bom, "company": company }, as_dict=True)
 	elif fetch_scrap_items:
 		query = query.format(
 			table="BOM Scrap Item", where_conditions="",
@@ -863,14 +955,14 @@ def get_bom_items_as_dict(bom, company, qty=1, fetch_exploded=1, fetch_scrap_ite
 			is_stock_item=is_stock_item, qty_field="stock_qty"
 		)
 
-		items = frappe.db.sql(query, { "qty": qty, "bom": bom, "company": company }, as_dict=True)
+		items = frappe.db.sql(query, { "bom": bom, "company": company }, as_dict=True)
 	else:
 		query = query.format(table="BOM Item", where_conditions="", is_stock_item=is_stock_item,
 			qty_field="stock_qty" if fetch_qty_in_stock_uom else "qty",
 			select_columns = """, bom_item.uom, bom_item.conversion_factor, bom_item.source_warehouse,
 				bom_item.idx, bom_item.operation, bom_item.include_item_in_manufacturing, bom_item.sourced_by_supplier,
 				bom_item.description, bom_item.base_rate as rate """)
-		items = frappe.db.sql(query, { "qty": qty, "bom": bom, "company": company }, as_dict=True)
+		items = frappe.db.sql(query, { "bom": bom, "company": company }, as_dict=True)
 
 	for item in items:
 		if item.item_code in item_dict:
@@ -954,6 +1046,62 @@ def get_children(doctype, parent=None, is_root=False, **filters):
 
 		return bom_items
 
+def get_exploded_sub_assemblies(bom_no):
+	"""
+		Returns sub-assembly rows of all levels of the BOM in the order of the tree.
+		Quantity of a row for `n` units of the BOM is given by `get_exploded_qty`.
+	"""
+	return get_cached_bom_explosion(bom_no, ["sub_assemblies"], lambda: _get_exploded_sub_assemblies(bom_no))
+
+def _get_exploded_sub_assemblies(bom_no):
+	bom = frappe.get_cached_value("BOM", bom_no, ["item", "quantity"], as_dict=1)
+
+	bom_items = frappe.db.sql("""
+		select
+			bom_item.item_code, bom_item.bom_no, bom_item.stock_qty,
+			item.description, item.item_name, item.stock_uom, item.is_sub_contracted_item,
+			child_bom.bom_level
+		from `tabBOM Item` bom_item
+			join `tabItem` item on item.name = bom_item.item_code
+			left join `tabBOM` child_bom on child_bom.name = bom_item.bom_no
+		where bom_item.parent = %s and bom_item.parenttype = 'BOM'
+			and ifnull(bom_item.bom_no, '') != ''
+		order by bom_item.idx
+	""", bom_no, as_dict=1)
+
+	sub_assemblies = []
+	for d in bom_items:
+		qty_factor = d.stock_qty / bom.quantity
+
+		sub_assemblies.append(frappe._dict({
+			'parent_item_code': bom.item,
+			'description': d.description,
+			'production_item': d.item_code,
+			'item_name': d.item_name,
+			'stock_uom': d.stock_uom,
+			'uom': d.stock_uom,
+			'bom_no': d.bom_no,
+			'is_sub_contracted_item': d.is_sub_contracted_item,
+			'bom_level': d.bom_level or 0,
+			'indent': 0,
+			'qty_factors': [qty_factor]
+		}))
+
+		for row in get_exploded_sub_assemblies(d.bom_no):
+			row.indent += 1
+			row.qty_factors.insert(0, qty_factor)
+			sub_assemblies.append(row)
+
+	return sub_assemblies
+
+def get_exploded_qty(row, qty):
+	# the factor of each level is applied in turn, as when the tree is walked level by level
+	qty = flt(qty)
+	for qty_factor in row.qty_factors:
+		qty = qty_factor * qty
+
+	return qty
+
 def get_boms_in_bottom_up_order(bom_no=None):
 	def _get_parent(bom_no):
 		return frappe.db.sql_list("""
@@ -10,7 +10,13 @@ from frappe.test_runner import make_test_records
 from frappe.utils import cstr, flt
 
 from erpnext.buying.doctype.purchase_order.test_purchase_order import create_purchase_order
-from erpnext.manufacturing.doctype.bom.bom import item_query, make_variant_bom
+from erpnext.manufacturing.doctype.bom.bom import (
+	get_bom_items_as_dict,
+	get_exploded_qty,
+	get_exploded_sub_assemblies,
+	item_query,
+	make_variant_bom,
+)
 from erpnext.manufacturing.doctype.bom_update_tool.bom_update_tool import update_cost
 from erpnext.stock.doctype.item.test_item import make_item
 from erpnext.stock.doctype.stock_reconciliation.test_stock_reconciliation import (
@@ -272,6 +278,51 @@ class TestBOM(ERPNextTestCase):
 		for reqd_item, created_item in zip(reqd_order, created_order):
 			self.assertEqual(reqd_item, created_item.item_code)
 
+	def test_exploded_sub_assemblies(self):
+		bom_tree = {
+			"Assembly": {
+				"SubAssembly1": {"ChildPart1": {}},
+				"SubAssembly2": {"SubSubAssy1": {"ChildPart2": {}}},
+				"ChildPart3": {},
+			}
+		}
+		parent_bom = create_nested_bom(bom_tree, prefix="_Test Explosion ")
+
+		sub_assemblies = get_exploded_sub_assemblies(parent_bom.name)
+		self.assertEqual([(d.production_item, d.indent) for d in sub_assemblies], [
+			("_Test Explosion SubAssembly1", 0),
+			("_Test Explosion SubAssembly2", 0),
+			("_Test Explosion SubSubAssy1", 1)
+		])
+		self.assertEqual([get_exploded_qty(d, 5) for d in sub_assemblies], [5.0, 5.0, 5.0])
+
+	def test_bom_explosion_cache(self):
+		bom = frappe.copy_doc(frappe.get_doc("BOM", get_default_bom()))
+		bom.insert()
+		item_code = bom.items[0].item_code
+
+		items = get_bom_items_as_dict(bom.name, "_Test Company", qty=2, fetch_exploded=0)
+		self.assertAlmostEqual(items[item_code].qty, 2 * bom.items[0].stock_qty / bom.quantity)
+
+		# results are copies of the cached explosion
+		items[item_code].qty = 0
+		items = get_bom_items_as_dict(bom.name, "_Test Company", qty=2, fetch_exploded=0)
+		self.assertAlmostEqual(items[item_code].qty, 2 * bom.items[0].stock_qty / bom.quantity)
+
+		# cached explosion is cleared on update
+		bom.items[0].qty += 1
+		bom.save()
+		items = get_bom_items_as_dict(bom.name, "_Test Company", qty=2, fetch_exploded=0)
+		self.assertAlmostEqual(items[item_code].qty, 2 * bom.items[0].stock_qty / bom.quantity)
+
+		# explosions are cached per BOM, saving an item clears only the BOMs using it
+		cache_key = "bom_explosion:" + bom.name
+		frappe.get_doc("Item", "_Test Item Home Desktop 100").save()
+		self.assertTrue(frappe.cache().hkeys(cache_key))
+
+		frappe.get_doc("Item", item_code).save()
+		self.assertFalse(frappe.cache().hkeys(cache_key))
+
 	def test_generated_variant_bom(self):
 		from erpnext.controllers.item_variant import create_variant
 
@@ -10,7 +10,11 @@ from frappe import _
 from frappe.model.document import Document
 from frappe.utils import cstr, flt
 
-from erpnext.manufacturing.doctype.bom.bom import get_boms_in_bottom_up_order
+from erpnext.manufacturing.doctype.bom.bom import (
+	clear_bom_explosion_cache,
+	get_bom_item_rate,
+	get_boms_in_bottom_up_order,
+)
 
 
 class BOMUpdateTool(Document):
@@ -106,8 +110,265 @@ def replace_bom(args):
 
 def update_cost():
 	frappe.db.auto_commit_on_many_writes = 1
-	bom_list = get_boms_in_bottom_up_order()
-	for bom in bom_list:
-		frappe.get_doc("BOM", bom).update_cost(update_parent=False, from_child_bom=True)
-
+	BOMCostRollup(get_boms_in_bottom_up_order()).run()
 	frappe.db.auto_commit_on_many_writes = 0
+
+
+class BOMCostRollup:
+	"""
+		Updates the costs of BOMs as per the latest rates of their raw materials,
+		like `BOM.update_cost` but for all BOMs at once.
+
+		BOMs are computed in memory level by level, sub-assemblies before the BOMs using them,
+		with the rates of a batch of BOMs fetched in bulk. Only changed rows are written back.
+	"""
+
+	# fields set by `BOM.update_cost`
+	FIELDS = {
+		"BOM": ["rm_cost_as_per", "operating_cost", "base_operating_cost", "raw_material_cost",
+			"base_raw_material_cost", "scrap_material_cost", "base_scrap_material_cost", "total_cost",
+			"base_total_cost"],
+		"BOM Item": ["rate", "amount", "base_rate", "base_amount", "qty_consumed_per_unit"],
+		"BOM Operation": ["hour_rate", "base_hour_rate", "operating_cost", "base_operating_cost",
+			"cost_per_unit", "base_cost_per_unit"],
+		"BOM Scrap Item": ["base_rate", "amount", "base_amount"]
+	}
+
+	TABLES = {"BOM Item": "items", "BOM Operation": "operations", "BOM Scrap Item": "scrap_items"}
+
+	def __init__(self, bom_list):
+		self.bom_list = bom_list
+		self.items = {}
+		self.valuation_rates = {}
+		self.last_valuation_rates = {}
+		self.price_list_rates = {}
+		self.unit_costs = {}
+		self.exploded_boms = set()
+		self.hour_rates = dict(frappe.get_all("Workstation", fields=["name", "hour_rate"], as_list=1))
+
+	def run(self, chunk_size=500):
+		for boms in self.get_levels():
+			for i in range(0, len(boms), chunk_size):
+				self.update_boms(boms[i:i + chunk_size])
+
+	def get_levels(self):
+		"""Returns BOMs grouped by the depth of their sub-assemblies, leaf BOMs first"""
+		bom_set = set(self.bom_list)
+		children = {}
+		for parent, bom_no in frappe.db.sql("""
+			select distinct parent, bom_no
+			from `tabBOM Item`
+			where parenttype = 'BOM' and docstatus = 1 and ifnull(bom_no, '') != ''
+		"""):
+			if parent in bom_set and bom_no in bom_set and parent != bom_no:
+				children.setdefault(parent, []).append(bom_no)
+
+		depths = {}
+		def get_depth(bom):
+			if bom not in depths:
+				depths[bom] = 0
+				depths[bom] = 1 + max([get_depth(child) for child in children.get(bom, [])] or [-1])
+			return depths[bom]
+
+		levels = {}
+		for bom in self.bom_list:
+			levels.setdefault(get_depth(bom), []).append(bom)
+
+		return [levels[depth] for depth in sorted(levels)]
+
+	def update_boms(self, bom_list):
+		boms = self.get_boms(bom_list)
+		self.prefetch_rates(boms)
+
+		changed_rows = {doctype: {} for doctype in self.FIELDS}
+		changed_boms = []
+		for bom in boms:
+			values_before_update = self.get_values(bom)
+			self.update_bom_cost(bom)
+
+			for key, values in self.get_values(bom).items():
+				if any(is_changed(old, new) for old, new in zip(values_before_update[key], values)):
+					doctype, name = key
+					changed_rows[doctype][name] = values
+					if bom.name not in changed_boms:
+						changed_boms.append(bom.name)
+
+			# exploded items carry the rates of raw materials and the exploded items of sub-assemblies
+			if any((d.name in changed_rows["BOM Item"] and not d.bom_no) or d.bom_no in self.exploded_boms
+				for d in bom.get("items")):
+				self.exploded_boms.add(bom.name)
+
+		for doctype, rows in changed_rows.items():
+			bulk_update(doctype, rows, self.FIELDS[doctype])
+
+		# cached explosions carry the rates of BOM items, also of the BOMs whose exploded items are not updated
+		if changed_boms:
+			clear_bom_explosion_cache(changed_boms)
+
+		for bom in boms:
+			if bom.name in self.exploded_boms:
+				bom.update_exploded_items()
+
+	def get_boms(self, bom_list):
+		boms = {d.name: d for d in frappe.get_all("BOM", fields=["*"],
+			filters={"name": ("in", bom_list), "docstatus": 1})}
+
+		for doctype, parentfield in self.TABLES.items():
+			for d in frappe.get_all(doctype, fields=["*"], order_by="idx",
+				filters={"parent": ("in", bom_list), "parenttype": "BOM", "parentfield": parentfield}):
+				if d.parent in boms:
+					boms[d.parent].setdefault(parentfield, []).append(d)
+
+		return [frappe.get_doc(dict(boms[name], doctype="BOM")) for name in bom_list if name in boms]
+
+	def get_values(self, bom):
+		values = {("BOM", bom.name): [bom.get(fieldname) for fieldname in self.FIELDS["BOM"]]}
+		for doctype, parentfield in self.TABLES.items():
+			for d in bom.get(parentfield):
+				values[(doctype, d.name)] = [d.get(fieldname) for fieldname in self.FIELDS[doctype]]
+
+		return values
+
+	def prefetch_rates(self, boms):
+		item_codes = {d.item_code for bom in boms for d in bom.get("items") if d.item_code} - set(self.items)
+		if item_codes:
+			for item in frappe.get_all("Item", filters={"name": ("in", list(item_codes))},
+				fields=["name", "is_customer_provided_item", "last_purchase_rate", "valuation_rate"]):
+				self.items[item.name] = item
+
+		valuation_rate_keys = {(d.item_code, bom.company) for bom in boms
+			if (bom.rm_cost_as_per or "Valuation Rate") == "Valuation Rate"
+			for d in bom.get("items") if d.item_code} - set(self.valuation_rates)
+		if valuation_rate_keys:
+			self.prefetch_valuation_rates(valuation_rate_keys)
+
+		bom_nos = {d.bom_no for bom in boms for d in bom.get("items") if d.bom_no} - set(self.unit_costs)
+		if bom_nos:
+			self.unit_costs.update(frappe.db.sql("""
+				select name, base_total_cost/quantity
+				from `tabBOM`
+				where is_active = 1 and name in %s
+			""", [tuple(bom_nos)]))
+
+	def prefetch_valuation_rates(self, keys):
+		"""Weighted average valuation rates of items per company, as per `get_valuation_rate`"""
+		stock = {}
+		for d in frappe.db.sql("""
+			select
+				bin.item_code, warehouse.company, bin.actual_qty, bin.stock_value
+			from
+				`tabBin` bin, `tabWarehouse` warehouse
+			where
+				bin.warehouse = warehouse.name
+				and bin.item_code in %(item_codes)s
+				and warehouse.company in %(companies)s""", {
+				"item_codes": tuple({item_code for item_code, company in keys}),
+				"companies": tuple({company for item_code, company in keys})
+			}, as_dict=1):
+			total = stock.setdefault((d.item_code, d.company), [0.0, 0.0])
+			total[0] += flt(d.actual_qty)
+			total[1] += flt(d.stock_value)
+
+		for key in keys:
+			total_qty, total_value = stock.get(key, (0.0, 0.0))
+			valuation_rate = total_value / total_qty if total_qty else 0.0
+
+			if valuation_rate <= 0:
+				valuation_rate = self.get_last_valuation_rate(key[0])
+
+			if not valuation_rate:
+				valuation_rate = (self.items.get(key[0]) or {}).get("valuation_rate")
+
+			self.valuation_rates[key] = flt(valuation_rate)
+
+	def get_last_valuation_rate(self, item_code):
+		if item_code not in self.last_valuation_rates:
+			last_valuation_rate = frappe.db.sql("""select valuation_rate
+				from `tabStock Ledger Entry`
+				where item_code = %s and valuation_rate > 0 and is_cancelled = 0
+				order by posting_date desc, posting_time desc, creation desc limit 1""", item_code)
+
+			self.last_valuation_rates[item_code] = flt(last_valuation_rate[0][0]) if last_valuation_rate else 0
+
+		return self.last_valuation_rates[item_code]
+
+	def update_bom_cost(self, bom):
+		for d in bom.get("items"):
+			if not d.item_code:
+				continue
+
+			rate = self.get_rm_rate(bom, d)
+			if rate:
+				d.rate = rate
+			d.amount = flt(d.rate) * flt(d.qty)
+			d.base_rate = flt(d.rate) * flt(bom.conversion_rate)
+			d.base_amount = flt(d.amount) * flt(bom.conversion_rate)
+
+		for d in bom.get("operations"):
+			hour_rate = flt(self.hour_rates.get(d.workstation)) if d.workstation else 0
+			if hour_rate:
+				d.hour_rate = hour_rate / flt(bom.conversion_rate) if bom.conversion_rate else hour_rate
+
+		bom.calculate_cost()
+		self.unit_costs[bom.name] = flt(bom.base_total_cost) / flt(bom.quantity) if bom.is_active else 0
+
+	def get_rm_rate(self, bom, d):
+		"""Raw material rate as per `BOM.get_rm_rate`, from prefetched rates"""
+		if not bom.rm_cost_as_per:
+			bom.rm_cost_as_per = "Valuation Rate"
+
+		rate = 0
+		conversion_factor = d.conversion_factor or 1
+		item = self.items.get(d.item_code) or frappe._dict()
+
+		if not item.is_customer_provided_item and not d.sourced_by_supplier:
+			if d.bom_no and bom.set_rate_of_sub_assembly_item_based_on_bom:
+				rate = flt(self.unit_costs.get(d.bom_no)) * conversion_factor
+			elif bom.rm_cost_as_per == "Valuation Rate":
+				rate = self.valuation_rates[(d.item_code, bom.company)] * conversion_factor
+			elif bom.rm_cost_as_per == "Last Purchase Rate":
+				rate = flt(item.last_purchase_rate) * conversion_factor
+			elif bom.rm_cost_as_per == "Price List":
+				rate = self.get_price_list_rate(bom, d)
+
+		return flt(rate) * flt(bom.plc_conversion_rate or 1) / (bom.conversion_rate or 1)
+
+	def get_price_list_rate(self, bom, d):
+		key = (bom.buying_price_list, bom.company, bom.currency, d.item_code, d.uom, d.stock_uom,
+			flt(d.qty), flt(d.conversion_factor))
+
+		if key not in self.price_list_rates:
+			self.price_list_rates[key] = get_bom_item_rate({
+				"company": bom.company,
+				"item_code": d.item_code,
+				"qty": d.qty,
+				"uom": d.uom,
+				"stock_uom": d.stock_uom,
+				"conversion_factor": d.conversion_factor
+			}, bom)
+
+		return self.price_list_rates[key]
+
+
+def is_changed(old, new):
+	if isinstance(old, str) or isinstance(new, str):
+		return cstr(old) != cstr(new)
+
+	# as stored in the database
+	return flt(old, 9) != flt(new, 9)
+
+
+def bulk_update(doctype, rows, fields, chunk_size=500):
+	"""Set `fields` of existing rows, given as {name: [values]}, with one query per chunk"""
+	names = list(rows)
+	for i in range(0, len(names), chunk_size):
+		chunk = names[i:i + chunk_size]
+
+		updates, values = [], []
+		for idx, fieldname in enumerate(fields):
+			updates.append("`{0}` = case `name` {1} end".format(fieldname, " ".join(["when %s then %s"] * len(chunk))))
+			for name in chunk:
+				values += [name, rows[name][idx]]
+
+		frappe.db.sql("""update `tab{0}` set {1} where `name` in ({2})""".format(
+			doctype, ", ".join(updates), ", ".join(["%s"] * len(chunk))), tuple(values + chunk))
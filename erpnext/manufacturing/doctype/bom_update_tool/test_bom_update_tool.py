@@ -3,6 +3,7 @@
 
 import frappe
 
+from erpnext.manufacturing.doctype.bom.bom import get_bom_items_as_dict
 from erpnext.manufacturing.doctype.bom_update_tool.bom_update_tool import update_cost
 from erpnext.manufacturing.doctype.production_plan.test_production_plan import make_bom
 from erpnext.stock.doctype.item.test_item import create_item
@@ -45,6 +46,7 @@ class TestBOMUpdateTool(ERPNextTestCase):
 			doc = frappe.get_doc("BOM", bom_no)
 
 		self.assertEqual(doc.total_cost, 200)
+		self.assertEqual(get_bom_items_as_dict(doc.name, doc.company, fetch_exploded=0)["BOM Cost Test Item 2"].rate, 100)
 
 		frappe.db.set_value("Item", "BOM Cost Test Item 2", "valuation_rate", 200)
 		update_cost()
@@ -52,8 +54,53 @@ class TestBOMUpdateTool(ERPNextTestCase):
 		doc.load_from_db()
 		self.assertEqual(doc.total_cost, 300)
 
+		# the cached explosion is cleared with the rates
+		self.assertEqual(get_bom_items_as_dict(doc.name, doc.company, fetch_exploded=0)["BOM Cost Test Item 2"].rate, 200)
+
 		frappe.db.set_value("Item", "BOM Cost Test Item 2", "valuation_rate", 100)
 		update_cost()
 
 		doc.load_from_db()
 		self.assertEqual(doc.total_cost, 200)
+
+	def test_bom_cost_of_sub_assemblies(self):
+		"Costs of sub-assemblies roll up to their parent BOMs, unchanged BOMs are not rewritten."
+		for item in ["BOM Rollup Test Item 1", "BOM Rollup Test Item 2", "BOM Rollup Test Item 3",
+			"BOM Rollup Test Item 4"]:
+			item_doc = create_item(item, valuation_rate=100)
+			if item_doc.valuation_rate != 100.00:
+				frappe.db.set_value("Item", item_doc.name, "valuation_rate", 100)
+
+		if not frappe.db.get_value("BOM", {"item": "BOM Rollup Test Item 2", "docstatus": 1}):
+			make_bom(item="BOM Rollup Test Item 2", raw_materials=["BOM Rollup Test Item 3"], currency="INR")
+
+		bom_no = frappe.db.get_value("BOM", {"item": "BOM Rollup Test Item 1", "docstatus": 1})
+		if not bom_no:
+			bom_no = make_bom(item="BOM Rollup Test Item 1",
+				raw_materials=["BOM Rollup Test Item 2", "BOM Rollup Test Item 4"], currency="INR").name
+
+		doc = frappe.get_doc("BOM", bom_no)
+		self.assertTrue(doc.items[0].bom_no)
+		self.assertEqual(doc.total_cost, 200)
+
+		frappe.db.set_value("Item", "BOM Rollup Test Item 3", "valuation_rate", 300)
+		update_cost()
+
+		doc.load_from_db()
+		self.assertEqual(doc.total_cost, 400)
+		self.assertEqual(doc.items[0].rate, 300)
+		self.assertEqual({d.item_code: d.rate for d in doc.exploded_items},
+			{"BOM Rollup Test Item 3": 300, "BOM Rollup Test Item 4": 100})
+
+		exploded_items = [d.name for d in doc.exploded_items]
+		update_cost()
+
+		doc.load_from_db()
+		self.assertEqual(doc.total_cost, 400)
+		self.assertEqual([d.name for d in doc.exploded_items], exploded_items)
+
+		frappe.db.set_value("Item", "BOM Rollup Test Item 3", "valuation_rate", 100)
+		update_cost()
+
+		doc.load_from_db()
+		self.assertEqual(doc.total_cost, 200)
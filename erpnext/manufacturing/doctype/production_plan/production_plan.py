@@ -21,7 +21,12 @@ from frappe.utils import (
 )
 from frappe.utils.csvutils import build_csv_response
 
-from erpnext.manufacturing.doctype.bom.bom import get_children, validate_bom_no
+from erpnext.manufacturing.doctype.bom.bom import (
+	get_cached_bom_explosion,
+	get_exploded_qty,
+	get_exploded_sub_assemblies,
+	validate_bom_no,
+)
 from erpnext.manufacturing.doctype.work_order.work_order import get_item_details
 from erpnext.setup.doctype.item_group.item_group import get_item_group_defaults
 
@@ -612,8 +617,19 @@ def download_raw_materials(doc, warehouses=None):
 	build_csv_response(item_list, doc.name)
 
 def get_exploded_items(item_details, company, bom_no, include_non_stock_items, planned_qty=1):
-	for d in frappe.db.sql("""select bei.item_code, item.default_bom as bom,
-			ifnull(sum(bei.stock_qty/ifnull(bom.quantity, 1)), 0)*%s as qty, item.item_name,
+	items = get_cached_bom_explosion(bom_no, ["production_plan_exploded_items", company, cint(include_non_stock_items)],
+		lambda: _get_exploded_items(company, bom_no, include_non_stock_items))
+
+	for d in items:
+		d.qty = d.qty * flt(planned_qty)
+		item_details.setdefault(d.get('item_code'), d)
+
+	return item_details
+
+def _get_exploded_items(company, bom_no, include_non_stock_items):
+	"""Returns raw materials of all levels of the BOM with qty for one unit of the BOM"""
+	items = frappe.db.sql("""select bei.item_code, item.default_bom as bom,
+			ifnull(sum(bei.stock_qty/ifnull(bom.quantity, 1)), 0) as qty, item.item_name,
 			bei.description, bei.stock_uom, item.min_order_qty, bei.source_warehouse,
 			item.default_material_request_type, item.min_order_qty, item_default.default_warehouse,
 			item.purchase_uom, item_uom.conversion_factor, item.safety_stock
@@ -629,12 +645,13 @@ def get_exploded_items(item_details, company, bom_no, include_non_stock_items, p
 			bei.docstatus < 2
 			and bom.name=%s and item.is_stock_item in (1, {0})
 		group by bei.item_code, bei.stock_uom""".format(0 if include_non_stock_items else 1),
-		(planned_qty, company, bom_no), as_dict=1):
+		(company, bom_no), as_dict=1)
+
+	for d in items:
 		if not d.conversion_factor and d.purchase_uom:
 			d.conversion_factor = get_uom_conversion_factor(d.item_code, d.purchase_uom)
-		item_details.setdefault(d.get('item_code'), d)
 
-	return item_details
+	return items
 
 def get_uom_conversion_factor(item_code, uom):
 	return frappe.db.get_value('UOM Conversion Detail',
@@ -642,10 +659,32 @@ def get_uom_conversion_factor(item_code, uom):
 
 def get_subitems(doc, data, item_details, bom_no, company, include_non_stock_items,
 	include_subcontracted_items, parent_qty, planned_qty=1):
+	items = get_cached_bom_explosion(bom_no, ["production_plan_subitems", company, cint(include_non_stock_items)],
+		lambda: _get_subitems(bom_no, company, include_non_stock_items))
+
+	for d in items:
+		d.qty = flt(parent_qty) * d.qty * flt(planned_qty)
+
+		if not data.get('include_exploded_items') or not d.default_bom:
+			if d.item_code in item_details:
+				item_details[d.item_code].qty = item_details[d.item_code].qty + d.qty
+			else:
+				item_details[d.item_code] = d
+
+		if data.get('include_exploded_items') and d.default_bom:
+			if ((d.default_material_request_type in ["Manufacture", "Purchase"] and
+				not d.is_sub_contracted) or (d.is_sub_contracted and include_subcontracted_items)):
+				if d.qty > 0:
+					get_subitems(doc, data, item_details, d.default_bom, company,
+						include_non_stock_items, include_subcontracted_items, d.qty)
+	return item_details
+
+def _get_subitems(bom_no, company, include_non_stock_items):
+	"""Returns items of the BOM with qty for one unit of the BOM"""
 	items = frappe.db.sql("""
 		SELECT
 			bom_item.item_code, default_material_request_type, item.item_name,
-			ifnull(%(parent_qty)s * sum(bom_item.stock_qty/ifnull(bom.quantity, 1)) * %(planned_qty)s, 0) as qty,
+			ifnull(sum(bom_item.stock_qty/ifnull(bom.quantity, 1)), 0) as qty,
 			item.is_sub_contracted_item as is_sub_contracted, bom_item.source_warehouse,
 			item.default_bom as default_bom, bom_item.description as description,
 			bom_item.stock_uom as stock_uom, item.min_order_qty as min_order_qty, item.safety_stock as safety_stock,
@@ -664,28 +703,14 @@ def get_subitems(doc, data, item_details, bom_no, company, include_non_stock_ite
 			and item.is_stock_item in (1, {0})
 		group by bom_item.item_code""".format(0 if include_non_stock_items else 1),{
 			'bom': bom_no,
-			'parent_qty': parent_qty,
-			'planned_qty': planned_qty,
 			'company': company
 		}, as_dict=1)
 
 	for d in items:
-		if not data.get('include_exploded_items') or not d.default_bom:
-			if d.item_code in item_details:
-				item_details[d.item_code].qty = item_details[d.item_code].qty + d.qty
-			else:
-				if not d.conversion_factor and d.purchase_uom:
-					d.conversion_factor = get_uom_conversion_factor(d.item_code, d.purchase_uom)
-
-				item_details[d.item_code] = d
+		if not d.conversion_factor and d.purchase_uom:
+			d.conversion_factor = get_uom_conversion_factor(d.item_code, d.purchase_uom)
 
-		if data.get('include_exploded_items') and d.default_bom:
-			if ((d.default_material_request_type in ["Manufacture", "Purchase"] and
-				not d.is_sub_contracted) or (d.is_sub_contracted and include_subcontracted_items)):
-				if d.qty > 0:
-					get_subitems(doc, data, item_details, d.default_bom, company,
-						include_non_stock_items, include_subcontracted_items, d.qty)
-	return item_details
+	return items
 
 def get_material_request_items(row, sales_order, company,
 	ignore_existing_ordered_qty, include_safety_stock, warehouse, bin_dict):
@@ -1000,27 +1025,9 @@ def get_item_data(item_code):
 	}
 
 def get_sub_assembly_items(bom_no, bom_data, to_produce_qty, indent=0):
-	data = get_children('BOM', parent = bom_no)
-	for d in data:
-		if d.expandable:
-			parent_item_code = frappe.get_cached_value("BOM", bom_no, "item")
-			bom_level = (frappe.get_cached_value("BOM", d.value, "bom_level")
-				if d.value else 0)
-
-			stock_qty = (d.stock_qty / d.parent_bom_qty) * flt(to_produce_qty)
-			bom_data.append(frappe._dict({
-				'parent_item_code': parent_item_code,
-				'description': d.description,
-				'production_item': d.item_code,
-				'item_name': d.item_name,
-				'stock_uom': d.stock_uom,
-				'uom': d.stock_uom,
-				'bom_no': d.value,
-				'is_sub_contracted_item': d.is_sub_contracted_item,
-				'bom_level': bom_level,
-				'indent': indent,
-				'stock_qty': stock_qty
-			}))
-
-			if d.value:
-				get_sub_assembly_items(d.value, bom_data, stock_qty, indent=indent+1)
+	for d in get_exploded_sub_assemblies(bom_no):
+		d.indent += indent
+		d.stock_qty = get_exploded_qty(d, to_produce_qty)
+		del d["qty_factors"]
+
+		bom_data.append(d)
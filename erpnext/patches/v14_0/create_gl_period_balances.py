@@ -0,0 +1,20 @@
+import frappe
+
+from erpnext.accounts.doctype.accounting_dimension.accounting_dimension import (
+	make_dimension_in_accounting_doctypes,
+)
+from erpnext.accounts.doctype.gl_period_balance.gl_period_balance import (
+	rebuild_gl_period_balances,
+	use_gl_period_balances,
+)
+
+
+def execute():
+	frappe.reload_doc("accounts", "doctype", "gl_period_balance")
+	frappe.reload_doc("accounts", "doctype", "accounts_settings")
+
+	for dimension in frappe.get_all("Accounting Dimension", fields=["name", "fieldname", "label", "document_type"]):
+		make_dimension_in_accounting_doctypes(dimension, doclist=["GL Period Balance"])
+
+	if use_gl_period_balances():
+		rebuild_gl_period_balances()
@@ -0,0 +1,9 @@
+import frappe
+
+from erpnext.accounts.doctype.open_item.open_item import rebuild_open_items
+
+
+def execute():
+	frappe.reload_doc("accounts", "doctype", "open_item")
+
+	rebuild_open_items()
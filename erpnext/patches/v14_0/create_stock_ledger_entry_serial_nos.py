@@ -0,0 +1,37 @@
+import frappe
+
+from erpnext.stock.doctype.serial_no.serial_no import get_serial_nos
+from erpnext.stock.doctype.stock_ledger_entry_serial_no.stock_ledger_entry_serial_no import (
+	make_serial_no_entries,
+)
+
+
+def execute():
+	frappe.reload_doc("stock", "doctype", "stock_ledger_entry_serial_no")
+
+	batch_size = 10000
+	last_name = ""
+
+	while True:
+		sl_entries = frappe.db.sql("""
+			select sle.name, sle.serial_no
+			from `tabStock Ledger Entry` sle
+			where sle.name > %s
+				and ifnull(sle.serial_no, '') != ''
+				and not exists (
+					select name
+					from `tabStock Ledger Entry Serial No` sr
+					where sr.stock_ledger_entry = sle.name
+				)
+			order by sle.name
+			limit %s
+		""", (last_name, batch_size), as_dict=1)
+
+		if not sl_entries:
+			break
+
+		for sle in sl_entries:
+			make_serial_no_entries(sle.name, get_serial_nos(sle.serial_no))
+
+		frappe.db.commit()
+		last_name = sl_entries[-1].name
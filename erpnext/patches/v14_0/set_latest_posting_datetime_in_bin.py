@@ -0,0 +1,16 @@
+import frappe
+
+
+def execute():
+	frappe.reload_doc("stock", "doctype", "bin")
+
+	frappe.db.sql("""
+		update `tabBin` bin
+		set bin.latest_posting_datetime = (
+			select max(sle.posting_datetime)
+			from `tabStock Ledger Entry` sle
+			where sle.item_code = bin.item_code
+				and sle.warehouse = bin.warehouse
+				and sle.is_cancelled = 0
+		)
+	""")
@@ -0,0 +1,29 @@
+import frappe
+
+
+def execute():
+	frappe.reload_doc("stock", "doctype", "stock_ledger_entry")
+
+	batch_size = 100000
+	last_name = ""
+
+	while True:
+		names = frappe.db.sql_list("""
+			select name
+			from `tabStock Ledger Entry`
+			where name > %s
+			order by name
+			limit %s
+		""", (last_name, batch_size))
+
+		if not names:
+			break
+
+		frappe.db.sql("""
+			update `tabStock Ledger Entry`
+			set posting_datetime = timestamp(posting_date, posting_time)
+			where name in %s
+		""", (names,))
+
+		frappe.db.commit()
+		last_name = names[-1]
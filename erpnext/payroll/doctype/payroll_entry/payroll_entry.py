@@ -14,6 +14,7 @@ from frappe.utils import (
 	add_to_date,
 	cint,
 	comma_and,
+	cstr,
 	date_diff,
 	flt,
 	getdate,
@@ -26,6 +27,9 @@ from erpnext.accounts.doctype.accounting_dimension.accounting_dimension import (
 from erpnext.accounts.utils import get_fiscal_year
 from erpnext.hr.doctype.employee.employee import get_holiday_list_for_employee
 
+# salary slips are created and submitted in parallel background jobs of this many employees each
+SALARY_SLIPS_PER_JOB = 100
+
 
 class PayrollEntry(Document):
 	def onload(self):
@@ -149,7 +153,7 @@ class PayrollEntry(Document):
 				"currency": self.currency
 			})
 			if len(employees) > 5:
-				frappe.enqueue(create_salary_slips_for_employees, timeout=600, employees=employees, args=args)
+				enqueue_payroll_jobs(self, create_salary_slips_for_employees, "employees", employees, args=args)
 			else:
 				create_salary_slips_for_employees(employees, args, publish_progress=False)
 				# since this method is called via frm.call this doc needs to be updated manually
@@ -181,7 +185,7 @@ class PayrollEntry(Document):
 		self.check_permission('write')
 		ss_list = self.get_sal_slip_list(ss_status=0)
 		if len(ss_list) > 30:
-			frappe.enqueue(submit_salary_slips_for_employees, timeout=600, payroll_entry=self, salary_slips=ss_list)
+			enqueue_payroll_jobs(self, submit_salary_slips_for_employees, "salary_slips", ss_list, payroll_entry=self)
 		else:
 			submit_salary_slips_for_employees(self, ss_list, publish_progress=False)
 
@@ -605,10 +609,84 @@ def payroll_entry_has_bank_entries(name):
 
 	return response
 
-def create_salary_slips_for_employees(employees, args, publish_progress=True):
+def enqueue_payroll_jobs(payroll_entry, method, fieldname, values, **kwargs):
+	"""
+		Enqueue `method` in parallel jobs, each with `SALARY_SLIPS_PER_JOB` of the `values`
+		(employees or salary slips) as the `fieldname` argument.
+
+		Each job commits and publishes the progress of the payroll entry on its own,
+		the one which finds the slips of all the jobs processed (see `complete_payroll_job`)
+		completes the payroll entry. A failed job leaves the payroll entry as is,
+		and a retry enqueues the remaining employees or slips.
+	"""
+	from frappe.core.page.background_jobs.background_jobs import get_info
+
+	job_prefix = "{0}::{1}".format(payroll_entry.name, method.__name__)
+	if any(cstr(d.get("job_name")).startswith(job_prefix) for d in get_info()):
+		frappe.msgprint(_("Salary Slips of this Payroll Entry are already being processed in the background"), alert=1)
+		return
+
+	for i in range(0, len(values), SALARY_SLIPS_PER_JOB):
+		job_name = "{0}::{1}".format(job_prefix, i)
+		frappe.enqueue(
+			method,
+			queue="long",
+			timeout=600,
+			job_name=job_name,
+			payroll_job=job_name,
+			now=frappe.conf.developer_mode or frappe.flags.in_test,
+			**{fieldname: values[i:i + SALARY_SLIPS_PER_JOB]},
+			**kwargs
+		)
+
+def complete_payroll_job(payroll_entry, fieldname):
+	"""
+		Commits the work of a job enqueued by `enqueue_payroll_jobs` and returns True
+		if the job is to complete the payroll entry, i.e. `fieldname` (salary_slips_created
+		or salary_slips_submitted) is not set yet and the slips of all the jobs are processed.
+
+		Completion is read from the database, so a failed job (or a slip which failed validation)
+		keeps the payroll entry incomplete until a retry processes the remaining employees or slips.
+		What follows runs in a new transaction, which reads the slips committed by all the jobs.
+	"""
+	frappe.db.commit()
+
+	# jobs complete one at a time, and read after the commits of the others
+	# (the snapshot is taken at the first read after the lock)
+	if frappe.db.get_value("Payroll Entry", payroll_entry, fieldname, for_update=True):
+		return False
+
+	if fieldname == "salary_slips_created":
+		return not get_employees_without_salary_slips(payroll_entry)
+
+	# slips with negative net pay are never submitted
+	return not frappe.db.count("Salary Slip",
+		{"payroll_entry": payroll_entry, "docstatus": 0, "net_pay": (">=", 0)})
+
+def get_employees_without_salary_slips(payroll_entry):
+	return frappe.db.sql_list("""
+		select ped.employee from `tabPayroll Employee Detail` ped
+		where ped.parent = %s and ped.parenttype = 'Payroll Entry'
+			and not exists(select ss.name from `tabSalary Slip` ss
+				where ss.payroll_entry = ped.parent and ss.employee = ped.employee and ss.docstatus != 2)
+	""", payroll_entry)
+
+def publish_payroll_progress(payroll_entry, docstatus, title):
+	total = frappe.db.count("Payroll Employee Detail", {"parent": payroll_entry, "parenttype": "Payroll Entry"})
+	if total:
+		done = frappe.db.count("Salary Slip", {"payroll_entry": payroll_entry, "docstatus": docstatus})
+		frappe.publish_progress(min(done * 100 / total, 100), title=title)
+
+def create_salary_slips_for_employees(employees, args, publish_progress=True, payroll_job=None):
+	from erpnext.payroll.doctype.salary_slip.salary_slip import prefetch_payroll_data
+
 	salary_slips_exists_for = get_existing_salary_slips(employees, args)
-	count=0
 	salary_slips_not_created = []
+
+	# inputs of all slips are fetched at once, instead of by each slip
+	payroll_data = prefetch_payroll_data(list(set(employees) - set(salary_slips_exists_for)),
+		args.start_date, args.end_date)
+
 	for emp in employees:
 		if emp not in salary_slips_exists_for:
 			args.update({
@@ -616,23 +694,26 @@ def create_salary_slips_for_employees(employees, args, publish_progress=True):
 				"employee": emp
 			})
 			ss = frappe.get_doc(args)
+			ss.flags.payroll_data = payroll_data
 			ss.insert()
-			count+=1
-			if publish_progress:
-				frappe.publish_progress(count*100/len(set(employees) - set(salary_slips_exists_for)),
-					title = _("Creating Salary Slips..."))
 
 		else:
 			salary_slips_not_created.append(emp)
 
-	payroll_entry = frappe.get_doc("Payroll Entry", args.payroll_entry)
-	payroll_entry.db_set("salary_slips_created", 1)
-	payroll_entry.notify_update()
+	if publish_progress:
+		publish_payroll_progress(args.payroll_entry, ("!=", 2), _("Creating Salary Slips..."))
 
 	if salary_slips_not_created:
 		frappe.msgprint(_("Salary Slips already exists for employees {}, and will not be processed by this payroll.")
 			.format(frappe.bold(", ".join([emp for emp in salary_slips_not_created]))) , title=_("Message"), indicator="orange")
 
+	if payroll_job and not complete_payroll_job(args.payroll_entry, "salary_slips_created"):
+		return
+
+	payroll_entry = frappe.get_doc("Payroll Entry", args.payroll_entry)
+	payroll_entry.db_set("salary_slips_created", 1)
+	payroll_entry.notify_update()
+
 def get_existing_salary_slips(employees, args):
 	return frappe.db.sql_list("""
 		select distinct employee from `tabSalary Slip`
@@ -642,14 +723,20 @@ def get_existing_salary_slips(employees, args):
 	""" % ('%s', '%s', '%s', '%s', ', '.join(['%s']*len(employees))),
 		[args.company, args.payroll_entry, args.start_date, args.end_date] + employees)
 
-def submit_salary_slips_for_employees(payroll_entry, salary_slips, publish_progress=True):
+def submit_salary_slips_for_employees(payroll_entry, salary_slips, publish_progress=True, payroll_job=None):
+	from erpnext.payroll.doctype.salary_slip.salary_slip import prefetch_payroll_data
+
 	submitted_ss = []
 	not_submitted_ss = []
 	frappe.flags.via_payroll_entry = True
 
-	count = 0
+	employees = frappe.get_all("Salary Slip", filters={"name": ("in", [ss[0] for ss in salary_slips])},
+		pluck="employee") if salary_slips else []
+	payroll_data = prefetch_payroll_data(employees, payroll_entry.start_date, payroll_entry.end_date)
+
 	for ss in salary_slips:
 		ss_obj = frappe.get_doc("Salary Slip",ss[0])
+		ss_obj.flags.payroll_data = payroll_data
 		if ss_obj.net_pay<0:
 			not_submitted_ss.append(ss[0])
 		else:
@@ -659,15 +746,23 @@ def submit_salary_slips_for_employees(payroll_entry, salary_slips, publish_progr
 			except frappe.ValidationError:
 				not_submitted_ss.append(ss[0])
 
-		count += 1
-		if publish_progress:
-			frappe.publish_progress(count*100/len(salary_slips), title = _("Submitting Salary Slips..."))
+	if publish_progress:
+		publish_payroll_progress(payroll_entry.name, 1, _("Submitting Salary Slips..."))
+
+	if submitted_ss:
+		payroll_entry.email_salary_slip(submitted_ss)
+
+	if payroll_job:
+		if not complete_payroll_job(payroll_entry.name, "salary_slips_submitted"):
+			return
+
+		# slips submitted by the other jobs are accrued along with these
+		submitted_ss = submitted_ss or payroll_entry.get_sal_slip_list(ss_status=1)
+
 	if submitted_ss:
 		payroll_entry.make_accrual_jv_entry()
 		frappe.msgprint(_("Salary Slip submitted for period from {0} to {1}")
-			.format(ss_obj.start_date, ss_obj.end_date))
-
-		payroll_entry.email_salary_slip(submitted_ss)
+			.format(payroll_entry.start_date, payroll_entry.end_date))
 
 		payroll_entry.db_set("salary_slips_submitted", 1)
 		payroll_entry.notify_update()
@@ -1,7 +1,9 @@
 # Copyright (c) 2015, Frappe Technologies Pvt. Ltd. and Contributors
 # License: GNU General Public License v3. See license.txt
 
+import threading
 import unittest
+from unittest.mock import patch
 
 import frappe
 from dateutil.relativedelta import relativedelta
@@ -64,6 +66,105 @@ class TestPayrollEntry(unittest.TestCase):
 			make_payroll_entry(start_date=dates.start_date, end_date=dates.end_date, payable_account=company_doc.default_payroll_payable_account,
 				currency=company_doc.default_currency)
 
+	def test_payroll_entry_in_parallel_jobs(self):
+		from erpnext.payroll.doctype.payroll_entry import payroll_entry as payroll_entry_module
+
+		company_doc, employees = make_employees_for_payroll_jobs(7)
+
+		# salary slips are created by 4 jobs, of 2 employees each
+		dates = get_start_end_dates('Monthly', nowdate())
+		with patch.object(payroll_entry_module, "SALARY_SLIPS_PER_JOB", 2):
+			payroll_entry = make_payroll_entry(start_date=dates.start_date, end_date=dates.end_date,
+				payable_account=company_doc.default_payroll_payable_account, currency=company_doc.default_currency)
+
+		payroll_entry.reload()
+		self.assertEqual(payroll_entry.salary_slips_created, 1)
+		self.assertEqual(payroll_entry.salary_slips_submitted, 1)
+
+		for employee in employees:
+			salary_slip = frappe.get_doc("Salary Slip", {"payroll_entry": payroll_entry.name, "employee": employee})
+			self.assertEqual(salary_slip.docstatus, 1)
+
+			# same as computed by the salary slip on its own
+			expected = frappe.copy_doc(salary_slip)
+			expected.get_emp_and_working_day_details()
+			expected.calculate_net_pay()
+			for fieldname in ["total_working_days", "payment_days", "leave_without_pay", "gross_pay", "net_pay"]:
+				self.assertEqual(salary_slip.get(fieldname), expected.get(fieldname))
+
+	def test_salary_slips_submitted_by_concurrent_jobs(self):
+		from erpnext.payroll.doctype.payroll_entry import payroll_entry as payroll_entry_module
+
+		company_doc, employees = make_employees_for_payroll_jobs(4)
+
+		dates = get_start_end_dates('Monthly', nowdate())
+		payroll_entry = frappe.new_doc("Payroll Entry")
+		payroll_entry.update({
+			"company": company_doc.name,
+			"start_date": dates.start_date,
+			"end_date": dates.end_date,
+			"posting_date": nowdate(),
+			"payroll_frequency": "Monthly",
+			"payment_account": get_payment_account(),
+			"payroll_payable_account": company_doc.default_payroll_payable_account,
+			"currency": company_doc.default_currency,
+			"exchange_rate": 1
+		})
+		payroll_entry.fill_employee_details()
+		payroll_entry.save()
+		payroll_entry.create_salary_slips()
+
+		# 2 jobs of 2 slips each, as enqueued by `enqueue_payroll_jobs`
+		salary_slips = payroll_entry.get_sal_slip_list(ss_status=0)
+		self.assertEqual(len(salary_slips), 4)
+
+		job_prefix = "{0}::submit_salary_slips_for_employees".format(payroll_entry.name)
+		jobs = {"{0}::{1}".format(job_prefix, i): salary_slips[i:i + 2] for i in (0, 2)}
+
+		self.addCleanup(delete_payroll_jobs_data, payroll_entry.name, employees)
+		# the jobs run in connections of their own, which only see committed data
+		frappe.db.commit()
+
+		site, errors = frappe.local.site, []
+		barrier = threading.Barrier(2, timeout=120)
+		complete_payroll_job = payroll_entry_module.complete_payroll_job
+
+		def complete_after_other_job(payroll_entry, fieldname):
+			# both jobs have submitted their slips before either completes
+			barrier.wait()
+			return complete_payroll_job(payroll_entry, fieldname)
+
+		def run_job(payroll_job, salary_slips):
+			frappe.init(site=site)
+			frappe.connect()
+			try:
+				payroll_entry_module.submit_salary_slips_for_employees(
+					frappe.get_doc("Payroll Entry", payroll_entry.name), salary_slips,
+					publish_progress=False, payroll_job=payroll_job)
+				# as the worker does after a job
+				frappe.db.commit()
+			except Exception as e:
+				errors.append(e)
+			finally:
+				frappe.destroy()
+
+		with patch.object(payroll_entry_module, "complete_payroll_job", complete_after_other_job):
+			threads = [threading.Thread(target=run_job, args=job) for job in jobs.items()]
+			for thread in threads:
+				thread.start()
+			for thread in threads:
+				thread.join()
+
+		self.assertFalse(errors)
+		self.assertEqual(frappe.db.get_value("Payroll Entry", payroll_entry.name, "salary_slips_submitted"), 1)
+
+		# slips of both jobs are in the one accrual entry
+		journal_entries = frappe.get_all("Salary Slip", filters={"payroll_entry": payroll_entry.name, "docstatus": 1},
+			pluck="journal_entry")
+		self.assertEqual(len(journal_entries), 4)
+		self.assertEqual(len(set(journal_entries)), 1)
+		self.assertTrue(journal_entries[0])
+
 	def test_multi_currency_payroll_entry(self): # pylint: disable=no-self-use
 		company = erpnext.get_default_company()
 		employee = make_employee("test_muti_currency_employee@payroll.com", company=company)
@@ -278,6 +379,52 @@ def make_payroll_entry(**args):
 
 	return payroll_entry
 
+def make_employees_for_payroll_jobs(count):
+	company = erpnext.get_default_company()
+	for data in frappe.get_all('Salary Component', fields = ["name"]):
+		if not frappe.db.get_value('Salary Component Account',
+			{'parent': data.name, 'company': company}, 'name'):
+			get_salary_component_account(data.name)
+
+	company_doc = frappe.get_doc('Company', company)
+	salary_structure = make_salary_structure("_Test Salary Structure for Payroll Jobs", "Monthly",
+		company=company, currency=company_doc.default_currency)
+
+	employees = []
+	for i in range(count):
+		employee = make_employee("test_payroll_job_employee_{0}@payroll.com".format(i), company=company)
+		create_salary_structure_assignment(employee, salary_structure.name, company=company,
+			currency=company_doc.default_currency)
+		employees.append(employee)
+
+	return company_doc, employees
+
+def delete_payroll_jobs_data(payroll_entry, employees):
+	"""Deletes the data committed by the test of concurrent payroll jobs"""
+	salary_slips = frappe.get_all("Salary Slip", filters={"payroll_entry": payroll_entry},
+		fields=["name", "journal_entry"])
+
+	for journal_entry in {d.journal_entry for d in salary_slips if d.journal_entry}:
+		frappe.db.sql("""delete from `tabGL Entry` where voucher_type='Journal Entry' and voucher_no=%s""", journal_entry)
+		frappe.db.sql("""delete from `tabJournal Entry Account` where parent=%s""", journal_entry)
+		frappe.db.sql("""delete from `tabJournal Entry` where name=%s""", journal_entry)
+
+	for salary_slip in salary_slips:
+		frappe.db.sql("""delete from `tabSalary Detail` where parent=%s""", salary_slip.name)
+		frappe.db.sql("""delete from `tabSalary Slip` where name=%s""", salary_slip.name)
+
+	frappe.db.sql("""delete from `tabPayroll Employee Detail` where parent=%s""", payroll_entry)
+	frappe.db.sql("""delete from `tabPayroll Entry` where name=%s""", payroll_entry)
+
+	for employee in employees:
+		frappe.db.sql("""delete from `tabSalary Structure Assignment` where employee=%s""", employee)
+		frappe.db.sql("""delete from `tabEmployee` where name=%s""", employee)
+
+	frappe.db.sql("""delete from `tabSalary Detail` where parent='_Test Salary Structure for Payroll Jobs'""")
+	frappe.db.sql("""delete from `tabSalary Structure` where name='_Test Salary Structure for Payroll Jobs'""")
+
+	frappe.db.commit()
+
 def get_payment_account():
 	return frappe.get_value('Account',
 		{'account_type': 'Cash', 'company': erpnext.get_default_company(),'is_group':0}, "name")
@@ -219,7 +219,7 @@ class SalarySlip(TransactionBase):
 					self.append('leave_balance', row)
 
 			if struct:
-				self._salary_structure_doc = frappe.get_doc('Salary Structure', struct)
+				self._salary_structure_doc = self.get_salary_structure_doc(struct)
 				self.salary_slip_based_on_timesheet = self._salary_structure_doc.salary_slip_based_on_timesheet or 0
 				self.set_time_sheet()
 				self.pull_sal_struct()
@@ -244,15 +244,22 @@ class SalarySlip(TransactionBase):
 		if self.payroll_frequency:
 			cond += """and ss.payroll_frequency = '%(payroll_frequency)s'""" % {"payroll_frequency": self.payroll_frequency}
 
-		st_name = frappe.db.sql("""
-			select sa.salary_structure
-			from `tabSalary Structure Assignment` sa join `tabSalary Structure` ss
-			where sa.salary_structure=ss.name
-				and sa.docstatus = 1 and ss.docstatus = 1 and ss.is_active ='Yes' %s
-			order by sa.from_date desc
-			limit 1
-		""" %cond, {'employee': self.employee, 'start_date': self.start_date,
-			'end_date': self.end_date, 'joining_date': joining_date})
+		payroll_data = self.get_payroll_data()
+		if payroll_data:
+			st_name = [(d.salary_structure,) for d in payroll_data.assignments.get(self.employee, [])
+				if d.salary_structure in payroll_data.salary_structures
+				and (not self.payroll_frequency or payroll_data.salary_structures[d.salary_structure] == self.payroll_frequency)
+				and (d.from_date <= getdate(self.end_date) or (joining_date and d.from_date <= getdate(joining_date)))][:1]
+		else:
+			st_name = frappe.db.sql("""
+				select sa.salary_structure
+				from `tabSalary Structure Assignment` sa join `tabSalary Structure` ss
+				where sa.salary_structure=ss.name
+					and sa.docstatus = 1 and ss.docstatus = 1 and ss.is_active ='Yes' %s
+				order by sa.from_date desc
+				limit 1
+			""" %cond, {'employee': self.employee, 'start_date': self.start_date,
+				'end_date': self.end_date, 'joining_date': joining_date})
 
 		if st_name:
 			self.salary_structure = st_name[0][0]
@@ -328,18 +335,15 @@ class SalarySlip(TransactionBase):
 				self.absent_days += unmarked_days #will be treated as absent
 				self.payment_days -= unmarked_days
 				if include_holidays_in_total_working_days:
+					attendance_dates = {d.attendance_date for d in self.get_attendance_days()}
 					for holiday in holidays:
-						if not frappe.db.exists("Attendance", {"employee": self.employee, "attendance_date": holiday, "docstatus": 1 }):
+						if getdate(holiday) not in attendance_dates:
 							self.payment_days += 1
 		else:
 			self.payment_days = 0
 
 	def get_unmarked_days(self):
-		marked_days = frappe.get_all("Attendance", filters = {
-					"attendance_date": ["between", [self.start_date, self.end_date]],
-					"employee": self.employee,
-					"docstatus": 1
-				}, fields = ["COUNT(*) as marked_days"])[0].marked_days
+		marked_days = len(self.get_attendance_days())
 
 		return self.total_working_days - marked_days
 
@@ -373,41 +377,39 @@ class SalarySlip(TransactionBase):
 		return payment_days
 
 	def get_holidays_for_employee(self, start_date, end_date):
+		payroll_data = self.get_payroll_data()
+		if payroll_data and self.employee in payroll_data.holiday_lists \
+			and payroll_data.start_date <= getdate(start_date) and getdate(end_date) <= payroll_data.end_date:
+			start_date, end_date = cstr(getdate(start_date)), cstr(getdate(end_date))
+			return [holiday for holiday in payroll_data.holidays.get(payroll_data.holiday_lists[self.employee], [])
+				if start_date <= holiday <= end_date]
+
 		return get_holiday_dates_for_employee(self.employee, start_date, end_date)
 
 	def calculate_lwp_or_ppl_based_on_leave_application(self, holidays, working_days):
 		lwp = 0
-		holidays = "','".join(holidays)
+		holidays = {getdate(holiday) for holiday in holidays}
 		daily_wages_fraction_for_half_day = \
 			flt(frappe.db.get_value("Payroll Settings", None, "daily_wages_fraction_for_half_day")) or 0.5
 
+		payroll_data = self.get_payroll_data()
+		if payroll_data:
+			leave_applications = payroll_data.leave_applications.get(self.employee, [])
+		else:
+			leave_applications = get_lwp_leave_applications([self.employee],
+				self.start_date, self.end_date).get(self.employee, [])
+
 		for d in range(working_days):
-			dt = add_days(cstr(getdate(self.start_date)), d)
-			leave = frappe.db.sql("""
-				SELECT t1.name,
-					CASE WHEN (t1.half_day_date = %(dt)s or t1.to_date = t1.from_date)
-					THEN t1.half_day else 0 END,
-					t2.is_ppl,
-					t2.fraction_of_daily_salary_per_leave
-				FROM `tabLeave Application` t1, `tabLeave Type` t2
-				WHERE t2.name = t1.leave_type
-				AND (t2.is_lwp = 1 or t2.is_ppl = 1)
-				AND t1.docstatus = 1
-				AND t1.employee = %(employee)s
-				AND ifnull(t1.salary_slip, '') = ''
-				AND CASE
-					WHEN t2.include_holiday != 1
-						THEN %(dt)s not in ('{0}') and %(dt)s between from_date and to_date
-					WHEN t2.include_holiday
-						THEN %(dt)s between from_date and to_date
-					END
-				""".format(holidays), {"employee": self.employee, "dt": dt})
+			dt = add_days(getdate(self.start_date), d)
+			leave = next((leave_application for leave_application in leave_applications
+				if leave_application.from_date <= dt <= leave_application.to_date
+				and (cint(leave_application.include_holiday) or dt not in holidays)), None)
 
 			if leave:
 				equivalent_lwp_count = 0
-				is_half_day_leave = cint(leave[0][1])
-				is_partially_paid_leave = cint(leave[0][2])
-				fraction_of_daily_salary_per_leave = flt(leave[0][3])
+				is_half_day_leave = cint(leave.half_day) if (leave.half_day_date == dt or leave.to_date == leave.from_date) else 0
+				is_partially_paid_leave = cint(leave.is_ppl)
+				fraction_of_daily_salary_per_leave = flt(leave.fraction_of_daily_salary_per_leave)
 
 				equivalent_lwp_count =  (1 - daily_wages_fraction_for_half_day) if is_half_day_leave else 1
 
@@ -433,15 +435,12 @@ class SalarySlip(TransactionBase):
 		for leave_type in leave_types:
 			leave_type_map[leave_type.name] = leave_type
 
-		attendances = frappe.db.sql('''
-			SELECT attendance_date, status, leave_type
-			FROM `tabAttendance`
-			WHERE
-				status in ("Absent", "Half Day", "On leave")
-				AND employee = %s
-				AND docstatus = 1
-				AND attendance_date between %s and %s
-		''', values=(self.employee, self.start_date, self.end_date), as_dict=1)
+		attendances = [frappe._dict({
+				"attendance_date": d.attendance_date,
+				"status": d.attendance_status,
+				"leave_type": d.attendance_leave_type
+			}) for d in self.get_attendance_days()
+			if cstr(d.attendance_status).lower() in ("absent", "half day", "on leave")]
 
 		for d in attendances:
 			if d.status in ('Half Day', 'On Leave') and d.leave_type and d.leave_type not in leave_type_map.keys():
@@ -471,27 +470,29 @@ class SalarySlip(TransactionBase):
 		return lwp, absent
 
 	def get_attendance_days(self):
-		return frappe.db.sql('''
-			SELECT 
-				attendance_date, 
-				status AS `attendance_status`, 
-				leave_type AS `attendance_leave_type`, 
-				`working_hours`, 
-				`leave`, 
-				`overtime`, 
-				`undertime`, 
-				`night_differential`, 
-				`night_differential_overtime`, 
-				`late_in`, 
-				`rest_day`, 
-				`special_holiday`, 
-					   `legal_holiday`
-			FROM `tabAttendance`
-			WHERE 1
-				AND employee = %s
-				AND docstatus = 1
-				AND attendance_date between %s and %s
-		''', values=(self.employee, self.start_date, self.end_date), as_dict=1)
+		payroll_data = self.get_payroll_data()
+		if payroll_data:
+			return payroll_data.attendance.get(self.employee, [])
+
+		return get_attendance_of_employees([self.employee], self.start_date, self.end_date).get(self.employee, [])
+
+	def get_payroll_data(self):
+		"""Returns the inputs prefetched by `prefetch_payroll_data`, if set for the employee and period of the slip"""
+		payroll_data = self.flags.payroll_data
+		if payroll_data and self.employee in payroll_data.employees \
+			and (getdate(self.start_date), getdate(self.end_date)) == (payroll_data.start_date, payroll_data.end_date):
+			return payroll_data
+
+	def get_salary_structure_doc(self, salary_structure):
+		payroll_data = self.get_payroll_data()
+		if not payroll_data:
+			return frappe.get_doc('Salary Structure', salary_structure)
+
+		# shared by the slips of the payroll, only read from
+		if salary_structure not in payroll_data.salary_structure_docs:
+			payroll_data.salary_structure_docs[salary_structure] = frappe.get_doc('Salary Structure', salary_structure)
+
+		return payroll_data.salary_structure_docs[salary_structure]
 
 	def add_earning_for_hourly_wages(self, doc, salary_component, amount):
 		row_exists = False
@@ -538,7 +539,7 @@ class SalarySlip(TransactionBase):
 
 	def calculate_component_amounts(self, component_type):
 		if not getattr(self, '_salary_structure_doc', None):
-			self._salary_structure_doc = frappe.get_doc('Salary Structure', self.salary_structure)
+			self._salary_structure_doc = self.get_salary_structure_doc(self.salary_structure)
 
 		payroll_period = get_payroll_period(self.start_date, self.end_date, self.company)
 
@@ -670,18 +671,23 @@ class SalarySlip(TransactionBase):
 			else start_date
 		)
 
-		salary_structure_assignment = frappe.get_value(
-			"Salary Structure Assignment",
-			{
-				"employee": self.employee,
-				"salary_structure": self.salary_structure,
-				"from_date": ("<=", date_to_validate),
-				"docstatus": 1,
-			},
-			"*",
-			order_by="from_date desc",
-			as_dict=True,
-		)
+		payroll_data = self.get_payroll_data()
+		if payroll_data:
+			salary_structure_assignment = next((d for d in payroll_data.assignments.get(self.employee, [])
+				if d.salary_structure == self.salary_structure and d.from_date <= date_to_validate), None)
+		else:
+			salary_structure_assignment = frappe.get_value(
+				"Salary Structure Assignment",
+				{
+					"employee": self.employee,
+					"salary_structure": self.salary_structure,
+					"from_date": ("<=", date_to_validate),
+					"docstatus": 1,
+				},
+				"*",
+				order_by="from_date desc",
+				as_dict=True,
+			)
 
 		if not salary_structure_assignment:
 			frappe.throw(
@@ -1515,6 +1521,103 @@ class SalarySlip(TransactionBase):
 		if self.validate_attendance and validate_attendance_for_employee(self.employee, self.start_date, self.end_date):
 			frappe.throw(_("Cannot Submit, Employees left to mark attendance"))
 
+def prefetch_payroll_data(employees, start_date, end_date):
+	"""
+		Returns the inputs of salary slips of `employees` for the period, with a query for each input
+		for all employees instead of per salary slip. Set as `payroll_data` in the flags of a salary slip.
+	"""
+	data = frappe._dict({
+		"employees": set(employees),
+		"start_date": getdate(start_date),
+		"end_date": getdate(end_date),
+		"assignments": {},
+		"salary_structures": {},
+		"salary_structure_docs": {},
+		"holiday_lists": {},
+		"holidays": {},
+		"leave_applications": {},
+		"attendance": {}
+	})
+
+	if not employees:
+		return data
+
+	for d in frappe.get_all("Salary Structure Assignment", fields=["*"],
+		filters={"employee": ("in", employees), "docstatus": 1}, order_by="from_date desc"):
+		data.assignments.setdefault(d.employee, []).append(d)
+
+	salary_structures = list({d.salary_structure for rows in data.assignments.values() for d in rows})
+	if salary_structures:
+		data.salary_structures = dict(frappe.get_all("Salary Structure", fields=["name", "payroll_frequency"],
+			filters={"name": ("in", salary_structures), "docstatus": 1, "is_active": "Yes"}, as_list=1))
+
+	# as per `get_holiday_list_for_employee`, employees without a holiday list fall back to it
+	default_holiday_lists = dict(frappe.get_all("Company", fields=["name", "default_holiday_list"], as_list=1))
+	for employee, holiday_list, company in frappe.get_all("Employee", fields=["name", "holiday_list", "company"],
+		filters={"name": ("in", employees)}, as_list=1):
+		if holiday_list or default_holiday_lists.get(company):
+			data.holiday_lists[employee] = holiday_list or default_holiday_lists.get(company)
+
+	if data.holiday_lists:
+		for d in frappe.get_all("Holiday", fields=["parent", "holiday_date"], filters={
+			"parent": ("in", list(set(data.holiday_lists.values()))),
+			"holiday_date": ("between", [data.start_date, data.end_date])
+		}):
+			data.holidays.setdefault(d.parent, []).append(cstr(d.holiday_date))
+
+	data.leave_applications = get_lwp_leave_applications(employees, data.start_date, data.end_date)
+	data.attendance = get_attendance_of_employees(employees, data.start_date, data.end_date)
+
+	return data
+
+def get_lwp_leave_applications(employees, start_date, end_date):
+	"""Returns leave applications (without pay or partially paid) of employees in the period, not yet in a salary slip"""
+	leave_applications = {}
+	for d in frappe.db.sql("""
+		SELECT t1.employee, t1.from_date, t1.to_date, t1.half_day, t1.half_day_date,
+			t2.is_ppl, t2.fraction_of_daily_salary_per_leave, t2.include_holiday
+		FROM `tabLeave Application` t1, `tabLeave Type` t2
+		WHERE t2.name = t1.leave_type
+		AND (t2.is_lwp = 1 or t2.is_ppl = 1)
+		AND t1.docstatus = 1
+		AND t1.employee in %(employees)s
+		AND ifnull(t1.salary_slip, '') = ''
+		AND t1.from_date <= %(end_date)s
+		AND t1.to_date >= %(start_date)s
+		""", {"employees": tuple(employees), "start_date": start_date, "end_date": end_date}, as_dict=1):
+		leave_applications.setdefault(d.pop("employee"), []).append(d)
+
+	return leave_applications
+
+def get_attendance_of_employees(employees, start_date, end_date):
+	attendance = {}
+	for d in frappe.db.sql('''
+		SELECT 
+			employee,
+			attendance_date, 
+			status AS `attendance_status`, 
+			leave_type AS `attendance_leave_type`, 
+			`working_hours`, 
+			`leave`, 
+			`overtime`, 
+			`undertime`, 
+			`night_differential`, 
+			`night_differential_overtime`, 
+			`late_in`, 
+			`rest_day`, 
+			`special_holiday`, 
+				   `legal_holiday`
+		FROM `tabAttendance`
+		WHERE 1
+			AND employee in %s
+			AND docstatus = 1
+			AND attendance_date between %s and %s
+	''', values=(tuple(employees), start_date, end_date), as_dict=1):
+		# rows are passed to formulas as is, without the employee
+		attendance.setdefault(d.pop("employee"), []).append(d)
+
+	return attendance
+
 def unlink_ref_doc_from_salary_slip(ref_no):
 	linked_ss = frappe.db.sql_list("""select name from `tabSalary Slip`
 	where journal_entry=%s and docstatus < 2""", (ref_no))
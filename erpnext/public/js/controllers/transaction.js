@@ -545,137 +545,182 @@ erpnext.TransactionController = class TransactionController extends erpnext.taxe
 			if(!this.validate_company_and_party()) {
 				this.frm.fields_dict["items"].grid.grid_rows[item.idx - 1].remove();
 			} else {
-				return this.frm.call({
-					method: "erpnext.stock.get_item_details.get_item_details",
-					child: item,
-					args: {
-						doc: me.frm.doc,
-						args: {
-							item_code: item.item_code,
-							barcode: item.barcode,
-							serial_no: item.serial_no,
-							batch_no: item.batch_no,
-							set_warehouse: me.frm.doc.set_warehouse,
-							warehouse: item.warehouse,
-							customer: me.frm.doc.customer || me.frm.doc.party_name,
-							quotation_to: me.frm.doc.quotation_to,
-							supplier: me.frm.doc.supplier,
-							currency: me.frm.doc.currency,
-							update_stock: update_stock,
-							conversion_rate: me.frm.doc.conversion_rate,
-							price_list: me.frm.doc.selling_price_list || me.frm.doc.buying_price_list,
-							price_list_currency: me.frm.doc.price_list_currency,
-							plc_conversion_rate: me.frm.doc.plc_conversion_rate,
-							company: me.frm.doc.company,
-							order_type: me.frm.doc.order_type,
-							is_pos: cint(me.frm.doc.is_pos),
-							is_return: cint(me.frm.doc.is_return),
-							is_subcontracted: me.frm.doc.is_subcontracted,
-							transaction_date: me.frm.doc.transaction_date || me.frm.doc.posting_date,
-							ignore_pricing_rule: me.frm.doc.ignore_pricing_rule,
-							doctype: me.frm.doc.doctype,
-							name: me.frm.doc.name,
-							project: item.project || me.frm.doc.project,
-							qty: item.qty || 1,
-							net_rate: item.rate,
-							stock_qty: item.stock_qty,
-							conversion_factor: item.conversion_factor,
-							weight_per_unit: item.weight_per_unit,
-							weight_uom: item.weight_uom,
-							manufacturer: item.manufacturer,
-							stock_uom: item.stock_uom,
-							pos_profile: cint(me.frm.doc.is_pos) ? me.frm.doc.pos_profile : '',
-							cost_center: item.cost_center,
-							tax_category: me.frm.doc.tax_category,
-							item_tax_template: item.item_tax_template,
-							child_docname: item.name
-						}
-					},
-
-					callback: function(r) {
-						if(!r.exc) {
-							frappe.run_serially([
-								() => {
-									var d = locals[cdt][cdn];
-									me.add_taxes_from_item_tax_template(d.item_tax_rate);
-									if (d.free_item_data) {
-										me.apply_product_discount(d);
-									}
-								},
-								() => {
-									// for internal customer instead of pricing rule directly apply valuation rate on item
-									if (me.frm.doc.is_internal_customer || me.frm.doc.is_internal_supplier) {
-										me.get_incoming_rate(item, me.frm.posting_date, me.frm.posting_time,
-											me.frm.doc.doctype, me.frm.doc.company);
-									} else {
-										me.frm.script_manager.trigger("price_list_rate", cdt, cdn);
-									}
-								},
-								() => {
-									if (me.frm.doc.is_internal_customer || me.frm.doc.is_internal_supplier) {
-										me.calculate_taxes_and_totals();
-									}
-								},
-								() => me.toggle_conversion_factor(item),
-								() => {
-									if (show_batch_dialog)
-										return frappe.db.get_value("Item", item.item_code, ["has_batch_no", "has_serial_no"])
-											.then((r) => {
-												if (r.message &&
-												(r.message.has_batch_no || r.message.has_serial_no)) {
-													frappe.flags.hide_serial_batch_dialog = false;
-												}
-											});
-								},
-								() => {
-									// check if batch serial selector is disabled or not
-									if (show_batch_dialog && !frappe.flags.hide_serial_batch_dialog)
-										return frappe.db.get_single_value('Stock Settings', 'disable_serial_no_and_batch_selector')
-											.then((value) => {
-												if (value) {
-													frappe.flags.hide_serial_batch_dialog = true;
-												}
-											});
-								},
-								() => {
-									if(show_batch_dialog && !frappe.flags.hide_serial_batch_dialog) {
-										var d = locals[cdt][cdn];
-										$.each(r.message, function(k, v) {
-											if(!d[k]) d[k] = v;
+				return this.get_item_details_in_batch(item, {
+					item_code: item.item_code,
+					barcode: item.barcode,
+					serial_no: item.serial_no,
+					batch_no: item.batch_no,
+					set_warehouse: me.frm.doc.set_warehouse,
+					warehouse: item.warehouse,
+					customer: me.frm.doc.customer || me.frm.doc.party_name,
+					quotation_to: me.frm.doc.quotation_to,
+					supplier: me.frm.doc.supplier,
+					currency: me.frm.doc.currency,
+					update_stock: update_stock,
+					conversion_rate: me.frm.doc.conversion_rate,
+					price_list: me.frm.doc.selling_price_list || me.frm.doc.buying_price_list,
+					price_list_currency: me.frm.doc.price_list_currency,
+					plc_conversion_rate: me.frm.doc.plc_conversion_rate,
+					company: me.frm.doc.company,
+					order_type: me.frm.doc.order_type,
+					is_pos: cint(me.frm.doc.is_pos),
+					is_return: cint(me.frm.doc.is_return),
+					is_subcontracted: me.frm.doc.is_subcontracted,
+					transaction_date: me.frm.doc.transaction_date || me.frm.doc.posting_date,
+					ignore_pricing_rule: me.frm.doc.ignore_pricing_rule,
+					doctype: me.frm.doc.doctype,
+					name: me.frm.doc.name,
+					project: item.project || me.frm.doc.project,
+					qty: item.qty || 1,
+					net_rate: item.rate,
+					stock_qty: item.stock_qty,
+					conversion_factor: item.conversion_factor,
+					weight_per_unit: item.weight_per_unit,
+					weight_uom: item.weight_uom,
+					manufacturer: item.manufacturer,
+					stock_uom: item.stock_uom,
+					pos_profile: cint(me.frm.doc.is_pos) ? me.frm.doc.pos_profile : '',
+					cost_center: item.cost_center,
+					tax_category: me.frm.doc.tax_category,
+					item_tax_template: item.item_tax_template,
+					child_docname: item.name
+				}).then(function(r) {
+					if(!r.exc) {
+						frappe.run_serially([
+							() => {
+								var d = locals[cdt][cdn];
+								me.add_taxes_from_item_tax_template(d.item_tax_rate);
+								if (d.free_item_data) {
+									me.apply_product_discount(d);
+								}
+							},
+							() => {
+								// for internal customer instead of pricing rule directly apply valuation rate on item
+								if (me.frm.doc.is_internal_customer || me.frm.doc.is_internal_supplier) {
+									me.get_incoming_rate(item, me.frm.posting_date, me.frm.posting_time,
+										me.frm.doc.doctype, me.frm.doc.company);
+								} else {
+									me.frm.script_manager.trigger("price_list_rate", cdt, cdn);
+								}
+							},
+							() => {
+								if (me.frm.doc.is_internal_customer || me.frm.doc.is_internal_supplier) {
+									me.calculate_taxes_and_totals();
+								}
+							},
+							() => me.toggle_conversion_factor(item),
+							() => {
+								if (show_batch_dialog)
+									return frappe.db.get_value("Item", item.item_code, ["has_batch_no", "has_serial_no"])
+										.then((r) => {
+											if (r.message &&
+											(r.message.has_batch_no || r.message.has_serial_no)) {
+												frappe.flags.hide_serial_batch_dialog = false;
+											}
 										});
+							},
+							() => {
+								// check if batch serial selector is disabled or not
+								if (show_batch_dialog && !frappe.flags.hide_serial_batch_dialog)
+									return frappe.db.get_single_value('Stock Settings', 'disable_serial_no_and_batch_selector')
+										.then((value) => {
+											if (value) {
+												frappe.flags.hide_serial_batch_dialog = true;
+											}
+										});
+							},
+							() => {
+								if(show_batch_dialog && !frappe.flags.hide_serial_batch_dialog) {
+									var d = locals[cdt][cdn];
+									$.each(r.message, function(k, v) {
+										if(!d[k]) d[k] = v;
+									});
 
-										if (d.has_batch_no && d.has_serial_no) {
-											d.batch_no = undefined;
-										}
-
-										erpnext.show_serial_batch_selector(me.frm, d, (item) => {
-											me.frm.script_manager.trigger('qty', item.doctype, item.name);
-											if (!me.frm.doc.set_warehouse)
-												me.frm.script_manager.trigger('warehouse', item.doctype, item.name);
-											me.apply_price_list(item, true);
-										}, undefined, !frappe.flags.hide_serial_batch_dialog);
+									if (d.has_batch_no && d.has_serial_no) {
+										d.batch_no = undefined;
 									}
-								},
-								() => me.conversion_factor(doc, cdt, cdn, true),
-								() => me.remove_pricing_rule(item),
-								() => {
-									if (item.apply_rule_on_other_items) {
-										let key = item.name;
-										me.apply_rule_on_other_items({key: item});
-									}
-								},
-								() => {
-									var company_currency = me.get_company_currency();
-									me.update_item_grid_labels(company_currency);
+
+									erpnext.show_serial_batch_selector(me.frm, d, (item) => {
+										me.frm.script_manager.trigger('qty', item.doctype, item.name);
+										if (!me.frm.doc.set_warehouse)
+											me.frm.script_manager.trigger('warehouse', item.doctype, item.name);
+										me.apply_price_list(item, true);
+									}, undefined, !frappe.flags.hide_serial_batch_dialog);
 								}
-							]);
-						}
+							},
+							() => me.conversion_factor(doc, cdt, cdn, true),
+							() => me.remove_pricing_rule(item),
+							() => {
+								if (item.apply_rule_on_other_items) {
+									let key = item.name;
+									me.apply_rule_on_other_items({key: item});
+								}
+							},
+							() => {
+								var company_currency = me.get_company_currency();
+								me.update_item_grid_labels(company_currency);
+							}
+						]);
 					}
 				});
 			}
 		}
 	}
 
+	get_item_details_in_batch(item, args) {
+		// rows whose item is set in the same tick (pasted or added together) are fetched in one call,
+		// the promise of each row resolves with its item details as `message`, as of `get_item_details`
+		var me = this;
+		if (!this.item_details_batch) {
+			let batch = this.item_details_batch = {rows: [], args: []};
+			batch.promise = new Promise((resolve) => {
+				setTimeout(() => {
+					me.item_details_batch = null;
+					frappe.call({
+						method: "erpnext.stock.get_item_details.get_item_details_for_items",
+						args: {
+							doc: me.frm.doc,
+							args: {},
+							items: batch.args
+						},
+						callback: function(r) {
+							if (r.exc || !r.message) {
+								resolve([]);
+								return;
+							}
+
+							let std_fields = ["doctype"].concat(frappe.model.std_fields_list);
+							let parentfields = new Set();
+							batch.rows.forEach((row, i) => {
+								let child = locals[row.doctype] && locals[row.doctype][row.name];
+								if (!child) return;
+
+								$.each(r.message[i] || {}, (key, value) => {
+									if (!std_fields.includes(key)) child[key] = value;
+								});
+								parentfields.add(child.parentfield);
+							});
+
+							parentfields.forEach((parentfield) => me.frm.refresh_field(parentfield));
+							resolve(r.message);
+						},
+						error: function() {
+							resolve([]);
+						}
+					});
+				}, 0);
+			});
+		}
+
+		let batch = this.item_details_batch;
+		let idx = batch.rows.push(item) - 1;
+		batch.args.push(args);
+
+		return batch.promise.then((message) => {
+			return message[idx] ? {message: message[idx]} : {exc: true};
+		});
+	}
+
 	price_list_rate(doc, cdt, cdn) {
 		var item = frappe.get_doc(cdt, cdn);
 		frappe.model.round_floats_in(item, ["price_list_rate", "discount_percentage"]);
@@ -3,13 +3,25 @@
 
 
 import json
+import pickle
+import time
 
 import frappe
+from frappe.utils import cint
 from frappe.utils.nestedset import get_root_of
 
-from erpnext.accounts.doctype.pos_invoice.pos_invoice import get_stock_availability
+from erpnext.accounts.doctype.pos_invoice.pos_invoice import (
+	get_available_qty_of_items,
+	get_bundle_availability_of_items,
+	get_stock_availability,
+)
 from erpnext.accounts.doctype.pos_profile.pos_profile import get_item_groups
 
+# available qty (per warehouse) and prices (per price list) of items in the item selector are cached,
+# entries are cleared when bins, POS invoices or item prices change and expire after `CACHE_EXPIRY` seconds,
+# so that a change committed while another request refills the cache is not missed for long
+CACHE_EXPIRY = 300
+
 
 def search_by_term(search_term, warehouse, price_list):
 	result = search_for_serial_or_batch_or_barcode_number(search_term) or {}
@@ -42,7 +54,8 @@ def search_by_term(search_term, warehouse, price_list):
 		return {'items': [item_info]}
 
 @frappe.whitelist()
-def get_items(start, page_length, price_list, item_group, pos_profile, search_term=""):
+def get_items(start, page_length, price_list, item_group, pos_profile, search_term="", last_item=None):
+	"""Returns a page of items, after `last_item` (the last item of the previous page) if given, else from `start`"""
 	warehouse, hide_unavailable_items = frappe.db.get_value(
 		'POS Profile', pos_profile, ['warehouse', 'hide_unavailable_items'])
 
@@ -66,6 +79,13 @@ def get_items(start, page_length, price_list, item_group, pos_profile, search_te
 		bin_join_selection = ", `tabBin` bin"
 		bin_join_condition = "AND bin.warehouse = %(warehouse)s AND bin.item_code = item.name AND bin.actual_qty > 0"
 
+	if last_item:
+		pagination_condition = "AND item.name > %(last_item)s"
+		limit = "LIMIT {0}".format(cint(page_length))
+	else:
+		pagination_condition = ""
+		limit = "LIMIT {0}, {1}".format(cint(start), cint(page_length))
+
 	items_data = frappe.db.sql("""
 		SELECT
 			item.name AS item_code,
@@ -75,44 +95,38 @@ def get_items(start, page_length, price_list, item_group, pos_profile, search_te
 			item.image AS item_image,
 			item.is_stock_item
 		FROM
-			`tabItem` item {bin_join_selection}
+			`tabItem` item
+			INNER JOIN `tabItem Group` item_group ON item_group.name = item.item_group
+			{bin_join_selection}
 		WHERE
 			item.disabled = 0
 			AND item.has_variants = 0
 			AND item.is_sales_item = 1
 			AND item.is_fixed_asset = 0
-			AND item.item_group in (SELECT name FROM `tabItem Group` WHERE lft >= {lft} AND rgt <= {rgt})
+			AND item_group.lft >= %(lft)s AND item_group.rgt <= %(rgt)s
 			AND {condition}
 			{bin_join_condition}
+			{pagination_condition}
 		ORDER BY
 			item.name asc
-		LIMIT
-			{start}, {page_length}"""
+		{limit}"""
 		.format(
-			start=start,
-			page_length=page_length,
-			lft=lft,
-			rgt=rgt,
 			condition=condition,
 			bin_join_selection=bin_join_selection,
-			bin_join_condition=bin_join_condition
-		), {'warehouse': warehouse}, as_dict=1)
+			bin_join_condition=bin_join_condition,
+			pagination_condition=pagination_condition,
+			limit=limit
+		), {'warehouse': warehouse, 'lft': lft, 'rgt': rgt, 'last_item': last_item}, as_dict=1)
 
 	if items_data:
 		items_data = filter_service_items(items_data)
-		items = [d.item_code for d in items_data]
-		item_prices_data = frappe.get_all("Item Price",
-			fields = ["item_code", "price_list_rate", "currency"],
-			filters = {'price_list': price_list, 'item_code': ['in', items]})
-
-		item_prices = {}
-		for d in item_prices_data:
-			item_prices[d.item_code] = d
+		item_prices = get_item_prices([d.item_code for d in items_data], price_list)
+		stock_availability = get_items_availability(items_data, warehouse)
 
 		for item in items_data:
 			item_code = item.item_code
 			item_price = item_prices.get(item_code) or {}
-			item_stock_qty = get_stock_availability(item_code, warehouse)
+			item_stock_qty = stock_availability.get(item_code)
 
 			row = {}
 			row.update(item)
@@ -144,13 +158,73 @@ def search_for_serial_or_batch_or_barcode_number(search_value):
 
 	return {}
 
+def get_item_prices(item_codes, price_list):
+	def get_prices(item_codes):
+		item_prices = {item_code: {} for item_code in item_codes}
+		for d in frappe.get_all("Item Price",
+			fields = ["item_code", "price_list_rate", "currency"],
+			filters = {'price_list': price_list, 'item_code': ['in', item_codes]}):
+			item_prices[d.item_code] = d
+
+		return item_prices
+
+	return get_cached_item_values("pos_item_price:" + price_list, item_codes, get_prices)
+
+def get_items_availability(items, warehouse):
+	"""Returns available qty of items as per `get_stock_availability`, without a query per item"""
+	stock_items = [d.item_code for d in items if d.is_stock_item]
+	product_bundles = [d.item_code for d in items if not d.is_stock_item]
+
+	availability = get_cached_item_values("pos_item_availability:" + warehouse, stock_items,
+		lambda item_codes: get_available_qty_of_items(item_codes, warehouse))
+
+	if product_bundles:
+		# depend on the stock of the bundle items, so they are not cached
+		availability.update(get_bundle_availability_of_items(product_bundles, warehouse))
+
+	return availability
+
+def get_cached_item_values(name, item_codes, generator):
+	"""Returns values of items from the cached hash `name`, getting the missing ones with `generator(item_codes)`"""
+	if not item_codes:
+		return {}
+
+	cache = frappe.cache()
+	key = cache.make_key(name)
+	now = time.time()
+
+	values = {}
+	for item_code, value in zip(item_codes, cache.hmget(key, item_codes)):
+		if value:
+			value, cached_on = pickle.loads(value)
+			if now - cached_on < CACHE_EXPIRY:
+				values[item_code] = value
+
+	missing_item_codes = [item_code for item_code in item_codes if item_code not in values]
+	if missing_item_codes:
+		missing_values = generator(missing_item_codes)
+
+		pipeline = cache.pipeline()
+		for item_code in missing_item_codes:
+			pipeline.hset(key, item_code, pickle.dumps((missing_values.get(item_code), now)))
+		pipeline.execute()
+
+		values.update(missing_values)
+
+	return values
+
+def clear_item_availability_cache(item_code, warehouse):
+	frappe.cache().hdel("pos_item_availability:" + warehouse, item_code)
+
+def clear_item_price_cache(item_code, price_list):
+	frappe.cache().hdel("pos_item_price:" + price_list, item_code)
+
 def filter_service_items(items):
-	for item in items:
-		if not item['is_stock_item']:
-			if not frappe.db.exists('Product Bundle', item['item_code']):
-				items.remove(item)
+	service_items = [item['item_code'] for item in items if not item['is_stock_item']]
+	product_bundles = frappe.get_all('Product Bundle', filters={'name': ('in', service_items)},
+		pluck='name') if service_items else []
 
-	return items
+	return [item for item in items if item['is_stock_item'] or item['item_code'] in product_bundles]
 
 def get_conditions(search_term):
 	condition = "("
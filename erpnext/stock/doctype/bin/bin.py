@@ -8,6 +8,9 @@ from frappe.query_builder import Case
 from frappe.query_builder.functions import Coalesce, Sum
 from frappe.utils import flt
 
+from erpnext.stock.reorder_item import queue_item_for_reorder
+from erpnext.stock.utils import get_combine_datetime
+
 
 class Bin(Document):
 	def before_save(self):
@@ -58,10 +61,12 @@ class Bin(Document):
 					)
 		).run()[0][0] or 0.0
 
+		previous_projected_qty = self.projected_qty
 		self.set_projected_qty()
 
 		self.db_set('reserved_qty_for_production', flt(self.reserved_qty_for_production))
 		self.db_set('projected_qty', self.projected_qty)
+		update_reorder_queue(self.item_code, self.projected_qty, previous_projected_qty)
 
 	def update_reserved_qty_for_sub_contracting(self):
 		#reserved qty
@@ -119,13 +124,21 @@ class Bin(Document):
 			reserved_qty_for_sub_contract = 0
 
 		self.db_set('reserved_qty_for_sub_contract', reserved_qty_for_sub_contract)
+		previous_projected_qty = self.projected_qty
 		self.set_projected_qty()
 		self.db_set('projected_qty', self.projected_qty)
+		update_reorder_queue(self.item_code, self.projected_qty, previous_projected_qty)
 
 def on_doctype_update():
 	frappe.db.add_index("Bin", ["item_code", "warehouse"])
 
 
+def update_reorder_queue(item_code, projected_qty, previous_projected_qty):
+	# only a drop in projected qty can take the item below a reorder level
+	if flt(projected_qty) < flt(previous_projected_qty):
+		queue_item_for_reorder(item_code)
+
+
 def update_stock(bin_name, args, allow_negative_stock=False, via_landed_cost_voucher=False):
 	"""WARNING: This function is deprecated. Inline this function instead of using it."""
 	from erpnext.stock.stock_ledger import repost_current_voucher
@@ -133,13 +146,48 @@ def update_stock(bin_name, args, allow_negative_stock=False, via_landed_cost_vou
 	repost_current_voucher(args, allow_negative_stock, via_landed_cost_voucher)
 	update_qty(bin_name, args)
 
+def update_latest_posting_datetime(bin_name, args):
+	"""
+		Maintain the posting datetime of the latest SLE of the item-warehouse in Bin,
+		used to check for future SLEs without scanning the ledger.
+
+		Cancellations (and bins without a value yet) recompute it from the ledger with a locking
+		read, so that concurrent transactions never leave a value older than the latest SLE.
+	"""
+	latest_posting_datetime = frappe.db.sql("""
+		select latest_posting_datetime
+		from `tabBin`
+		where name = %s
+		for update""", bin_name)[0][0]
+
+	if latest_posting_datetime and not args.get("is_cancelled"):
+		posting_datetime = get_combine_datetime(args.get("posting_date"), args.get("posting_time"))
+		if posting_datetime > latest_posting_datetime:
+			frappe.db.set_value("Bin", bin_name, "latest_posting_datetime", posting_datetime,
+				update_modified=False)
+		return
+
+	latest_sle = frappe.db.sql("""
+		select posting_datetime
+		from `tabStock Ledger Entry`
+		where item_code = %s
+			and warehouse = %s
+			and is_cancelled = 0
+		order by posting_datetime desc
+		limit 1
+		for update""", (args.get("item_code"), args.get("warehouse")))
+
+	frappe.db.set_value("Bin", bin_name, "latest_posting_datetime", latest_sle[0][0] if latest_sle else None,
+		update_modified=False)
+
 def get_bin_details(bin_name):
 	return frappe.db.get_value('Bin', bin_name, ['actual_qty', 'ordered_qty',
 	'reserved_qty', 'indented_qty', 'planned_qty', 'reserved_qty_for_production',
-	'reserved_qty_for_sub_contract'], as_dict=1)
+	'reserved_qty_for_sub_contract', 'projected_qty'], as_dict=1)
 
 def update_qty(bin_name, args):
 	from erpnext.controllers.stock_controller import future_sle_exists
+	from erpnext.selling.page.point_of_sale.point_of_sale import clear_item_availability_cache
 
 	bin_details = get_bin_details(bin_name)
 	# actual qty is already updated by processing current voucher
@@ -176,3 +224,6 @@ def update_qty(bin_name, args):
 		'planned_qty': planned_qty,
 		'projected_qty': projected_qty
 	})
+
+	update_reorder_queue(args.get("item_code"), projected_qty, bin_details.projected_qty)
+	clear_item_availability_cache(args.get("item_code"), args.get("warehouse"))
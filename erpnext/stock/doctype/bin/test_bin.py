@@ -1,9 +1,53 @@
 # Copyright (c) 2015, Frappe Technologies Pvt. Ltd. and Contributors
 # See license.txt
 
-import unittest
+import frappe
+from frappe.utils import add_days, get_datetime, nowdate
+
+from erpnext.controllers.stock_controller import future_sle_exists
+from erpnext.stock.doctype.item.test_item import make_item
+from erpnext.stock.doctype.stock_entry.stock_entry_utils import make_stock_entry
+from erpnext.tests.utils import ERPNextTestCase
 
 # test_records = frappe.get_test_records('Bin')
 
-class TestBin(unittest.TestCase):
-	pass
+class TestBin(ERPNextTestCase):
+	def test_latest_posting_datetime(self):
+		item_code = make_item("_Test Item for Bin Latest Posting", {"is_stock_item": 1}).name
+		warehouse = "_Test Warehouse - _TC"
+		today = nowdate()
+
+		def get_latest_posting_datetime():
+			return frappe.db.get_value("Bin", {"item_code": item_code, "warehouse": warehouse},
+				"latest_posting_datetime")
+
+		se = make_stock_entry(item_code=item_code, target=warehouse, qty=10, basic_rate=100,
+			posting_date=today, posting_time="10:00:00")
+		self.assertEqual(get_latest_posting_datetime(), get_datetime(today + " 10:00:00"))
+
+		# backdated entry keeps the latest posting datetime
+		backdated = make_stock_entry(item_code=item_code, target=warehouse, qty=5, basic_rate=100,
+			posting_date=add_days(today, -1), posting_time="10:00:00")
+		self.assertEqual(get_latest_posting_datetime(), get_datetime(today + " 10:00:00"))
+
+		args = frappe._dict({
+			"item_code": item_code,
+			"warehouse": warehouse,
+			"voucher_type": "Stock Entry",
+			"voucher_no": "_Test Voucher for Bin Latest Posting",
+			"posting_date": add_days(today, -1),
+			"posting_time": "12:00:00"
+		})
+		self.assertTrue(future_sle_exists(args, [args]))
+
+		args.update({"voucher_no": "_Test Voucher for Bin Latest Posting 2", "posting_date": today,
+			"posting_time": "11:00:00"})
+		self.assertFalse(future_sle_exists(args, [args]))
+
+		# cancellation recomputes it from the ledger
+		se.cancel()
+		self.assertEqual(get_latest_posting_datetime(),
+			get_datetime(add_days(today, -1) + " 10:00:00"))
+
+		backdated.cancel()
+		self.assertIsNone(get_latest_posting_datetime())
@@ -38,6 +38,7 @@ from erpnext.setup.doctype.item_group.item_group import (
 	invalidate_cache_for,
 )
 from erpnext.stock.doctype.item_default.item_default import ItemDefault
+from erpnext.stock.reorder_item import queue_item_for_reorder
 
 
 class DuplicateReorderRows(frappe.ValidationError):
@@ -156,6 +157,9 @@ class Item(WebsiteGenerator):
 		self.update_item_price()
 		self.update_template_item()
 
+		if self.get("reorder_levels"):
+			queue_item_for_reorder(self.name)
+
 	def validate_description(self):
 		'''Clean HTML description if set'''
 		if cint(frappe.db.get_single_value('Stock Settings', 'clean_description_html')):
@@ -22,7 +22,11 @@ from erpnext.stock.doctype.item.item import (
 	validate_is_stock_item,
 )
 from erpnext.stock.doctype.stock_entry.stock_entry_utils import make_stock_entry
-from erpnext.stock.get_item_details import get_item_details
+from erpnext.stock.get_item_details import (
+	get_item_details,
+	get_item_details_for_items,
+	prefetched_item_details,
+)
 from erpnext.tests.utils import ERPNextTestCase, change_settings
 
 test_ignore = ["BOM"]
@@ -114,6 +118,49 @@ class TestItem(ERPNextTestCase):
 		for key, value in to_check.items():
 			self.assertEqual(value, details.get(key))
 
+	def test_get_item_details_for_items(self):
+		frappe.db.sql("""delete from `tabItem Price`""")
+		make_test_objects("Item Price")
+
+		company = "_Test Company"
+		currency = frappe.get_cached_value("Company",  company,  "default_currency")
+		args = {
+			"company": company,
+			"price_list": "_Test Price List",
+			"currency": currency,
+			"doctype": "Sales Order",
+			"conversion_rate": 1,
+			"price_list_currency": currency,
+			"plc_conversion_rate": 1,
+			"order_type": "Sales",
+			"customer": "_Test Customer",
+			"ignore_pricing_rule": 1
+		}
+		items = [
+			{"item_code": "_Test Item", "qty": 2},
+			{"item_code": "_Test Item 2", "qty": 1, "warehouse": "_Test Warehouse 1 - _TC"},
+			{"item_code": "_Test Item", "qty": 5, "uom": "_Test UOM 1"},
+			{"item_code": None}
+		]
+
+		details = get_item_details_for_items(args, items)
+		self.assertEqual(len(details), len(items))
+		self.assertEqual(details[-1], {})
+
+		for row, row_details in zip(items[:-1], details):
+			expected = get_item_details(dict(args, **row))
+			for key in ("price_list_rate", "conversion_factor", "warehouse", "actual_qty",
+				"projected_qty", "stock_qty", "income_account"):
+				self.assertEqual(row_details.get(key), expected.get(key))
+
+		# a nested batch restores the prefetch of the outer one
+		with prefetched_item_details([dict(args, **items[0])]):
+			prefetch = frappe.flags.item_details_prefetch
+			get_item_details_for_items(args, items[1:2])
+			self.assertIs(frappe.flags.item_details_prefetch, prefetch)
+
+		self.assertIsNone(frappe.flags.item_details_prefetch)
+
 	def test_item_tax_template(self):
 		expected_item_tax_template = [
 			{"item_code": "_Test Item With Item Tax Template", "tax_category": "",
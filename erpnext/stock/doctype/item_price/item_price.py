@@ -84,3 +84,16 @@ class ItemPrice(Document):
 		if self.buying and not self.selling:
 			# if only buying then remove customer
 			self.customer = None
+
+	def on_update(self):
+		self.clear_item_price_cache()
+
+	def on_trash(self):
+		self.clear_item_price_cache()
+
+	def clear_item_price_cache(self):
+		from erpnext.selling.page.point_of_sale.point_of_sale import clear_item_price_cache
+
+		for doc in [self, self.get_doc_before_save()]:
+			if doc and doc.item_code and doc.price_list:
+				clear_item_price_cache(doc.item_code, doc.price_list)
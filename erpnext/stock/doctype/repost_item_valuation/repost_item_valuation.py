@@ -5,6 +5,7 @@ import frappe
 from frappe import _
 from frappe.model.document import Document
 from frappe.utils import cint, get_link_to_form, get_weekday, now, nowtime, today
+from frappe.utils.background_jobs import get_info
 from frappe.utils.user import get_users_with_role
 from rq.timeouts import JobTimeoutException
 
@@ -13,7 +14,10 @@ from erpnext.accounts.utils import (
 	check_if_stock_and_account_balance_synced,
 	update_gl_entries_after,
 )
-from erpnext.stock.stock_ledger import repost_future_sle
+from erpnext.stock.stock_ledger import get_items_to_be_repost, repost_future_sle
+
+REPOSTING_PROGRESS_KEY = "repost_item_valuation_progress"
+COMPONENT_JOB_PREFIX = "repost_item_valuation_component::"
 
 
 class RepostItemValuation(Document):
@@ -165,12 +169,19 @@ def repost_entries():
 
 	riv_entries = get_repost_item_valuation_entries()
 
+	if frappe.db.get_single_value("Stock Reposting Settings", "parallel_reposting"):
+		enqueue_parallel_reposts(riv_entries)
+		return
+
 	for row in riv_entries:
 		doc = frappe.get_doc('Repost Item Valuation', row.name)
 		if doc.status in ('Queued', 'In Progress'):
 			repost(doc)
 			doc.deduplicate_similar_repost()
 
+	check_stock_and_account_balance()
+
+def check_stock_and_account_balance():
 	riv_entries = get_repost_item_valuation_entries()
 	if riv_entries:
 		return
@@ -178,6 +189,159 @@ def repost_entries():
 	for d in frappe.get_all('Company', filters= {'enable_perpetual_inventory': 1}):
 		check_if_stock_and_account_balance_synced(today(), d.name)
 
+def enqueue_parallel_reposts(riv_entries):
+	"""Split pending reposts into independent components and repost each in its own job."""
+	if not riv_entries or get_running_component_jobs():
+		return
+
+	components = get_repost_components([d.name for d in riv_entries])
+
+	frappe.cache().delete_value(REPOSTING_PROGRESS_KEY)
+	for entries in components:
+		component = entries[0]
+		set_component_progress(component, entries=entries, completed=0, status="Queued")
+
+		frappe.enqueue(repost_component, timeout=1800, queue='long',
+			job_name=COMPONENT_JOB_PREFIX + component, component=component, entries=entries)
+
+def get_running_component_jobs():
+	return [d.get("job_name") for d in get_info()
+		if (d.get("job_name") or "").startswith(COMPONENT_JOB_PREFIX)]
+
+def repost_component(component, entries):
+	"""Repost all entries of one component, in order. Stops at the first failure,
+	remaining entries stay queued and are picked up by the next run."""
+	set_component_progress(component, status="In Progress")
+
+	for i, name in enumerate(entries):
+		doc = frappe.get_doc('Repost Item Valuation', name)
+		if doc.status in ('Queued', 'In Progress'):
+			try:
+				repost(doc)
+			except Exception:
+				set_component_progress(component, completed=i, status="Failed")
+				return
+
+			doc.deduplicate_similar_repost()
+			frappe.db.commit()
+
+		set_component_progress(component, completed=i + 1)
+
+	set_component_progress(component, status="Completed")
+
+	if all(d.get("status") in ("Completed", "Failed") for d in get_reposting_progress().values()):
+		check_stock_and_account_balance()
+
+def set_component_progress(component, **kwargs):
+	progress = get_reposting_progress().get(component) or {}
+	progress.update(kwargs)
+	frappe.cache().hset(REPOSTING_PROGRESS_KEY, component, progress)
+
+def get_reposting_progress():
+	"""Progress of parallel reposting jobs, keyed by the first entry of each component."""
+	return frappe.cache().hgetall(REPOSTING_PROGRESS_KEY) or {}
+
+def get_repost_components(riv_entries):
+	"""
+		Group Repost Item Valuation entries which can not be reposted independently.
+
+		Two entries depend on each other if they repost the same item-warehouse,
+		including item-warehouses reached via transfers, or if they repost GL entries
+		of the same voucher. Returns lists of entry names, in the original order.
+	"""
+	parent = {name: name for name in riv_entries}
+
+	def find(name):
+		while parent[name] != name:
+			parent[name] = parent[parent[name]]
+			name = parent[name]
+		return name
+
+	owner = {}
+	for name in riv_entries:
+		doc = frappe.get_doc('Repost Item Valuation', name)
+		for key in get_reposting_footprint(doc):
+			if key in owner:
+				parent[find(name)] = find(owner[key])
+			else:
+				owner[key] = name
+
+	components = {}
+	for name in riv_entries:
+		components.setdefault(find(name), []).append(name)
+
+	return list(components.values())
+
+def get_reposting_footprint(doc):
+	"""Item-warehouses and vouchers which may be updated while reposting the entry."""
+	if doc.based_on == 'Transaction':
+		item_warehouses = {(d.get("item_code"), d.get("warehouse"))
+			for d in get_items_to_be_repost(doc.voucher_type, doc.voucher_no, doc)}
+	else:
+		item_warehouses = {(doc.item_code, doc.warehouse)}
+
+	footprint = {("Item Warehouse", item_code, warehouse)
+		for item_code, warehouse in get_dependent_item_warehouses(item_warehouses, doc.posting_date)}
+
+	if cint(erpnext.is_perpetual_inventory_enabled(doc.company)):
+		for voucher_type, voucher_no in get_future_vouchers(doc):
+			footprint.add(("Voucher", voucher_type, voucher_no))
+
+	return footprint
+
+def get_dependent_item_warehouses(item_warehouses, posting_date):
+	"""Add item-warehouses whose valuation depends on the given ones via transfers,
+	repacks and other entries linked with `dependant_sle_voucher_detail_no`."""
+	item_warehouses = set(item_warehouses)
+	to_check = list(item_warehouses)
+
+	while to_check:
+		item_code, warehouse = to_check.pop()
+		dependents = frappe.db.sql("""
+			select distinct dependant.item_code, dependant.warehouse
+			from `tabStock Ledger Entry` sle
+			inner join `tabStock Ledger Entry` dependant
+				on dependant.voucher_detail_no = sle.dependant_sle_voucher_detail_no
+				and dependant.name != sle.name
+			where
+				sle.item_code = %s
+				and sle.warehouse = %s
+				and sle.posting_date >= %s
+				and sle.is_cancelled = 0
+				and ifnull(sle.dependant_sle_voucher_detail_no, '') != ''
+				and dependant.is_cancelled = 0
+		""", (item_code, warehouse, posting_date))
+
+		for key in dependents:
+			key = tuple(key)
+			if key not in item_warehouses:
+				item_warehouses.add(key)
+				to_check.append(key)
+
+	return item_warehouses
+
+def get_future_vouchers(doc):
+	"""Vouchers whose GL entries are reposted along with this entry, see `repost_gl_entries`."""
+	if doc.based_on == 'Transaction':
+		ref_doc = frappe.get_doc(doc.voucher_type, doc.voucher_no)
+		items, warehouses = ref_doc.get_items_and_warehouses()
+	else:
+		items = [doc.item_code]
+		warehouses = [doc.warehouse]
+
+	if not (items and warehouses):
+		return []
+
+	return frappe.db.sql("""
+		select distinct voucher_type, voucher_no
+		from `tabStock Ledger Entry`
+		where
+			item_code in %(items)s
+			and warehouse in %(warehouses)s
+			and posting_date >= %(posting_date)s
+			and is_cancelled = 0
+	""", {"items": items, "warehouses": warehouses, "posting_date": doc.posting_date})
+
 def get_repost_item_valuation_entries():
 	return frappe.db.sql(""" SELECT name from `tabRepost Item Valuation`
 		WHERE status in ('Queued', 'In Progress') and creation <= %s and docstatus = 1
@@ -9,6 +9,7 @@ from frappe.utils import nowdate
 from erpnext.controllers.stock_controller import create_item_wise_repost_entries
 from erpnext.stock.doctype.purchase_receipt.test_purchase_receipt import make_purchase_receipt
 from erpnext.stock.doctype.repost_item_valuation.repost_item_valuation import (
+	get_repost_components,
 	in_configured_timeslot,
 )
 from erpnext.stock.utils import PendingRepostingError
@@ -162,3 +163,28 @@ class TestRepostItemValuation(unittest.TestCase):
 		self.assertRaises(PendingRepostingError, stock_settings.save)
 
 		riv.set_status("Skipped")
+
+	def test_repost_components(self):
+		riv_args = frappe._dict(
+			doctype="Repost Item Valuation",
+			item_code="_Test Item",
+			warehouse="_Test Warehouse - _TC",
+			based_on="Item and Warehouse",
+			posting_date="2100-01-01",
+			posting_time="00:01:00",
+		)
+
+		rivs = []
+		for warehouse in ("_Test Warehouse - _TC", "Stores - _TC", "_Test Warehouse - _TC"):
+			riv = frappe.get_doc(riv_args.update({"warehouse": warehouse}))
+			riv.flags.dont_run_in_test = True
+			riv.submit()
+			rivs.append(riv)
+
+		components = get_repost_components([d.name for d in rivs])
+
+		# same item-warehouse can't be reposted in parallel
+		self.assertEqual(sorted(components), sorted([[rivs[0].name, rivs[2].name], [rivs[1].name]]))
+
+		for riv in rivs:
+			riv.set_status("Skipped")
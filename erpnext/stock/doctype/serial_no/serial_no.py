@@ -10,6 +10,9 @@ from frappe.model.naming import make_autoname
 from frappe.utils import add_days, cint, cstr, flt, get_link_to_form, getdate, nowdate
 
 from erpnext.controllers.stock_controller import StockController
+from erpnext.stock.doctype.stock_ledger_entry_serial_no.stock_ledger_entry_serial_no import (
+	get_serial_no_ledger_entries,
+)
 from erpnext.stock.get_item_details import get_reserved_qty_for_so
 
 
@@ -148,48 +151,19 @@ class SerialNo(StockController):
 		if not serial_no:
 			serial_no = self.name
 
-		for sle in frappe.db.sql("""
-			SELECT voucher_type, voucher_no,
-				posting_date, posting_time, incoming_rate, actual_qty, serial_no
-			FROM
-				`tabStock Ledger Entry`
-			WHERE
-				item_code=%s AND company = %s
-				AND is_cancelled = 0
-				AND (serial_no = %s
-					OR serial_no like %s
-					OR serial_no like %s
-					OR serial_no like %s
-				)
-			ORDER BY
-				posting_date desc, posting_time desc, creation desc""",
-			(
-				self.item_code, self.company,
-				serial_no,
-				serial_no+'\n%',
-				'%\n'+serial_no,
-				'%\n'+serial_no+'\n%'
-			),
-			as_dict=1):
-				if serial_no.upper() in get_serial_nos(sle.serial_no):
-					if cint(sle.actual_qty) > 0:
-						sle_dict.setdefault("incoming", []).append(sle)
-					else:
-						sle_dict.setdefault("outgoing", []).append(sle)
+		for sle in get_serial_no_ledger_entries([serial_no],
+			filters={"item_code": self.item_code, "company": self.company},
+			fields=["voucher_type", "voucher_no", "posting_date", "posting_time", "incoming_rate", "actual_qty"]):
+			if cint(sle.actual_qty) > 0:
+				sle_dict.setdefault("incoming", []).append(sle)
+			else:
+				sle_dict.setdefault("outgoing", []).append(sle)
 
 		return sle_dict
 
 	def on_trash(self):
-		sl_entries = frappe.db.sql("""select serial_no from `tabStock Ledger Entry`
-			where serial_no like %s and item_code=%s and is_cancelled=0""",
-			("%%%s%%" % self.name, self.item_code), as_dict=True)
-
-		# Find the exact match
-		sle_exists = False
-		for d in sl_entries:
-			if self.name.upper() in get_serial_nos(d.serial_no):
-				sle_exists = True
-				break
+		sle_exists = get_serial_no_ledger_entries([self.name],
+			filters={"item_code": self.item_code}, limit=1)
 
 		if sle_exists:
 			frappe.throw(_("Cannot delete Serial No {0}, as it is used in stock transactions").format(self.name))
@@ -226,11 +200,10 @@ def validate_serial_no(sle, item_det):
 			if len(serial_nos) != len(set(serial_nos)):
 				frappe.throw(_("Duplicate Serial No entered for Item {0}").format(sle.item_code), SerialNoDuplicateError)
 
+			serial_no_details = get_serial_no_details(serial_nos)
 			for serial_no in serial_nos:
-				if frappe.db.exists("Serial No", serial_no):
-					sr = frappe.db.get_value("Serial No", serial_no, ["name", "item_code", "batch_no", "sales_order",
-						"delivery_document_no", "delivery_document_type", "warehouse", "purchase_document_type",
-						"purchase_document_no", "company", "status"], as_dict=1)
+				sr = serial_no_details.get(serial_no.upper())
+				if sr:
 
 					if sr.item_code!=sle.item_code:
 						if not allow_serial_nos_with_different_item(serial_no, sle):
@@ -317,6 +290,16 @@ def validate_serial_no(sle, item_det):
 		for serial_no in serial_nos:
 			check_serial_no_validity_on_cancel(serial_no, sle)
 
+def get_serial_no_details(serial_nos):
+	"""Returns details of existing serial nos used in validations, fetched in one query"""
+	if not serial_nos:
+		return {}
+
+	return {d.name.upper(): d for d in frappe.get_all("Serial No",
+		filters={"name": ("in", serial_nos)},
+		fields=["name", "item_code", "batch_no", "sales_order", "delivery_document_no", "delivery_document_type",
+			"warehouse", "purchase_document_type", "purchase_document_no", "company", "status"])}
+
 def check_serial_no_validity_on_cancel(serial_no, sle):
 	sr = frappe.db.get_value("Serial No", serial_no, ["name", "warehouse", "company", "status"], as_dict=1)
 	sr_link = frappe.utils.get_link_to_form("Serial No", serial_no)
@@ -11,6 +11,7 @@ from frappe.utils import flt, nowdate, nowtime
 from erpnext.accounts.doctype.account.test_account import get_inventory_account
 from erpnext.stock.doctype.item.test_item import (
 	create_item,
+	make_item,
 	make_item_variant,
 	set_item_variant_settings,
 )
@@ -143,6 +144,34 @@ class TestStockEntry(ERPNextTestCase):
 
 		self.assertTrue(item_code in items)
 
+	def test_auto_material_request_for_queued_items(self):
+		from erpnext.stock.reorder_item import REORDER_QUEUE, reorder_queued_items
+
+		item_code = make_item("_Test Reorder Queued Item", {
+			"is_stock_item": 1,
+			"reorder_levels": [{
+				"material_request_type": "Purchase",
+				"warehouse": "_Test Warehouse - _TC",
+				"warehouse_reorder_level": 20,
+				"warehouse_reorder_qty": 20
+			}]
+		}).name
+		make_stock_entry(item_code=item_code, target="_Test Warehouse - _TC", qty=50, basic_rate=100)
+		frappe.cache().delete_value(REORDER_QUEUE)
+
+		frappe.db.set_value("Stock Settings", None, "auto_indent", 1)
+
+		# projected qty drops below the reorder level
+		make_stock_entry(item_code=item_code, source="_Test Warehouse - _TC", qty=40)
+		mr_list = reorder_queued_items()
+
+		# nothing changed since the last run
+		self.assertIsNone(reorder_queued_items())
+
+		frappe.db.set_value("Stock Settings", None, "auto_indent", 0)
+
+		self.assertEqual([(d.item_code, d.qty) for mr in mr_list for d in mr.items], [(item_code, 20)])
+
 	def test_material_receipt_gl_entry(self):
 		company = frappe.db.get_value('Warehouse', 'Stores - TCP1', 'company')
 
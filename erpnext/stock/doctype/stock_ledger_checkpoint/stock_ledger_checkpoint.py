@@ -0,0 +1,180 @@
+# Copyright (c) 2021, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+from contextlib import contextmanager
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import add_months, get_last_day, getdate, nowdate
+
+
+class StockLedgerCheckpoint(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("Stock Ledger Checkpoint", ["item_code", "warehouse", "period_end"])
+
+
+@contextmanager
+def cached_checkpoints():
+	"""
+		Cache the latest checkpoint of each item-warehouse for `get_latest_checkpoint` calls within the context,
+		checkpoints invalidated within the context are removed from the cache
+	"""
+	previous_cache = frappe.flags.stock_ledger_checkpoints
+	if previous_cache is None:
+		frappe.flags.stock_ledger_checkpoints = {}
+	try:
+		yield
+	finally:
+		frappe.flags.stock_ledger_checkpoints = previous_cache
+
+
+def get_latest_checkpoint(item_code, warehouse, posting_date):
+	"""Returns the latest checkpoint of an item-warehouse with period ending before `posting_date`."""
+	if not (item_code and warehouse and posting_date):
+		return
+
+	cache = frappe.flags.stock_ledger_checkpoints
+	if cache is None:
+		return query_latest_checkpoint(item_code, warehouse, posting_date)
+
+	key = (item_code, warehouse)
+	if key not in cache:
+		cache[key] = query_latest_checkpoint(item_code, warehouse)
+
+	checkpoint = cache[key]
+	if not checkpoint or getdate(checkpoint.period_end) < getdate(posting_date):
+		return checkpoint
+
+	# back dated lookups need an earlier checkpoint
+	return query_latest_checkpoint(item_code, warehouse, posting_date)
+
+
+def query_latest_checkpoint(item_code, warehouse, posting_date=None):
+	condition = "and period_end < %(posting_date)s" if posting_date else ""
+	checkpoint = frappe.db.sql("""
+		select *
+		from `tabStock Ledger Checkpoint`
+		where item_code = %(item_code)s
+			and warehouse = %(warehouse)s
+			{condition}
+		order by period_end desc
+		limit 1
+	""".format(condition=condition), {"item_code": item_code, "warehouse": warehouse,
+		"posting_date": posting_date}, as_dict=1)
+
+	return checkpoint[0] if checkpoint else None
+
+
+def get_latest_checkpoint_period(posting_date):
+	"""Returns the latest period end before `posting_date` for which checkpoints exist."""
+	period_end = frappe.db.sql("""
+		select max(period_end)
+		from `tabStock Ledger Checkpoint`
+		where period_end < %s
+	""", posting_date)
+
+	return period_end[0][0] if period_end else None
+
+
+def invalidate_checkpoints(item_code, warehouse, posting_date):
+	"""Delete checkpoints which are affected by a change in the ledger on `posting_date`."""
+	invalidate_checkpoints_of_item_warehouses({(item_code, warehouse): posting_date})
+
+
+def invalidate_checkpoints_of_item_warehouses(posting_dates, chunk_size=100):
+	"""
+		Delete checkpoints affected by changes in the ledger of many item-warehouses,
+		`posting_dates` is like {(item_code, warehouse): earliest posting date of the changes}
+	"""
+	item_warehouses = [(key, posting_date) for key, posting_date in posting_dates.items() if posting_date]
+
+	for i in range(0, len(item_warehouses), chunk_size):
+		chunk = item_warehouses[i:i + chunk_size]
+		frappe.db.sql("""
+			delete from `tabStock Ledger Checkpoint`
+			where {conditions}
+		""".format(conditions=" or ".join(["(item_code = %s and warehouse = %s and period_end >= %s)"] * len(chunk))),
+			tuple(value for (item_code, warehouse), posting_date in chunk
+				for value in (item_code, warehouse, posting_date)))
+
+	cache = frappe.flags.stock_ledger_checkpoints
+	if cache:
+		for key, posting_date in item_warehouses:
+			cache.pop(key, None)
+
+
+def create_stock_ledger_checkpoints(period_end=None):
+	"""
+		Create checkpoints for all item-warehouses as of `period_end`,
+		defaults to the end of last month.
+
+		Item-warehouses with entries in the period get the last entry of the period,
+		the rest carry forward the previous checkpoint. Only item-warehouses without
+		a previous checkpoint need a lookup through the whole ledger.
+	"""
+	from erpnext.stock.stock_ledger import get_previous_sle
+
+	period_end = getdate(period_end) if period_end else get_last_day(add_months(nowdate(), -1))
+	previous_period_end = get_latest_checkpoint_period(period_end)
+
+	existing = set(frappe.db.sql("""
+		select item_code, warehouse
+		from `tabStock Ledger Checkpoint`
+		where period_end = %s
+	""", period_end))
+
+	checkpoints = {}
+	if previous_period_end:
+		for sle in frappe.db.sql("""
+			select
+				name, item_code, warehouse, posting_date,
+				qty_after_transaction, valuation_rate, stock_value, stock_queue
+			from `tabStock Ledger Entry`
+			where is_cancelled = 0
+				and posting_date > %s
+				and posting_date <= %s
+			order by posting_date, posting_time, creation
+		""", (previous_period_end, period_end), as_dict=1):
+			checkpoints[(sle.item_code, sle.warehouse)] = sle
+
+		for checkpoint in frappe.db.sql("""
+			select
+				stock_ledger_entry as name, item_code, warehouse, posting_date,
+				qty_after_transaction, valuation_rate, stock_value, stock_queue
+			from `tabStock Ledger Checkpoint`
+			where period_end = %s
+		""", previous_period_end, as_dict=1):
+			checkpoints.setdefault((checkpoint.item_code, checkpoint.warehouse), checkpoint)
+
+	for item_code, warehouse in frappe.db.sql("select item_code, warehouse from `tabBin`"):
+		key = (item_code, warehouse)
+		if key in checkpoints or key in existing:
+			continue
+
+		sle = get_previous_sle({
+			"item_code": item_code,
+			"warehouse": warehouse,
+			"posting_date": period_end,
+			"posting_time": "23:59:59"
+		})
+		if sle:
+			checkpoints[key] = sle
+
+	fields = ["name", "creation", "modified", "owner", "modified_by", "item_code", "warehouse",
+		"period_end", "stock_ledger_entry", "posting_date", "qty_after_transaction",
+		"valuation_rate", "stock_value", "stock_queue"]
+
+	values = []
+	now = frappe.utils.now()
+	for key, sle in checkpoints.items():
+		if key in existing:
+			continue
+
+		values.append((frappe.generate_hash(length=10), now, now, frappe.session.user, frappe.session.user,
+			sle.item_code, sle.warehouse, period_end, sle.name, sle.posting_date,
+			sle.qty_after_transaction, sle.valuation_rate, sle.stock_value, sle.stock_queue))
+
+	frappe.db.bulk_insert("Stock Ledger Checkpoint", fields, values)
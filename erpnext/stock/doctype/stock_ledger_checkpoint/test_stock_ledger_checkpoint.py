@@ -0,0 +1,60 @@
+# Copyright (c) 2021, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+from erpnext.stock.doctype.item.test_item import make_item
+from erpnext.stock.doctype.stock_entry.stock_entry_utils import make_stock_entry
+from erpnext.stock.doctype.stock_ledger_checkpoint.stock_ledger_checkpoint import (
+	cached_checkpoints,
+	create_stock_ledger_checkpoints,
+	get_latest_checkpoint,
+	invalidate_checkpoints,
+)
+from erpnext.stock.utils import get_stock_balance, get_stock_value_on
+from erpnext.tests.utils import ERPNextTestCase
+
+
+class TestStockLedgerCheckpoint(ERPNextTestCase):
+	def test_checkpoint_invalidation(self):
+		item_code = make_item("_Test Item for Stock Checkpoint", {"is_stock_item": 1}).name
+		warehouse = "_Test Warehouse - _TC"
+
+		make_stock_entry(item_code=item_code, target=warehouse, qty=10, basic_rate=100,
+			posting_date="2021-01-15")
+		create_stock_ledger_checkpoints("2021-01-31")
+
+		checkpoint = get_latest_checkpoint(item_code, warehouse, "2021-02-01")
+		self.assertEqual(checkpoint.qty_after_transaction, 10)
+		self.assertEqual(checkpoint.stock_value, 1000)
+
+		# balances after the checkpoint are computed from it
+		make_stock_entry(item_code=item_code, target=warehouse, qty=5, basic_rate=200,
+			posting_date="2021-02-10")
+		self.assertEqual(get_stock_balance(item_code, warehouse, "2021-02-15"), 15)
+		self.assertEqual(get_stock_value_on(warehouse, "2021-02-15", item_code), 2000)
+
+		# back dated entry before the period end invalidates the checkpoint
+		make_stock_entry(item_code=item_code, target=warehouse, qty=5, basic_rate=100,
+			posting_date="2021-01-20")
+		self.assertIsNone(get_latest_checkpoint(item_code, warehouse, "2021-02-01"))
+		self.assertEqual(get_stock_balance(item_code, warehouse, "2021-02-15"), 20)
+		self.assertEqual(get_stock_value_on(warehouse, "2021-02-15", item_code), 2500)
+
+	def test_cached_checkpoints(self):
+		item_code = make_item("_Test Item for Stock Checkpoint 2", {"is_stock_item": 1}).name
+		warehouse = "_Test Warehouse - _TC"
+
+		make_stock_entry(item_code=item_code, target=warehouse, qty=10, basic_rate=100,
+			posting_date="2021-01-15")
+		make_stock_entry(item_code=item_code, target=warehouse, qty=5, basic_rate=100,
+			posting_date="2021-02-15")
+		create_stock_ledger_checkpoints("2021-01-31")
+		create_stock_ledger_checkpoints("2021-02-28")
+
+		with cached_checkpoints():
+			self.assertEqual(get_latest_checkpoint(item_code, warehouse, "2021-03-01").qty_after_transaction, 15)
+			# back dated lookups get the checkpoint of their period
+			self.assertEqual(get_latest_checkpoint(item_code, warehouse, "2021-02-10").qty_after_transaction, 10)
+
+			# invalidated checkpoints are dropped from the cache
+			invalidate_checkpoints(item_code, warehouse, "2021-02-20")
+			self.assertEqual(get_latest_checkpoint(item_code, warehouse, "2021-03-01").qty_after_transaction, 10)
@@ -1,9 +1,11 @@
 # Copyright (c) 2015, Frappe Technologies Pvt. Ltd. and Contributors
 # See license.txt
 
+import datetime
+
 import frappe
 from frappe.core.page.permission_manager.permission_manager import reset
-from frappe.utils import add_days, today
+from frappe.utils import add_days, get_datetime, now, today
 
 from erpnext.stock.doctype.delivery_note.test_delivery_note import (
 	create_delivery_note,
@@ -19,8 +21,8 @@ from erpnext.stock.doctype.stock_ledger_entry.stock_ledger_entry import BackDate
 from erpnext.stock.doctype.stock_reconciliation.test_stock_reconciliation import (
 	create_stock_reconciliation,
 )
-from erpnext.stock.stock_ledger import get_previous_sle
-from erpnext.tests.utils import ERPNextTestCase
+from erpnext.stock.stock_ledger import get_previous_sle, update_entries_after
+from erpnext.tests.utils import ERPNextTestCase, benchmark, get_benchmark_sizes, timer
 
 
 class TestStockLedgerEntry(ERPNextTestCase):
@@ -276,6 +278,136 @@ class TestStockLedgerEntry(ERPNextTestCase):
 		lcv.cancel()
 		pr.cancel()
 
+	def test_batched_reposting(self):
+		company = "_Test Company"
+		item_code = "_Test Item for Reposting"
+		warehouse = "Stores - _TC"
+		fields = ["name", "qty_after_transaction", "valuation_rate", "stock_value",
+			"stock_queue", "stock_value_difference"]
+
+		def get_ledger():
+			return frappe.get_all("Stock Ledger Entry",
+				filters={"item_code": item_code, "warehouse": warehouse, "is_cancelled": 0},
+				fields=fields, order_by="posting_date, posting_time, creation")
+
+		for i, (qty, rate) in enumerate([(10, 100), (5, 120), (8, 110)]):
+			make_purchase_receipt(company=company, posting_date=add_days('2020-04-10', i),
+				warehouse=warehouse, item_code=item_code, qty=qty, rate=rate)
+
+		dn = create_delivery_note(item_code=item_code, qty=12, rate=150, warehouse=warehouse,
+			company=company, expense_account="Cost of Goods Sold - _TC", cost_center="Main - _TC",
+			posting_date='2020-04-20')
+
+		expected_ledger = get_ledger()
+		expected_incoming_rate = dn.items[0].incoming_rate
+
+		# wipe computed values and replay the whole ledger in small batches
+		frappe.db.sql("""update `tabStock Ledger Entry`
+			set qty_after_transaction=0, valuation_rate=0, stock_value=0,
+				stock_queue='[]', stock_value_difference=0
+			where item_code=%s and warehouse=%s""", (item_code, warehouse))
+		frappe.db.set_value("Delivery Note Item", dn.items[0].name, "incoming_rate", 0)
+
+		update_entries_after({
+			"item_code": item_code,
+			"warehouse": warehouse,
+			"posting_date": "2020-04-01",
+			"posting_time": "00:00"
+		}, batch_size=2)
+
+		self.assertEqual(get_ledger(), expected_ledger)
+		self.assertEqual(frappe.db.get_value("Delivery Note Item", dn.items[0].name, "incoming_rate"),
+			expected_incoming_rate)
+
+	@benchmark
+	def test_batched_reposting_benchmark(self):
+		"Reposting a synthetic ledger row by row and in batches computes the same values."
+		item_code = "_Test Item for Reposting"
+		warehouse = "Stores - _TC"
+		args = {"item_code": item_code, "warehouse": warehouse, "posting_date": "2015-01-01", "posting_time": "00:00"}
+
+		def get_ledger():
+			return frappe.db.sql("""select name, qty_after_transaction, valuation_rate, stock_value,
+					stock_queue, stock_value_difference
+				from `tabStock Ledger Entry`
+				where item_code = %s and warehouse = %s
+				order by posting_datetime, creation""", (item_code, warehouse))
+
+		for size in get_benchmark_sizes(20000, 200000):
+			make_synthetic_stock_ledger([item_code], warehouse, size, from_date="2015-01-01")
+
+			with timer(f"Reposting {size} entries row by row"):
+				update_entries_after(args)
+			expected_ledger = get_ledger()
+
+			with timer(f"Reposting {size} entries in batches"):
+				update_entries_after(args, batch_size=1000)
+			self.assertEqual(get_ledger(), expected_ledger)
+
+			frappe.db.sql("delete from `tabStock Ledger Entry` where item_code = %s", item_code)
+
+	def test_posting_datetime(self):
+		se = make_stock_entry(item_code="_Test Item for Reposting", target="Stores - _TC", qty=10,
+			basic_rate=100, posting_date="2020-04-10", posting_time="14:05:32")
+
+		posting_datetime = frappe.db.get_value("Stock Ledger Entry",
+			{"voucher_type": "Stock Entry", "voucher_no": se.name}, "posting_datetime")
+		self.assertEqual(posting_datetime, get_datetime("2020-04-10 14:05:32"))
+
+		# lookups before and at the posting datetime
+		args = {"item_code": "_Test Item for Reposting", "warehouse": "Stores - _TC",
+			"posting_date": "2020-04-10"}
+		self.assertFalse(get_previous_sle(dict(args, posting_time="14:05:31")))
+		self.assertEqual(get_previous_sle(dict(args, posting_time="14:05:32")).qty_after_transaction, 10)
+
+	@benchmark
+	def test_posting_datetime_benchmark(self):
+		"Ledger lookups on timestamp(posting_date, posting_time) and on the indexed posting_datetime."
+		warehouse = "Stores - _TC"
+		queries = {
+			"previous entry": """
+				select name from `tabStock Ledger Entry`
+				where item_code = %(item_code)s and warehouse = %(warehouse)s and is_cancelled = 0
+					and {posting_datetime} < {args_datetime}
+				order by {posting_datetime} desc, creation desc
+				limit 1""",
+			"future entries": """
+				select name from `tabStock Ledger Entry`
+				where item_code = %(item_code)s and warehouse = %(warehouse)s and is_cancelled = 0
+					and {posting_datetime} > {args_datetime}
+				order by {posting_datetime} asc, creation asc""",
+			"future entry count": """
+				select item_code, warehouse, count(name) from `tabStock Ledger Entry`
+				where item_code = %(item_code)s and warehouse = %(warehouse)s and is_cancelled = 0
+					and {posting_datetime} >= {args_datetime}
+				group by item_code, warehouse"""
+		}
+		conditions = {
+			"timestamp": {"posting_datetime": "timestamp(posting_date, posting_time)",
+				"args_datetime": "timestamp(%(posting_date)s, %(posting_time)s)"},
+			"posting_datetime": {"posting_datetime": "posting_datetime", "args_datetime": "%(posting_datetime)s"}
+		}
+
+		for size in get_benchmark_sizes(1000000):
+			# 1000 entries per item, looked up from the middle of its ledger
+			item_codes = ["_Test Posting Datetime Benchmark Item {0}".format(i) for i in range(size // 1000)]
+			make_synthetic_stock_ledger(item_codes, warehouse, 1000, from_date="2015-01-01")
+
+			posting_datetime = get_datetime("2015-01-01") + datetime.timedelta(hours=500)
+			args = [{"item_code": item_code, "warehouse": warehouse, "posting_date": posting_datetime.date(),
+				"posting_time": posting_datetime.time(), "posting_datetime": posting_datetime}
+				for item_code in item_codes[::max(len(item_codes) // 100, 1)]]
+
+			for label, query in queries.items():
+				results = {}
+				for column, condition in conditions.items():
+					with timer(f"{label} of {len(args)} items in {size} entries on {column}"):
+						results[column] = [frappe.db.sql(query.format(**condition), d) for d in args]
+
+				self.assertEqual(results["timestamp"], results["posting_datetime"])
+
+			frappe.db.sql("delete from `tabStock Ledger Entry` where item_code in %s", [tuple(item_codes)])
+
 	def test_sub_contracted_item_costing(self):
 		from erpnext.manufacturing.doctype.production_plan.test_production_plan import make_bom
 
@@ -350,6 +482,40 @@ class TestStockLedgerEntry(ERPNextTestCase):
 			user.remove_roles("Stock Manager")
 
 
+def make_synthetic_stock_ledger(item_codes, warehouse, entries_per_item, from_date, company="_Test Company"):
+	"""
+		Bulk inserts stock ledger entries without vouchers for benchmarks, an hour apart for each item
+		from `from_date`: receipts of 10 units at 100 alternating with issues of 5 units.
+	"""
+	fields = ["name", "creation", "modified", "owner", "modified_by", "docstatus", "item_code", "warehouse",
+		"company", "posting_date", "posting_time", "posting_datetime", "voucher_type", "voucher_no",
+		"actual_qty", "incoming_rate", "qty_after_transaction", "valuation_rate", "stock_value",
+		"stock_value_difference", "stock_queue", "is_cancelled"]
+
+	prefix = "SLE-BENCH-{0}".format(frappe.generate_hash(length=6))
+	start, timestamp = get_datetime(from_date), now()
+
+	values = []
+	for item_index, item_code in enumerate(item_codes):
+		qty_after_transaction = 0
+		for i in range(entries_per_item):
+			posting_datetime = start + datetime.timedelta(hours=i, seconds=item_index)
+			actual_qty = 10 if i % 2 == 0 else -5
+			qty_after_transaction += actual_qty
+
+			values.append(("{0}-{1}-{2}".format(prefix, item_index, i), posting_datetime, timestamp,
+				"Administrator", "Administrator", 1, item_code, warehouse, company, posting_datetime.date(),
+				posting_datetime.time(), posting_datetime, "Stock Entry", "{0}-{1}".format(prefix, item_index),
+				actual_qty, 100 if actual_qty > 0 else 0, qty_after_transaction, 100,
+				qty_after_transaction * 100, actual_qty * 100, "[[{0}, 100]]".format(qty_after_transaction), 0))
+
+			if len(values) >= 10000:
+				frappe.db.bulk_insert("Stock Ledger Entry", fields, values)
+				values = []
+
+	if values:
+		frappe.db.bulk_insert("Stock Ledger Entry", fields, values)
+
 def create_repack_entry(**args):
 	args = frappe._dict(args)
 	repack = frappe.new_doc("Stock Entry")
@@ -0,0 +1,73 @@
+# Copyright (c) 2021, Frappe Technologies Pvt. Ltd. and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+
+class StockLedgerEntrySerialNo(Document):
+	pass
+
+
+def on_doctype_update():
+	frappe.db.add_index("Stock Ledger Entry Serial No", ["serial_no"])
+	frappe.db.add_index("Stock Ledger Entry Serial No", ["stock_ledger_entry"])
+
+
+def make_serial_no_entries(sle_name, serial_nos):
+	"""Map the serial nos of a Stock Ledger Entry, one row per serial no."""
+	if not serial_nos:
+		return
+
+	fields = ["name", "creation", "modified", "owner", "modified_by", "serial_no", "stock_ledger_entry"]
+	now = frappe.utils.now()
+
+	frappe.db.bulk_insert("Stock Ledger Entry Serial No", fields, [
+		(frappe.generate_hash(length=10), now, now, frappe.session.user, frappe.session.user, serial_no, sle_name)
+		for serial_no in serial_nos
+	])
+
+
+def get_serial_no_ledger_entries(serial_nos, filters=None, fields=None, limit=None):
+	"""
+		Returns Stock Ledger Entries of a batch of serial nos with one indexed query,
+		latest first. Cancelled entries are excluded and each row has the matched `serial_no`.
+
+		filters = {
+			"company": "_Test Company",
+			"actual_qty": (">", 0)
+		}
+	"""
+	serial_nos = tuple(set(serial_nos))
+	if not serial_nos:
+		return []
+
+	fields = fields or ["name"]
+	values = {"serial_nos": serial_nos}
+
+	conditions = ""
+	for fieldname, value in (filters or {}).items():
+		operator = "="
+		if isinstance(value, (list, tuple)):
+			operator, value = value
+
+		if operator not in ("=", "!=", ">", "<", ">=", "<="):
+			frappe.throw(frappe._("Invalid operator {0}").format(operator))
+
+		conditions += " and sle.`{0}` {1} %({0})s".format(fieldname, operator)
+		values[fieldname] = value
+
+	return frappe.db.sql("""
+		select sr.serial_no, {fields}
+		from `tabStock Ledger Entry Serial No` sr
+		inner join `tabStock Ledger Entry` sle on sle.name = sr.stock_ledger_entry
+		where sr.serial_no in %(serial_nos)s
+			and sle.is_cancelled = 0
+			{conditions}
+		order by sle.posting_datetime desc, sle.creation desc
+		{limit}
+	""".format(
+		fields=", ".join("sle.`{0}`".format(fieldname) for fieldname in fields),
+		conditions=conditions,
+		limit="limit {0}".format(int(limit)) if limit else ""
+	), values, as_dict=1)
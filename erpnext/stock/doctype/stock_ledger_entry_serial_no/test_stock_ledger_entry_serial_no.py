@@ -0,0 +1,54 @@
+# Copyright (c) 2021, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+import frappe
+
+from erpnext.stock.doctype.delivery_note.test_delivery_note import create_delivery_note
+from erpnext.stock.doctype.serial_no.serial_no import get_serial_nos
+from erpnext.stock.doctype.stock_entry.test_stock_entry import make_serialized_item
+from erpnext.stock.doctype.stock_ledger_entry_serial_no.stock_ledger_entry_serial_no import (
+	get_serial_no_ledger_entries,
+)
+from erpnext.stock.utils import get_serial_nos_data_after_transactions
+from erpnext.tests.utils import ERPNextTestCase
+
+
+class TestStockLedgerEntrySerialNo(ERPNextTestCase):
+	def tearDown(self):
+		frappe.db.rollback()
+
+	def test_serial_no_ledger_entries(self):
+		se = make_serialized_item(target_warehouse="_Test Warehouse - _TC")
+		serial_nos = get_serial_nos(se.get("items")[0].serial_no)
+
+		receipt_sle = frappe.db.get_value("Stock Ledger Entry",
+			{"voucher_type": "Stock Entry", "voucher_no": se.name}, "name")
+		self.assertEqual(
+			sorted(frappe.get_all("Stock Ledger Entry Serial No",
+				filters={"stock_ledger_entry": receipt_sle}, pluck="serial_no")),
+			sorted(serial_nos)
+		)
+
+		dn = create_delivery_note(item_code="_Test Serialized Item With Series", qty=1, serial_no=serial_nos[0])
+
+		# latest entry first, one query for all serial nos
+		entries = get_serial_no_ledger_entries(serial_nos, fields=["voucher_no", "actual_qty"])
+		self.assertEqual((entries[0].serial_no, entries[0].voucher_no), (serial_nos[0], dn.name))
+		self.assertEqual(len(entries), len(serial_nos) + 1)
+
+		incoming = get_serial_no_ledger_entries(serial_nos, filters={"actual_qty": (">", 0)}, fields=["voucher_no"])
+		self.assertEqual({d.voucher_no for d in incoming}, {se.name})
+
+		in_stock = get_serial_nos_data_after_transactions({
+			"item_code": "_Test Serialized Item With Series",
+			"warehouse": "_Test Warehouse - _TC",
+			"posting_date": frappe.utils.add_days(dn.posting_date, 1),
+			"posting_time": "00:00"
+		}).split("\n")
+		self.assertNotIn(serial_nos[0], in_stock)
+		self.assertTrue(set(serial_nos[1:]).issubset(set(in_stock)))
+
+		# cancelled entries are ignored
+		dn.cancel()
+		entries = get_serial_no_ledger_entries([serial_nos[0]], fields=["voucher_no"])
+		self.assertEqual([d.voucher_no for d in entries], [se.name])
@@ -3,6 +3,7 @@
 
 
 import json
+from contextlib import contextmanager
 
 import frappe
 from frappe import _, throw
@@ -121,6 +122,138 @@ def get_item_details(args, doc=None, for_validate=False, overwrite_warehouse=Tru
 
 	return out
 
+@frappe.whitelist()
+def get_item_details_for_items(args, items, doc=None, for_validate=False, overwrite_warehouse=True):
+	"""
+		Returns item details of multiple rows of a transaction, in the order of `items`
+
+		args = parent context, same as `get_item_details`
+		items = [{"item_code": "", "qty": 1.0, "uom": "", "warehouse": "", ...}, ...]
+
+		Values of a row take precedence over `args`. Item Prices, Bins and UOM conversion
+		factors of all rows are fetched upfront instead of row by row.
+	"""
+	args = process_string_args(args)
+	items = process_string_args(items)
+	doc = process_string_args(doc)
+
+	rows = []
+	for item in items:
+		row = frappe._dict(args)
+		row.update(item)
+		rows.append(row)
+
+	out = []
+	with prefetched_item_details(rows):
+		for row in rows:
+			out.append(get_item_details(row, doc, for_validate=for_validate, overwrite_warehouse=overwrite_warehouse)
+				if row.get("item_code") or row.get("barcode") or row.get("serial_no") else {})
+
+	return out
+
+@contextmanager
+def prefetched_item_details(rows):
+	"""
+		Prefetch Item Prices, Bins and UOM conversion factors of the items of `rows`
+		(list of `get_item_details` args), used by `get_item_details` calls within the context
+	"""
+	previous_prefetch = frappe.flags.item_details_prefetch
+	frappe.flags.item_details_prefetch = get_item_details_prefetch(rows)
+	try:
+		yield
+	finally:
+		frappe.flags.item_details_prefetch = previous_prefetch
+
+def get_item_details_prefetch(rows):
+	rows = [process_args(row) for row in rows if row.get("item_code") or row.get("barcode") or row.get("serial_no")]
+	item_codes = list({row.item_code for row in rows if row.item_code})
+	if not item_codes:
+		return
+
+	prefetch = frappe._dict({
+		"item_codes": set(item_codes),
+		"price_lists": {row.price_list for row in rows if row.price_list},
+		"item_prices": {},
+		"packing_units": {},
+		"bins": {},
+		"conversion_factors": {},
+		"variant_of": {},
+		"stock_uoms": {}
+	})
+
+	for item_code, variant_of, stock_uom in frappe.get_all("Item", filters={"name": ("in", item_codes)},
+		fields=["name", "variant_of", "stock_uom"], as_list=1):
+		prefetch.variant_of[item_code] = variant_of
+		prefetch.stock_uoms[item_code] = stock_uom
+
+	# prices and conversion factors of variants fall back to their templates
+	prefetch.item_price_codes = prefetch.item_codes.union(d for d in prefetch.variant_of.values() if d)
+	item_and_template_codes = list(prefetch.item_price_codes)
+
+	if prefetch.price_lists:
+		for item_price in frappe.get_all("Item Price",
+			filters={"item_code": ("in", item_and_template_codes), "price_list": ("in", list(prefetch.price_lists))},
+			fields=["name", "item_code", "price_list", "price_list_rate", "uom", "batch_no", "customer",
+				"supplier", "valid_from", "valid_upto", "packing_unit"]):
+			prefetch.item_prices.setdefault((item_price.item_code, item_price.price_list), []).append(item_price)
+			prefetch.packing_units[item_price.name] = item_price.packing_unit
+
+	for d in frappe.get_all("Bin", filters={"item_code": ("in", item_codes)},
+		fields=["item_code", "warehouse", "projected_qty", "actual_qty", "reserved_qty"]):
+		prefetch.bins[(d.item_code, d.warehouse)] = d
+
+	for parent, uom, conversion_factor in frappe.get_all("UOM Conversion Detail",
+		filters={"parent": ("in", item_and_template_codes), "parenttype": "Item"},
+		fields=["parent", "uom", "conversion_factor"], as_list=1):
+		prefetch.conversion_factors.setdefault((parent, uom), conversion_factor)
+
+	return prefetch
+
+def get_prefetched_item_prices(args, item_code, ignore_party=False):
+	"""Same as `get_item_price`, from Item Prices prefetched by `prefetched_item_details`"""
+	def is_valid_on(item_price, date):
+		return (getdate(item_price.valid_from or '2000-01-01') <= getdate(date)
+			<= getdate(item_price.valid_upto or '2500-12-31'))
+
+	def sort_key(value):
+		# nulls last in descending order, as in the database
+		return (value is not None, value or '')
+
+	item_prices = []
+	for item_price in frappe.flags.item_details_prefetch.item_prices.get((item_code, args.get("price_list")), []):
+		if cstr(item_price.uom) not in ('', cstr(args.get("uom"))):
+			continue
+
+		if cstr(item_price.batch_no) not in ('', cstr(args.get("batch_no"))):
+			continue
+
+		if not ignore_party:
+			if args.get("customer"):
+				if item_price.customer != args.get("customer"): continue
+			elif args.get("supplier"):
+				if item_price.supplier != args.get("supplier"): continue
+			elif item_price.customer or item_price.supplier:
+				continue
+
+		if args.get("transaction_date") and not is_valid_on(item_price, args.get("transaction_date")):
+			continue
+
+		if args.get("posting_date") and not is_valid_on(item_price, args.get("posting_date")):
+			continue
+
+		item_prices.append(item_price)
+
+	item_prices.sort(key=lambda d: (sort_key(d.valid_from), sort_key(d.batch_no), sort_key(d.uom)), reverse=True)
+
+	return [(d.name, d.price_list_rate, d.uom) for d in item_prices]
+
+def is_prefetched(item_code, price_list=None):
+	prefetch = frappe.flags.item_details_prefetch
+	if not prefetch or item_code not in prefetch.item_price_codes:
+		return False
+
+	return not price_list or price_list in prefetch.price_lists
+
 def update_stock(args, out):
 	if (args.get("doctype") == "Delivery Note" or
 		(args.get("doctype") == "Sales Invoice" and args.get('update_stock'))) \
@@ -724,6 +857,9 @@ def insert_item_price(args):
 				frappe.msgprint(_("Item Price added for {0} in Price List {1}").format(args.item_code,
 					args.price_list), alert=True)
 
+			if frappe.flags.item_details_prefetch:
+				frappe.flags.item_details_prefetch.item_price_codes.discard(args.item_code)
+
 def get_item_price(args, item_code, ignore_party=False):
 	"""
 		Get name, price_list_rate from Item Price based on conditions
@@ -735,6 +871,9 @@ def get_item_price(args, item_code, ignore_party=False):
 
 	args['item_code'] = item_code
 
+	if is_prefetched(item_code, args.get("price_list")):
+		return get_prefetched_item_prices(args, item_code, ignore_party)
+
 	conditions = """where item_code=%(item_code)s
 		and price_list=%(price_list)s
 		and ifnull(uom, '') in ('', %(uom)s)"""
@@ -819,9 +958,14 @@ def check_packing_list(price_list_rate_name, desired_qty, item_code):
 	"""
 
 	flag = True
-	item_price = frappe.get_doc("Item Price", price_list_rate_name)
-	if item_price.packing_unit:
-		packing_increment = desired_qty % item_price.packing_unit
+	prefetch = frappe.flags.item_details_prefetch
+	if prefetch and price_list_rate_name in prefetch.packing_units:
+		packing_unit = prefetch.packing_units[price_list_rate_name]
+	else:
+		packing_unit = frappe.db.get_value("Item Price", price_list_rate_name, "packing_unit")
+
+	if packing_unit:
+		packing_increment = desired_qty % packing_unit
 
 		if packing_increment != 0:
 			flag = False
@@ -968,14 +1112,23 @@ def get_serial_no_batchwise(args, sales_order=None):
 
 @frappe.whitelist()
 def get_conversion_factor(item_code, uom):
-	variant_of = frappe.db.get_value("Item", item_code, "variant_of", cache=True)
-	filters = {"parent": item_code, "uom": uom}
-	if variant_of:
-		filters["parent"] = ("in", (item_code, variant_of))
-	conversion_factor = frappe.db.get_value("UOM Conversion Detail",
-		filters, "conversion_factor")
+	prefetch = frappe.flags.item_details_prefetch
+	if prefetch and item_code in prefetch.variant_of:
+		variant_of = prefetch.variant_of[item_code]
+		conversion_factor = (prefetch.conversion_factors.get((item_code, uom))
+			or prefetch.conversion_factors.get((variant_of, uom)))
+		stock_uom = prefetch.stock_uoms[item_code]
+	else:
+		variant_of = frappe.db.get_value("Item", item_code, "variant_of", cache=True)
+		filters = {"parent": item_code, "uom": uom}
+		if variant_of:
+			filters["parent"] = ("in", (item_code, variant_of))
+		conversion_factor = frappe.db.get_value("UOM Conversion Detail",
+			filters, "conversion_factor")
+		stock_uom = None
+
 	if not conversion_factor:
-		stock_uom = frappe.db.get_value("Item", item_code, "stock_uom")
+		stock_uom = stock_uom or frappe.db.get_value("Item", item_code, "stock_uom")
 		conversion_factor = get_uom_conv_factor(uom, stock_uom)
 	return {"conversion_factor": conversion_factor or 1.0}
 
@@ -986,9 +1139,15 @@ def get_projected_qty(item_code, warehouse):
 
 @frappe.whitelist()
 def get_bin_details(item_code, warehouse, company=None):
-	bin_details = frappe.db.get_value("Bin", {"item_code": item_code, "warehouse": warehouse},
-		["projected_qty", "actual_qty", "reserved_qty"], as_dict=True, cache=True) \
-			or {"projected_qty": 0, "actual_qty": 0, "reserved_qty": 0}
+	prefetch = frappe.flags.item_details_prefetch
+	if prefetch and item_code in prefetch.item_codes:
+		bin_details = prefetch.bins.get((item_code, warehouse))
+		bin_details = ({key: bin_details[key] for key in ("projected_qty", "actual_qty", "reserved_qty")}
+			if bin_details else {"projected_qty": 0, "actual_qty": 0, "reserved_qty": 0})
+	else:
+		bin_details = frappe.db.get_value("Bin", {"item_code": item_code, "warehouse": warehouse},
+			["projected_qty", "actual_qty", "reserved_qty"], as_dict=True, cache=True) \
+				or {"projected_qty": 0, "actual_qty": 0, "reserved_qty": 0}
 	if company:
 		bin_details['company_total_stock'] = get_company_total_stock(item_code, company)
 	return bin_details
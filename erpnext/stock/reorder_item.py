@@ -11,6 +11,9 @@ from frappe.utils import add_days, cint, flt, nowdate
 
 import erpnext
 
+# items whose projected qty went down since the last reorder, see `queue_item_for_reorder`
+REORDER_QUEUE = "items_to_reorder"
+
 
 def reorder_item():
 	""" Reorder item if stock reaches reorder level"""
@@ -19,9 +22,36 @@ def reorder_item():
 		return
 
 	if cint(frappe.db.get_value('Stock Settings', None, 'auto_indent')):
+		# all items are checked, queued items need not be checked again
+		frappe.cache().delete_value(REORDER_QUEUE)
 		return _reorder_item()
 
-def _reorder_item():
+def reorder_queued_items():
+	"""
+		Reorder items whose projected qty went down since the last run, without checking all items.
+
+		Changes missed by the queue (e.g. while the cache was flushed) are picked up by the daily `reorder_item`.
+	"""
+	if not (frappe.db.a_row_exists("Company") and frappe.db.a_row_exists("Fiscal Year")):
+		return
+
+	if not cint(frappe.db.get_value('Stock Settings', None, 'auto_indent')):
+		frappe.cache().delete_value(REORDER_QUEUE)
+		return
+
+	items = [frappe.safe_decode(item_code) for item_code in frappe.cache().smembers(REORDER_QUEUE)]
+	if not items:
+		return
+
+	# items queued while this runs are checked in the next run
+	frappe.cache().srem(REORDER_QUEUE, *items)
+	return _reorder_item(items)
+
+def queue_item_for_reorder(item_code):
+	"""Check reorder levels of the item in the next `reorder_queued_items`"""
+	frappe.cache().sadd(REORDER_QUEUE, item_code)
+
+def _reorder_item(items=None):
 	material_requests = {"Purchase": {}, "Transfer": {}, "Material Issue": {}, "Manufacture": {}}
 	warehouse_company = frappe._dict(frappe.db.sql("""select name, company from `tabWarehouse`
 		where disabled=0"""))
@@ -32,11 +62,12 @@ def _reorder_item():
 		where is_stock_item=1 and has_variants=0
 			and disabled=0
 			and (end_of_life is null or end_of_life='0000-00-00' or end_of_life > %(today)s)
+			{condition}
 			and (exists (select name from `tabItem Reorder` ir where ir.parent=item.name)
 				or (variant_of is not null and variant_of != ''
 				and exists (select name from `tabItem Reorder` ir where ir.parent=item.variant_of))
-			)""",
-		{"today": nowdate()})
+			)""".format(condition="and item.name in %(items)s" if items else ""),
+		{"today": nowdate(), "items": tuple(items or [])})
 
 	if not items_to_consider:
 		return
@@ -86,6 +117,7 @@ def _reorder_item():
 
 def get_item_warehouse_projected_qty(items_to_consider):
 	item_warehouse_projected_qty = {}
+	parent_warehouses = frappe._dict(frappe.db.sql("""select name, parent_warehouse from `tabWarehouse`"""))
 
 	for item_code, warehouse, projected_qty in frappe.db.sql("""select item_code, warehouse, projected_qty
 		from tabBin where item_code in ({0})
@@ -98,14 +130,14 @@ def get_item_warehouse_projected_qty(items_to_consider):
 		if warehouse not in item_warehouse_projected_qty.get(item_code):
 			item_warehouse_projected_qty[item_code][warehouse] = flt(projected_qty)
 
-		warehouse_doc = frappe.get_doc("Warehouse", warehouse)
+		parent_warehouse = parent_warehouses.get(warehouse)
 
-		while warehouse_doc.parent_warehouse:
-			if not item_warehouse_projected_qty.get(item_code, {}).get(warehouse_doc.parent_warehouse):
-				item_warehouse_projected_qty.setdefault(item_code, {})[warehouse_doc.parent_warehouse] = flt(projected_qty)
+		while parent_warehouse:
+			if not item_warehouse_projected_qty.get(item_code, {}).get(parent_warehouse):
+				item_warehouse_projected_qty.setdefault(item_code, {})[parent_warehouse] = flt(projected_qty)
 			else:
-				item_warehouse_projected_qty[item_code][warehouse_doc.parent_warehouse] += flt(projected_qty)
-			warehouse_doc = frappe.get_doc("Warehouse", warehouse_doc.parent_warehouse)
+				item_warehouse_projected_qty[item_code][parent_warehouse] += flt(projected_qty)
+			parent_warehouse = parent_warehouses.get(parent_warehouse)
 
 	return item_warehouse_projected_qty
 
@@ -123,6 +155,8 @@ def create_material_request(material_requests):
 
 		frappe.log_error(frappe.get_traceback())
 
+	item_details, conversion_factors = get_item_details_for_material_requests(material_requests)
+
 	for request_type in material_requests:
 		for company in material_requests[request_type]:
 			try:
@@ -139,15 +173,14 @@ def create_material_request(material_requests):
 
 				for d in items:
 					d = frappe._dict(d)
-					item = frappe.get_doc("Item", d.item_code)
+					item = item_details[d.item_code]
 					uom = item.stock_uom
 					conversion_factor = 1.0
 
 					if request_type == 'Purchase':
 						uom = item.purchase_uom or item.stock_uom
 						if uom != item.stock_uom:
-							conversion_factor = frappe.db.get_value("UOM Conversion Detail",
-								{'parent': item.name, 'uom': uom}, 'conversion_factor') or 1.0
+							conversion_factor = conversion_factors.get((item.name, uom)) or 1.0
 
 					must_be_whole_number = frappe.db.get_value("UOM", uom, "must_be_whole_number", cache=True)
 					qty = d.reorder_qty / conversion_factor
@@ -191,6 +224,23 @@ def create_material_request(material_requests):
 
 	return mr_list
 
+def get_item_details_for_material_requests(material_requests):
+	"""Returns details and purchase UOM conversion factors of all items to be requested"""
+	item_codes = list({d["item_code"] for companies in material_requests.values()
+		for items in companies.values() for d in items})
+
+	if not item_codes:
+		return {}, {}
+
+	item_details = {d.name: d for d in frappe.get_all("Item", filters={"name": ("in", item_codes)},
+		fields=["name", "item_name", "description", "item_group", "brand", "stock_uom", "purchase_uom",
+			"lead_time_days"])}
+
+	conversion_factors = {(d.parent, d.uom): d.conversion_factor for d in frappe.get_all("UOM Conversion Detail",
+		filters={"parent": ("in", item_codes), "parenttype": "Item"}, fields=["parent", "uom", "conversion_factor"])}
+
+	return item_details, conversion_factors
+
 def send_email_notification(mr_list):
 	""" Notify user about auto creation of indent"""
 
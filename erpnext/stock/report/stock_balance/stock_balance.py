@@ -9,6 +9,9 @@ from frappe import _
 from frappe.utils import cint, date_diff, flt, getdate
 
 import erpnext
+from erpnext.stock.doctype.stock_ledger_checkpoint.stock_ledger_checkpoint import (
+	get_latest_checkpoint_period,
+)
 from erpnext.stock.report.stock_ageing.stock_ageing import FIFOSlots, get_average_age
 from erpnext.stock.report.stock_ledger.stock_ledger import get_item_group_condition
 from erpnext.stock.utils import add_additional_uom_columns, is_reposting_item_valuation_in_progress
@@ -29,18 +32,17 @@ def execute(filters=None):
 	include_uom = filters.get("include_uom")
 	columns = get_columns(filters)
 	items = get_items(filters)
-	sle = get_stock_ledger_entries(filters, items)
 
 	if filters.get('show_stock_ageing_data'):
 		filters['show_warehouse_wise_stock'] = True
-		item_wise_fifo_queue = FIFOSlots(filters, sle).generate()
+
+	iwb_map, item_wise_fifo_queue = get_item_warehouse_map_in_chunks(filters, items)
 
 	# if no stock ledger entry found return
-	if not sle:
+	if not iwb_map:
 		return columns, []
 
-	iwb_map = get_item_warehouse_map(filters, sle)
-	item_map = get_item_details(items, sle, filters)
+	item_map = get_item_details(items or list({item for (company, item, warehouse) in iwb_map}), [], filters)
 	item_reorder_detail_map = get_item_reorder_details(item_map.keys())
 
 	data = []
@@ -153,14 +155,29 @@ def get_conditions(filters):
 
 	return conditions
 
-def get_stock_ledger_entries(filters, items):
-	item_conditions_sql = ''
-	if items:
-		item_conditions_sql = ' and sle.item_code in ({})'\
-			.format(', '.join(frappe.db.escape(i, percent=False) for i in items))
+def get_item_conditions(items):
+	if not items:
+		return ''
 
+	return ' and sle.item_code in ({})'.format(', '.join(frappe.db.escape(i, percent=False) for i in items))
+
+def get_stock_ledger_entries(filters, items, checkpoint_period=None):
+	"""
+		Returns stock ledger entries upto `to_date` in posting order.
+
+		If `checkpoint_period` is set, entries upto the period are skipped for item-warehouses
+		which have a Stock Ledger Checkpoint for the period, their balance is taken from the checkpoint.
+	"""
+	item_conditions_sql = get_item_conditions(items)
 	conditions = get_conditions(filters)
 
+	if checkpoint_period:
+		conditions += """ and (sle.posting_date > {0} or not exists (
+			select name from `tabStock Ledger Checkpoint` checkpoint
+			where checkpoint.period_end = {0}
+				and checkpoint.item_code = sle.item_code
+				and checkpoint.warehouse = sle.warehouse))""".format(frappe.db.escape(str(checkpoint_period)))
+
 	return frappe.db.sql("""
 		select
 			sle.item_code, warehouse, sle.posting_date, sle.actual_qty, sle.valuation_rate,
@@ -175,23 +192,105 @@ def get_stock_ledger_entries(filters, items):
 
 def get_item_warehouse_map(filters, sle):
 	iwb_map = {}
-	from_date = getdate(filters.get("from_date"))
-	to_date = getdate(filters.get("to_date"))
+	float_precision = cint(frappe.db.get_default("float_precision")) or 3
+
+	update_item_warehouse_map(iwb_map, sle, filters, float_precision)
+	iwb_map = filter_items_with_no_transactions(iwb_map, float_precision)
 
+	return iwb_map
+
+def get_item_warehouse_map_in_chunks(filters, items, chunk_size=1000):
+	"""
+		Build the item-warehouse map by folding stock ledger entries of `chunk_size` items at a time.
+		Entries of different items are independent, so only the entries of one chunk
+		and the balances of the map are held in memory.
+
+		Opening balances are taken from the latest Stock Ledger Checkpoint before `from_date`,
+		except with stock ageing which needs all entries for FIFO slots.
+
+		Returns the map and FIFO slots (if stock ageing data is to be shown).
+	"""
+	iwb_map = {}
+	item_wise_fifo_queue = {} if filters.get('show_stock_ageing_data') else None
 	float_precision = cint(frappe.db.get_default("float_precision")) or 3
 
+	checkpoint_period = None
+	if item_wise_fifo_queue is None:
+		checkpoint_period = get_latest_checkpoint_period(getdate(filters.get("from_date")))
+		if checkpoint_period:
+			iwb_map.update(get_checkpoint_balances(filters, items, checkpoint_period))
+
+	item_codes = items or get_items_with_stock_ledger_entries(filters)
+	for i in range(0, len(item_codes), chunk_size):
+		sle = get_stock_ledger_entries(filters, item_codes[i:i + chunk_size], checkpoint_period)
+		update_item_warehouse_map(iwb_map, sle, filters, float_precision)
+
+		if item_wise_fifo_queue is not None:
+			item_wise_fifo_queue.update(FIFOSlots(filters, sle).generate())
+
+	iwb_map = filter_items_with_no_transactions(iwb_map, float_precision)
+
+	return iwb_map, item_wise_fifo_queue
+
+def get_items_with_stock_ledger_entries(filters):
+	conditions = ""
+	if filters.get("company"):
+		conditions += " and company = %s" % frappe.db.escape(filters.get("company"))
+
+	return frappe.db.sql_list("""
+		select distinct item_code
+		from `tabStock Ledger Entry`
+		where is_cancelled = 0 {0}
+		order by item_code
+	""".format(conditions))
+
+def get_checkpoint_balances(filters, items, checkpoint_period):
+	"""Returns balances of item-warehouses as per Stock Ledger Checkpoints of `checkpoint_period`"""
+	iwb_map = {}
+
+	for d in frappe.db.sql("""
+		select
+			sle.company, checkpoint.item_code, checkpoint.warehouse,
+			checkpoint.qty_after_transaction, checkpoint.stock_value, checkpoint.valuation_rate
+		from
+			`tabStock Ledger Checkpoint` checkpoint
+			inner join `tabStock Ledger Entry` sle on sle.name = checkpoint.stock_ledger_entry
+		where checkpoint.period_end = %s %s %s
+		""" % (frappe.db.escape(str(checkpoint_period)), get_item_conditions(items), get_conditions(filters)), #nosec
+		as_dict=1):
+		qty_dict = get_empty_qty_dict()
+		qty_dict.update({
+			"opening_qty": flt(d.qty_after_transaction),
+			"opening_val": flt(d.stock_value),
+			"bal_qty": flt(d.qty_after_transaction),
+			"bal_val": flt(d.stock_value),
+			"val_rate": flt(d.valuation_rate)
+		})
+		iwb_map[(d.company, d.item_code, d.warehouse)] = qty_dict
+
+	return iwb_map
+
+def get_empty_qty_dict():
+	return frappe._dict({
+		"opening_qty": 0.0, "opening_val": 0.0,
+		"in_qty": 0.0, "in_val": 0.0,
+		"out_qty": 0.0, "out_val": 0.0,
+		"bal_qty": 0.0, "bal_val": 0.0,
+		"val_rate": 0.0
+	})
+
+def update_item_warehouse_map(iwb_map, sle, filters, float_precision):
+	"""Fold stock ledger entries (in posting order) into balances of the item-warehouse map"""
+	from_date = getdate(filters.get("from_date"))
+	to_date = getdate(filters.get("to_date"))
+	stock_reco_purposes = {}
+
 	for d in sle:
 		key = (d.company, d.item_code, d.warehouse)
 		if key not in iwb_map:
-			iwb_map[key] = frappe._dict({
-				"opening_qty": 0.0, "opening_val": 0.0,
-				"in_qty": 0.0, "in_val": 0.0,
-				"out_qty": 0.0, "out_val": 0.0,
-				"bal_qty": 0.0, "bal_val": 0.0,
-				"val_rate": 0.0
-			})
+			iwb_map[key] = get_empty_qty_dict()
 
-		qty_dict = iwb_map[(d.company, d.item_code, d.warehouse)]
+		qty_dict = iwb_map[key]
 
 		if d.voucher_type == "Stock Reconciliation" and not d.batch_no:
 			qty_diff = flt(d.qty_after_transaction) - flt(qty_dict.bal_qty)
@@ -200,9 +299,14 @@ def get_item_warehouse_map(filters, sle):
 
 		value_diff = flt(d.stock_value_difference)
 
-		if d.posting_date < from_date or (d.posting_date == from_date
-			and d.voucher_type == "Stock Reconciliation" and
-			frappe.db.get_value("Stock Reconciliation", d.voucher_no, "purpose") == "Opening Stock"):
+		is_opening_stock = False
+		if d.posting_date == from_date and d.voucher_type == "Stock Reconciliation":
+			if d.voucher_no not in stock_reco_purposes:
+				stock_reco_purposes[d.voucher_no] = frappe.db.get_value("Stock Reconciliation",
+					d.voucher_no, "purpose")
+			is_opening_stock = stock_reco_purposes[d.voucher_no] == "Opening Stock"
+
+		if d.posting_date < from_date or is_opening_stock:
 			qty_dict.opening_qty += qty_diff
 			qty_dict.opening_val += value_diff
 
@@ -218,10 +322,6 @@ def get_item_warehouse_map(filters, sle):
 		qty_dict.bal_qty += qty_diff
 		qty_dict.bal_val += value_diff
 
-	iwb_map = filter_items_with_no_transactions(iwb_map, float_precision)
-
-	return iwb_map
-
 def filter_items_with_no_transactions(iwb_map, float_precision):
 	for (company, item, warehouse) in sorted(iwb_map):
 		qty_dict = iwb_map[(company, item, warehouse)]
@@ -0,0 +1,97 @@
+# Copyright (c) 2021, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+import tracemalloc
+
+import frappe
+
+from erpnext.stock.doctype.item.test_item import make_item
+from erpnext.stock.doctype.stock_entry.stock_entry_utils import make_stock_entry
+from erpnext.stock.doctype.stock_ledger_entry.test_stock_ledger_entry import make_synthetic_stock_ledger
+from erpnext.stock.doctype.stock_ledger_checkpoint.stock_ledger_checkpoint import (
+	create_stock_ledger_checkpoints,
+)
+from erpnext.stock.report.stock_balance.stock_balance import (
+	get_item_warehouse_map,
+	get_item_warehouse_map_in_chunks,
+	get_stock_ledger_entries,
+)
+from erpnext.tests.utils import ERPNextTestCase, benchmark, get_benchmark_sizes, timer
+
+
+class TestStockBalance(ERPNextTestCase):
+	def setUp(self):
+		self.warehouse = "_Test Warehouse - _TC"
+		self.items = [
+			make_item("_Test Stock Balance Item {0}".format(i), {"is_stock_item": 1}).name
+			for i in range(3)
+		]
+
+		for i, item_code in enumerate(self.items):
+			make_stock_entry(item_code=item_code, target=self.warehouse, qty=10, basic_rate=100,
+				posting_date="2021-01-10")
+			make_stock_entry(item_code=item_code, source=self.warehouse, qty=i + 1,
+				posting_date="2021-01-20")
+			make_stock_entry(item_code=item_code, target=self.warehouse, qty=5, basic_rate=200,
+				posting_date="2021-02-10")
+
+		self.filters = frappe._dict(
+			company="_Test Company",
+			from_date="2021-02-01",
+			to_date="2021-02-28"
+		)
+
+	def test_balances_in_chunks(self):
+		"Balances folded one item at a time match the balances of the whole ledger."
+		expected = get_item_warehouse_map(self.filters,
+			get_stock_ledger_entries(self.filters, self.items))
+
+		iwb_map, _ = get_item_warehouse_map_in_chunks(self.filters, self.items, chunk_size=1)
+		self.assertEqual(iwb_map, expected)
+
+		for i, item_code in enumerate(self.items):
+			qty_dict = iwb_map[("_Test Company", item_code, self.warehouse)]
+			self.assertEqual(qty_dict.opening_qty, 10 - (i + 1))
+			self.assertEqual(qty_dict.in_qty, 5)
+			self.assertEqual(qty_dict.bal_qty, 15 - (i + 1))
+
+	def test_opening_balances_from_checkpoint(self):
+		expected, _ = get_item_warehouse_map_in_chunks(self.filters, self.items)
+
+		create_stock_ledger_checkpoints("2021-01-31")
+		iwb_map, _ = get_item_warehouse_map_in_chunks(self.filters, self.items)
+
+		self.assertEqual(iwb_map, expected)
+
+	@benchmark
+	def test_balances_benchmark(self):
+		"Time and peak memory of balances folded from the whole ledger and in chunks of items."
+		filters = frappe._dict(company="_Test Company", from_date="2015-01-20", to_date="2015-02-28")
+
+		def measure(label, func):
+			tracemalloc.start()
+			try:
+				with timer(label):
+					result = func()
+				print(f"{label}: {tracemalloc.get_traced_memory()[1] / 2**20:.1f} MiB at peak")
+			finally:
+				tracemalloc.stop()
+
+			return result
+
+		sizes = get_benchmark_sizes(1000000, 5000000, 10000000)
+		for size in sizes:
+			# 1000 entries per item
+			items = ["_Test Stock Balance Benchmark Item {0:05d}".format(i) for i in range(size // 1000)]
+			make_synthetic_stock_ledger(items, self.warehouse, 1000, from_date="2015-01-01")
+
+			iwb_map, _ = measure(f"Balances of {size} entries in chunks",
+				lambda: get_item_warehouse_map_in_chunks(filters, items))
+
+			# the whole ledger is only loaded for the smallest size, as it takes gigabytes for the larger ones
+			if size == min(sizes):
+				expected = measure(f"Balances of {size} entries from the whole ledger",
+					lambda: get_item_warehouse_map(filters, get_stock_ledger_entries(filters, items)))
+				self.assertEqual(iwb_map, expected)
+
+			frappe.db.sql("delete from `tabStock Ledger Entry` where item_code in %s", [tuple(items)])
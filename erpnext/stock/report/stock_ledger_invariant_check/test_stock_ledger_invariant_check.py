@@ -0,0 +1,31 @@
+# Copyright (c) 2021, Frappe Technologies Pvt. Ltd. and Contributors
+# See license.txt
+
+import json
+
+import frappe
+
+from erpnext.stock.report.stock_ledger_invariant_check.stock_ledger_invariant_check import (
+	add_invariant_check_fields,
+)
+from erpnext.stock.valuation import COMPRESS_QUEUE_ABOVE, dump_stock_queue
+from erpnext.tests.utils import ERPNextTestCase
+
+
+class TestStockLedgerInvariantCheck(ERPNextTestCase):
+	def test_compressed_stock_queue(self):
+		queue = [[1, 10 + i] for i in range(COMPRESS_QUEUE_ABOVE + 1)]
+		stock_value = sum(qty * rate for qty, rate in queue)
+		sle = frappe._dict(
+			voucher_type="Stock Entry", batch_no=None,
+			actual_qty=len(queue), qty_after_transaction=len(queue),
+			stock_value=stock_value, stock_value_difference=stock_value,
+			valuation_rate=stock_value / len(queue),
+			stock_queue=dump_stock_queue(queue, compress=True),
+		)
+
+		add_invariant_check_fields([sle])
+
+		self.assertEqual(json.loads(sle.stock_queue), queue)
+		self.assertEqual(sle.fifo_queue_qty, len(queue))
+		self.assertEqual(sle.fifo_value_diff, 0)
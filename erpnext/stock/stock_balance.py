@@ -167,6 +167,8 @@ def get_planned_qty(item_code, warehouse):
 
 
 def update_bin_qty(item_code, warehouse, qty_dict=None):
+	from erpnext.selling.page.point_of_sale.point_of_sale import clear_item_availability_cache
+	from erpnext.stock.doctype.bin.bin import update_reorder_queue
 	from erpnext.stock.utils import get_bin
 	bin = get_bin(item_code, warehouse)
 	mismatch = False
@@ -176,9 +178,12 @@ def update_bin_qty(item_code, warehouse, qty_dict=None):
 			mismatch = True
 
 	if mismatch:
+		previous_projected_qty = bin.projected_qty
 		bin.set_projected_qty()
 		bin.db_update()
 		bin.clear_cache()
+		update_reorder_queue(item_code, bin.projected_qty, previous_projected_qty)
+		clear_item_availability_cache(item_code, warehouse)
 
 def set_stock_balance_as_per_serial_no(item_code=None, posting_date=None, posting_time=None,
 	 	fiscal_year=None):
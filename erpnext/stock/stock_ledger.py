@@ -1,8 +1,9 @@
 # Copyright (c) 2015, Frappe Technologies Pvt. Ltd. and Contributors
 # License: GNU General Public License v3. See license.txt
 
-import copy
+import datetime
 import json
+from collections import defaultdict
 
 import frappe
 from frappe import _
@@ -10,13 +11,23 @@ from frappe.model.meta import get_field_precision
 from frappe.utils import cint, cstr, flt, get_link_to_form, getdate, now, nowdate
 
 import erpnext
+from erpnext.stock.doctype.bin.bin import update_latest_posting_datetime
 from erpnext.stock.doctype.bin.bin import update_qty as update_bin_qty
+from erpnext.stock.doctype.stock_ledger_checkpoint.stock_ledger_checkpoint import (
+	cached_checkpoints,
+	get_latest_checkpoint,
+	invalidate_checkpoints_of_item_warehouses,
+)
+from erpnext.stock.doctype.stock_ledger_entry_serial_no.stock_ledger_entry_serial_no import (
+	get_serial_no_ledger_entries,
+)
 from erpnext.stock.utils import (
+	get_combine_datetime,
 	get_incoming_outgoing_rate_for_cancel,
 	get_or_make_bin,
 	get_valuation_method,
 )
-from erpnext.stock.valuation import FIFOValuation
+from erpnext.stock.valuation import FIFOValuation, dump_stock_queue, load_stock_queue
 
 
 class NegativeStockError(frappe.ValidationError): pass
@@ -25,6 +36,7 @@ class SerialNoExistsInFutureTransaction(frappe.ValidationError):
 
 _exceptions = frappe.local('stockledger_exceptions')
 
+@cached_checkpoints()
 def make_sl_entries(sl_entries, allow_negative_stock=False, via_landed_cost_voucher=False):
 	from erpnext.controllers.stock_controller import future_sle_exists
 	if sl_entries:
@@ -36,6 +48,14 @@ def make_sl_entries(sl_entries, allow_negative_stock=False, via_landed_cost_vouc
 		args = get_args_for_future_sle(sl_entries[0])
 		future_sle_exists(args, sl_entries)
 
+		# checkpoints of the voucher's item-warehouses are invalidated from the earliest entry, in one go
+		posting_dates = {}
+		for sle in sl_entries:
+			key = (sle.item_code, sle.warehouse)
+			if sle.posting_date and (key not in posting_dates or getdate(sle.posting_date) < posting_dates[key]):
+				posting_dates[key] = getdate(sle.posting_date)
+		invalidate_checkpoints_of_item_warehouses(posting_dates)
+
 		for sle in sl_entries:
 			if sle.serial_no:
 				validate_serial_no(sle)
@@ -67,6 +87,7 @@ def make_sl_entries(sl_entries, allow_negative_stock=False, via_landed_cost_vouc
 				bin_name = get_or_make_bin(args.get("item_code"), args.get("warehouse"))
 				repost_current_voucher(args, allow_negative_stock, via_landed_cost_voucher)
 				update_bin_qty(bin_name, args)
+				update_latest_posting_datetime(bin_name, args)
 			else:
 				frappe.msgprint(_("Item {0} ignored since it is not a stock item").format(args.get("item_code")))
 
@@ -106,27 +127,33 @@ def get_args_for_future_sle(row):
 def validate_serial_no(sle):
 	from erpnext.stock.doctype.serial_no.serial_no import get_serial_nos
 
-	for sn in get_serial_nos(sle.serial_no):
-		args = copy.deepcopy(sle)
-		args.serial_no = sn
-		args.warehouse = ''
+	serial_nos = get_serial_nos(sle.serial_no)
+	filters = {
+		"item_code": sle.item_code,
+		"posting_datetime": (">", get_combine_datetime(sle.posting_date or "1900-01-01", sle.posting_time or "00:00"))
+	}
+	if sle.get("name"):
+		filters["name"] = ("!=", sle.name)
 
-		vouchers = []
-		for row in get_stock_ledger_entries(args, '>'):
-			voucher_type = frappe.bold(row.voucher_type)
-			voucher_no = frappe.bold(get_link_to_form(row.voucher_type, row.voucher_no))
-			vouchers.append(f'{voucher_type} {voucher_no}')
+	# future transactions of all the serial nos, in one query
+	vouchers = {}
+	for row in get_serial_no_ledger_entries(serial_nos, filters=filters, fields=["voucher_type", "voucher_no"]):
+		voucher_type = frappe.bold(row.voucher_type)
+		voucher_no = frappe.bold(get_link_to_form(row.voucher_type, row.voucher_no))
+		vouchers.setdefault(row.serial_no.upper(), []).append(f'{voucher_type} {voucher_no}')
 
-		if vouchers:
-			serial_no = frappe.bold(sn)
-			msg = (f'''The serial no {serial_no} has been used in the future transactions so you need to cancel them first.
-				The list of the transactions are as below.''' + '<br><br><ul><li>')
+	if vouchers:
+		msg = ('The serial nos below have been used in the future transactions so you need to cancel them first.'
+			+ '<br><br><ul>')
 
-			msg += '</li><li>'.join(vouchers)
-			msg += '</li></ul>'
+		for sn in serial_nos:
+			if sn.upper() in vouchers:
+				msg += f'<li>{frappe.bold(sn)}<ul><li>' + '</li><li>'.join(vouchers.pop(sn.upper())) + '</li></ul></li>'
 
-			title = 'Cannot Submit' if not sle.get('is_cancelled') else 'Cannot Cancel'
-			frappe.throw(_(msg), title=_(title), exc=SerialNoExistsInFutureTransaction)
+		msg += '</ul>'
+
+		title = 'Cannot Submit' if not sle.get('is_cancelled') else 'Cannot Cancel'
+		frappe.throw(_(msg), title=_(title), exc=SerialNoExistsInFutureTransaction)
 
 def validate_cancellation(args):
 	if args[0].get("is_cancelled"):
@@ -160,11 +187,13 @@ def make_entry(args, allow_negative_stock=False, via_landed_cost_voucher=False):
 	sle.submit()
 	return sle
 
+@cached_checkpoints()
 def repost_future_sle(args=None, voucher_type=None, voucher_no=None, allow_negative_stock=None, via_landed_cost_voucher=False, doc=None):
 	if not args and voucher_type and voucher_no:
 		args = get_items_to_be_repost(voucher_type, voucher_no, doc)
 
 	distinct_item_warehouses = get_distinct_item_warehouse(args, doc)
+	batch_size = get_reposting_batch_size()
 
 	i = get_current_index(doc) or 0
 	while i < len(args):
@@ -177,7 +206,8 @@ def repost_future_sle(args=None, voucher_type=None, voucher_no=None, allow_negat
 			'posting_time': args[i].get('posting_time'),
 			'creation': args[i].get('creation'),
 			'distinct_item_warehouses': distinct_item_warehouses
-		}, allow_negative_stock=allow_negative_stock, via_landed_cost_voucher=via_landed_cost_voucher)
+		}, allow_negative_stock=allow_negative_stock, via_landed_cost_voucher=via_landed_cost_voucher,
+			batch_size=batch_size)
 
 		distinct_item_warehouses[(args[i].get('item_code'), args[i].get('warehouse'))].reposting_status = True
 
@@ -249,6 +279,14 @@ def get_current_index(doc=None):
 	if doc and doc.current_index:
 		return doc.current_index
 
+def get_reposting_batch_size():
+	"""Batch size for replaying future SLEs, 0 if batched reposting is disabled."""
+	settings = frappe.get_cached_doc("Stock Reposting Settings")
+	if not settings.batched_reposting:
+		return 0
+
+	return cint(settings.reposting_batch_size) or 1000
+
 class update_entries_after(object):
 	"""
 		update valution rate and qty after transaction
@@ -262,8 +300,12 @@ class update_entries_after(object):
 				"posting_date": "2012-12-12",
 				"posting_time": "12:00"
 			}
+
+		:param batch_size: if set, future SLEs are replayed in memory and
+			written back with one bulk update per `batch_size` entries
 	"""
-	def __init__(self, args, allow_zero_rate=False, allow_negative_stock=None, via_landed_cost_voucher=False, verbose=1):
+	def __init__(self, args, allow_zero_rate=False, allow_negative_stock=None, via_landed_cost_voucher=False, verbose=1,
+		batch_size=None):
 		self.exceptions = {}
 		self.verbose = verbose
 		self.allow_zero_rate = allow_zero_rate
@@ -283,6 +325,12 @@ class update_entries_after(object):
 		self.new_items_found = False
 		self.distinct_item_warehouses = args.get("distinct_item_warehouses", frappe._dict())
 
+		self.batch_size = cint(batch_size)
+		self.pending_sle_updates = []
+		self.pending_rate_updates = defaultdict(dict)
+		self.transaction_item_codes = {}
+		self.compress_stock_queue = cint(frappe.get_cached_doc("Stock Reposting Settings").compress_stock_queue)
+
 		self.data = frappe._dict()
 		self.initialize_previous_data(self.args)
 		self.build()
@@ -322,7 +370,7 @@ class update_entries_after(object):
 
 		warehouse_dict.update({
 			"prev_stock_value": previous_sle.stock_value or 0.0,
-			"stock_queue": json.loads(previous_sle.stock_queue or "[]"),
+			"stock_queue": load_stock_queue(previous_sle.stock_queue),
 			"stock_value_difference": 0.0
 		})
 
@@ -331,10 +379,13 @@ class update_entries_after(object):
 
 		if self.args.get("sle_id"):
 			self.process_sle_against_current_timestamp()
+			self.flush_pending_updates()
 			if not future_sle_exists(self.args):
 				self.update_bin()
 		else:
 			entries_to_fix = self.get_future_entries_to_fix()
+			if self.batch_size:
+				self.prefetch_transaction_item_codes(entries_to_fix)
 
 			i = 0
 			while i < len(entries_to_fix):
@@ -346,29 +397,45 @@ class update_entries_after(object):
 				if sle.dependant_sle_voucher_detail_no:
 					entries_to_fix = self.get_dependent_entries_to_fix(entries_to_fix, sle)
 
+			self.flush_pending_updates()
 			self.update_bin()
 
+		self.invalidate_checkpoints()
+
 		if self.exceptions:
 			self.raise_exceptions()
 
+	def invalidate_checkpoints(self):
+		# checkpoints after the reposted entries are stale, including dependent warehouses.
+		# current voucher's checkpoints are already invalidated in make_sl_entries
+		if self.args.get("sle_id"):
+			return
+
+		invalidate_checkpoints_of_item_warehouses({(self.item_code, warehouse): data.first_posting_date
+			for warehouse, data in self.data.items() if data.get("first_posting_date")})
+
 	def process_sle_against_current_timestamp(self):
 		sl_entries = self.get_sle_against_current_voucher()
 		for sle in sl_entries:
 			self.process_sle(sle)
 
 	def get_sle_against_current_voucher(self):
-		self.args['time_format'] = '%H:%i:%s'
+		# entries in the same second as the current voucher
+		posting_datetime = get_combine_datetime(self.args.posting_date, self.args.posting_time).replace(microsecond=0)
+		self.args['posting_datetime'] = posting_datetime
+		self.args['next_posting_datetime'] = posting_datetime + datetime.timedelta(seconds=1)
 
 		return frappe.db.sql("""
 			select
-				*, timestamp(posting_date, posting_time) as "timestamp"
+				*, posting_datetime as "timestamp"
 			from
 				`tabStock Ledger Entry`
 			where
 				item_code = %(item_code)s
 				and warehouse = %(warehouse)s
 				and is_cancelled = 0
-				and timestamp(posting_date, time_format(posting_time, %(time_format)s)) = timestamp(%(posting_date)s, time_format(%(posting_time)s, %(time_format)s))
+				and posting_datetime >= %(posting_datetime)s
+				and posting_datetime < %(next_posting_datetime)s
 
 			order by
 				creation ASC
@@ -414,6 +481,7 @@ class update_entries_after(object):
 				self.new_items_found = True
 
 	def append_future_sle_for_dependant(self, dependant_sle, entries_to_fix):
+		self.flush_pending_updates()
 		self.initialize_previous_data(dependant_sle)
 
 		args = self.data[dependant_sle.warehouse].previous_sle \
@@ -428,6 +496,8 @@ class update_entries_after(object):
 
 		# previous sle data for this warehouse
 		self.wh_data = self.data[sle.warehouse]
+		if not self.wh_data.get("first_posting_date"):
+			self.wh_data.first_posting_date = sle.posting_date
 
 		if (sle.serial_no and not self.via_landed_cost_voucher) or not cint(self.allow_negative_stock):
 			# validate negative stock for serialized items, fifo valuation
@@ -473,14 +543,49 @@ class update_entries_after(object):
 		sle.qty_after_transaction = self.wh_data.qty_after_transaction
 		sle.valuation_rate = self.wh_data.valuation_rate
 		sle.stock_value = self.wh_data.stock_value
-		sle.stock_queue = json.dumps(self.wh_data.stock_queue)
+		sle.stock_queue = dump_stock_queue(self.wh_data.stock_queue, self.compress_stock_queue)
 		sle.stock_value_difference = stock_value_difference
 		sle.doctype="Stock Ledger Entry"
-		frappe.get_doc(sle).db_update()
+		self.update_sle(sle)
 
 		if not self.args.get("sle_id"):
 			self.update_outgoing_rate_on_transaction(sle)
 
+	def update_sle(self, sle):
+		if not self.batch_size:
+			frappe.get_doc(sle).db_update()
+			return
+
+		self.pending_sle_updates.append(sle)
+		if len(self.pending_sle_updates) >= self.batch_size:
+			self.flush_pending_updates()
+
+	def flush_pending_updates(self):
+		"""
+			Write buffered SLE and transaction rate updates to the database.
+			Must be called before anything that reads them back from the database,
+			e.g. valuation rate fallbacks or rates of return entries.
+		"""
+		if self.pending_sle_updates:
+			bulk_update_sle(self.pending_sle_updates)
+			self.pending_sle_updates = []
+
+		for (doctype, fieldname), values in self.pending_rate_updates.items():
+			bulk_update_values(doctype, {fieldname: values})
+		self.pending_rate_updates.clear()
+
+	def prefetch_transaction_item_codes(self, entries):
+		"""Fetch item codes of sales transaction rows with one query per doctype."""
+		voucher_detail_nos = defaultdict(set)
+		for sle in entries:
+			if sle.voucher_detail_no and sle.voucher_type in ("Delivery Note", "Sales Invoice"):
+				voucher_detail_nos[sle.voucher_type + " Item"].add(sle.voucher_detail_no)
+
+		for doctype, names in voucher_detail_nos.items():
+			for name, item_code in frappe.get_all(doctype, filters={"name": ("in", list(names))},
+				fields=["name", "item_code"], as_list=1):
+				self.transaction_item_codes[(doctype, name)] = item_code
+
 	def validate_negative_stock(self, sle):
 		"""
 			validate negative stock for entries current datetime onwards
@@ -499,6 +604,7 @@ class update_entries_after(object):
 	def get_dynamic_incoming_outgoing_rate(self, sle):
 		# Get updated incoming/outgoing rate from transaction
 		if sle.recalculate_rate:
+			self.flush_pending_updates()
 			rate = self.get_incoming_outgoing_rate_from_transaction(sle)
 
 			if flt(sle.actual_qty) >= 0:
@@ -566,6 +672,7 @@ class update_entries_after(object):
 			self.recalculate_amounts_in_stock_entry(sle.voucher_no)
 
 	def recalculate_amounts_in_stock_entry(self, voucher_no):
+		self.flush_pending_updates()
 		stock_entry = frappe.get_doc("Stock Entry", voucher_no, for_update=True)
 		stock_entry.calculate_rate_and_amount(reset_outgoing_rate=False, raise_error_if_no_rate=False)
 		stock_entry.db_update()
@@ -574,9 +681,17 @@ class update_entries_after(object):
 
 	def update_rate_on_delivery_and_sales_return(self, sle, outgoing_rate):
 		# Update item's incoming rate on transaction
-		item_code = frappe.db.get_value(sle.voucher_type + " Item", sle.voucher_detail_no, "item_code")
+		item_doctype = sle.voucher_type + " Item"
+		if (item_doctype, sle.voucher_detail_no) in self.transaction_item_codes:
+			item_code = self.transaction_item_codes[(item_doctype, sle.voucher_detail_no)]
+		else:
+			item_code = frappe.db.get_value(item_doctype, sle.voucher_detail_no, "item_code")
+
 		if item_code == sle.item_code:
-			frappe.db.set_value(sle.voucher_type + " Item", sle.voucher_detail_no, "incoming_rate", outgoing_rate)
+			if self.batch_size:
+				self.pending_rate_updates[(item_doctype, "incoming_rate")][sle.voucher_detail_no] = outgoing_rate
+			else:
+				frappe.db.set_value(item_doctype, sle.voucher_detail_no, "incoming_rate", outgoing_rate)
 		else:
 			# packed item
 			frappe.db.set_value("Packed Item",
@@ -591,6 +706,7 @@ class update_entries_after(object):
 
 		# Recalculate subcontracted item's rate in case of subcontracted purchase receipt/invoice
 		if frappe.get_cached_value(sle.voucher_type, sle.voucher_no, "is_subcontracted") == 'Yes':
+			self.flush_pending_updates()
 			doc = frappe.get_doc(sle.voucher_type, sle.voucher_no)
 			doc.update_valuation_rate(reset_outgoing_rate=False)
 			for d in (doc.items + doc.supplied_items):
@@ -629,6 +745,7 @@ class update_entries_after(object):
 		if not self.wh_data.valuation_rate and sle.voucher_detail_no:
 			allow_zero_rate = self.check_if_allow_zero_valuation_rate(sle.voucher_type, sle.voucher_detail_no)
 			if not allow_zero_rate:
+				self.flush_pending_updates()
 				self.wh_data.valuation_rate = get_valuation_rate(sle.item_code, sle.warehouse,
 					sle.voucher_type, sle.voucher_no, self.allow_zero_rate,
 					currency=erpnext.get_company_currency(sle.company), company=sle.company)
@@ -643,24 +760,16 @@ class update_entries_after(object):
 
 		# Get rate for serial nos which has been transferred to other company
 		invalid_serial_nos = [d.name for d in all_serial_nos if d.company!=sle.company]
-		for serial_no in invalid_serial_nos:
-			incoming_rate = frappe.db.sql("""
-				select incoming_rate
-				from `tabStock Ledger Entry`
-				where
-					company = %s
-					and actual_qty > 0
-					and is_cancelled = 0
-					and (serial_no = %s
-						or serial_no like %s
-						or serial_no like %s
-						or serial_no like %s
-					)
-				order by posting_date desc
-				limit 1
-			""", (sle.company, serial_no, serial_no+'\n%', '%\n'+serial_no, '%\n'+serial_no+'\n%'))
-
-			incoming_values += flt(incoming_rate[0][0]) if incoming_rate else 0
+		if invalid_serial_nos:
+			self.flush_pending_updates()
+
+			# latest incoming rate of each serial no
+			incoming_rates = {}
+			for d in get_serial_no_ledger_entries(invalid_serial_nos,
+				filters={"company": sle.company, "actual_qty": (">", 0)}, fields=["incoming_rate"]):
+				incoming_rates.setdefault(d.serial_no.upper(), d.incoming_rate)
+
+			incoming_values += sum(flt(incoming_rates.get(serial_no.upper())) for serial_no in invalid_serial_nos)
 
 		return incoming_values
 
@@ -697,6 +806,7 @@ class update_entries_after(object):
 			if not self.wh_data.valuation_rate and sle.voucher_detail_no:
 				allow_zero_valuation_rate = self.check_if_allow_zero_valuation_rate(sle.voucher_type, sle.voucher_detail_no)
 				if not allow_zero_valuation_rate:
+					self.flush_pending_updates()
 					self.wh_data.valuation_rate = get_valuation_rate(sle.item_code, sle.warehouse,
 						sle.voucher_type, sle.voucher_no, self.allow_zero_rate,
 						currency=erpnext.get_company_currency(sle.company), company=sle.company)
@@ -713,6 +823,7 @@ class update_entries_after(object):
 			def rate_generator() -> float:
 				allow_zero_valuation_rate = self.check_if_allow_zero_valuation_rate(sle.voucher_type, sle.voucher_detail_no)
 				if not allow_zero_valuation_rate:
+					self.flush_pending_updates()
 					return get_valuation_rate(sle.item_code, sle.warehouse,
 						sle.voucher_type, sle.voucher_no, self.allow_zero_rate,
 						currency=erpnext.get_company_currency(sle.company), company=sle.company)
@@ -786,6 +897,8 @@ class update_entries_after(object):
 				raise NegativeStockError(message)
 
 	def update_bin(self):
+		from erpnext.selling.page.point_of_sale.point_of_sale import clear_item_availability_cache
+
 		# update bin for each warehouse
 		for warehouse, data in self.data.items():
 			bin_name = get_or_make_bin(self.item_code, warehouse)
@@ -795,31 +908,36 @@ class update_entries_after(object):
 				"actual_qty": data.qty_after_transaction,
 				"stock_value": data.stock_value
 			})
+			clear_item_availability_cache(self.item_code, warehouse)
 
 
 def get_previous_sle_of_current_voucher(args, exclude_current_voucher=False):
 	"""get stock ledger entries filtered by specific posting datetime conditions"""
 
-	args['time_format'] = '%H:%i:%s'
 	if not args.get("posting_date"):
 		args["posting_date"] = "1900-01-01"
 	if not args.get("posting_time"):
 		args["posting_time"] = "00:00"
 
+	# compare up to seconds
+	args["posting_datetime"] = get_combine_datetime(args["posting_date"], args["posting_time"]).replace(microsecond=0)
+
 	voucher_condition = ""
 	if exclude_current_voucher:
 		voucher_no = args.get("voucher_no")
 		voucher_condition = f"and voucher_no != '{voucher_no}'"
+	else:
+		voucher_condition = get_checkpoint_condition(args)
 
 	sle = frappe.db.sql("""
-		select *, timestamp(posting_date, posting_time) as "timestamp"
+		select *, posting_datetime as "timestamp"
 		from `tabStock Ledger Entry`
 		where item_code = %(item_code)s
 			and warehouse = %(warehouse)s
 			and is_cancelled = 0
 			{voucher_condition}
-			and timestamp(posting_date, time_format(posting_time, %(time_format)s)) < timestamp(%(posting_date)s, time_format(%(posting_time)s, %(time_format)s))
-		order by timestamp(posting_date, posting_time) desc, creation desc
+			and posting_datetime < %(posting_datetime)s
+		order by posting_datetime desc, creation desc
 		limit 1
 		for update""".format(voucher_condition=voucher_condition), args, as_dict=1)
 
@@ -846,40 +964,40 @@ def get_previous_sle(args, for_update=False):
 def get_stock_ledger_entries(previous_sle, operator=None,
 	order="desc", limit=None, for_update=False, debug=False, check_serial_no=True):
 	"""get stock ledger entries filtered by specific posting datetime conditions"""
-	conditions = " and timestamp(posting_date, posting_time) {0} timestamp(%(posting_date)s, %(posting_time)s)".format(operator)
+	conditions = " and posting_datetime {0} %(posting_datetime)s".format(operator)
 	if previous_sle.get("warehouse"):
 		conditions += " and warehouse = %(warehouse)s"
 	elif previous_sle.get("warehouse_condition"):
 		conditions += " and " + previous_sle.get("warehouse_condition")
 
 	if check_serial_no and previous_sle.get("serial_no"):
-		# conditions += " and serial_no like {}".format(frappe.db.escape('%{0}%'.format(previous_sle.get("serial_no"))))
-		serial_no = previous_sle.get("serial_no")
-		conditions += (""" and
-			(
-				serial_no = {0}
-				or serial_no like {1}
-				or serial_no like {2}
-				or serial_no like {3}
-			)
-		""").format(frappe.db.escape(serial_no), frappe.db.escape('{}\n%'.format(serial_no)),
-			frappe.db.escape('%\n{}'.format(serial_no)), frappe.db.escape('%\n{}\n%'.format(serial_no)))
+		conditions += """ and name in (
+			select stock_ledger_entry
+			from `tabStock Ledger Entry Serial No`
+			where serial_no = %(serial_no)s
+		)"""
 
 	if not previous_sle.get("posting_date"):
 		previous_sle["posting_date"] = "1900-01-01"
 	if not previous_sle.get("posting_time"):
 		previous_sle["posting_time"] = "00:00"
 
+	previous_sle["posting_datetime"] = get_combine_datetime(previous_sle["posting_date"], previous_sle["posting_time"])
+
 	if operator in (">", "<=") and previous_sle.get("name"):
 		conditions += " and name!=%(name)s"
 
+	if (operator in ("<", "<=") and order == "desc" and limit and previous_sle.get("warehouse")
+		and not (check_serial_no and previous_sle.get("serial_no"))):
+		conditions += get_checkpoint_condition(previous_sle, exclude_sle=previous_sle.get("name"))
+
 	return frappe.db.sql("""
-		select *, timestamp(posting_date, posting_time) as "timestamp"
+		select *, posting_datetime as "timestamp"
 		from `tabStock Ledger Entry`
 		where item_code = %%(item_code)s
 		and is_cancelled = 0
 		%(conditions)s
-		order by timestamp(posting_date, posting_time) %(order)s, creation %(order)s
+		order by posting_datetime %(order)s, creation %(order)s
 		%(limit)s %(for_update)s""" % {
 			"conditions": conditions,
 			"limit": limit or "",
@@ -887,10 +1005,67 @@ def get_stock_ledger_entries(previous_sle, operator=None,
 			"order": order
 		}, previous_sle, as_dict=1, debug=debug)
 
+def bulk_update_sle(sl_entries):
+	"""Update recomputed valuation fields of multiple SLEs in a single query."""
+	fields = ("qty_after_transaction", "valuation_rate", "stock_value", "stock_queue",
+		"stock_value_difference", "incoming_rate", "outgoing_rate")
+
+	bulk_update_values("Stock Ledger Entry", {
+		fieldname: {sle.name: sle.get(fieldname) for sle in sl_entries}
+		for fieldname in fields
+	})
+
+def bulk_update_values(doctype, values):
+	"""
+		Update multiple columns of multiple rows with one query using `case` expressions
+
+		values = {
+			"fieldname": {"row name": value, ...},
+		}
+	"""
+	names = set()
+	for row_values in values.values():
+		names.update(row_values)
+
+	if not names:
+		return
+
+	set_clauses, query_values = [], []
+	for fieldname, row_values in values.items():
+		cases = []
+		for name, value in row_values.items():
+			cases.append("when %s then %s")
+			query_values.extend([name, value])
+
+		set_clauses.append("`{0}` = case name {1} else `{0}` end".format(fieldname, " ".join(cases)))
+
+	names = list(names)
+	query_values.extend(names)
+
+	frappe.db.sql("""
+		update `tab{doctype}`
+		set {set_clauses}
+		where name in ({placeholders})
+	""".format(doctype=doctype, set_clauses=", ".join(set_clauses),
+		placeholders=", ".join(["%s"] * len(names))), tuple(query_values))
+
+def get_checkpoint_condition(args, exclude_sle=None):
+	"""
+		Condition to skip the ledger history before the latest stock ledger checkpoint,
+		when looking for the last SLE of an item-warehouse before a posting datetime.
+
+		The SLE of the checkpoint satisfies the condition itself, so the result is unchanged.
+	"""
+	checkpoint = get_latest_checkpoint(args.get("item_code"), args.get("warehouse"), args.get("posting_date"))
+	if not checkpoint or checkpoint.stock_ledger_entry == exclude_sle:
+		return ""
+
+	return " and posting_datetime >= {0}".format(frappe.db.escape(str(checkpoint.posting_date)))
+
 def get_sle_by_voucher_detail_no(voucher_detail_no, excluded_sle=None):
 	return frappe.db.get_value('Stock Ledger Entry',
 		{'voucher_detail_no': voucher_detail_no, 'name': ['!=', excluded_sle]},
-		['item_code', 'warehouse', 'posting_date', 'posting_time', 'timestamp(posting_date, posting_time) as timestamp'],
+		['item_code', 'warehouse', 'posting_date', 'posting_time', 'posting_datetime as timestamp'],
 		as_dict=1)
 
 def get_valuation_rate(item_code, warehouse, voucher_type, voucher_no,
@@ -964,6 +1139,8 @@ def update_qty_in_future_sle(args, allow_negative_stock=False):
 	if args.voucher_type == "Stock Reconciliation":
 		qty_shift = get_stock_reco_qty_shift(args)
 
+	args.posting_datetime = get_combine_datetime(args.posting_date, args.posting_time)
+
 	# find the next nearest stock reco so that we only recalculate SLEs till that point
 	next_stock_reco_detail = get_next_stock_reco(args)
 	if next_stock_reco_detail:
@@ -979,9 +1156,9 @@ def update_qty_in_future_sle(args, allow_negative_stock=False):
 			and warehouse = %(warehouse)s
 			and voucher_no != %(voucher_no)s
 			and is_cancelled = 0
-			and (timestamp(posting_date, posting_time) > timestamp(%(posting_date)s, %(posting_time)s)
+			and (posting_datetime > %(posting_datetime)s
 				or (
-					timestamp(posting_date, posting_time) = timestamp(%(posting_date)s, %(posting_time)s)
+					posting_datetime = %(posting_datetime)s
 					and creation > %(creation)s
 				)
 			)
@@ -1016,7 +1193,7 @@ def get_next_stock_reco(args):
 
 	return frappe.db.sql("""
 		select
-			name, posting_date, posting_time, creation, voucher_no
+			name, posting_date, posting_time, posting_datetime, creation, voucher_no
 		from
 			`tabStock Ledger Entry`
 		where
@@ -1025,9 +1202,9 @@ def get_next_stock_reco(args):
 			and voucher_type = 'Stock Reconciliation'
 			and voucher_no != %(voucher_no)s
 			and is_cancelled = 0
-			and (timestamp(posting_date, posting_time) > timestamp(%(posting_date)s, %(posting_time)s)
+			and (posting_datetime > %(posting_datetime)s
 				or (
-					timestamp(posting_date, posting_time) = timestamp(%(posting_date)s, %(posting_time)s)
+					posting_datetime = %(posting_datetime)s
 					and creation > %(creation)s
 				)
 			)
@@ -1037,9 +1214,9 @@ def get_next_stock_reco(args):
 def get_datetime_limit_condition(detail):
 	return f"""
 		and
-		(timestamp(posting_date, posting_time) < timestamp('{detail.posting_date}', '{detail.posting_time}')
+		(posting_datetime < '{detail.posting_datetime}'
 			or (
-				timestamp(posting_date, posting_time) = timestamp('{detail.posting_date}', '{detail.posting_time}')
+				posting_datetime = '{detail.posting_datetime}'
 				and creation < '{detail.creation}'
 			)
 		)"""
@@ -1080,6 +1257,8 @@ def validate_negative_qty_in_future_sle(args, allow_negative_stock=False):
 
 
 def get_future_sle_with_negative_qty(args):
+	args.posting_datetime = get_combine_datetime(args.posting_date, args.posting_time)
+
 	return frappe.db.sql("""
 		select
 			qty_after_transaction, posting_date, posting_time,
@@ -1089,31 +1268,33 @@ def get_future_sle_with_negative_qty(args):
 			item_code = %(item_code)s
 			and warehouse = %(warehouse)s
 			and voucher_no != %(voucher_no)s
-			and timestamp(posting_date, posting_time) >= timestamp(%(posting_date)s, %(posting_time)s)
+			and posting_datetime >= %(posting_datetime)s
 			and is_cancelled = 0
 			and qty_after_transaction < 0
-		order by timestamp(posting_date, posting_time) asc
+		order by posting_datetime asc
 		limit 1
 	""", args, as_dict=1)
 
 
 def get_future_sle_with_negative_batch_qty(args):
+	args.posting_datetime = get_combine_datetime(args.posting_date, args.posting_time)
+
 	return frappe.db.sql("""
 		with batch_ledger as (
 			select
-				posting_date, posting_time, voucher_type, voucher_no,
-				sum(actual_qty) over (order by posting_date, posting_time, creation) as cumulative_total
+				posting_date, posting_time, posting_datetime, voucher_type, voucher_no,
+				sum(actual_qty) over (order by posting_datetime, creation) as cumulative_total
 			from `tabStock Ledger Entry`
 			where
 				item_code = %(item_code)s
 				and warehouse = %(warehouse)s
 				and batch_no=%(batch_no)s
 				and is_cancelled = 0
-			order by posting_date, posting_time, creation
+			order by posting_datetime, creation
 		)
 		select * from batch_ledger
 		where
 			cumulative_total < 0.0
-			and timestamp(posting_date, posting_time) >= timestamp(%(posting_date)s, %(posting_time)s)
+			and posting_datetime >= %(posting_datetime)s
 		limit 1
 	""", args, as_dict=1)
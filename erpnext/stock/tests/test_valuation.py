@@ -3,7 +3,12 @@ import unittest
 from hypothesis import given
 from hypothesis import strategies as st
 
-from erpnext.stock.valuation import FIFOValuation, _round_off_if_near_zero
+from erpnext.stock.valuation import (
+	FIFOValuation,
+	_round_off_if_near_zero,
+	dump_stock_queue,
+	load_stock_queue,
+)
 
 qty_gen = st.floats(min_value=-1e6, max_value=1e6)
 value_gen = st.floats(min_value=1, max_value=1e6)
@@ -124,6 +129,36 @@ class TestFifoValuation(unittest.TestCase):
 		self.queue.add_stock(5, 17)
 		self.queue.add_stock(8, 11)
 
+	def test_consuming_long_queue(self):
+		for i in range(1, 1001):
+			self.queue.add_stock(1, i)
+
+		for i in range(1, 901):
+			self.assertEqual(self.queue.remove_stock(1), [[1, i]])
+
+		self.assertEqual(len(self.queue), 100)
+		self.assertEqual(self.queue.get_state()[0], [1, 901])
+
+		self.queue.remove_stock(1, 950)
+		self.assertEqual(len(self.queue), 99)
+		self.assertNotIn([1, 950], self.queue.get_state())
+
+	def test_stock_queue_encoding(self):
+		queue = [[1, 10], [2.5, 20]]
+		self.assertEqual(dump_stock_queue(queue), "[[1,10],[2.5,20]]")
+		self.assertEqual(dump_stock_queue(queue, compress=True), "[[1,10],[2.5,20]]")
+
+		long_queue = [[1, rate] for rate in range(1000)]
+		encoded = dump_stock_queue(long_queue, compress=True)
+		self.assertTrue(encoded.startswith("zlib:"))
+		self.assertLess(len(encoded), len(dump_stock_queue(long_queue)))
+		self.assertEqual(load_stock_queue(encoded), long_queue)
+
+		# JSON stored before compact encoding
+		self.assertEqual(load_stock_queue("[[1, 10], [2.5, 20]]"), queue)
+		self.assertEqual(load_stock_queue(None), [])
+		self.assertEqual(load_stock_queue(""), [])
+
 	@given(stock_queue_generator)
 	def test_fifo_qty_hypothesis(self, stock_queue):
 		self.queue = FIFOValuation([])
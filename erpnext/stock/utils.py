@@ -2,13 +2,15 @@
 # License: GNU General Public License v3. See license.txt
 
 
+import datetime
 import json
 
 import frappe
 from frappe import _
-from frappe.utils import cstr, flt, get_link_to_form, nowdate, nowtime
+from frappe.utils import cstr, flt, get_link_to_form, get_time, getdate, nowdate, nowtime
 
 import erpnext
+from erpnext.stock.valuation import load_stock_queue
 
 
 class InvalidWarehouseCompany(frappe.ValidationError): pass
@@ -40,9 +42,13 @@ def get_stock_value_from_bin(warehouse=None, item_code=None):
 	return stock_value
 
 def get_stock_value_on(warehouse=None, posting_date=None, item_code=None):
+	from erpnext.stock.doctype.stock_ledger_checkpoint.stock_ledger_checkpoint import (
+		get_latest_checkpoint_period,
+	)
+
 	if not posting_date: posting_date = nowdate()
 
-	values, condition = [posting_date], ""
+	values, condition = [], ""
 
 	if warehouse:
 
@@ -56,27 +62,51 @@ def get_stock_value_on(warehouse=None, posting_date=None, item_code=None):
 
 		else:
 			values.append(warehouse)
-			condition += " AND warehouse = %s"
+			condition += " AND sle.warehouse = %s"
 
 	if item_code:
 		values.append(item_code)
-		condition += " AND item_code = %s"
+		condition += " AND sle.item_code = %s"
+
+	sle_map = {}
+	def set_stock_value(entries):
+		for sle in entries:
+			sle_map.setdefault((sle.item_code, sle.warehouse), flt(sle.stock_value))
+
+	period_end = get_latest_checkpoint_period(posting_date)
+	if not period_end:
+		set_stock_value(get_stock_value_entries(condition, [posting_date] + values))
+		return sum(sle_map.values())
+
+	# entries after the latest checkpoint take precedence over the checkpoint
+	set_stock_value(get_stock_value_entries(condition + " AND sle.posting_date > %s",
+		[posting_date] + values + [period_end]))
+
+	set_stock_value(frappe.db.sql("""
+		SELECT item_code, warehouse, stock_value
+		FROM `tabStock Ledger Checkpoint` sle
+		WHERE period_end = %s {0}
+	""".format(condition), [period_end] + values, as_dict=1))
+
+	# item-warehouses without a valid checkpoint
+	set_stock_value(get_stock_value_entries(condition + """ AND not exists (
+			select name from `tabStock Ledger Checkpoint` checkpoint
+			where checkpoint.item_code = sle.item_code
+				and checkpoint.warehouse = sle.warehouse
+				and checkpoint.period_end = %s)""",
+		[period_end] + values + [period_end]))
 
-	stock_ledger_entries = frappe.db.sql("""
+	return sum(sle_map.values())
+
+def get_stock_value_entries(condition, values):
+	return frappe.db.sql("""
 		SELECT item_code, stock_value, name, warehouse
 		FROM `tabStock Ledger Entry` sle
 		WHERE posting_date <= %s {0}
 			and is_cancelled = 0
-		ORDER BY timestamp(posting_date, posting_time) DESC, creation DESC
+		ORDER BY posting_datetime DESC, creation DESC
 	""".format(condition), values, as_dict=1)
 
-	sle_map = {}
-	for sle in stock_ledger_entries:
-		if not (sle.item_code, sle.warehouse) in sle_map:
-			sle_map[(sle.item_code, sle.warehouse)] = flt(sle.stock_value)
-
-	return sum(sle_map.values())
-
 @frappe.whitelist()
 def get_stock_balance(item_code, warehouse, posting_date=None, posting_time=None,
 	with_valuation_rate=False, with_serial_no=False):
@@ -110,32 +140,33 @@ def get_stock_balance(item_code, warehouse, posting_date=None, posting_time=None
 		return last_entry.qty_after_transaction if last_entry else 0.0
 
 def get_serial_nos_data_after_transactions(args):
-	from pypika import CustomFunction
-
 	serial_nos = set()
 	args = frappe._dict(args)
 	sle = frappe.qb.DocType('Stock Ledger Entry')
-	Timestamp = CustomFunction('timestamp', ['date', 'time'])
+	sle_serial_no = frappe.qb.DocType('Stock Ledger Entry Serial No')
 
 	stock_ledger_entries = frappe.qb.from_(
 		sle
+	).inner_join(
+		sle_serial_no
+	).on(
+		sle_serial_no.stock_ledger_entry == sle.name
 	).select(
-		'serial_no','actual_qty'
+		sle_serial_no.serial_no, sle.actual_qty
 	).where(
 		(sle.item_code == args.item_code)
 		& (sle.warehouse == args.warehouse)
-		& (Timestamp(sle.posting_date, sle.posting_time) < Timestamp(args.posting_date, args.posting_time))
+		& (sle.posting_datetime < get_combine_datetime(args.posting_date, args.posting_time))
 		& (sle.is_cancelled == 0)
 	).orderby(
-		sle.posting_date, sle.posting_time, sle.creation
+		sle.posting_datetime, sle.creation
 	).run(as_dict=1)
 
 	for stock_ledger_entry in stock_ledger_entries:
-		changed_serial_no = get_serial_nos_data(stock_ledger_entry.serial_no)
 		if stock_ledger_entry.actual_qty > 0:
-			serial_nos.update(changed_serial_no)
+			serial_nos.add(stock_ledger_entry.serial_no)
 		else:
-			serial_nos.difference_update(changed_serial_no)
+			serial_nos.discard(stock_ledger_entry.serial_no)
 
 	return '\n'.join(serial_nos)
 
@@ -228,7 +259,7 @@ def get_incoming_rate(args, raise_error_if_no_rate=True):
 		previous_sle = get_previous_sle(args)
 		if valuation_method == 'FIFO':
 			if previous_sle:
-				previous_stock_queue = json.loads(previous_sle.get('stock_queue', '[]') or '[]')
+				previous_stock_queue = load_stock_queue(previous_sle.get('stock_queue'))
 				in_rate = get_fifo_rate(previous_stock_queue, args.get("qty") or 0) if previous_stock_queue else 0
 		elif valuation_method == 'Moving Average':
 			in_rate = previous_sle.get('valuation_rate') or 0
@@ -456,3 +487,11 @@ def check_pending_reposting(posting_date: str, throw_error: bool = True) -> bool
 			)
 
 	return bool(reposting_pending)
+
+
+def get_combine_datetime(posting_date, posting_time):
+	"""Combine posting date and time into a datetime, as stored in `posting_datetime` of SLE."""
+	if isinstance(posting_time, datetime.timedelta):
+		posting_time = (datetime.datetime.min + posting_time).time()
+
+	return datetime.datetime.combine(getdate(posting_date), get_time(posting_time or "00:00:00"))
@@ -1,4 +1,7 @@
-from typing import Callable, List, NewType, Optional, Tuple
+import base64
+import json
+import zlib
+from typing import Callable, List, NewType, Optional, Tuple, Union
 
 from frappe.utils import flt
 
@@ -8,6 +11,10 @@ FifoBin = NewType("FifoBin", List[float])
 QTY = 0
 RATE = 1
 
+# Compressed stock queues are prefixed to tell them apart from JSON
+COMPRESSED_QUEUE_PREFIX = "zlib:"
+COMPRESS_QUEUE_ABOVE = 50
+
 
 class FIFOValuation:
 	"""Valuation method where a queue of all the incoming stock is maintained.
@@ -15,43 +22,79 @@ class FIFOValuation:
 	New stock is added at end of the queue.
 	Qty consumption happens on First In First Out basis.
 
-	Queue is implemented using "bins" of [qty, rate].
+	Queue is implemented using "bins" of [qty, rate], stored as parallel
+	lists of qty and rate. Consumed bins at the head are skipped using an
+	offset and discarded in batches, so removal from the head is O(1) amortized.
 
 	ref: https://en.wikipedia.org/wiki/FIFO_and_LIFO_accounting
 	"""
 
 	# specifying the attributes to save resources
 	# ref: https://docs.python.org/3/reference/datamodel.html#slots
-	__slots__ = ["queue",]
+	__slots__ = ["qtys", "rates", "head"]
 
 	def __init__(self, state: Optional[List[FifoBin]]):
-		self.queue: List[FifoBin] = state if state is not None else []
+		self._set_state(state or [])
+
+	def _set_state(self, state: List[FifoBin]) -> None:
+		self.qtys: List[float] = [fifo_bin[QTY] for fifo_bin in state]
+		self.rates: List[float] = [fifo_bin[RATE] for fifo_bin in state]
+		self.head = 0
+
+	@property
+	def queue(self) -> List[FifoBin]:
+		return self.get_state()
 
 	def __repr__(self):
-		return str(self.queue)
+		return str(self.get_state())
 
 	def __iter__(self):
-		return iter(self.queue)
+		return iter(self.get_state())
+
+	def __len__(self):
+		return len(self.qtys) - self.head
 
 	def __eq__(self, other):
 		if isinstance(other, list):
-			return self.queue == other
-		return self.queue == other.queue
+			return self.get_state() == other
+		return self.get_state() == other.get_state()
 
 	def get_state(self) -> List[FifoBin]:
 		"""Get current state of queue."""
-		return self.queue
+		return [[qty, rate] for qty, rate in zip(self.qtys[self.head:], self.rates[self.head:])]
 
 	def get_total_stock_and_value(self) -> Tuple[float, float]:
 		total_qty = 0.0
 		total_value = 0.0
 
-		for qty, rate in self.queue:
+		for qty, rate in zip(self.qtys[self.head:], self.rates[self.head:]):
 			total_qty += flt(qty)
 			total_value += flt(qty) * flt(rate)
 
 		return _round_off_if_near_zero(total_qty), _round_off_if_near_zero(total_value)
 
+	def _append(self, qty: float, rate: float) -> None:
+		self.qtys.append(qty)
+		self.rates.append(rate)
+
+	def _pop(self, index: int) -> FifoBin:
+		"""Remove bin at `index` (relative to the head of queue) and return it."""
+		if index:
+			return [self.qtys.pop(self.head + index), self.rates.pop(self.head + index)]
+
+		fifo_bin = [self.qtys[self.head], self.rates[self.head]]
+		self.head += 1
+
+		if self.head == len(self.qtys):
+			self._set_state([])
+		elif self.head >= 32 and self.head * 2 >= len(self.qtys):
+			# discard consumed bins once they make up half of the lists
+			del self.qtys[:self.head]
+			del self.rates[:self.head]
+			self.head = 0
+
+		return fifo_bin
+
 	def add_stock(self, qty: float, rate: float) -> None:
 		"""Update fifo queue with new stock.
 
@@ -59,22 +102,22 @@ class FIFOValuation:
 				qty: new quantity to add
 				rate: incoming rate of new quantity"""
 
-		if not len(self.queue):
-			self.queue.append([0, 0])
+		if not len(self):
+			self._append(0, 0)
 
 		# last row has the same rate, merge new bin.
-		if self.queue[-1][RATE] == rate:
-			self.queue[-1][QTY] += qty
+		if self.rates[-1] == rate:
+			self.qtys[-1] += qty
 		else:
 			# Item has a positive balance qty, add new entry
-			if self.queue[-1][QTY] > 0:
-				self.queue.append([qty, rate])
+			if self.qtys[-1] > 0:
+				self._append(qty, rate)
 			else:  # negative balance qty
-				qty = self.queue[-1][QTY] + qty
+				qty = self.qtys[-1] + qty
 				if qty > 0:  # new balance qty is positive
-					self.queue[-1] = [qty, rate]
+					self.qtys[-1], self.rates[-1] = qty, rate
 				else:  # new balance qty is still negative, maintain same rate
-					self.queue[-1][QTY] = qty
+					self.qtys[-1] = qty
 
 	def remove_stock(
 		self, qty: float, outgoing_rate: float = 0.0, rate_generator: Callable[[], float] = None
@@ -91,51 +134,78 @@ class FIFOValuation:
 
 		consumed_bins = []
 		while qty:
-			if not len(self.queue):
+			if not len(self):
 				# rely on rate generator.
-				self.queue.append([0, rate_generator()])
+				self._append(0, rate_generator())
 
 			index = None
 			if outgoing_rate > 0:
 				# Find the entry where rate matched with outgoing rate
-				for idx, fifo_bin in enumerate(self.queue):
-					if fifo_bin[RATE] == outgoing_rate:
-						index = idx
-						break
+				try:
+					index = self.rates.index(outgoing_rate, self.head) - self.head
+				except ValueError:
+					pass
 
 				# If no entry found with outgoing rate, collapse queue
 				if index is None:  # nosemgrep
-					new_stock_value = sum(d[QTY] * d[RATE] for d in self.queue) - qty * outgoing_rate
-					new_stock_qty = sum(d[QTY] for d in self.queue) - qty
-					self.queue = [[new_stock_qty, new_stock_value / new_stock_qty if new_stock_qty > 0 else outgoing_rate]]
+					stock_qty, stock_value = self.qtys[self.head:], self.rates[self.head:]
+					new_stock_value = sum(q * r for q, r in zip(stock_qty, stock_value)) - qty * outgoing_rate
+					new_stock_qty = sum(stock_qty) - qty
+					self._set_state([[new_stock_qty, new_stock_value / new_stock_qty if new_stock_qty > 0 else outgoing_rate]])
 					consumed_bins.append([qty, outgoing_rate])
 					break
 			else:
 				index = 0
 
 			# select first bin or the bin with same rate
-			fifo_bin = self.queue[index]
-			if qty >= fifo_bin[QTY]:
+			bin_qty, bin_rate = self.qtys[self.head + index], self.rates[self.head + index]
+			if qty >= bin_qty:
 				# consume current bin
-				qty = _round_off_if_near_zero(qty - fifo_bin[QTY])
-				to_consume = self.queue.pop(index)
-				consumed_bins.append(list(to_consume))
+				qty = _round_off_if_near_zero(qty - bin_qty)
+				consumed_bins.append(self._pop(index))
 
-				if not self.queue and qty:
+				if not len(self) and qty:
 					# stock finished, qty still remains to be withdrawn
 					# negative stock, keep in as a negative bin
-					self.queue.append([-qty, outgoing_rate or fifo_bin[RATE]])
-					consumed_bins.append([qty, outgoing_rate or fifo_bin[RATE]])
+					self._append(-qty, outgoing_rate or bin_rate)
+					consumed_bins.append([qty, outgoing_rate or bin_rate])
 					break
 			else:
 				# qty found in current bin consume it and exit
-				fifo_bin[QTY] = _round_off_if_near_zero(fifo_bin[QTY] - qty)
-				consumed_bins.append([qty, fifo_bin[RATE]])
+				self.qtys[self.head + index] = _round_off_if_near_zero(bin_qty - qty)
+				consumed_bins.append([qty, bin_rate])
 				qty = 0
 
 		return consumed_bins
 
 
+def dump_stock_queue(queue: List[FifoBin], compress: bool = False) -> str:
+	"""Serialize stock queue for the `stock_queue` field of Stock Ledger Entry.
+
+	Queue is stored as compact JSON. If `compress` is set, queues longer than
+	`COMPRESS_QUEUE_ABOVE` bins are stored zlib compressed with a prefix."""
+	data = json.dumps(queue, separators=(",", ":"))
+
+	if compress and len(queue) > COMPRESS_QUEUE_ABOVE:
+		return COMPRESSED_QUEUE_PREFIX + base64.b64encode(zlib.compress(data.encode())).decode()
+
+	return data
+
+
+def load_stock_queue(value: Union[str, List[FifoBin], None]) -> List[FifoBin]:
+	"""Read stock queue stored by `dump_stock_queue`, or as plain JSON."""
+	if not value:
+		return []
+
+	if isinstance(value, list):
+		return value
+
+	if value.startswith(COMPRESSED_QUEUE_PREFIX):
+		value = zlib.decompress(base64.b64decode(value[len(COMPRESSED_QUEUE_PREFIX):])).decode()
+
+	return json.loads(value)
+
+
 def _round_off_if_near_zero(number: float, precision: int = 7) -> float:
 	"""Rounds off the number to zero only if number is close to zero for decimal
 	specified in precision. Precision defaults to 7.
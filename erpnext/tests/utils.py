@@ -2,7 +2,9 @@
 # License: GNU General Public License v3. See license.txt
 
 import copy
+import os
 import signal
+import time
 import unittest
 from contextlib import contextmanager
 from typing import Any, Dict, NewType, Optional
@@ -164,3 +166,30 @@ def timeout(seconds=30, error_message="Test timed out."):
 			return result
 		return wrapper
 	return decorator
+
+
+def benchmark(func):
+	""" Skips a benchmark unless the ERPNEXT_BENCHMARK environment variable is set,
+		as benchmarks build large synthetic data sets and run for minutes.
+
+		ERPNEXT_BENCHMARK=1 bench --site test_site run-tests --module <module> --test <benchmark>"""
+	return unittest.skipUnless(os.environ.get("ERPNEXT_BENCHMARK"), "ERPNEXT_BENCHMARK is not set")(func)
+
+
+def get_benchmark_sizes(*default_sizes):
+	"""Sizes of data sets to benchmark with, overridden by comma separated ERPNEXT_BENCHMARK_SIZES"""
+	sizes = os.environ.get("ERPNEXT_BENCHMARK_SIZES")
+	if sizes:
+		return [int(size) for size in sizes.split(",")]
+
+	return list(default_sizes)
+
+
+@contextmanager
+def timer(label):
+	"""Prints the time taken by the block"""
+	start = time.perf_counter()
+	try:
+		yield
+	finally:
+		print(f"{label}: {time.perf_counter() - start:.3f}s")